@@ -0,0 +1,22 @@
+"""Console entry point.
+
+Shell completion (``artctl __complete ...``) is answered before the CLI module, and
+with it PyYAML and every subcommand, is imported.
+"""
+
+import sys
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["__complete"]:
+        from . import complete
+
+        return complete.main(argv[1:])
+    from . import cli
+
+    return cli.main(argv)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,331 @@
+"""Programmatic asyncio API for embedding artctl in other services.
+
+Unlike :mod:`artctl.cli`, nothing here prints or exits. Validation problems surface as
+the underlying module exceptions (:class:`~artctl.registry.RegistryError`,
+:class:`~artctl.params.ParameterError`, :class:`~artctl.output_manager.OutputError`,
+:class:`~artctl.templater.TemplateError`, :class:`~artctl.runner.RunnerError`) and
+generator failures are reported through :class:`RunResult`.
+
+Typical use::
+
+    entries = api.load("registry")
+    result = await api.run(entries["spiral"], {"turns": 40})
+    if result.ok:
+        publish(result.output_path)
+
+Preview loops can skip the disk entirely with ``output_mode="shm"``: the generator
+writes raw pixels into shared memory and ``result.frame`` is a
+:class:`~artctl.sdk.SharedFrame` to read and then ``close()``.
+"""
+
+import asyncio
+import os
+from dataclasses import dataclass
+from datetime import datetime
+
+from . import catalog
+from . import coalesce
+from . import dedupe
+from . import output_manager
+from . import params
+from . import placement as placement_module
+from . import registry
+from . import runner
+from . import sdk
+from . import stats
+from . import templater
+
+
+@dataclass(frozen=True)
+class RunPlan:
+    """A fully resolved run: the command to execute and where its output lands."""
+
+    program: str
+    command: list
+    output_path: str
+    params: dict
+    placement: dict = None
+    staging_path: str = None
+    output_mode: str = output_manager.DEFAULT_OUTPUT_MODE
+    segment: str = None
+
+
+@dataclass(frozen=True)
+class RunResult:
+    """Outcome of executing a :class:`RunPlan`."""
+
+    program: str
+    command: list
+    output_path: str
+    params: dict
+    exit_status: int
+    output_verified: bool
+    started_at: str
+    wall_time: float
+    user_time: float
+    system_time: float
+    max_rss_kb: int
+    placement: dict = None
+    output_digest: str = None
+    output_size: int = None
+    frame: object = None
+
+    @property
+    def ok(self):
+        return self.exit_status == 0 and self.output_verified
+
+
+def load(registry_path="registry", cache=None):
+    """Load registry entries, optionally through a :class:`~artctl.registry.RegistryCache`."""
+    if cache is not None:
+        return cache.load(registry_path)
+    return registry.load_registry(registry_path)
+
+
+def resolve(entry, overrides=None):
+    """Coerce overrides against the entry's declared params and apply defaults.
+
+    ``overrides`` is either a list of ``KEY=VALUE`` strings, as accepted by ``--set``,
+    or a mapping of parameter names to values.
+    """
+    if isinstance(overrides, dict):
+        overrides = [
+            "{0}={1}".format(name, _format_value(value)) for name, value in overrides.items()
+        ]
+    return params.parse_overrides(overrides or [], entry.get("params", []))
+
+
+def plan(
+    entry,
+    values,
+    base_dir=None,
+    now=None,
+    placement=None,
+    project_root=None,
+    scratch_dir=None,
+    output_mode=None,
+):
+    """Compute the output path and render the command for resolved parameter values.
+
+    Like ``artctl run``, this creates the dated output directory. With ``scratch_dir``
+    the command writes to a staging path there instead of the final output path.
+    ``output_mode`` overrides the entry's ``output.mode``; ``"shm"`` plans a fresh
+    shared-memory segment and no output path.
+    """
+    values = dict(values)
+    mode = output_mode or output_manager.output_mode(entry)
+    if mode not in output_manager.OUTPUT_MODES:
+        raise output_manager.OutputError(
+            "Output mode must be one of {0}; got '{1}'.".format(
+                list(output_manager.OUTPUT_MODES), mode
+            )
+        )
+    output_path = None
+    staged = None
+    segment = None
+    if mode == "shm":
+        segment = output_manager.shared_segment_name()
+        values["output"] = sdk.SHM_PREFIX + segment
+    else:
+        output_path = output_manager.build_output_path(
+            entry, base_dir=base_dir, now=now, params_values=values
+        )
+        if scratch_dir:
+            staged = output_manager.staging_path(output_path, scratch_dir)
+        values["output"] = staged or output_path
+        if mode == "stream":
+            values["output"] = output_manager.STREAM_TARGET
+    command = templater.render_command(entry, values, project_root)
+    return RunPlan(
+        program=entry["name"],
+        command=command,
+        output_path=output_path,
+        params={key: value for key, value in values.items() if key != "output"},
+        placement=placement,
+        staging_path=staged,
+        output_mode=mode,
+        segment=segment,
+    )
+
+
+def execute_plan(
+    entry, run_plan, working_dir=None, catalog_path=None, background_publish=False
+):
+    """Execute a plan synchronously and return its :class:`RunResult`.
+
+    Staged output is verified in scratch and then published to the final path; with
+    ``background_publish`` a cross-filesystem copy is left running on a worker thread
+    (see :func:`artctl.output_manager.wait_for_publishes`) instead of delaying the result.
+    Failed or unverified staged output is discarded, and so is a failed run's
+    shared-memory segment, including when :class:`~artctl.runner.RunnerError` is raised.
+    For entries with ``mode: stream`` output the generator's stdout is captured and the
+    result carries its digest and size.
+    For ``shm`` output the result's ``frame`` holds the attached segment; the caller
+    must ``close()`` it.
+    """
+    started_at = datetime.now().isoformat(timespec="seconds")
+    written_path = run_plan.staging_path or run_plan.output_path
+    streamed = run_plan.output_mode == "stream"
+    if written_path:
+        dedupe.break_link(written_path)
+    try:
+        usage = runner.run_process(
+            run_plan.command,
+            working_dir=working_dir,
+            placement=run_plan.placement,
+            stdout_path=written_path if streamed else None,
+            runtime=entry.get("runtime"),
+        )
+    except BaseException:
+        # Whatever the generator left in scratch or shared memory would otherwise leak.
+        if run_plan.staging_path:
+            output_manager.discard_staged(run_plan.staging_path)
+        if run_plan.segment:
+            _attach_frame(run_plan.segment, keep=False)
+        raise
+    exit_status = usage["returncode"]
+    frame = None
+    if run_plan.segment:
+        frame = _attach_frame(run_plan.segment, keep=exit_status == 0)
+        verified = frame is not None
+    else:
+        verified = exit_status == 0 and output_manager.verify_output(entry, written_path)
+    if run_plan.staging_path:
+        if verified and os.path.exists(run_plan.staging_path):
+            future = output_manager.publish_output(
+                run_plan.staging_path, run_plan.output_path, background=background_publish
+            )
+            if not background_publish:
+                future.result()
+        else:
+            output_manager.discard_staged(run_plan.staging_path)
+    result = RunResult(
+        program=run_plan.program,
+        command=run_plan.command,
+        output_path=run_plan.output_path,
+        params=run_plan.params,
+        exit_status=exit_status,
+        output_verified=verified,
+        started_at=started_at,
+        wall_time=usage["wall_time"],
+        user_time=usage["user_time"],
+        system_time=usage["system_time"],
+        max_rss_kb=usage["max_rss_kb"],
+        placement=run_plan.placement,
+        output_digest=usage.get("output_digest"),
+        output_size=usage.get("output_size"),
+        frame=frame,
+    )
+    if catalog_path:
+        record = catalog.make_record(
+            result.program,
+            result.params,
+            result.output_path or sdk.SHM_PREFIX + run_plan.segment,
+            exit_status,
+            placement=result.placement,
+            started_at=started_at,
+            version=stats.source_version(entry, working_dir),
+        )
+        catalog.record_usage(record, usage)
+        if result.output_digest:
+            record["output_digest"] = result.output_digest
+            record["output_size"] = result.output_size
+        catalog.append_record(catalog_path, record)
+    return result
+
+
+def _attach_frame(segment, keep):
+    try:
+        frame = sdk.SharedFrame(segment)
+    except sdk.SDKError:
+        return None
+    if not keep:
+        frame.close()
+        return None
+    return frame
+
+
+async def run(
+    entry,
+    overrides=None,
+    *,
+    base_dir=None,
+    placement=None,
+    worker_index=0,
+    working_dir=None,
+    catalog_path=None,
+    coalescer=None,
+    scratch_dir=None,
+    background_publish=False,
+    output_mode=None,
+):
+    """Resolve, plan and execute one run without blocking the event loop.
+
+    ``placement`` is a placement config (as in a registry ``placement`` block) merged
+    over the entry's own block and resolved for ``worker_index``. With a
+    :class:`~artctl.coalesce.SingleFlight` as ``coalescer``, concurrent calls for the same
+    program, resolved params and options (entry, directories, placement, output mode)
+    share one generator process and its :class:`RunResult`.
+    ``scratch_dir`` and ``background_publish`` are described in :func:`execute_plan`,
+    ``output_mode`` in :func:`plan`. Coalesced callers share one ``frame``.
+    """
+    values = resolve(entry, overrides)
+    config = placement_module.merge_config(entry.get("placement"), placement)
+    resolved_placement = placement_module.resolve_placement(config, worker_index=worker_index)
+
+    async def _execute():
+        run_plan = plan(
+            entry,
+            values,
+            base_dir=base_dir,
+            placement=resolved_placement,
+            scratch_dir=scratch_dir,
+            output_mode=output_mode,
+        )
+        return await asyncio.to_thread(
+            execute_plan, entry, run_plan, working_dir, catalog_path, background_publish
+        )
+
+    if coalescer is None:
+        return await _execute()
+    options = {
+        "entry": entry,
+        "base_dir": os.path.abspath(base_dir or output_manager.DEFAULT_BASE_DIR),
+        "placement": resolved_placement,
+        "working_dir": os.path.abspath(working_dir or os.getcwd()),
+        "catalog_path": catalog_path,
+        "scratch_dir": scratch_dir,
+        "background_publish": background_publish,
+        "output_mode": output_mode or output_manager.output_mode(entry),
+    }
+    key = coalesce.canonical_key(entry["name"], values, options)
+    result, _ = await coalescer.do(key, _execute)
+    return result
+
+
+async def run_many(requests, concurrency=None, return_exceptions=False, **options):
+    """Run several ``(entry, overrides)`` pairs concurrently, returning results in order.
+
+    At most ``concurrency`` generators run at once (unbounded when ``None``); each
+    request gets its position as ``worker_index`` so placement spreads round-robin.
+    Remaining keyword arguments are passed to :func:`run`.
+    """
+    requests = list(requests)
+    semaphore = asyncio.Semaphore(concurrency) if concurrency else None
+
+    async def _run_one(index, entry, overrides):
+        if semaphore is None:
+            return await run(entry, overrides, worker_index=index, **options)
+        async with semaphore:
+            return await run(entry, overrides, worker_index=index, **options)
+
+    tasks = [
+        _run_one(index, entry, overrides) for index, (entry, overrides) in enumerate(requests)
+    ]
+    return await asyncio.gather(*tasks, return_exceptions=return_exceptions)
+
+
+def _format_value(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
@@ -0,0 +1,243 @@
+"""Pack dated output directories into indexed per-day archives.
+
+Each ``<base>/YYYY/MM/DD/`` directory becomes ``<base>/YYYY/MM/DD.zip`` plus a sidecar
+``DD.zip.idx.json`` mapping every member to the offset of its local header, so a
+single image is extracted with one seek and one read instead of parsing the archive.
+Zip is used rather than tar because members are compressed independently.
+"""
+
+import json
+import os
+import struct
+import zipfile
+import zlib
+
+from . import retention
+
+PACK_EXTENSION = retention.PACK_EXTENSION
+INDEX_SUFFIX = retention.PACK_INDEX_SUFFIX
+INDEX_VERSION = 1
+LOCATION_SEPARATOR = "#"
+
+COMPRESSION_METHODS = {
+    "stored": zipfile.ZIP_STORED,
+    "deflate": zipfile.ZIP_DEFLATED,
+}
+
+_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+_LOCAL_HEADER_SIGNATURE = 0x04034B50
+_COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class ArchiveError(Exception):
+    """Raised when packing or extracting an archive fails."""
+
+
+def pack_path_for(day_path):
+    return day_path.rstrip(os.sep) + PACK_EXTENSION
+
+
+def index_path_for(pack_path):
+    return pack_path + INDEX_SUFFIX
+
+
+def format_location(pack_path, member):
+    return "{0}{1}{2}".format(pack_path, LOCATION_SEPARATOR, member)
+
+
+def split_location(location):
+    """Split ``pack.zip#member`` into ``(pack_path, member)``."""
+    pack_path, sep, member = location.rpartition(LOCATION_SEPARATOR)
+    if not sep or not pack_path or not member:
+        raise ArchiveError(
+            "Archive location must look like PACK.zip#MEMBER; got '{0}'.".format(location)
+        )
+    return pack_path, member
+
+
+def archive_day(day_path, compression="stored", remove=True):
+    """Pack one day directory and return ``(pack_path, {member: original_path})``.
+
+    The pack and its index are written under temporary names and renamed into place,
+    and the archived files are only removed after the pack has been re-read and
+    checked. Days holding anything that would not be packed (hidden files such as
+    in-progress ``.partial`` copies, symlinks) are refused; files that appear while the
+    pack is written are left in place with their directories.
+    """
+    if compression not in COMPRESSION_METHODS:
+        raise ArchiveError(
+            "Unknown compression '{0}'; expected one of {1}.".format(
+                compression, sorted(COMPRESSION_METHODS)
+            )
+        )
+    pack_path = pack_path_for(day_path)
+    if os.path.exists(pack_path):
+        raise ArchiveError("Archive already exists: {0}".format(pack_path))
+
+    skipped = _unarchivable(day_path)
+    if skipped:
+        raise ArchiveError(
+            "Refusing to archive {0}; it holds entries that would not be packed: {1}.".format(
+                day_path, ", ".join(skipped)
+            )
+        )
+    files = sorted(path for path, _ in retention.iter_files(day_path))
+    members = {os.path.relpath(path, day_path).replace(os.sep, "/"): path for path in files}
+    temporary = pack_path + ".partial"
+    try:
+        with zipfile.ZipFile(
+            temporary, "w", compression=COMPRESSION_METHODS[compression], allowZip64=True
+        ) as pack:
+            for member, path in members.items():
+                pack.write(path, member)
+        index = _build_index(temporary)
+        _check_pack(index, members)
+        index_temporary = index_path_for(pack_path) + ".partial"
+        with open(index_temporary, "w", encoding="utf-8") as handle:
+            json.dump(index, handle, sort_keys=True)
+        os.replace(temporary, pack_path)
+        os.replace(index_temporary, index_path_for(pack_path))
+    except (OSError, zipfile.BadZipFile) as exc:
+        for leftover in (temporary, index_path_for(pack_path) + ".partial"):
+            if os.path.exists(leftover):
+                os.unlink(leftover)
+        raise ArchiveError("Failed to archive {0}: {1}".format(day_path, exc))
+
+    if remove:
+        _remove_archived(day_path, files)
+    return pack_path, members
+
+
+def _unarchivable(day_path):
+    skipped = []
+    for directory, dirnames, filenames in os.walk(day_path):
+        for name in dirnames + filenames:
+            path = os.path.join(directory, name)
+            regular = os.path.isdir(path) or os.path.isfile(path)
+            if name.startswith(".") or os.path.islink(path) or not regular:
+                skipped.append(os.path.relpath(path, day_path))
+        dirnames[:] = [name for name in dirnames if not name.startswith(".")]
+    return sorted(skipped)
+
+
+def _remove_archived(day_path, files):
+    for path in files:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+    for directory, _, _ in sorted(os.walk(day_path), reverse=True):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            pass
+
+
+def _build_index(pack_path):
+    members = {}
+    with zipfile.ZipFile(pack_path) as pack:
+        for info in pack.infolist():
+            members[info.filename] = {
+                "offset": info.header_offset,
+                "size": info.file_size,
+                "compressed_size": info.compress_size,
+                "compress_type": info.compress_type,
+                "crc": info.CRC,
+            }
+    return {"version": INDEX_VERSION, "members": members}
+
+
+def _check_pack(index, members):
+    packed = index["members"]
+    if set(packed) != set(members):
+        raise ArchiveError("Archive members do not match the source directory.")
+    for member, path in members.items():
+        if packed[member]["size"] != os.path.getsize(path):
+            raise ArchiveError("Archived size mismatch for {0}.".format(member))
+
+
+def load_index(pack_path):
+    try:
+        with open(index_path_for(pack_path), "r", encoding="utf-8") as handle:
+            index = json.load(handle)
+    except FileNotFoundError:
+        raise ArchiveError("Archive index not found for {0}.".format(pack_path))
+    except (OSError, ValueError) as exc:
+        raise ArchiveError("Failed to read archive index for {0}: {1}".format(pack_path, exc))
+    if index.get("version") != INDEX_VERSION:
+        raise ArchiveError("Unsupported archive index version in {0}.".format(pack_path))
+    return index
+
+
+def extract_member(pack_path, member, destination):
+    """Extract one member to ``destination`` using the sidecar index; return its size."""
+    entry = load_index(pack_path)["members"].get(member)
+    if entry is None:
+        raise ArchiveError("Member '{0}' not found in {1}.".format(member, pack_path))
+    if entry["compress_type"] == zipfile.ZIP_STORED:
+        decompressor = None
+    elif entry["compress_type"] == zipfile.ZIP_DEFLATED:
+        decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+    else:
+        raise ArchiveError("Unsupported compression for member '{0}'.".format(member))
+
+    directory = os.path.dirname(destination)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temporary = destination + ".partial"
+    crc = 0
+    written = 0
+    try:
+        with open(pack_path, "rb") as pack, open(temporary, "wb") as output:
+            pack.seek(entry["offset"])
+            header = pack.read(_LOCAL_HEADER.size)
+            fields = _LOCAL_HEADER.unpack(header)
+            if fields[0] != _LOCAL_HEADER_SIGNATURE:
+                raise ArchiveError(
+                    "Corrupt local header for '{0}' in {1}.".format(member, pack_path)
+                )
+            pack.seek(fields[9] + fields[10], os.SEEK_CUR)
+            remaining = entry["compressed_size"]
+            while remaining:
+                chunk = pack.read(min(_COPY_CHUNK_SIZE, remaining))
+                if not chunk:
+                    raise ArchiveError("Archive {0} is truncated.".format(pack_path))
+                remaining -= len(chunk)
+                if decompressor is not None:
+                    chunk = decompressor.decompress(chunk)
+                crc = zlib.crc32(chunk, crc)
+                written += len(chunk)
+                output.write(chunk)
+            if decompressor is not None:
+                tail = decompressor.flush()
+                crc = zlib.crc32(tail, crc)
+                written += len(tail)
+                output.write(tail)
+        if crc != entry["crc"] or written != entry["size"]:
+            raise ArchiveError(
+                "Checksum mismatch extracting '{0}' from {1}.".format(member, pack_path)
+            )
+        os.replace(temporary, destination)
+    except (OSError, struct.error, zlib.error) as exc:
+        raise ArchiveError("Failed to extract '{0}' from {1}: {2}".format(member, pack_path, exc))
+    finally:
+        if os.path.exists(temporary):
+            os.unlink(temporary)
+    return written
+
+
+def relocate_records(records, relocations):
+    """Point catalog records at archived members; return how many were updated.
+
+    ``relocations`` maps absolute original output paths to archive locations.
+    """
+    updated = 0
+    for record in records:
+        output = record.get("output")
+        if not output:
+            continue
+        location = relocations.get(os.path.abspath(output))
+        if location is not None:
+            record["output"] = location
+            updated += 1
+    return updated
@@ -0,0 +1,292 @@
+"""Parameter sweeps and batched generator invocations.
+
+Entries with a ``batch`` block render many items per process: artctl writes a JSON
+lines manifest of ``{"index", "params", "output"}`` items, runs the batch command once
+with ``{batch_manifest}`` and ``{batch_results}`` substituted, and reads back one
+``{"index", "ok", "error"}`` line per item (see :func:`artctl.sdk.iter_batch` and
+:class:`artctl.sdk.BatchResults`). Other entries are swept one process per item.
+"""
+
+import itertools
+import json
+import os
+import queue
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from . import dedupe
+from . import output_manager
+from . import runner
+from . import templater
+
+DEFAULT_BATCH_SIZE = 256
+
+
+class BatchError(Exception):
+    """Raised when a sweep cannot be planned or a batch cannot be run."""
+
+
+def parse_grid(specs):
+    """Parse ``NAME=a,b,c`` and ``NAME=START:STOP[:STEP]`` specs into ``[(name, values)]``.
+
+    Ranges are inclusive and produce integers when every bound is an integer. Values
+    are returned as strings for :func:`artctl.params.parse_overrides` to coerce.
+    """
+    axes = []
+    seen = set()
+    for spec in specs:
+        name, sep, raw = spec.partition("=")
+        name = name.strip()
+        if not sep or not name or not raw.strip():
+            raise BatchError("Grid axes must use NAME=VALUES format; got '{0}'.".format(spec))
+        if name in seen:
+            raise BatchError("Grid axis '{0}' given more than once.".format(name))
+        seen.add(name)
+        if ":" in raw and "," not in raw:
+            values = _parse_range(spec, raw)
+        else:
+            values = [value.strip() for value in raw.split(",") if value.strip()]
+        if not values:
+            raise BatchError("Grid axis '{0}' has no values.".format(name))
+        axes.append((name, values))
+    return axes
+
+
+def _parse_range(spec, raw):
+    parts = raw.split(":")
+    if len(parts) not in (2, 3):
+        raise BatchError("Grid ranges must be START:STOP[:STEP]; got '{0}'.".format(spec))
+    integral = all(_is_int(part) for part in parts)
+    convert = int if integral else float
+    try:
+        start, stop = convert(parts[0]), convert(parts[1])
+        step = convert(parts[2]) if len(parts) == 3 else convert(1)
+    except ValueError:
+        raise BatchError("Grid range bounds must be numbers; got '{0}'.".format(spec))
+    if step <= 0:
+        raise BatchError("Grid range step must be positive; got '{0}'.".format(spec))
+    values = []
+    count = 0
+    value = start
+    while value <= stop + (0 if integral else step * 1e-9):
+        values.append(str(value))
+        count += 1
+        value = start + step * count
+    return values
+
+
+def _is_int(text):
+    text = text.strip()
+    return text.lstrip("-").isdigit()
+
+
+def expand_grid(axes):
+    """Return one ``{name: value}`` mapping per point of the grid's Cartesian product."""
+    names = [name for name, _ in axes]
+    return [dict(zip(names, combo)) for combo in itertools.product(*[v for _, v in axes])]
+
+
+def supports_batch(entry):
+    return bool(entry.get("batch"))
+
+
+def batch_size(entry, requested=None, count=None, jobs=None):
+    """Return how many items go into one batch invocation of ``entry``.
+
+    Given the ``count`` of items and the number of ``jobs`` running at once, the size
+    is also capped at ``ceil(count / jobs)`` so that every job gets a batch.
+    """
+    limit = (entry.get("batch") or {}).get("max_items")
+    size = requested or limit or DEFAULT_BATCH_SIZE
+    if limit:
+        size = min(size, limit)
+    if count and jobs and jobs > 1:
+        size = min(size, -(-count // jobs))
+    return size
+
+
+def write_manifest(path, items):
+    with open(path, "w", encoding="utf-8") as handle:
+        for index, item in enumerate(items):
+            line = {"index": index, "params": item["params"], "output": item["output"]}
+            handle.write(json.dumps(line, sort_keys=True, default=str) + "\n")
+
+
+def read_results(path):
+    """Return ``{index: {"ok": bool, "error": str or None}}`` from a results file."""
+    results = {}
+    try:
+        with open(path, "r", encoding="utf-8") as handle:
+            for line in handle:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                    results[int(record["index"])] = {
+                        "ok": bool(record.get("ok")),
+                        "error": record.get("error"),
+                    }
+                except (ValueError, KeyError, TypeError):
+                    continue
+    except FileNotFoundError:
+        pass
+    return results
+
+
+def run_batch(entry, items, placement=None, working_dir=None, progress_fd=None):
+    """Render ``items`` in one batch invocation; return ``(usage, outcomes)``.
+
+    ``items`` are ``{"params", "output"}`` mappings; outputs hardlinked by ``dedupe``
+    get their own copy first (:func:`artctl.dedupe.break_link`). ``outcomes`` lists one
+    ``{"exit_status", "reason"}`` mapping per item, in order; ``reason`` is ``None``
+    for items that were rendered and passed output verification.
+    """
+    if not supports_batch(entry):
+        raise BatchError(
+            "Program '{0}' does not declare a batch command.".format(entry["name"])
+        )
+    for item in items:
+        dedupe.break_link(item["output"])
+    workdir = tempfile.mkdtemp(prefix="artctl-batch-")
+    try:
+        manifest = os.path.join(workdir, "manifest.jsonl")
+        results_path = os.path.join(workdir, "results.jsonl")
+        write_manifest(manifest, items)
+        batch_entry = dict(entry, command=entry["batch"]["command"], params=[])
+        command = templater.render_command(
+            batch_entry, {"batch_manifest": manifest, "batch_results": results_path}
+        )
+        usage = runner.run_process(
+            command,
+            working_dir=working_dir,
+            placement=placement,
+            progress_fd=progress_fd,
+            runtime=entry.get("runtime"),
+        )
+        results = read_results(results_path)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    outcomes = []
+    for index, item in enumerate(items):
+        result = results.get(index)
+        if result is None:
+            if usage["returncode"] != 0:
+                outcome = {
+                    "exit_status": usage["returncode"],
+                    "reason": "generator exited with status {0}".format(usage["returncode"]),
+                }
+            else:
+                outcome = {"exit_status": 1, "reason": "no result reported"}
+        elif not result["ok"]:
+            outcome = {"exit_status": 1, "reason": result["error"] or "render failed"}
+        else:
+            reason = output_manager.check_output(entry, item["output"])
+            outcome = {"exit_status": 0, "reason": reason}
+        outcomes.append(outcome)
+    return usage, outcomes
+
+
+def run_single(entry, item, placement=None, working_dir=None, progress_fd=None):
+    """Render one item with the entry's regular command; return ``(usage, outcome)``."""
+    values = dict(item["params"], output=item["output"])
+    command = templater.render_command(entry, values)
+    dedupe.break_link(item["output"])
+    usage = runner.run_process(
+        command,
+        working_dir=working_dir,
+        placement=placement,
+        progress_fd=progress_fd,
+        runtime=entry.get("runtime"),
+    )
+    if usage["returncode"] != 0:
+        reason = "generator exited with status {0}".format(usage["returncode"])
+    else:
+        reason = output_manager.check_output(entry, item["output"])
+    return usage, {"exit_status": usage["returncode"], "reason": reason}
+
+
+def run_sweep(
+    entry,
+    items,
+    jobs=None,
+    size=None,
+    use_batch=True,
+    placement_for=None,
+    working_dir=None,
+    on_result=None,
+    progress=None,
+):
+    """Render every item, batching when the entry supports it.
+
+    Returns ``(outcomes, invocations)``: one outcome per item, in order, and the
+    number of generator processes started. Batches are sized by :func:`batch_size`,
+    so there are at least ``jobs`` of them. Up to ``jobs`` invocations run at once,
+    each holding one of ``jobs`` worker slots while it runs;
+    ``placement_for(worker_index)`` returns the placement for the slot, so concurrent
+    invocations never share a pinned CPU. ``on_result(index, item, outcome)`` is
+    called (under a lock) as soon as each item's outcome is known. Outcomes carry the
+    ``placement`` they ran with; items rendered in their own process also carry the
+    :func:`artctl.runner.run_process` ``usage`` (batched items share one process and are
+    not timed individually). Each invocation gets its own channel of the ``progress``
+    :class:`~artctl.progress.ProgressMonitor`, if one is given.
+    """
+    lock = threading.Lock()
+    outcomes = [None] * len(items)
+    workers = max(1, jobs or 1)
+    batched = use_batch and supports_batch(entry)
+    if batched:
+        step = batch_size(entry, size, len(items), workers)
+        groups = [
+            list(range(start, min(start + step, len(items))))
+            for start in range(0, len(items), step)
+        ]
+    else:
+        groups = [[index] for index in range(len(items))]
+
+    slots = queue.SimpleQueue()
+    for worker_index in range(workers):
+        slots.put(worker_index)
+
+    def _invoke(indexes):
+        worker_index = slots.get()
+        try:
+            _run_group(worker_index, indexes)
+        finally:
+            slots.put(worker_index)
+
+    def _run_group(worker_index, indexes):
+        placement = placement_for(worker_index) if placement_for else None
+        if len(indexes) > 1:
+            label = "items {0}-{1}".format(indexes[0], indexes[-1])
+        else:
+            label = "item {0}".format(indexes[0])
+        channel = progress.channel(label) if progress is not None else nullcontext()
+        try:
+            with channel as progress_fd:
+                if batched:
+                    _, results = run_batch(
+                        entry, [items[i] for i in indexes], placement, working_dir, progress_fd
+                    )
+                else:
+                    usage, outcome = run_single(
+                        entry, items[indexes[0]], placement, working_dir, progress_fd
+                    )
+                    results = [dict(outcome, usage=usage)]
+        except (runner.RunnerError, templater.TemplateError, OSError) as exc:
+            failure = {"exit_status": getattr(exc, "returncode", None) or 1, "reason": str(exc)}
+            results = [failure] * len(indexes)
+        results = [dict(outcome, placement=placement) for outcome in results]
+        with lock:
+            for index, outcome in zip(indexes, results):
+                outcomes[index] = outcome
+                if on_result is not None:
+                    on_result(index, items[index], outcome)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(_invoke, groups))
+    return outcomes, len(groups)
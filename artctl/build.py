@@ -0,0 +1,423 @@
+"""Declarative render graphs with make-style incremental rebuilds.
+
+A project file (``build.yaml`` by default) names render targets::
+
+    outputs: build
+    targets:
+      base:
+        program: spiral
+        params: {turns: 40, size: 512}
+      framed:
+        program: frame
+        params:
+          source: "{targets.base}"
+        deps: [palette]
+
+Each target renders one registry program to ``<outputs>/<target>.<extension>``. A
+``{targets.<name>}`` placeholder in a param value is replaced by that target's output
+path and makes it a dependency; ``deps`` adds ordering-only dependencies.
+
+:func:`build` runs targets in dependency order, up to ``jobs`` at once. A target is
+skipped when its fingerprint (program, command template, resolved params, generator
+source digest and upstream output digests) matches the stamp saved after its last
+successful build and its output is unchanged. File digests are cached in the stamps
+by ``(size, mtime)`` so unchanged files are only stat'ed, not re-hashed. Because
+upstream outputs enter the fingerprint by digest, a rebuilt upstream that produced an
+identical file does not rebuild its dependents.
+"""
+
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import yaml
+
+from . import dedupe
+from . import output_manager
+from . import params
+from . import runner
+from . import templater
+
+DEFAULT_PROJECT_FILE = "build.yaml"
+DEFAULT_OUTPUTS_DIR = "build"
+STAMP_DIR = ".artctl-stamps"
+STAMP_VERSION = 1
+
+ALLOWED_PROJECT_KEYS = {"outputs", "targets"}
+ALLOWED_TARGET_KEYS = {"program", "params", "deps"}
+
+_TARGET_NAME = re.compile(r"^[A-Za-z0-9_][A-Za-z0-9_.-]*$")
+_TARGET_REFERENCE = re.compile(r"\{targets\.([^{}]+)\}")
+
+
+class BuildError(Exception):
+    """Raised when a project file is invalid or its graph cannot be scheduled."""
+
+
+def load_project(path, entries):
+    """Load and validate a project file against the registry ``entries``.
+
+    Returns ``{"path", "outputs", "targets"}`` where each target is a mapping of
+    ``name``, ``program``, ``params`` (raw values), ``deps`` and ``output``.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as handle:
+            data = yaml.safe_load(handle)
+    except OSError as exc:
+        raise BuildError("Failed to read project file {0}: {1}".format(path, exc))
+    except yaml.YAMLError as exc:
+        raise BuildError("Failed to parse YAML in {0}: {1}".format(path, exc))
+    if not isinstance(data, dict):
+        raise BuildError("Project file must contain a mapping: {0}".format(path))
+    unknown = set(data).difference(ALLOWED_PROJECT_KEYS)
+    if unknown:
+        raise BuildError("Unknown fields {0} found in {1}".format(sorted(unknown), path))
+    raw_targets = data.get("targets")
+    if not isinstance(raw_targets, dict) or not raw_targets:
+        raise BuildError("Project file must define a 'targets' mapping: {0}".format(path))
+    outputs = data.get("outputs", DEFAULT_OUTPUTS_DIR)
+    if not isinstance(outputs, str) or not outputs:
+        raise BuildError("Project 'outputs' must be a directory path in {0}".format(path))
+    if not os.path.isabs(outputs):
+        outputs = os.path.join(os.path.dirname(os.path.abspath(path)), outputs)
+
+    targets = {}
+    for name, spec in raw_targets.items():
+        targets[name] = _load_target(path, name, spec, entries, outputs)
+    for target in targets.values():
+        missing = sorted(set(target["deps"]).difference(targets))
+        if missing:
+            raise BuildError(
+                "Target '{0}' depends on unknown targets {1} in {2}".format(
+                    target["name"], missing, path
+                )
+            )
+    order(targets)
+    for target in targets.values():
+        resolve_values(target, entries[target["program"]], targets)
+    return {"path": path, "outputs": outputs, "targets": targets}
+
+
+def _load_target(path, name, spec, entries, outputs):
+    if not isinstance(name, str) or not _TARGET_NAME.match(name):
+        raise BuildError("Invalid target name '{0}' in {1}".format(name, path))
+    if not isinstance(spec, dict):
+        raise BuildError("Target '{0}' must be a mapping in {1}".format(name, path))
+    unknown = set(spec).difference(ALLOWED_TARGET_KEYS)
+    if unknown:
+        raise BuildError(
+            "Target '{0}' has unknown fields {1} in {2}".format(name, sorted(unknown), path)
+        )
+    program = spec.get("program")
+    entry = entries.get(program)
+    if entry is None:
+        raise BuildError(
+            "Target '{0}' uses program '{1}', which is not in the registry.".format(name, program)
+        )
+    if output_manager.output_mode(entry) != "file":
+        raise BuildError("Target '{0}' must use a program with file output.".format(name))
+    values = spec.get("params") or {}
+    if not isinstance(values, dict):
+        raise BuildError("Target '{0}' params must be a mapping in {1}".format(name, path))
+    deps = spec.get("deps") or []
+    if not isinstance(deps, list) or not all(isinstance(dep, str) for dep in deps):
+        raise BuildError("Target '{0}' deps must be a list of names in {1}".format(name, path))
+    references = []
+    for value in values.values():
+        if isinstance(value, str):
+            references.extend(_TARGET_REFERENCE.findall(value))
+    output_config = entry.get("output") or {}
+    extension = output_config.get("extension", output_manager.DEFAULT_EXTENSION).lstrip(".")
+    return {
+        "name": name,
+        "program": program,
+        "params": values,
+        "deps": sorted(set(deps).union(references)),
+        "output": os.path.join(outputs, "{0}.{1}".format(name, extension)),
+    }
+
+
+def order(targets, selected=None):
+    """Return target names in dependency order, limited to ``selected`` and their deps."""
+    wanted = list(selected) if selected else sorted(targets)
+    unknown = sorted(set(wanted).difference(targets))
+    if unknown:
+        raise BuildError("Unknown targets {0}.".format(unknown))
+    ordered = []
+    state = {}
+
+    def visit(name, trail):
+        if state.get(name) == "done":
+            return
+        if state.get(name) == "visiting":
+            cycle = trail[trail.index(name) :] + [name]
+            raise BuildError("Dependency cycle: {0}".format(" -> ".join(cycle)))
+        state[name] = "visiting"
+        for dep in targets[name]["deps"]:
+            visit(dep, trail + [name])
+        state[name] = "done"
+        ordered.append(name)
+
+    for name in wanted:
+        visit(name, [])
+    return ordered
+
+
+def resolve_values(target, entry, targets):
+    """Coerce a target's params, substituting ``{targets.<name>}`` with output paths."""
+
+    def substitute(match):
+        return targets[match.group(1)]["output"]
+
+    overrides = []
+    for key, value in target["params"].items():
+        if isinstance(value, bool):
+            value = "true" if value else "false"
+        elif isinstance(value, str):
+            value = _TARGET_REFERENCE.sub(substitute, value)
+        overrides.append("{0}={1}".format(key, value))
+    try:
+        return params.parse_overrides(overrides, entry.get("params", []))
+    except params.ParameterError as exc:
+        raise BuildError("Target '{0}': {1}".format(target["name"], exc))
+
+
+def stamp_path(outputs, name):
+    return os.path.join(outputs, STAMP_DIR, name + ".json")
+
+
+def read_stamp(outputs, name):
+    try:
+        with open(stamp_path(outputs, name), "r", encoding="utf-8") as handle:
+            stamp = json.load(handle)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(stamp, dict) or stamp.get("version") != STAMP_VERSION:
+        return None
+    return stamp
+
+
+def write_stamp(outputs, name, stamp):
+    path = stamp_path(outputs, name)
+    temporary = "{0}.{1}.tmp".format(path, os.getpid())
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(temporary, "w", encoding="utf-8") as handle:
+            json.dump(dict(stamp, version=STAMP_VERSION), handle, sort_keys=True)
+        os.replace(temporary, path)
+    except OSError as exc:
+        raise BuildError("Failed to write build stamp {0}: {1}".format(path, exc))
+
+
+def _remove_stamp(outputs, name):
+    try:
+        os.remove(stamp_path(outputs, name))
+    except FileNotFoundError:
+        pass
+
+
+def file_state(path, previous=None):
+    """Return ``{"signature", "digest"}`` for ``path``, or ``None`` if it is missing.
+
+    The digest from ``previous`` is reused when the file's size and mtime still match.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    signature = [stat.st_size, stat.st_mtime_ns]
+    if previous and previous.get("signature") == signature and previous.get("digest"):
+        return {"signature": signature, "digest": previous["digest"]}
+    return {"signature": signature, "digest": dedupe.hash_file(path)}
+
+
+def fingerprint(target, entry, values, sources, upstream):
+    """Digest everything that determines a target's output."""
+    payload = {
+        "program": target["program"],
+        "command": entry.get("command"),
+        "params": {key: value for key, value in values.items() if key != "output"},
+        "sources": {path: (state or {}).get("digest") for path, state in sources.items()},
+        "upstream": upstream,
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _check_target(project, name, entry, digests, force, working_dir=None):
+    """Return ``(stale_reason or None, context)`` for one target."""
+    targets = project["targets"]
+    target = targets[name]
+    stamp = read_stamp(project["outputs"], name) or {}
+    values = resolve_values(target, entry, targets)
+    source_path = entry.get("entrypoint")
+    sources = {}
+    if source_path:
+        previous = (stamp.get("sources") or {}).get(source_path)
+        sources[source_path] = file_state(
+            os.path.join(working_dir or "", source_path), previous
+        )
+    upstream = {dep: digests.get(dep) for dep in target["deps"]}
+    context = {
+        "values": values,
+        "sources": sources,
+        "fingerprint": fingerprint(target, entry, values, sources, upstream),
+        "stamp": stamp,
+    }
+    if force:
+        return "forced", context
+    if not stamp:
+        return "never built", context
+    if stamp.get("fingerprint") != context["fingerprint"]:
+        return "inputs changed", context
+    output = file_state(target["output"], stamp.get("output"))
+    if output is None:
+        return "output missing", context
+    if output["digest"] != (stamp.get("output") or {}).get("digest"):
+        return "output modified", context
+    context["output"] = output
+    return None, context
+
+
+def _build_target(project, name, entry, context, working_dir):
+    target = project["targets"][name]
+    outputs = project["outputs"]
+    output_path = target["output"]
+    _remove_stamp(outputs, name)
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    dedupe.break_link(output_path)
+    values = dict(context["values"], output=output_path)
+    command = templater.render_command(entry, values)
+    usage = runner.run_process(command, working_dir=working_dir, runtime=entry.get("runtime"))
+    if usage["returncode"] != 0:
+        return "generator exited with status {0}".format(usage["returncode"]), usage
+    reason = output_manager.check_output(entry, output_path)
+    if reason is None and not os.path.exists(output_path):
+        reason = "no output was produced"
+    if reason is not None:
+        return reason, usage
+    context["output"] = file_state(output_path)
+    write_stamp(
+        outputs,
+        name,
+        {
+            "fingerprint": context["fingerprint"],
+            "output": context["output"],
+            "sources": context["sources"],
+        },
+    )
+    return None, usage
+
+
+def build(
+    project,
+    entries,
+    selected=None,
+    jobs=1,
+    force=False,
+    dry_run=False,
+    keep_going=False,
+    working_dir=None,
+    on_result=None,
+):
+    """Bring the selected targets (and their dependencies) up to date.
+
+    Returns one result per target in dependency order: a mapping with ``name``,
+    ``program``, ``params`` (resolved values), ``output``, ``status`` (``built``,
+    ``up-to-date``, ``would-build``, ``failed``, ``blocked`` or ``skipped``), ``reason``,
+    ``duration`` and, for targets whose generator ran, its
+    :func:`artctl.runner.run_process` ``usage``.
+    ``on_result(result)`` is called from the scheduling thread as each one settles.
+    """
+    targets = project["targets"]
+    names = order(targets, selected)
+    waiting = {name: set(targets[name]["deps"]) for name in names}
+    dependents = {name: [] for name in names}
+    for name in names:
+        for dep in targets[name]["deps"]:
+            dependents[dep].append(name)
+    results = {}
+    digests = {}
+    stopped = False
+
+    def settle(name, status, reason=None, duration=None, usage=None):
+        result = {
+            "name": name,
+            "program": targets[name]["program"],
+            "params": resolve_values(targets[name], entries[targets[name]["program"]], targets),
+            "output": targets[name]["output"],
+            "status": status,
+            "reason": reason,
+            "duration": duration,
+            "usage": usage,
+        }
+        results[name] = result
+        if on_result is not None:
+            on_result(result)
+        if status in ("failed", "blocked", "skipped"):
+            for dependent in dependents[name]:
+                if dependent not in results:
+                    settle(dependent, "blocked", "dependency '{0}' {1}".format(name, status))
+            return
+        for dependent in dependents[name]:
+            waiting[dependent].discard(name)
+
+    def process(name):
+        started = time.perf_counter()
+        entry = entries[targets[name]["program"]]
+        pending = [dep for dep in targets[name]["deps"] if results[dep]["status"] == "would-build"]
+        if pending:
+            reason = "dependency '{0}' is out of date".format(pending[0])
+            return "would-build", reason, started, None
+        stale, context = _check_target(project, name, entry, digests, force, working_dir)
+        if stale is None:
+            digests[name] = context["output"]["digest"]
+            stamp = context["stamp"]
+            if not dry_run and (
+                stamp.get("output") != context["output"]
+                or stamp.get("sources") != context["sources"]
+            ):
+                # Same content under a new mtime: record it so the next check only stats.
+                write_stamp(
+                    project["outputs"],
+                    name,
+                    dict(stamp, output=context["output"], sources=context["sources"]),
+                )
+            return "up-to-date", None, started, None
+        if dry_run:
+            return "would-build", stale, started, None
+        reason, usage = _build_target(project, name, entry, context, working_dir)
+        if reason is not None:
+            return "failed", reason, started, usage
+        digests[name] = context["output"]["digest"]
+        return "built", stale, started, usage
+
+    slots = max(1, jobs or 1)
+    with ThreadPoolExecutor(max_workers=slots) as executor:
+        running = {}
+        while True:
+            for name in names:
+                if stopped or len(running) >= slots:
+                    break
+                if name not in results and name not in running.values() and not waiting[name]:
+                    running[executor.submit(process, name)] = name
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    status, reason, started, usage = future.result()
+                except (BuildError, templater.TemplateError, runner.RunnerError, OSError) as exc:
+                    status, reason, started, usage = "failed", str(exc), None, None
+                duration = time.perf_counter() - started if started is not None else None
+                settle(name, status, reason, duration, usage)
+                if status == "failed" and not keep_going:
+                    stopped = True
+        for name in names:
+            if name not in results:
+                settle(name, "skipped", "build stopped after a failure")
+    return [results[name] for name in names]
@@ -0,0 +1,101 @@
+"""Append-only run catalog stored as JSON lines."""
+
+import json
+import os
+
+
+class CatalogError(Exception):
+    """Raised when the run catalog cannot be read or written."""
+
+
+CATALOG_ENV_VAR = "ARTCTL_CATALOG"
+
+
+def resolve_catalog_path(path=None):
+    """Return the catalog path from the CLI flag or environment, or ``None`` if disabled."""
+    return path or os.environ.get(CATALOG_ENV_VAR) or None
+
+
+def make_record(
+    program, params, output, exit_status, placement=None, started_at=None, version=None
+):
+    """Build a catalog record for one generator run.
+
+    ``version`` identifies the generator source (see :func:`artctl.stats.source_version`);
+    timings are added with :func:`record_usage`.
+    """
+    record = {
+        "program": program,
+        "params": {key: value for key, value in (params or {}).items() if key != "output"},
+        "output": output,
+        "placement": placement,
+        "started_at": started_at,
+        "exit_status": exit_status,
+    }
+    if version is not None:
+        record["version"] = version
+    return record
+
+
+def record_usage(record, usage):
+    """Copy wall time, CPU time and peak RSS from a :func:`artctl.runner.run_process` result."""
+    if usage:
+        record["wall_time"] = round(usage["wall_time"], 6)
+        record["cpu_time"] = round(usage["user_time"] + usage["system_time"], 6)
+        record["max_rss_kb"] = usage["max_rss_kb"]
+    return record
+
+
+def append_record(path, record):
+    """Append one run record to the catalog, creating parent directories as needed."""
+    directory = os.path.dirname(path)
+    try:
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        line = json.dumps(record, sort_keys=True, separators=(",", ":"), default=str)
+        with open(path, "a", encoding="utf-8") as handle:
+            handle.write(line + "\n")
+    except OSError as exc:
+        raise CatalogError("Failed to write run catalog {0}: {1}".format(path, exc))
+
+
+def read_records(path):
+    """Yield run records from the catalog in the order they were written."""
+    if not os.path.exists(path):
+        return
+    try:
+        with open(path, "r", encoding="utf-8") as handle:
+            for line_number, line in enumerate(handle, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError as exc:
+                    raise CatalogError(
+                        "Invalid catalog record at {0}:{1}: {2}".format(path, line_number, exc)
+                    )
+    except OSError as exc:
+        raise CatalogError("Failed to read run catalog {0}: {1}".format(path, exc))
+
+
+def rewrite_records(path, transform):
+    """Rewrite the catalog in place through ``transform(records)``; return its result.
+
+    ``transform`` mutates the list of records; the catalog is replaced atomically.
+    """
+    if not os.path.exists(path):
+        return 0
+    records = list(read_records(path))
+    result = transform(records)
+    temporary = "{0}.{1}.tmp".format(path, os.getpid())
+    try:
+        with open(temporary, "w", encoding="utf-8") as handle:
+            for record in records:
+                handle.write(
+                    json.dumps(record, sort_keys=True, separators=(",", ":"), default=str) + "\n"
+                )
+        os.replace(temporary, path)
+    except OSError as exc:
+        raise CatalogError("Failed to rewrite run catalog {0}: {1}".format(path, exc))
+    return result
@@ -1,18 +1,46 @@
 """Command-line interface entry point for artctl."""
 
 import argparse
+import json
+import os
+import random
+import signal
 import sys
+import time
+from datetime import datetime, timedelta
 
 from . import __version__
+from . import archive
+from . import batch
+from . import build
+from . import catalog
+from . import coalesce
+from . import complete
+from . import dedupe
+from . import metrics
 from . import output_manager
 from . import params
+from . import placement
+from . import plan
+from . import profiling
+from . import progress
 from . import registry
+from . import retention
+from . import runtimes
+from . import sampling
+from . import search
 from . import templater
 from . import runner
+from . import server
+from . import stats
+from . import verify
 
 EXIT_SUCCESS = 0
 EXIT_INTERNAL_ERROR = 1
 EXIT_VALIDATION_ERROR = 2
+EXIT_OUTPUT_ERROR = 4
+
+FORWARDABLE_COMMANDS = {"list", "help", "run"}
 
 
 def build_parser():
@@ -36,12 +64,68 @@ def build_parser():
         action="store_true",
         help="Enable verbose logging for troubleshooting.",
     )
+    parser.add_argument(
+        "--catalog",
+        default=None,
+        metavar="PATH",
+        help="Append a JSON record for every run to PATH (default: $ARTCTL_CATALOG, if set).",
+    )
+    parser.add_argument(
+        "--metrics-textfile",
+        default=None,
+        metavar="PATH",
+        help="Accumulate Prometheus metrics in a node-exporter textfile at PATH after each "
+        "run or sweep (default: $ARTCTL_METRICS_TEXTFILE, if set).",
+    )
+    parser.add_argument(
+        "--socket",
+        default=None,
+        metavar="PATH",
+        help="Forward commands to an 'artctl serve' daemon at PATH when it is running "
+        "(default: $ARTCTL_SOCKET, if set).",
+    )
 
     subparsers = parser.add_subparsers(dest="command")
 
     list_parser = subparsers.add_parser(
         "list",
-        help="List all registry programs.",
+        help="List registry programs, optionally filtered.",
+    )
+    list_parser.add_argument(
+        "--tag",
+        dest="tags",
+        action="append",
+        default=[],
+        metavar="TAG",
+        help="Only list programs with TAG (repeat to require several tags).",
+    )
+    list_parser.add_argument(
+        "--runtime",
+        choices=sorted(registry.ALLOWED_RUNTIMES),
+        default=None,
+        help="Only list programs using this runtime.",
+    )
+    list_parser.add_argument(
+        "--search",
+        default=None,
+        metavar="TEXT",
+        help="Only list programs whose name, tags or description contain words starting "
+        "with every word of TEXT.",
+    )
+    list_format = list_parser.add_mutually_exclusive_group()
+    list_format.add_argument(
+        "--json",
+        dest="list_format",
+        action="store_const",
+        const="json",
+        help="Write the matching programs as a JSON array.",
+    )
+    list_format.add_argument(
+        "--jsonl",
+        dest="list_format",
+        action="store_const",
+        const="jsonl",
+        help="Write one JSON object per matching program.",
     )
     list_parser.set_defaults(handler=handle_list)
 
@@ -76,34 +160,598 @@ def build_parser():
         action="store_true",
         help="Render the command without executing it.",
     )
+    run_parser.add_argument(
+        "--scratch-dir",
+        default=None,
+        metavar="DIR",
+        help="Have the generator write to fast scratch storage in DIR and atomically publish "
+        "the verified result into the outputs tree (default: $ARTCTL_SCRATCH_DIR, if set).",
+    )
+    run_parser.add_argument(
+        "--dedupe",
+        action="store_true",
+        help="Replace the output with a hardlink if an identical file already exists.",
+    )
+    run_parser.add_argument(
+        "--profile-generator",
+        action="store_true",
+        help="Run a python-runtime generator under cProfile, save <output>.pstats next to "
+        "the output and print its hottest functions.",
+    )
+    run_parser.add_argument(
+        "--profile-memory",
+        action="store_true",
+        help="With --profile-generator, also track peak memory with tracemalloc "
+        "(saved as <output>.memory.txt).",
+    )
+    _add_progress_argument(run_parser)
+    _add_placement_arguments(run_parser)
     run_parser.set_defaults(handler=handle_run)
 
+    sweep_parser = subparsers.add_parser(
+        "sweep",
+        help="Render every combination of a parameter grid, or a sample of the space.",
+    )
+    sweep_parser.add_argument(
+        "program",
+        help="Registry program name to sweep.",
+    )
+    _add_point_arguments(sweep_parser)
+    sweep_parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of generator processes to run at once.",
+    )
+    sweep_parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=None,
+        help="Items per batch invocation (default: the registry max_items, or {0}).".format(
+            batch.DEFAULT_BATCH_SIZE
+        ),
+    )
+    sweep_parser.add_argument(
+        "--no-batch",
+        action="store_true",
+        help="Run one generator process per item even if the program supports batches.",
+    )
+    sweep_parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="List the items without rendering them.",
+    )
+    _add_progress_argument(sweep_parser)
+    _add_placement_arguments(sweep_parser)
+    sweep_parser.set_defaults(handler=handle_sweep)
+
+    plan_parser = subparsers.add_parser(
+        "plan",
+        help="Print the rendered commands of a run or sweep for an external runner, "
+        "without creating anything.",
+    )
+    plan_parser.add_argument(
+        "program",
+        help="Registry program name to plan.",
+    )
+    _add_point_arguments(plan_parser)
+    plan_parser.add_argument(
+        "--format",
+        dest="plan_format",
+        choices=plan.PLAN_FORMATS,
+        default="jsonl",
+        help="jsonl: one JSON job (argv, cwd, env, output, params) per line; nul: one "
+        "shell command line per job, NUL-terminated, for xargs -0 or parallel -0 "
+        "(default: jsonl).",
+    )
+    plan_parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Plan batch-command invocations with their manifests inline (jsonl only).",
+    )
+    plan_parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=None,
+        help="Items per batch invocation (default: the registry max_items, or {0}).".format(
+            batch.DEFAULT_BATCH_SIZE
+        ),
+    )
+    plan_parser.add_argument(
+        "--manifest-dir",
+        default=None,
+        metavar="DIR",
+        help="Directory the consumer writes batch manifests to (required with --batch).",
+    )
+    plan_parser.set_defaults(handler=handle_plan)
+
+    build_parser = subparsers.add_parser(
+        "build",
+        help="Render the targets of a project file, skipping those that are up to date.",
+    )
+    build_parser.add_argument(
+        "targets",
+        nargs="*",
+        metavar="TARGET",
+        help="Targets to bring up to date, with their dependencies (default: all).",
+    )
+    build_parser.add_argument(
+        "--file",
+        "-f",
+        dest="project_file",
+        default=build.DEFAULT_PROJECT_FILE,
+        metavar="PATH",
+        help="Project file listing render targets (default: {0}).".format(
+            build.DEFAULT_PROJECT_FILE
+        ),
+    )
+    build_parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        help="Number of targets to render at once.",
+    )
+    build_parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Rebuild every selected target even if its stamp says it is up to date.",
+    )
+    build_parser.add_argument(
+        "--keep-going",
+        "-k",
+        action="store_true",
+        help="Keep building targets that do not depend on a failed one.",
+    )
+    build_parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Report which targets are out of date without rendering them.",
+    )
+    build_parser.set_defaults(handler=handle_build)
+
+    verify_parser = subparsers.add_parser(
+        "verify",
+        help="Verify the structure of output files under a directory.",
+    )
+    verify_parser.add_argument(
+        "directory",
+        help="Directory to scan, such as outputs/ or outputs/2025/01.",
+    )
+    verify_parser.add_argument(
+        "--mode",
+        choices=verify.VERIFY_MODES,
+        default="structure",
+        help="Verification depth (default: structure).",
+    )
+    verify_parser.add_argument(
+        "--min-size",
+        type=int,
+        default=None,
+        help="Minimum acceptable file size in bytes.",
+    )
+    verify_parser.add_argument(
+        "--extension",
+        dest="extensions",
+        action="append",
+        default=None,
+        metavar="EXT",
+        help="Only check files with this extension (repeatable; default: known image formats).",
+    )
+    verify_parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of files to verify in parallel.",
+    )
+    verify_parser.add_argument(
+        "--quiet",
+        action="store_true",
+        help="Only print the summary and failures.",
+    )
+    verify_parser.set_defaults(handler=handle_verify)
+
+    du_parser = subparsers.add_parser(
+        "du",
+        help="Report disk usage of the dated outputs tree per program.",
+    )
+    _add_outputs_dir_argument(du_parser)
+    du_parser.add_argument(
+        "--by-day",
+        action="store_true",
+        help="Break usage down per day directory.",
+    )
+    du_parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Rescan every day directory instead of reusing cached totals.",
+    )
+    du_parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of day directories to scan in parallel.",
+    )
+    du_parser.set_defaults(handler=handle_du)
+
+    stats_parser = subparsers.add_parser(
+        "stats",
+        help="Report run time and memory percentiles from the run catalog and flag "
+        "regressions between generator versions.",
+    )
+    stats_parser.add_argument(
+        "programs",
+        nargs="*",
+        metavar="PROGRAM",
+        help="Only report these programs (default: all recorded programs).",
+    )
+    stats_parser.add_argument(
+        "--metric",
+        choices=stats.METRICS,
+        default=stats.DEFAULT_METRIC,
+        help="Metric to report and compare (default: wall_time).",
+    )
+    stats_parser.add_argument(
+        "--by-version",
+        action="store_true",
+        help="Break percentiles down per generator version (entrypoint digest).",
+    )
+    stats_parser.add_argument(
+        "--alpha",
+        type=float,
+        default=stats.DEFAULT_ALPHA,
+        help="Significance level for regression tests (default: 0.01).",
+    )
+    stats_parser.add_argument(
+        "--min-change",
+        type=float,
+        default=stats.DEFAULT_MIN_CHANGE,
+        help="Smallest relative slowdown flagged as a regression (default: 0.05).",
+    )
+    stats_parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Print rows and regressions as JSON.",
+    )
+    stats_parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Recompute the summary from the whole catalog instead of only new records.",
+    )
+    stats_parser.set_defaults(handler=handle_stats)
+
+    prune_parser = subparsers.add_parser(
+        "prune",
+        help="Delete old outputs by age or per-program size budget.",
+    )
+    _add_outputs_dir_argument(prune_parser)
+    prune_parser.add_argument(
+        "--older-than",
+        type=int,
+        default=None,
+        metavar="DAYS",
+        help="Remove whole day directories older than DAYS days.",
+    )
+    prune_parser.add_argument(
+        "--before",
+        default=None,
+        metavar="YYYY-MM-DD",
+        help="Remove whole day directories dated before this day.",
+    )
+    prune_parser.add_argument(
+        "--max-size",
+        default=None,
+        metavar="SIZE",
+        help="Default per-program budget such as 5G; the oldest files over it are removed.",
+    )
+    prune_parser.add_argument(
+        "--budget",
+        dest="budgets",
+        action="append",
+        default=[],
+        metavar="PROGRAM=SIZE",
+        help="Per-program size budget (repeat for multiple programs).",
+    )
+    prune_parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Report what would be removed without deleting anything.",
+    )
+    prune_parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of day directories to scan in parallel.",
+    )
+    prune_parser.set_defaults(handler=handle_prune)
+
+    dedupe_parser = subparsers.add_parser(
+        "dedupe",
+        help="Hardlink byte-identical files in the outputs tree.",
+    )
+    _add_outputs_dir_argument(dedupe_parser)
+    dedupe_parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Report duplicates without linking them.",
+    )
+    dedupe_parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of files to hash in parallel.",
+    )
+    dedupe_parser.set_defaults(handler=handle_dedupe)
+
+    archive_parser = subparsers.add_parser(
+        "archive",
+        help="Pack old day directories into indexed per-day archives.",
+    )
+    _add_outputs_dir_argument(archive_parser)
+    archive_parser.add_argument(
+        "--before",
+        required=True,
+        metavar="YYYY-MM-DD",
+        help="Archive day directories dated before this day.",
+    )
+    archive_parser.add_argument(
+        "--compression",
+        choices=sorted(archive.COMPRESSION_METHODS),
+        default="stored",
+        help="Per-member compression (default: stored; PNGs are already compressed).",
+    )
+    archive_parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="List the day directories that would be archived.",
+    )
+    archive_parser.set_defaults(handler=handle_archive)
+
+    extract_parser = subparsers.add_parser(
+        "extract",
+        help="Extract one file from an archive pack using its index.",
+    )
+    extract_parser.add_argument(
+        "location",
+        metavar="PACK#MEMBER",
+        help="Archive location as recorded in the run catalog, e.g. outputs/2025/01/02.zip#a.png.",
+    )
+    extract_parser.add_argument(
+        "--dest",
+        default=None,
+        metavar="PATH",
+        help="Where to write the file (default: the member name in the current directory).",
+    )
+    extract_parser.set_defaults(handler=handle_extract)
+
+    serve_parser = subparsers.add_parser(
+        "serve",
+        help="Serve commands from a resident daemon over a Unix socket.",
+    )
+    serve_parser.add_argument(
+        "--socket",
+        dest="serve_socket",
+        default=None,
+        metavar="PATH",
+        help="Unix socket path to listen on (default: $ARTCTL_SOCKET).",
+    )
+    serve_parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        metavar="PORT",
+        help="Also serve Prometheus metrics over HTTP at /metrics on PORT.",
+    )
+    serve_parser.add_argument(
+        "--metrics-host",
+        default="127.0.0.1",
+        metavar="HOST",
+        help="Address for the metrics endpoint (default: 127.0.0.1).",
+    )
+    serve_parser.set_defaults(handler=handle_serve)
+
+    completion_parser = subparsers.add_parser(
+        "completion",
+        help="Print a shell completion script for programs, params and options.",
+    )
+    completion_parser.add_argument(
+        "shell",
+        choices=complete.SHELLS,
+        help="Shell to generate the script for.",
+    )
+    completion_parser.set_defaults(handler=handle_completion)
+
     return parser
 
 
+def _add_point_arguments(subparser):
+    subparser.add_argument(
+        "--grid",
+        dest="grid",
+        action="append",
+        default=[],
+        metavar="KEY=VALUES",
+        help="Grid axis as comma-separated values or an inclusive START:STOP[:STEP] range "
+        "(repeat for multiple axes).",
+    )
+    subparser.add_argument(
+        "--sample",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Instead of a grid, render N points sampled from the declared parameter space.",
+    )
+    subparser.add_argument(
+        "--method",
+        choices=sampling.SAMPLING_METHODS,
+        default="lhs",
+        help="Sampling method for --sample (default: lhs).",
+    )
+    subparser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="Seed for --sample, to reproduce a previous sample.",
+    )
+    subparser.add_argument(
+        "--range",
+        dest="ranges",
+        action="append",
+        default=[],
+        metavar="KEY=MIN:MAX",
+        help="Sample a numeric parameter over MIN:MAX instead of its declared min/max "
+        "(repeat for multiple parameters).",
+    )
+    subparser.add_argument(
+        "--allow-repeats",
+        action="store_true",
+        help="With --sample, do not skip combinations the run catalog already rendered.",
+    )
+    subparser.add_argument(
+        "--set",
+        dest="overrides",
+        action="append",
+        default=[],
+        metavar="KEY=VALUE",
+        help="Fix a parameter for every item (repeat for multiple overrides).",
+    )
+
+
+def _add_progress_argument(subparser):
+    subparser.add_argument(
+        "--progress",
+        choices=progress.PROGRESS_MODES,
+        default="auto",
+        help="Show progress reported by generators: a status line on stderr ('line', the "
+        "default on a terminal), JSON lines on stderr ('json'), or nothing ('none').",
+    )
+
+
+def _add_placement_arguments(subparser):
+    subparser.add_argument(
+        "--cpus",
+        default=None,
+        metavar="LIST",
+        help="Restrict the generator to a CPU set such as 0-3,6 (overrides registry placement).",
+    )
+    subparser.add_argument(
+        "--spread",
+        choices=sorted(placement.SPREAD_MODES),
+        default=None,
+        help="Pin workers round-robin to single cores or whole NUMA nodes of the CPU set.",
+    )
+    subparser.add_argument(
+        "--nice",
+        type=int,
+        default=None,
+        help="Scheduling niceness for the generator process (-20 to 19).",
+    )
+    subparser.add_argument(
+        "--ionice",
+        default=None,
+        metavar="CLASS[:LEVEL]",
+        help="I/O priority: idle, best-effort[:0-7] or realtime[:0-7].",
+    )
+    subparser.add_argument(
+        "--worker-index",
+        type=int,
+        default=0,
+        help="Worker slot used for round-robin CPU placement (default: 0).",
+    )
+
+
+def _resolve_placement(args, entry, worker_index=None):
+    overrides = {
+        "cpus": args.cpus,
+        "spread": args.spread,
+        "nice": args.nice,
+        "ionice": args.ionice,
+    }
+    config = placement.merge_config(entry.get("placement"), overrides)
+    if worker_index is None:
+        worker_index = args.worker_index
+    return placement.resolve_placement(config, worker_index=worker_index)
+
+
+def _add_outputs_dir_argument(subparser):
+    subparser.add_argument(
+        "--outputs-dir",
+        default=output_manager.DEFAULT_BASE_DIR,
+        help="Root of the dated outputs tree (default: outputs/).",
+    )
+
+
+def _load_registry(args):
+    cache = getattr(args, "registry_cache", None)
+    if cache is not None:
+        return cache.load(args.registry_path)
+    return registry.load_registry(args.registry_path)
+
+
+def _preflight(entries):
+    problems = runtimes.preflight(entries)
+    for problem in problems:
+        print("Preflight error: {0}".format(problem), file=sys.stderr)
+    return not problems
+
+
+def _record_run(args, record):
+    catalog_path = catalog.resolve_catalog_path(getattr(args, "catalog", None))
+    if not catalog_path:
+        return
+    try:
+        catalog.append_record(catalog_path, record)
+    except catalog.CatalogError as exc:
+        print("Catalog error: {0}".format(exc), file=sys.stderr)
+
+
+def _flush_metrics(args):
+    textfile = metrics.resolve_textfile_path(getattr(args, "metrics_textfile", None))
+    if not textfile:
+        return
+    try:
+        metrics.flush_textfile(textfile)
+    except metrics.MetricsError as exc:
+        print("Metrics error: {0}".format(exc), file=sys.stderr)
+
+
 def handle_list(args):
-    """List available registry entries."""
+    """List registry entries matching the filters, streaming them as they are found."""
     try:
-        entries = registry.load_registry(args.registry_path)
+        index = search.load_index(args.registry_path, lambda: _load_registry(args))
     except registry.RegistryError as exc:
         print("Registry error: {0}".format(exc), file=sys.stderr)
         return EXIT_VALIDATION_ERROR
 
-    if not entries:
-        print("No registry entries found in {0}.".format(args.registry_path))
-        return EXIT_SUCCESS
-
-    for name in sorted(entries):
-        entry = entries[name]
-        description = entry.get("description", "").strip()
-        print("- {0}: {1}".format(name, description))
+    list_format = getattr(args, "list_format", None)
+    filtered = bool(args.tags or args.runtime or args.search)
+    matches = search.query(index, tags=args.tags, runtime=args.runtime, text=args.search)
+    count = 0
+    if list_format == "json":
+        sys.stdout.write("[")
+    for program in matches:
+        if list_format == "json":
+            sys.stdout.write("\n  " if not count else ",\n  ")
+            sys.stdout.write(json.dumps(program, sort_keys=True))
+        elif list_format == "jsonl":
+            sys.stdout.write(json.dumps(program, sort_keys=True) + "\n")
+        else:
+            print("- {0}: {1}".format(program["name"], program["description"]))
+        count += 1
+    if list_format == "json":
+        sys.stdout.write("\n]\n" if count else "]\n")
+    elif list_format is None and not count:
+        if filtered:
+            print("No registry entries match the given filters.")
+        else:
+            print("No registry entries found in {0}.".format(args.registry_path))
     return EXIT_SUCCESS
 
 
 def handle_help(args):
     """Show details for a specific registry entry."""
     try:
-        entries = registry.load_registry(args.registry_path)
+        entries = _load_registry(args)
     except registry.RegistryError as exc:
         print("Registry error: {0}".format(exc), file=sys.stderr)
         return EXIT_VALIDATION_ERROR
@@ -147,6 +795,10 @@ def handle_help(args):
             print("  - Path template: {0}".format(output["path_template"]))
         if output.get("extension"):
             print("  - Extension: .{0}".format(output["extension"]))
+        if output.get("verify"):
+            print("  - Verification: {0}".format(output["verify"]))
+        if output.get("min_size") is not None:
+            print("  - Minimum size: {0} bytes".format(output["min_size"]))
     else:
         print("Output expectations: none")
 
@@ -160,10 +812,13 @@ def handle_help(args):
     return EXIT_SUCCESS
 
 
+_UNCOALESCED_ARGS = ("handler", "coalescer", "registry_cache", "program", "overrides", "verbose")
+
+
 def handle_run(args):
     """Validate registry entry, render command, and execute the generator."""
     try:
-        entries = registry.load_registry(args.registry_path)
+        entries = _load_registry(args)
     except registry.RegistryError as exc:
         print("Registry error: {0}".format(exc), file=sys.stderr)
         return EXIT_VALIDATION_ERROR
@@ -180,14 +835,100 @@ def handle_run(args):
         print("Parameter error: {0}".format(exc), file=sys.stderr)
         return EXIT_VALIDATION_ERROR
 
+    started = time.perf_counter()
+    coalescer = getattr(args, "coalescer", None)
+    if coalescer is None or args.dry_run:
+        exit_code, output_path = _run_resolved(args, program, entry, override_map)
+    else:
+        key = coalesce.canonical_key(program, override_map, _run_options(args, entry))
+        (exit_code, output_path), leader = coalescer.do(
+            key, lambda: _run_resolved(args, program, entry, dict(override_map))
+        )
+        if not leader:
+            print("Joined in-flight run of '{0}' with identical parameters.".format(program))
+            print("Output path:")
+            print("  {0}".format(output_path))
+            if exit_code == EXIT_SUCCESS:
+                print("Run completed successfully.")
+            else:
+                print(
+                    "Shared run failed with exit code {0}.".format(exit_code), file=sys.stderr
+                )
+
+    if not args.dry_run:
+        output_bytes = None
+        if exit_code == EXIT_SUCCESS and output_path and os.path.isfile(output_path):
+            output_bytes = os.path.getsize(output_path)
+        metrics.record_run(
+            program,
+            metrics.run_status(exit_code),
+            duration=time.perf_counter() - started,
+            output_bytes=output_bytes,
+        )
+        _flush_metrics(args)
+    return exit_code
+
+
+def _run_options(args, entry):
+    # Everything besides the params that changes what a run does or produces, so the
+    # daemon only coalesces requests that would run the same command the same way.
+    options = {
+        key: value for key, value in vars(args).items() if key not in _UNCOALESCED_ARGS
+    }
+    options.update(
+        entry=entry,
+        cwd=os.getcwd(),
+        registry_path=os.path.abspath(args.registry_path),
+        scratch_dir=output_manager.resolve_scratch_dir(getattr(args, "scratch_dir", None)),
+        catalog=catalog.resolve_catalog_path(getattr(args, "catalog", None)),
+    )
+    return options
+
+
+def _run_resolved(args, program, entry, override_map):
+    """Execute the run pipeline for resolved parameters; return ``(exit_code, output_path)``."""
+    if output_manager.output_mode(entry) == "shm":
+        print(
+            "Output mode 'shm' for '{0}' is only available through artctl.api.".format(program),
+            file=sys.stderr,
+        )
+        return EXIT_VALIDATION_ERROR, None
     try:
-        output_path = output_manager.build_output_path(entry, params_values=override_map)
+        output_path = output_manager.build_output_path(
+            entry, params_values=override_map, create_dirs=not args.dry_run
+        )
     except output_manager.OutputError as exc:
         print("Output error: {0}".format(exc), file=sys.stderr)
-        return EXIT_VALIDATION_ERROR
-    override_map["output"] = output_path
+        return EXIT_VALIDATION_ERROR, None
+    # Templated paths are chosen by the registry entry and are rewritten in place; only
+    # default, timestamped names are claimed against runs started in the same second.
+    if args.dry_run or (entry.get("output") or {}).get("path_template"):
+        return _run_output(args, program, entry, override_map, output_path)
+    try:
+        output_path, _ = output_manager.claim_output_path(output_path)
+    except OSError as exc:
+        print("Output error: {0}".format(exc), file=sys.stderr)
+        return EXIT_INTERNAL_ERROR, output_path
+    try:
+        return _run_output(args, program, entry, override_map, output_path)
+    finally:
+        output_manager.release_output_path(output_path)
+
+
+def _run_output(args, program, entry, override_map, output_path):
+    generator_output = output_path
+    scratch_dir = output_manager.resolve_scratch_dir(getattr(args, "scratch_dir", None))
+    if scratch_dir:
+        try:
+            generator_output = output_manager.staging_path(output_path, scratch_dir)
+        except (output_manager.OutputError, OSError) as exc:
+            print("Output error: {0}".format(exc), file=sys.stderr)
+            return EXIT_VALIDATION_ERROR, output_path
+    stream_path = None
+    if output_manager.output_mode(entry) == "stream":
+        stream_path = generator_output
+    override_map["output"] = output_manager.command_output(entry, generator_output)
 
-    print("Execution pipeline for '{0}' is not implemented yet.".format(program))
     print("Resolved parameters:")
     for name in entry.get("params", []):
         param_name = name["name"]
@@ -201,41 +942,1000 @@ def handle_run(args):
         )
     except templater.TemplateError as exc:
         print("Template error: {0}".format(exc), file=sys.stderr)
-        return EXIT_VALIDATION_ERROR
+        return EXIT_VALIDATION_ERROR, output_path
+
+    profile = None
+    if getattr(args, "profile_generator", False):
+        if entry.get("runtime") != "python":
+            print(
+                "Profiling is only supported for runtime: python entries; '{0}' uses {1}.".format(
+                    program, entry.get("runtime")
+                ),
+                file=sys.stderr,
+            )
+            return EXIT_VALIDATION_ERROR, output_path
+        stats_path, memory_path = profiling.profile_paths(output_path)
+        if not args.profile_memory:
+            memory_path = None
+        try:
+            rendered_command = profiling.rewrite_command(
+                rendered_command, os.path.abspath(stats_path),
+                os.path.abspath(memory_path) if memory_path else None,
+            )
+        except profiling.ProfilingError as exc:
+            print("Profiling error: {0}".format(exc), file=sys.stderr)
+            return EXIT_VALIDATION_ERROR, output_path
+        profile = (stats_path, memory_path)
+
+    try:
+        run_placement = _resolve_placement(args, entry)
+    except placement.PlacementError as exc:
+        print("Placement error: {0}".format(exc), file=sys.stderr)
+        return EXIT_VALIDATION_ERROR, output_path
 
     print("Command preview:")
     print("  {0}".format(" ".join(rendered_command)))
     print("Output path:")
     print("  {0}".format(output_path))
+    if generator_output != output_path:
+        print("Staging path:")
+        print("  {0}".format(generator_output))
+    if stream_path:
+        print("Generator stdout is captured to the output path.")
+    print("Placement: {0}".format(placement.describe(run_placement)))
 
     if args.dry_run:
         print("Dry run requested; command execution skipped.")
-        return EXIT_SUCCESS
+        return EXIT_SUCCESS, output_path
 
     try:
-        exit_status = runner.execute(rendered_command)
+        dedupe.break_link(generator_output)
+    except OSError as exc:
+        print("Output error: {0}".format(exc), file=sys.stderr)
+        return EXIT_INTERNAL_ERROR, output_path
+
+    record = catalog.make_record(
+        program,
+        override_map,
+        output_path,
+        exit_status=None,
+        placement=run_placement,
+        started_at=datetime.now().isoformat(timespec="seconds"),
+        version=stats.source_version(entry),
+    )
+    captured = {}
+    monitor = progress.ProgressMonitor(args.progress, label=program)
+    try:
+        with monitor, monitor.channel(program) as progress_fd:
+            captured = runner.run_process(
+                rendered_command,
+                placement=run_placement,
+                stdout_path=stream_path,
+                progress_fd=progress_fd,
+                runtime=entry.get("runtime"),
+            )
+            catalog.record_usage(record, captured)
+            exit_status = captured["returncode"]
+            if exit_status != 0:
+                raise runner.RunnerError(
+                    "Command exited with status {0}".format(exit_status),
+                    returncode=exit_status,
+                )
     except runner.RunnerError as exc:
+        record["exit_status"] = exc.returncode
+        _record_run(args, record)
+        if generator_output != output_path or stream_path:
+            output_manager.discard_staged(generator_output)
         print("Execution error: {0}".format(exc), file=sys.stderr)
+        if profile and exc.returncode is not None:
+            # The wrapper saves the profile even when the generator fails.
+            _report_profile(*profile)
+        return EXIT_INTERNAL_ERROR, output_path
+    record["exit_status"] = exit_status
+    if profile:
+        _report_profile(*profile)
+    if "output_digest" in captured:
+        record["output_digest"] = captured["output_digest"]
+        record["output_size"] = captured["output_size"]
+        print(
+            "Captured {0} ({1} {2}).".format(
+                retention.format_size(captured["output_size"]),
+                output_manager.STREAM_HASH_ALGORITHM,
+                captured["output_digest"],
+            )
+        )
+    _record_run(args, record)
+
+    if output_manager.output_is_required(entry):
+        if not output_manager.verify_output(entry, generator_output):
+            if os.path.exists(generator_output):
+                reason = output_manager.check_output(entry, generator_output)
+                print(
+                    "Output at {0} failed verification: {1}.".format(generator_output, reason),
+                    file=sys.stderr,
+                )
+            else:
+                print(
+                    f"Expected output was not produced at {generator_output}.",
+                    file=sys.stderr,
+                )
+            if generator_output != output_path:
+                output_manager.discard_staged(generator_output)
+            return EXIT_OUTPUT_ERROR, output_path
+
+    if generator_output != output_path and os.path.exists(generator_output):
+        try:
+            output_manager.publish_output(generator_output, output_path).result()
+        except output_manager.OutputError as exc:
+            print("Output error: {0}".format(exc), file=sys.stderr)
+            return EXIT_INTERNAL_ERROR, output_path
+        print("Published staged output to {0}.".format(output_path))
+
+    if getattr(args, "dedupe", False) and os.path.exists(output_path):
+        _dedupe_output(output_path, digest=captured.get("output_digest"))
+
+    print("Run completed successfully.")
+    return EXIT_SUCCESS, output_path
+
+
+def _report_profile(stats_path, memory_path):
+    if not os.path.exists(stats_path):
+        print("Generator profile was not written to {0}.".format(stats_path), file=sys.stderr)
+        return
+    print("Profile saved to {0}".format(stats_path))
+    print("Top functions by self time:")
+    print("  {0:>9} {1:>9} {2:>9}  {3}".format("self s", "cum s", "calls", "function"))
+    for self_time, cumulative, calls, location in profiling.top_functions(stats_path):
+        print(
+            "  {0:>9.4f} {1:>9.4f} {2:>9}  {3}".format(self_time, cumulative, calls, location)
+        )
+    if memory_path:
+        peak = profiling.read_peak_memory(memory_path)
+        if peak is not None:
+            print(
+                "Peak traced memory: {0} (details in {1})".format(
+                    retention.format_size(peak), memory_path
+                )
+            )
+
+
+def handle_sweep(args):
+    """Render a parameter grid, batching items when the program supports it."""
+    try:
+        entries = _load_registry(args)
+    except registry.RegistryError as exc:
+        print("Registry error: {0}".format(exc), file=sys.stderr)
+        return EXIT_VALIDATION_ERROR
+
+    program = args.program
+    entry = entries.get(program)
+    if not entry:
+        print("Program '{0}' not found in registry.".format(program), file=sys.stderr)
+        return EXIT_VALIDATION_ERROR
+    if output_manager.output_mode(entry) != "file":
+        print("Sweeps only support programs with file output.", file=sys.stderr)
+        return EXIT_VALIDATION_ERROR
+
+    declared = entry.get("params", [])
+    try:
+        constraints = sampling.compile_constraints(
+            entry.get("constraints"), [param["name"] for param in declared]
+        )
+        if args.sample is not None:
+            points = _sample_points(args, program, entry, constraints)
+        else:
+            points = []
+            for point in batch.expand_grid(batch.parse_grid(args.grid)):
+                overrides = args.overrides + [
+                    "{0}={1}".format(name, value) for name, value in point.items()
+                ]
+                points.append(params.parse_overrides(overrides, declared))
+            total = len(points)
+            points = [values for values in points if all(check(values) for check in constraints)]
+            if len(points) < total:
+                print(
+                    "Skipping {0} grid points that violate the program's constraints.".format(
+                        total - len(points)
+                    )
+                )
+        items = []
+        for index, values in enumerate(points):
+            output_path = output_manager.build_output_path(
+                entry, params_values=values, create_dirs=not args.dry_run
+            )
+            items.append(
+                {
+                    "params": values,
+                    "output": output_manager.indexed_output_path(output_path, index),
+                    "base": output_path,
+                }
+            )
+        _resolve_placement(args, entry, worker_index=0)
+    except sampling.SamplingError as exc:
+        print("Sampling error: {0}".format(exc), file=sys.stderr)
+        return EXIT_VALIDATION_ERROR
+    except catalog.CatalogError as exc:
+        print("Catalog error: {0}".format(exc), file=sys.stderr)
         return EXIT_INTERNAL_ERROR
+    except batch.BatchError as exc:
+        print("Sweep error: {0}".format(exc), file=sys.stderr)
+        return EXIT_VALIDATION_ERROR
+    except params.ParameterError as exc:
+        print("Parameter error: {0}".format(exc), file=sys.stderr)
+        return EXIT_VALIDATION_ERROR
+    except output_manager.OutputError as exc:
+        print("Output error: {0}".format(exc), file=sys.stderr)
+        return EXIT_VALIDATION_ERROR
+    except placement.PlacementError as exc:
+        print("Placement error: {0}".format(exc), file=sys.stderr)
+        return EXIT_VALIDATION_ERROR
+
+    batched = batch.supports_batch(entry) and not args.no_batch
+    if batched:
+        mode = "batches of {0}".format(
+            batch.batch_size(entry, args.batch_size, len(items), args.jobs)
+        )
+    else:
+        mode = "one process per item"
+    print("Sweeping '{0}' over {1} items ({2}).".format(program, len(items), mode))
+    if args.dry_run:
+        for item in items:
+            rendered = ", ".join(
+                "{0}={1}".format(name, value) for name, value in sorted(item["params"].items())
+            )
+            print("  {0}  {1}".format(item["output"], rendered))
+        print("Dry run requested; nothing rendered.")
+        return EXIT_SUCCESS
+    if not _preflight([entry]):
+        return EXIT_VALIDATION_ERROR
 
-    if exit_status != 0:
-        print("Generator exited with status {0}.".format(exit_status), file=sys.stderr)
+    try:
+        _claim_sweep_outputs(items)
+    except OSError as exc:
+        print("Output error: {0}".format(exc), file=sys.stderr)
         return EXIT_INTERNAL_ERROR
+    try:
+        return _run_sweep_items(args, program, entry, items, batched)
+    finally:
+        for item in items:
+            output_manager.release_output_path(item["output"])
 
-    if output_manager.output_is_required(entry):
-        if not output_manager.verify_output(entry, output_path):
+
+def _claim_sweep_outputs(items):
+    # Each item takes the first free index from its own onwards, so a sweep started in
+    # the same second as another run skips the names that one already holds.
+    index = 0
+    claimed = []
+    try:
+        for item in items:
+            item["output"], index = output_manager.claim_output_path(item.pop("base"), index)
+            claimed.append(item["output"])
+            index += 1
+    except OSError:
+        for path in claimed:
+            output_manager.release_output_path(path)
+        raise
+
+
+def _run_sweep_items(args, program, entry, items, batched):
+    started_at = datetime.now().isoformat(timespec="seconds")
+    version = stats.source_version(entry)
+    failures = []
+
+    def _on_result(index, item, outcome):
+        exit_status = outcome["exit_status"]
+        record = catalog.make_record(
+            program,
+            item["params"],
+            item["output"],
+            exit_status,
+            placement=outcome.get("placement"),
+            started_at=started_at,
+            version=version,
+        )
+        catalog.record_usage(record, outcome.get("usage"))
+        _record_run(args, record)
+        if outcome["reason"]:
+            failures.append((index, item["output"], outcome["reason"]))
+            status = "output_error" if exit_status == 0 else "error"
+            metrics.record_run(program, status)
+        else:
+            output_bytes = os.path.getsize(item["output"]) if os.path.isfile(item["output"]) else 0
+            metrics.record_run(program, "success", output_bytes=output_bytes)
+
+    if batched:
+        step = batch.batch_size(entry, args.batch_size, len(items), args.jobs)
+        expected = (len(items) + step - 1) // step
+    else:
+        expected = len(items)
+    started = time.perf_counter()
+    monitor = progress.ProgressMonitor(args.progress, label="sweep " + program, expected=expected)
+    with monitor:
+        _, invocations = batch.run_sweep(
+            entry,
+            items,
+            jobs=args.jobs,
+            size=args.batch_size,
+            use_batch=batched,
+            placement_for=lambda worker_index: _resolve_placement(args, entry, worker_index),
+            on_result=_on_result,
+            progress=monitor,
+        )
+    elapsed = time.perf_counter() - started
+    metrics.record_sweep(program, elapsed, invocations)
+    _flush_metrics(args)
+
+    for index, output_path, reason in sorted(failures):
+        print("Item {0} ({1}) failed: {2}.".format(index, output_path, reason), file=sys.stderr)
+    print(
+        "Rendered {0} of {1} items in {2} generator invocations ({3:.2f}s).".format(
+            len(items) - len(failures), len(items), invocations, elapsed
+        )
+    )
+    return EXIT_OUTPUT_ERROR if failures else EXIT_SUCCESS
+
+
+def _sample_points(args, program, entry, constraints):
+    points, describe = _sample_space(args, program, entry, constraints)
+    points = list(points)
+    print(describe(len(points)))
+    return points
+
+
+def _sample_space(args, program, entry, constraints):
+    """Return a lazy iterator of sampled points and a ``describe(count)`` summary."""
+    if args.grid:
+        raise sampling.SamplingError("--sample and --grid cannot be combined.")
+    if args.sample <= 0:
+        raise sampling.SamplingError("--sample must be a positive number of points.")
+    declared = entry.get("params", [])
+    base_values = params.parse_overrides(args.overrides, declared)
+    fixed = {override.partition("=")[0].strip() for override in args.overrides}
+    dimensions = sampling.build_space(declared, fixed, sampling.parse_ranges(args.ranges))
+    if not dimensions:
+        raise sampling.SamplingError(
+            "Program '{0}' has no parameters to sample; declare min/max, choices or "
+            "pass --range.".format(program)
+        )
+    seed = args.seed
+    if seed is None and args.method != "halton":
+        seed = random.randrange(2**32)
+    exclude = set()
+    if not args.allow_repeats:
+        exclude = sampling.rendered_keys(
+            catalog.resolve_catalog_path(getattr(args, "catalog", None)), program
+        )
+    points = sampling.sample(
+        program,
+        dimensions,
+        base_values,
+        args.sample,
+        method=args.method,
+        seed=seed,
+        constraints=constraints,
+        exclude=exclude,
+    )
+
+    def describe(count):
+        return "Sampled {0} of {1} points over {2} with {3}{4}.".format(
+            count,
+            args.sample,
+            ", ".join(dimension["name"] for dimension in dimensions),
+            args.method,
+            "" if seed is None else " (seed {0})".format(seed),
+        )
+
+    return points, describe
+
+
+def handle_plan(args):
+    """Stream the rendered jobs of a run or sweep without touching the filesystem."""
+    try:
+        entries = _load_registry(args)
+    except registry.RegistryError as exc:
+        print("Registry error: {0}".format(exc), file=sys.stderr)
+        return EXIT_VALIDATION_ERROR
+
+    program = args.program
+    entry = entries.get(program)
+    if not entry:
+        print("Program '{0}' not found in registry.".format(program), file=sys.stderr)
+        return EXIT_VALIDATION_ERROR
+    if output_manager.output_mode(entry) == "shm":
+        print("Output mode 'shm' cannot be planned.", file=sys.stderr)
+        return EXIT_VALIDATION_ERROR
+    if args.batch and args.plan_format != "jsonl":
+        print("Batch plans carry manifests and can only be written as jsonl.", file=sys.stderr)
+        return EXIT_VALIDATION_ERROR
+    if args.batch and not args.manifest_dir:
+        print("--batch needs --manifest-dir.", file=sys.stderr)
+        return EXIT_VALIDATION_ERROR
+
+    declared = entry.get("params", [])
+    describe = None
+    tally = {"items": 0, "rejected": 0}
+    directories = set()
+    count = 0
+    try:
+        constraints = sampling.compile_constraints(
+            entry.get("constraints"), [param["name"] for param in declared]
+        )
+        if args.sample is not None:
+            points, describe = _sample_space(args, program, entry, constraints)
+        elif args.grid:
+            points = plan.grid_points(batch.parse_grid(args.grid), args.overrides, declared)
+            points = _filter_points(points, constraints, tally)
+        else:
+            points = [params.parse_overrides(args.overrides, declared)]
+        jobs = plan.jobs(entry, points, indexed=bool(args.grid or args.sample is not None))
+        jobs = _track_items(jobs, directories, tally)
+        if args.batch:
+            jobs = plan.batch_jobs(
+                entry, jobs, batch.batch_size(entry, args.batch_size), args.manifest_dir
+            )
+        for job in jobs:
+            sys.stdout.write(plan.format_job(job, args.plan_format))
+            count += 1
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # The consumer stopped reading (e.g. piped into head); that is not an error.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return EXIT_SUCCESS
+    except sampling.SamplingError as exc:
+        print("Sampling error: {0}".format(exc), file=sys.stderr)
+        return EXIT_VALIDATION_ERROR
+    except catalog.CatalogError as exc:
+        print("Catalog error: {0}".format(exc), file=sys.stderr)
+        return EXIT_INTERNAL_ERROR
+    except (batch.BatchError, plan.PlanError) as exc:
+        print("Plan error: {0}".format(exc), file=sys.stderr)
+        return EXIT_VALIDATION_ERROR
+    except params.ParameterError as exc:
+        print("Parameter error: {0}".format(exc), file=sys.stderr)
+        return EXIT_VALIDATION_ERROR
+    except (output_manager.OutputError, templater.TemplateError) as exc:
+        print("Output error: {0}".format(exc), file=sys.stderr)
+        return EXIT_VALIDATION_ERROR
+
+    if describe is not None:
+        print(describe(tally["items"]), file=sys.stderr)
+    if tally["rejected"]:
+        print(
+            "Skipped {0} grid points that violate the program's constraints.".format(
+                tally["rejected"]
+            ),
+            file=sys.stderr,
+        )
+    print(
+        "Planned {0} jobs ({1} items) for '{2}'.".format(count, tally["items"], program),
+        file=sys.stderr,
+    )
+    missing = plan.missing_dirs(directories)
+    if missing:
+        print(
+            "Create these output directories before running the jobs: {0}".format(
+                " ".join(missing)
+            ),
+            file=sys.stderr,
+        )
+    return EXIT_SUCCESS
+
+
+def _filter_points(points, constraints, tally):
+    for values in points:
+        if all(check(values) for check in constraints):
+            yield values
+        else:
+            tally["rejected"] += 1
+
+
+def _track_items(jobs, directories, tally):
+    for job in jobs:
+        directories.add(os.path.dirname(job["output"]))
+        tally["items"] += 1
+        yield job
+
+
+def handle_build(args):
+    """Bring project targets up to date in dependency order."""
+    try:
+        entries = _load_registry(args)
+    except registry.RegistryError as exc:
+        print("Registry error: {0}".format(exc), file=sys.stderr)
+        return EXIT_VALIDATION_ERROR
+
+    try:
+        project = build.load_project(args.project_file, entries)
+        names = build.order(project["targets"], args.targets)
+    except build.BuildError as exc:
+        print("Build error: {0}".format(exc), file=sys.stderr)
+        return EXIT_VALIDATION_ERROR
+    programs = sorted({project["targets"][name]["program"] for name in names})
+    if not args.dry_run and not _preflight([entries[program] for program in programs]):
+        return EXIT_VALIDATION_ERROR
+
+    started_at = datetime.now().isoformat(timespec="seconds")
+    counts = {}
+
+    def _on_result(result):
+        status = result["status"]
+        counts[status] = counts.get(status, 0) + 1
+        name = result["name"]
+        if status == "up-to-date":
+            print("  up to date  {0}".format(name))
+        elif status == "would-build":
+            print("  would build {0} ({1})".format(name, result["reason"]))
+        elif status == "built":
             print(
-                f"Expected output was not produced at {output_path}.",
-                file=sys.stderr,
+                "  built       {0} -> {1} ({2}; {3:.2f}s)".format(
+                    name, result["output"], result["reason"], result["duration"]
+                )
+            )
+        else:
+            print("  {0:<11} {1}: {2}".format(status, name, result["reason"]), file=sys.stderr)
+        if status in ("built", "failed"):
+            record = catalog.make_record(
+                result["program"],
+                result["params"],
+                result["output"],
+                0 if status == "built" else 1,
+                started_at=started_at,
+                version=stats.source_version(entries[result["program"]]),
+            )
+            catalog.record_usage(record, result["usage"])
+            _record_run(args, record)
+            output_bytes = None
+            if status == "built" and os.path.isfile(result["output"]):
+                output_bytes = os.path.getsize(result["output"])
+            metrics.record_run(
+                result["program"],
+                "success" if status == "built" else "error",
+                duration=result["duration"],
+                output_bytes=output_bytes,
             )
-            return 4
 
-    print("Run completed successfully.")
+    print("Building {0}:".format(args.project_file))
+    started = time.perf_counter()
+    results = build.build(
+        project,
+        entries,
+        selected=args.targets,
+        jobs=args.jobs,
+        force=args.force,
+        dry_run=args.dry_run,
+        keep_going=args.keep_going,
+        on_result=_on_result,
+    )
+    _flush_metrics(args)
+    summary = ", ".join(
+        "{0} {1}".format(counts[status], status)
+        for status in ("built", "up-to-date", "would-build", "failed", "blocked", "skipped")
+        if counts.get(status)
+    )
+    elapsed = time.perf_counter() - started
+    print("{0} targets: {1} ({2:.2f}s).".format(len(results), summary, elapsed))
+    if any(result["status"] in ("failed", "blocked", "skipped") for result in results):
+        return EXIT_OUTPUT_ERROR
     return EXIT_SUCCESS
 
 
-def main(argv=None):
-    """Main entry point used by the console script."""
+def handle_verify(args):
+    """Verify every output file under a directory and report failures."""
+    if not os.path.isdir(args.directory):
+        print("Directory not found: {0}".format(args.directory), file=sys.stderr)
+        return EXIT_VALIDATION_ERROR
+
+    checked = 0
+    failed = 0
+    for path, reason in verify.verify_tree(
+        args.directory,
+        mode=args.mode,
+        min_size=args.min_size,
+        extensions=args.extensions,
+        jobs=args.jobs,
+    ):
+        checked += 1
+        if reason is None:
+            if not args.quiet:
+                print("OK   {0}".format(path))
+        else:
+            failed += 1
+            print("FAIL {0}: {1}".format(path, reason))
+
+    print("Verified {0} files: {1} failed.".format(checked, failed))
+    return EXIT_OUTPUT_ERROR if failed else EXIT_SUCCESS
+
+
+def handle_du(args):
+    """Report per-program disk usage of the outputs tree."""
+    try:
+        usage = retention.disk_usage(
+            args.outputs_dir, jobs=args.jobs, use_cache=not args.no_cache
+        )
+    except retention.RetentionError as exc:
+        print("Usage error: {0}".format(exc), file=sys.stderr)
+        return EXIT_INTERNAL_ERROR
+
+    if args.by_day:
+        for day, _, programs in usage:
+            for program in sorted(programs):
+                counts = programs[program]
+                print(
+                    "{0}  {1:<24} {2:>8} files {3:>10}".format(
+                        day.isoformat(),
+                        program,
+                        counts["files"],
+                        retention.format_size(counts["bytes"]),
+                    )
+                )
+
+    totals = retention.summarize(usage)
+    total_files = 0
+    total_bytes = 0
+    for program in sorted(totals):
+        counts = totals[program]
+        total_files += counts["files"]
+        total_bytes += counts["bytes"]
+        print(
+            "{0:<36} {1:>8} files {2:>10}".format(
+                program, counts["files"], retention.format_size(counts["bytes"])
+            )
+        )
+    print(
+        "{0:<36} {1:>8} files {2:>10} in {3} days".format(
+            "total",
+            total_files,
+            retention.format_size(total_bytes),
+            len({day for day, _, _ in usage}),
+        )
+    )
+    return EXIT_SUCCESS
+
+
+def handle_stats(args):
+    """Report per-program percentiles and regressions from the run catalog."""
+    catalog_path = catalog.resolve_catalog_path(getattr(args, "catalog", None))
+    if not catalog_path:
+        print(
+            "Stats error: no run catalog; pass --catalog or set ${0}.".format(
+                catalog.CATALOG_ENV_VAR
+            ),
+            file=sys.stderr,
+        )
+        return EXIT_VALIDATION_ERROR
+    try:
+        summary = stats.update(catalog_path, rebuild=args.rebuild)
+    except stats.StatsError as exc:
+        print("Stats error: {0}".format(exc), file=sys.stderr)
+        return EXIT_INTERNAL_ERROR
+
+    rows = stats.report(summary, args.metric, args.programs, by_version=args.by_version)
+    found = stats.regressions(
+        summary, args.metric, args.programs, alpha=args.alpha, min_change=args.min_change
+    )
+    if args.json:
+        print(
+            json.dumps(
+                {"metric": args.metric, "programs": rows, "regressions": found},
+                sort_keys=True,
+                indent=2,
+            )
+        )
+        return EXIT_SUCCESS
+
+    print(
+        "{0:<24} {1:<12} {2:>8} {3:>8} {4:>10} {5:>10} {6:>10}".format(
+            "program", "version", "runs", "failed", "p50", "p95", "p99"
+        )
+    )
+    for row in rows:
+        print(
+            "{0:<24} {1:<12} {2:>8} {3:>8} {4:>10} {5:>10} {6:>10}".format(
+                row["program"],
+                row["version"] or "all",
+                row["runs"],
+                row["failures"],
+                _format_metric(args.metric, row["p50"]),
+                _format_metric(args.metric, row["p95"]),
+                _format_metric(args.metric, row["p99"]),
+            )
+        )
+    for regression in found:
+        print(
+            "Regression in {0}: {1} -> {2}, {3} p50 {4} -> {5} ({6:+.1%}, p={7:.2g}).".format(
+                regression["program"],
+                regression["before"],
+                regression["after"],
+                args.metric,
+                _format_metric(args.metric, regression["before_p50"]),
+                _format_metric(args.metric, regression["after_p50"]),
+                regression["change"],
+                regression["p_value"],
+            )
+        )
+    return EXIT_SUCCESS
+
+
+def _format_metric(metric, value):
+    if value is None:
+        return "-"
+    if metric == "max_rss_kb":
+        return retention.format_size(value * 1024)
+    return "{0:.3f}s".format(value)
+
+
+def handle_prune(args):
+    """Remove outputs beyond the configured age or size budgets."""
+    try:
+        before = None
+        if args.before:
+            try:
+                before = datetime.strptime(args.before, "%Y-%m-%d").date()
+            except ValueError:
+                raise retention.RetentionError(
+                    "--before expects YYYY-MM-DD; got '{0}'.".format(args.before)
+                )
+        if args.older_than is not None:
+            cutoff = datetime.now().date() - timedelta(days=args.older_than)
+            before = cutoff if before is None else max(before, cutoff)
+        default_budget = retention.parse_size(args.max_size) if args.max_size else None
+        budgets = {}
+        for item in args.budgets:
+            program, sep, size = item.partition("=")
+            if not sep or not program.strip():
+                raise retention.RetentionError(
+                    "Budgets must use PROGRAM=SIZE format; got '{0}'.".format(item)
+                )
+            budgets[program.strip()] = retention.parse_size(size)
+    except retention.RetentionError as exc:
+        print("Prune error: {0}".format(exc), file=sys.stderr)
+        return EXIT_VALIDATION_ERROR
+
+    if before is None and default_budget is None and not budgets:
+        print(
+            "Nothing to prune: pass --older-than, --before, --max-size or --budget.",
+            file=sys.stderr,
+        )
+        return EXIT_VALIDATION_ERROR
+
+    try:
+        plan = retention.plan_prune(
+            args.outputs_dir,
+            before=before,
+            budgets=budgets,
+            default_budget=default_budget,
+            jobs=args.jobs,
+        )
+        for day, path, size in plan["days"]:
+            print(
+                "Remove day {0} ({1}): {2}".format(
+                    day.isoformat(), retention.format_size(size), path
+                )
+            )
+        for path, size in plan["files"]:
+            print("Remove file ({0}): {1}".format(retention.format_size(size), path))
+        planned = sum(item[2] for item in plan["days"]) + sum(item[1] for item in plan["files"])
+        if args.dry_run:
+            print("Dry run: would free {0}.".format(retention.format_size(planned)))
+            return EXIT_SUCCESS
+        freed = retention.apply_prune(args.outputs_dir, plan)
+    except retention.RetentionError as exc:
+        print("Prune error: {0}".format(exc), file=sys.stderr)
+        return EXIT_INTERNAL_ERROR
+
+    print("Freed {0}.".format(retention.format_size(freed)))
+    return EXIT_SUCCESS
+
+
+def _dedupe_output(output_path, digest=None):
+    try:
+        index = dedupe.DedupeIndex(output_manager.DEFAULT_BASE_DIR)
+        if digest and output_manager.STREAM_HASH_ALGORITHM == dedupe.HASH_ALGORITHM:
+            index.record(output_path, os.stat(output_path), digest)
+        status, reclaimed = dedupe.dedupe_file(output_path, index)
+        index.save()
+    except (dedupe.DedupeError, OSError) as exc:
+        print("Dedupe error: {0}".format(exc), file=sys.stderr)
+        return
+    if status == "linked":
+        print(
+            "Output is identical to an existing file; hardlinked (reclaimed {0}).".format(
+                retention.format_size(reclaimed)
+            )
+        )
+
+
+def handle_dedupe(args):
+    """Hardlink duplicate files across the outputs tree."""
+    if not os.path.isdir(args.outputs_dir):
+        print("Directory not found: {0}".format(args.outputs_dir), file=sys.stderr)
+        return EXIT_VALIDATION_ERROR
+    try:
+        summary = dedupe.dedupe_tree(args.outputs_dir, dry_run=args.dry_run, jobs=args.jobs)
+    except (dedupe.DedupeError, OSError) as exc:
+        print("Dedupe error: {0}".format(exc), file=sys.stderr)
+        return EXIT_INTERNAL_ERROR
+
+    verb = "Would link" if args.dry_run else "Linked"
+    print(
+        "Scanned {0} files ({1} size-matched candidates). {2} {3} duplicates, "
+        "reclaiming {4}.".format(
+            summary["scanned"],
+            summary["candidates"],
+            verb,
+            summary["linked"],
+            retention.format_size(summary["reclaimed"]),
+        )
+    )
+    return EXIT_SUCCESS
+
+
+def handle_archive(args):
+    """Pack day directories older than ``--before`` into indexed archives."""
+    try:
+        before = datetime.strptime(args.before, "%Y-%m-%d").date()
+    except ValueError:
+        print(
+            "Archive error: --before expects YYYY-MM-DD; got '{0}'.".format(args.before),
+            file=sys.stderr,
+        )
+        return EXIT_VALIDATION_ERROR
+
+    try:
+        days = [
+            (day, path)
+            for day, path in retention.iter_day_dirs(args.outputs_dir)
+            if day < before
+        ]
+    except retention.RetentionError as exc:
+        print("Archive error: {0}".format(exc), file=sys.stderr)
+        return EXIT_INTERNAL_ERROR
+
+    if args.dry_run:
+        for day, path in days:
+            print("Would archive day {0}: {1}".format(day.isoformat(), path))
+        return EXIT_SUCCESS
+
+    relocations = {}
+    cache = retention.UsageCache(args.outputs_dir)
+    failed = False
+    try:
+        for day, path in days:
+            pack_path, members = archive.archive_day(path, compression=args.compression)
+            cache.forget(os.path.relpath(path, args.outputs_dir))
+            for member, original in members.items():
+                relocations[os.path.abspath(original)] = archive.format_location(
+                    pack_path, member
+                )
+            print(
+                "Archived day {0}: {1} files -> {2}".format(
+                    day.isoformat(), len(members), pack_path
+                )
+            )
+    except (archive.ArchiveError, retention.RetentionError) as exc:
+        print("Archive error: {0}".format(exc), file=sys.stderr)
+        failed = True
+    finally:
+        # Days archived before a failure are already gone from disk; their catalog
+        # records must point at the packs regardless of how the loop ended.
+        if not _relocate_catalog(args, relocations):
+            failed = True
+    try:
+        cache.save()
+    except retention.RetentionError as exc:
+        print("Archive error: {0}".format(exc), file=sys.stderr)
+        failed = True
+    return EXIT_INTERNAL_ERROR if failed else EXIT_SUCCESS
+
+
+def _relocate_catalog(args, relocations):
+    catalog_path = catalog.resolve_catalog_path(getattr(args, "catalog", None))
+    if not catalog_path or not relocations:
+        return True
+    try:
+        updated = catalog.rewrite_records(
+            catalog_path, lambda records: archive.relocate_records(records, relocations)
+        )
+    except catalog.CatalogError as exc:
+        print("Catalog error: {0}".format(exc), file=sys.stderr)
+        return False
+    print("Updated {0} catalog records.".format(updated))
+    return True
+
+
+def handle_extract(args):
+    """Extract a single archived output without scanning the pack."""
+    try:
+        pack_path, member = archive.split_location(args.location)
+        destination = args.dest or os.path.basename(member)
+        size = archive.extract_member(pack_path, member, destination)
+    except archive.ArchiveError as exc:
+        print("Extract error: {0}".format(exc), file=sys.stderr)
+        return EXIT_OUTPUT_ERROR
+    print("Extracted {0} ({1}) to {2}".format(member, retention.format_size(size), destination))
+    return EXIT_SUCCESS
+
+
+def handle_serve(args):
+    """Run the resident daemon until interrupted."""
+    socket_path = args.serve_socket or server.resolve_socket_path(args.socket)
+    if not socket_path:
+        print("A socket path is required (--socket or $ARTCTL_SOCKET).", file=sys.stderr)
+        return EXIT_VALIDATION_ERROR
+
+    metrics_server = None
+    if args.metrics_port is not None:
+        try:
+            metrics_server = metrics.start_http_server(args.metrics_port, args.metrics_host)
+        except metrics.MetricsError as exc:
+            print("Metrics error: {0}".format(exc), file=sys.stderr)
+            return EXIT_INTERNAL_ERROR
+
+    try:
+        daemon = server.ArtctlServer(socket_path)
+    except (server.ServerError, OSError) as exc:
+        print("Server error: {0}".format(exc), file=sys.stderr)
+        if metrics_server is not None:
+            metrics_server.shutdown()
+            metrics_server.server_close()
+        return EXIT_INTERNAL_ERROR
+
+    try:
+        entries = daemon.registry_cache.load(args.registry_path)
+    except registry.RegistryError as exc:
+        print("Registry error: {0}".format(exc), file=sys.stderr)
+    else:
+        print("Loaded {0} registry entries from {1}.".format(len(entries), args.registry_path))
+    if metrics_server is not None:
+        host, port = metrics_server.server_address[:2]
+        print("Serving metrics on http://{0}:{1}{2}.".format(host, port, metrics.METRICS_PATH))
+    print("Serving on {0} (pid {1}).".format(socket_path, os.getpid()))
+    sys.stdout.flush()
+    signal.signal(signal.SIGTERM, _raise_keyboard_interrupt)
+    try:
+        daemon.serve()
+    except KeyboardInterrupt:
+        print("Daemon stopped.")
+    finally:
+        if metrics_server is not None:
+            metrics_server.shutdown()
+            metrics_server.server_close()
+    return EXIT_SUCCESS
+
+
+def _raise_keyboard_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def _forward_to_daemon(args, argv):
+    socket_path = server.resolve_socket_path(args.socket)
+    if not socket_path:
+        return None
+    try:
+        response = server.forward(socket_path, argv)
+    except server.ServerError as exc:
+        print("Daemon error: {0}; running locally.".format(exc), file=sys.stderr)
+        return None
+    if response is None:
+        return None
+    sys.stdout.write(response.get("stdout", ""))
+    sys.stderr.write(response.get("stderr", ""))
+    return response.get("exit_code", EXIT_INTERNAL_ERROR)
+
+
+def handle_completion(args):
+    """Print the completion script for a shell."""
+    sys.stdout.write(complete.script(args.shell))
+    return EXIT_SUCCESS
+
+
+def main(argv=None, allow_forward=True, registry_cache=None, coalescer=None):
+    """Main entry point used by the console script.
+
+    When a daemon socket is configured, ``list``, ``help`` and ``run`` are forwarded to
+    the daemon; ``allow_forward`` is disabled by the daemon itself, which passes its
+    resident ``registry_cache`` and a ``coalescer`` shared by concurrent run requests.
+    """
     parser = build_parser()
     args = parser.parse_args(argv)
 
@@ -243,6 +1943,13 @@ def main(argv=None):
         print(__version__)
         return EXIT_SUCCESS
 
+    if allow_forward and getattr(args, "command", None) in FORWARDABLE_COMMANDS:
+        exit_code = _forward_to_daemon(args, sys.argv[1:] if argv is None else argv)
+        if exit_code is not None:
+            return exit_code
+    args.registry_cache = registry_cache
+    args.coalescer = coalescer
+
     if not getattr(args, "command", None):
         parser.print_help()
         return EXIT_SUCCESS
@@ -0,0 +1,87 @@
+"""Single-flight coalescing of identical concurrent run requests.
+
+Callers that ask for the same program with the same resolved parameters while a run
+is in flight wait for that run and share its result instead of starting another
+generator process. Completed runs are forgotten immediately; this is not a cache.
+"""
+
+import asyncio
+import json
+import threading
+from concurrent.futures import Future
+
+
+def canonical_key(program, values, options=None):
+    """Return a stable key for a program and its resolved parameter values.
+
+    ``options`` holds everything else that changes what a run does or produces (the
+    registry entry, output mode and directories, placement, ...); requests are only
+    coalesced when those match too.
+    """
+    payload = {key: value for key, value in (values or {}).items() if key != "output"}
+    key = [program, payload]
+    if options:
+        key.append(options)
+    return json.dumps(key, sort_keys=True, separators=(",", ":"), default=str)
+
+
+class SingleFlight:
+    """Coalesce identical requests made from coroutines on one event loop."""
+
+    def __init__(self):
+        self._inflight = {}
+
+    def in_flight(self):
+        return len(self._inflight)
+
+    async def do(self, key, factory):
+        """Await ``factory()`` once per key; return ``(result, leader)``.
+
+        ``leader`` is true for the caller whose request started the run. Cancelling a
+        waiting caller does not cancel the shared run.
+        """
+        task = self._inflight.get(key)
+        leader = task is None
+        if leader:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task), leader
+
+    def _forget(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+
+class ThreadSingleFlight:
+    """Coalesce identical requests made from concurrent threads."""
+
+    def __init__(self):
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._inflight)
+
+    def do(self, key, func):
+        """Call ``func()`` once per key; return ``(result, leader)``.
+
+        Exceptions raised by the leader's call are re-raised in every waiting thread.
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+
+        if leader:
+            try:
+                future.set_result(func())
+            except BaseException as exc:
+                future.set_exception(exc)
+            finally:
+                with self._lock:
+                    del self._inflight[key]
+        return future.result(), leader
@@ -0,0 +1,334 @@
+"""Shell completion for programs, params and options.
+
+``artctl __complete WORD...`` prints the candidates for the last word, one per line.
+It answers from a small index of program names, their params and the CLI's options,
+so a keystroke costs one directory scan of the registry (to check mtimes) and one
+:mod:`marshal` load; PyYAML, the registry validators and the argparse parser are only
+imported when the index is stale and has to be rebuilt. Keep this module's imports
+to builtin modules; even :mod:`json` and :mod:`hashlib` cost several milliseconds.
+
+The index lives in ``$XDG_CACHE_HOME/artctl`` (``~/.cache/artctl``), one file per
+registry directory, and is rebuilt whenever a registry file, ``cli.py`` or
+``registry.py`` changes. Only the :data:`MAX_CACHED_INDEXES` most recently written
+indexes of each kind are kept, so registries that no longer exist do not pile up.
+"""
+
+import marshal
+import os
+import sys
+import zlib
+
+SHELLS = ("bash", "zsh", "fish")
+INDEX_VERSION = 1
+CACHE_DIR_ENV = "XDG_CACHE_HOME"
+DEFAULT_REGISTRY = "registry"
+MAX_CACHED_INDEXES = 16
+# Options whose values are ``NAME=...`` param assignments, and the param types they take.
+PARAM_OPTIONS = {
+    "--set": None,
+    "--grid": None,
+    "--range": ("int", "float"),
+}
+# Source files whose changes alter the parser or the cleaned params.
+_SOURCE_FILES = ("cli.py", "registry.py")
+
+BASH_SCRIPT = """\
+_artctl_complete() {
+    local cur words cword
+    if declare -F _get_comp_words_by_ref >/dev/null; then
+        _get_comp_words_by_ref -n =: cur words cword
+    else
+        cur="${COMP_WORDS[COMP_CWORD]}"
+        words=("${COMP_WORDS[@]}")
+        cword=$COMP_CWORD
+    fi
+    local IFS=$'\\n'
+    COMPREPLY=($(artctl __complete "${words[@]:1:cword}" 2>/dev/null))
+    if [[ "$cur" == *=* && "$COMP_WORDBREAKS" == *=* ]]; then
+        local prefix="${cur%"${cur##*=}"}"
+        COMPREPLY=("${COMPREPLY[@]#"$prefix"}")
+    fi
+    if [[ ${#COMPREPLY[@]} -eq 1 && "${COMPREPLY[0]}" == *= ]]; then
+        compopt -o nospace
+    fi
+}
+complete -o default -F _artctl_complete artctl
+"""
+
+ZSH_SCRIPT = """\
+#compdef artctl
+_artctl() {
+    local -a candidates assignments
+    candidates=("${(@f)$(artctl __complete "${(@)words[2,CURRENT]}" 2>/dev/null)}")
+    candidates=(${candidates:#})
+    if (( ! ${#candidates} )); then
+        _files
+        return
+    fi
+    assignments=(${(M)candidates:#*=})
+    candidates=(${candidates:#*=})
+    compadd -Q -a candidates
+    compadd -Q -S '' -a assignments
+}
+compdef _artctl artctl
+"""
+
+FISH_SCRIPT = """\
+function __artctl_complete
+    set -l words (commandline -opc)
+    set -l candidates (artctl __complete $words[2..-1] (commandline -ct) 2>/dev/null)
+    if test (count $candidates) -gt 0
+        printf '%s\\n' $candidates
+    else
+        __fish_complete_path (commandline -ct)
+    end
+end
+complete -c artctl -f -a '(__artctl_complete)'
+"""
+
+SCRIPTS = {"bash": BASH_SCRIPT, "zsh": ZSH_SCRIPT, "fish": FISH_SCRIPT}
+
+
+def script(shell):
+    """Return the completion script for ``shell``."""
+    if shell not in SCRIPTS:
+        raise ValueError(
+            "Shell must be one of {0}; got '{1}'.".format(", ".join(SHELLS), shell)
+        )
+    return SCRIPTS[shell]
+
+
+def index_path(registry_path, cache_dir=None, kind="complete"):
+    """Return where the ``kind`` index (completion or search) for ``registry_path`` is cached."""
+    if cache_dir is None:
+        base = os.environ.get(CACHE_DIR_ENV) or os.path.join(os.path.expanduser("~"), ".cache")
+        cache_dir = os.path.join(base, "artctl")
+    registry_path = os.path.abspath(registry_path)
+    name = "{0}-{1}-{2:08x}.marshal".format(
+        kind, os.path.basename(registry_path), zlib.crc32(registry_path.encode("utf-8"))
+    )
+    return os.path.join(cache_dir, name)
+
+
+def fingerprint(registry_path):
+    """Return ``[path, mtime_ns, size]`` for every registry file and relevant source."""
+    states = []
+    _scan(os.path.abspath(registry_path), states)
+    states.sort()
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    for name in _SOURCE_FILES:
+        path = os.path.join(package_dir, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        states.append([path, stat.st_mtime_ns, stat.st_size])
+    return states
+
+
+def _scan(directory, states):
+    # Mirrors registry discovery: recursive *.yaml/*.yml, hidden entries skipped.
+    try:
+        scanner = os.scandir(directory)
+    except OSError:
+        return
+    with scanner:
+        for item in scanner:
+            if item.name.startswith("."):
+                continue
+            try:
+                if item.is_dir():
+                    _scan(item.path, states)
+                elif item.name.endswith((".yaml", ".yml")) and item.is_file():
+                    stat = item.stat()
+                    states.append([item.path, stat.st_mtime_ns, stat.st_size])
+            except OSError:
+                continue
+
+
+def build_index(registry_path):
+    """Build the index from the registry and the CLI parser (imports both)."""
+    from . import cli
+    from . import registry
+
+    try:
+        entries = registry.load_registry(registry_path)
+    except registry.RegistryError:
+        entries = {}
+    programs = {}
+    for name, entry in entries.items():
+        params = {}
+        for param in entry.get("params") or []:
+            choices = param.get("choices")
+            if param["type"] == "bool":
+                choices = ["true", "false"]
+            params[param["name"]] = {
+                "type": param["type"],
+                "choices": [str(choice) for choice in choices] if choices else None,
+            }
+        programs[name] = {"params": params}
+    index = _describe_parser(cli.build_parser())
+    index["programs"] = programs
+    return index
+
+
+def _describe_parser(parser):
+    import argparse
+
+    options = {}
+    positionals = []
+    commands = {}
+    for action in parser._actions:
+        if isinstance(action, argparse._SubParsersAction):
+            for name, subparser in action.choices.items():
+                commands[name] = _describe_parser(subparser)
+        elif action.option_strings:
+            choices = [str(choice) for choice in action.choices] if action.choices else None
+            for option in action.option_strings:
+                options[option] = {"value": action.nargs != 0, "choices": choices}
+        else:
+            positionals.append(action.dest)
+    return {"options": options, "positionals": positionals, "commands": commands}
+
+
+def load_index(registry_path, cache_dir=None):
+    """Return the cached index, rebuilding and saving it when it is stale."""
+    path = index_path(registry_path, cache_dir)
+    current = fingerprint(registry_path)
+    index = read_cached(path, current)
+    if index is None:
+        index = build_index(registry_path)
+        write_cached(path, index, current)
+    return index
+
+
+def read_cached(path, current):
+    """Return the index saved at ``path`` if it was built for fingerprint ``current``."""
+    try:
+        with open(path, "rb") as handle:
+            # marshal.loads on the whole file; marshal.load reads a file object piecemeal.
+            index = marshal.loads(handle.read())
+        if index.get("version") == INDEX_VERSION and index.get("fingerprint") == current:
+            return index
+    except (OSError, EOFError, ValueError, TypeError, AttributeError):
+        pass
+    return None
+
+
+def write_cached(path, index, current):
+    """Save ``index`` for fingerprint ``current``; a read-only cache is ignored."""
+    index["version"] = INDEX_VERSION
+    index["fingerprint"] = current
+    temporary = "{0}.{1}.tmp".format(path, os.getpid())
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(temporary, "wb") as handle:
+            marshal.dump(index, handle)
+        os.replace(temporary, path)
+    except OSError:
+        if os.path.exists(temporary):
+            os.unlink(temporary)
+        return
+    _evict_indexes(path)
+
+
+def _evict_indexes(path):
+    # Drop the least recently written indexes of the same kind beyond the limit.
+    directory, name = os.path.split(path)
+    prefix = name.split("-", 1)[0] + "-"
+    indexes = []
+    try:
+        with os.scandir(directory) as scanner:
+            for item in scanner:
+                if item.name.startswith(prefix) and item.name.endswith(".marshal"):
+                    indexes.append((item.stat().st_mtime_ns, item.path))
+    except OSError:
+        return
+    indexes.sort(reverse=True)
+    for _, stale in indexes[MAX_CACHED_INDEXES:]:
+        try:
+            os.unlink(stale)
+        except OSError:
+            pass
+
+
+def candidates(words, index):
+    """Return completions for the last of ``words`` (the words after ``artctl``)."""
+    *previous, current = words or [""]
+    parser = index
+    command = None
+    positionals = []
+    pending = None
+    for word in previous:
+        if pending is not None:
+            pending = None
+            continue
+        if word.startswith("-") and word != "-":
+            spec = parser["options"].get(word.split("=", 1)[0])
+            if spec and spec["value"] and "=" not in word:
+                pending = word
+            continue
+        if command is None and word in index["commands"]:
+            command = word
+            parser = index["commands"][word]
+        else:
+            positionals.append(word)
+
+    program = None
+    if command is not None and parser["positionals"][:1] == ["program"] and positionals:
+        program = index["programs"].get(positionals[0])
+
+    if pending is not None:
+        if pending in PARAM_OPTIONS and command is not None:
+            return _param_candidates(program, current, PARAM_OPTIONS[pending])
+        choices = parser["options"][pending]["choices"] or []
+        return [choice for choice in choices if choice.startswith(current)]
+    if current.startswith("-"):
+        if "=" in current:
+            return []
+        return sorted(option for option in parser["options"] if option.startswith(current))
+    if command is None:
+        return sorted(name for name in index["commands"] if name.startswith(current))
+    if parser["positionals"][len(positionals) : len(positionals) + 1] == ["program"]:
+        return sorted(name for name in index["programs"] if name.startswith(current))
+    return []
+
+
+def _param_candidates(program, current, types):
+    if program is None:
+        return []
+    params = program["params"]
+    name, sep, value = current.partition("=")
+    if sep:
+        param = params.get(name)
+        if param is None or not param["choices"] or types is not None:
+            return []
+        return [name + "=" + choice for choice in param["choices"] if choice.startswith(value)]
+    return sorted(
+        key + "="
+        for key, param in params.items()
+        if key.startswith(current) and (types is None or param["type"] in types)
+    )
+
+
+def _registry_path(words):
+    path = DEFAULT_REGISTRY
+    for position, word in enumerate(words[:-1]):
+        if word == "--registry-path" and position + 1 < len(words) - 1:
+            path = words[position + 1]
+        elif word.startswith("--registry-path="):
+            path = word.split("=", 1)[1]
+    return path
+
+
+def main(words, stream=None, cache_dir=None):
+    """Print completions for ``words``; errors never reach the shell."""
+    stream = stream if stream is not None else sys.stdout
+    try:
+        index = load_index(_registry_path(words), cache_dir)
+        results = candidates(words, index)
+    except Exception:  # noqa: BLE001
+        return 1
+    if results:
+        stream.write("\n".join(results) + "\n")
+    return 0
@@ -0,0 +1,279 @@
+"""Hardlink-based deduplication of byte-identical outputs.
+
+A persistent index in ``<base>/.artctl-dedupe.json`` maps content digests to the
+canonical file (path, device and inode) and remembers every file it has seen by
+``(size, mtime_ns, inode)``. Files are only hashed once another file of the same size
+turns up, and unchanged files are never hashed twice. A canonical file whose size or
+mtime changed since it was indexed is re-hashed before anything is linked to it.
+
+Linked copies share one inode, so writing into any of them in place changes every
+copy. Outputs that are about to be regenerated at an existing path are first given a
+private copy with :func:`break_link`; staged outputs are published by rename and never
+write through a link.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from . import retention
+
+INDEX_FILENAME = ".artctl-dedupe.json"
+INDEX_VERSION = 1
+HASH_ALGORITHM = "sha256"
+
+
+class DedupeError(Exception):
+    """Raised when the dedupe index cannot be read or written."""
+
+
+def hash_file(path, algorithm=HASH_ALGORITHM):
+    """Return the hex digest of ``path``, streamed through a reusable buffer."""
+    with open(path, "rb") as handle:
+        return hashlib.file_digest(handle, algorithm).hexdigest()
+
+
+class DedupeIndex:
+    """Persistent digest-to-inode index for one outputs tree."""
+
+    def __init__(self, base_dir):
+        self.path = os.path.join(base_dir, INDEX_FILENAME)
+        self.digests = {}
+        self.files = {}
+        self._lock = threading.Lock()
+        self._read()
+
+    def _read(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as handle:
+                data = json.load(handle)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as exc:
+            raise DedupeError("Failed to read dedupe index {0}: {1}".format(self.path, exc))
+        if data.get("version") == INDEX_VERSION and data.get("algorithm") == HASH_ALGORITHM:
+            self.digests = data.get("digests") or {}
+            self.files = data.get("files") or {}
+
+    def save(self):
+        temporary = "{0}.{1}.tmp".format(self.path, os.getpid())
+        payload = {
+            "version": INDEX_VERSION,
+            "algorithm": HASH_ALGORITHM,
+            "digests": self.digests,
+            "files": self.files,
+        }
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(temporary, "w", encoding="utf-8") as handle:
+                json.dump(payload, handle)
+            os.replace(temporary, self.path)
+        except OSError as exc:
+            raise DedupeError("Failed to write dedupe index {0}: {1}".format(self.path, exc))
+
+    def known_sizes(self):
+        with self._lock:
+            return {entry["size"] for entry in self.digests.values()}
+
+    def digest_for(self, path, stat):
+        """Return the digest of ``path``, hashing only if it changed since last seen."""
+        key = os.path.abspath(path)
+        signature = [stat.st_size, stat.st_mtime_ns, stat.st_ino]
+        with self._lock:
+            cached = self.files.get(key)
+        if cached and cached["signature"] == signature and cached["digest"]:
+            return cached["digest"]
+        digest = hash_file(path)
+        self.record(path, stat, digest)
+        return digest
+
+    def is_current(self, path, stat):
+        with self._lock:
+            cached = self.files.get(os.path.abspath(path))
+        return bool(cached) and cached["signature"] == [
+            stat.st_size,
+            stat.st_mtime_ns,
+            stat.st_ino,
+        ]
+
+    def hash_peers(self, size, exclude):
+        """Hash indexed files of ``size`` not hashed yet and register their digests."""
+        exclude = os.path.abspath(exclude)
+        with self._lock:
+            peers = [
+                key
+                for key, value in self.files.items()
+                if value["signature"][0] == size and not value["digest"] and key != exclude
+            ]
+        for peer in peers:
+            try:
+                stat = os.stat(peer)
+            except OSError:
+                continue
+            self.canonical(self.digest_for(peer, stat), stat, peer)
+
+    def canonical(self, digest, stat, path):
+        """Return the canonical file for ``digest``, registering ``path`` if there is none.
+
+        An indexed file that was deleted or replaced since it was recorded is dropped,
+        and one whose size or mtime changed is re-hashed and dropped unless its content
+        still matches ``digest``.
+        """
+        with self._lock:
+            entry = self.digests.get(digest)
+        if entry is not None:
+            try:
+                current = os.stat(entry["path"])
+            except OSError:
+                current = None
+            if current and (current.st_dev, current.st_ino) == (entry["dev"], entry["ino"]):
+                if [current.st_size, current.st_mtime_ns] == [
+                    entry["size"],
+                    entry.get("mtime_ns"),
+                ]:
+                    return entry
+                try:
+                    matches = hash_file(entry["path"]) == digest
+                except OSError:
+                    matches = False
+                if matches:
+                    entry = _canonical_entry(entry["path"], current)
+                    with self._lock:
+                        self.digests[digest] = entry
+                    return entry
+        entry = _canonical_entry(path, stat)
+        with self._lock:
+            self.digests[digest] = entry
+        return entry
+
+    def record(self, path, stat, digest=None):
+        with self._lock:
+            self.files[os.path.abspath(path)] = {
+                "signature": [stat.st_size, stat.st_mtime_ns, stat.st_ino],
+                "digest": digest,
+            }
+
+    def forget_missing(self):
+        with self._lock:
+            self.files = {key: value for key, value in self.files.items() if os.path.exists(key)}
+
+
+def _canonical_entry(path, stat):
+    return {
+        "path": os.path.abspath(path),
+        "dev": stat.st_dev,
+        "ino": stat.st_ino,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+    }
+
+
+def break_link(path):
+    """Give ``path`` its own inode if it is hardlinked to other files.
+
+    The content is copied to a private file that replaces ``path`` atomically, so a
+    generator overwriting ``path`` in place cannot change the other copies. Returns
+    ``True`` when a link was broken.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return False
+    if stat.st_nlink < 2:
+        return False
+    directory, name = os.path.split(os.path.abspath(path))
+    temporary = os.path.join(directory, ".{0}.{1}.copy".format(name, uuid.uuid4().hex[:8]))
+    try:
+        shutil.copy2(path, temporary)
+        os.replace(temporary, path)
+    except OSError:
+        try:
+            os.unlink(temporary)
+        except FileNotFoundError:
+            pass
+        raise
+    return True
+
+
+def link_duplicate(path, target):
+    """Atomically replace ``path`` with a hardlink to ``target``."""
+    directory, name = os.path.split(os.path.abspath(path))
+    temporary = os.path.join(directory, ".{0}.{1}.link".format(name, uuid.uuid4().hex[:8]))
+    os.link(target, temporary)
+    try:
+        os.replace(temporary, path)
+    except OSError:
+        os.unlink(temporary)
+        raise
+
+
+def dedupe_file(path, index, dry_run=False, stat=None):
+    """Deduplicate one file against the index.
+
+    Returns ``(status, reclaimed_bytes)`` where status is ``"linked"``, ``"unique"``,
+    ``"already-linked"`` or ``"cross-device"``.
+    """
+    if stat is None:
+        stat = os.stat(path)
+    digest = index.digest_for(path, stat)
+    if digest not in index.digests:
+        index.hash_peers(stat.st_size, exclude=path)
+    entry = index.canonical(digest, stat, path)
+    if entry["dev"] == stat.st_dev and entry["ino"] == stat.st_ino:
+        return ("unique" if entry["path"] == os.path.abspath(path) else "already-linked"), 0
+    if entry["dev"] != stat.st_dev:
+        return "cross-device", 0
+    reclaimed = stat.st_size if stat.st_nlink == 1 else 0
+    if not dry_run:
+        link_duplicate(path, entry["path"])
+        index.record(path, os.stat(path), digest)
+    return "linked", reclaimed
+
+
+def dedupe_tree(base_dir, dry_run=False, jobs=None):
+    """Deduplicate every file under ``base_dir``; return a summary mapping.
+
+    Files whose size matches no other file and no indexed digest are skipped without
+    hashing. Hashing runs on a thread pool; linking is done serially in walk order so
+    the first copy of each content becomes canonical.
+    """
+    index = DedupeIndex(base_dir)
+    files = []
+    for path, _ in retention.iter_files(base_dir):
+        try:
+            files.append((path, os.stat(path)))
+        except FileNotFoundError:
+            continue
+
+    sizes = {}
+    for _, stat in files:
+        sizes[stat.st_size] = sizes.get(stat.st_size, 0) + 1
+    indexed_sizes = index.known_sizes()
+    candidates = [
+        (path, stat)
+        for path, stat in files
+        if stat.st_size > 0 and (sizes[stat.st_size] > 1 or stat.st_size in indexed_sizes)
+    ]
+
+    for path, stat in files:
+        if not index.is_current(path, stat):
+            index.record(path, stat)
+
+    with ThreadPoolExecutor(max_workers=jobs or min(8, os.cpu_count() or 1)) as executor:
+        list(executor.map(lambda item: index.digest_for(item[0], item[1]), candidates))
+
+    summary = {"scanned": len(files), "candidates": len(candidates), "linked": 0, "reclaimed": 0}
+    for path, stat in candidates:
+        status, reclaimed = dedupe_file(path, index, dry_run=dry_run, stat=stat)
+        if status == "linked":
+            summary["linked"] += 1
+            summary["reclaimed"] += reclaimed
+
+    if not dry_run:
+        index.forget_missing()
+        index.save()
+    return summary
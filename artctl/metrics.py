@@ -0,0 +1,312 @@
+"""Prometheus metrics for runs, sweeps and registry loads.
+
+Samples live in process memory keyed by metric name and labels; recording one is a
+dict update under a lock, so instrumenting the run path costs microseconds. They are
+published either as a node-exporter textfile (``--metrics-textfile`` or
+``$ARTCTL_METRICS_TEXTFILE``), rewritten atomically after each run or sweep, or over
+HTTP from ``artctl serve --metrics-port``.
+
+Every CLI invocation is a new process, so flushing adds the samples recorded since the
+last flush to the counts already in the textfile; the file accumulates across runs
+the way a long-running exporter would.
+"""
+
+import fcntl
+import math
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TEXTFILE_ENV_VAR = "ARTCTL_METRICS_TEXTFILE"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+METRICS_PATH = "/metrics"
+
+DURATION_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+LOAD_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+# name: (type, help, histogram buckets)
+FAMILIES = {
+    "artctl_runs_total": (
+        "counter",
+        "Generator runs and sweep items by program and status.",
+        None,
+    ),
+    "artctl_run_duration_seconds": (
+        "histogram",
+        "Wall-clock duration of 'artctl run' invocations.",
+        DURATION_BUCKETS,
+    ),
+    "artctl_sweep_duration_seconds": (
+        "histogram",
+        "Wall-clock duration of 'artctl sweep' invocations.",
+        DURATION_BUCKETS,
+    ),
+    "artctl_generator_invocations_total": (
+        "counter",
+        "Generator processes started by sweeps.",
+        None,
+    ),
+    "artctl_output_bytes_total": (
+        "counter",
+        "Bytes of output produced by successful runs.",
+        None,
+    ),
+    "artctl_registry_load_seconds": (
+        "histogram",
+        "Time spent reading and validating the registry.",
+        LOAD_BUCKETS,
+    ),
+    "artctl_registry_cache_requests_total": (
+        "counter",
+        "Resident registry cache lookups by result (hit or miss).",
+        None,
+    ),
+}
+
+_HISTOGRAM_SUFFIXES = ("_bucket", "_sum", "_count")
+_SAMPLE_PATTERN = re.compile(r"^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})?\s+(\S+)")
+_LABEL_PATTERN = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+
+
+class MetricsError(Exception):
+    """Raised when metrics cannot be published."""
+
+
+class Metrics:
+    """Thread-safe store of counter and histogram samples.
+
+    ``samples()`` returns totals since the store was created; ``take_pending()``
+    returns and clears what was recorded since it was last called.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = {}
+        self._pending = {}
+
+    def inc(self, name, amount=1, **labels):
+        self._add([(name, _label_key(labels), amount)])
+
+    def observe(self, name, value, **labels):
+        buckets = FAMILIES[name][2]
+        key = _label_key(labels)
+        updates = [
+            (name + "_bucket", key + (("le", _format_bound(bound)),), int(value <= bound))
+            for bound in buckets
+        ]
+        updates.append((name + "_bucket", key + (("le", "+Inf"),), 1))
+        updates.append((name + "_sum", key, value))
+        updates.append((name + "_count", key, 1))
+        self._add(updates)
+
+    def _add(self, updates):
+        with self._lock:
+            for sample, key, amount in updates:
+                self._totals[sample, key] = self._totals.get((sample, key), 0) + amount
+                self._pending[sample, key] = self._pending.get((sample, key), 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return dict(self._totals)
+
+    def take_pending(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+    def restore_pending(self, pending):
+        """Put samples back after a failed flush so the next one retries them."""
+        with self._lock:
+            for sample_key, amount in pending.items():
+                self._pending[sample_key] = self._pending.get(sample_key, 0) + amount
+
+
+REGISTRY = Metrics()
+_flush_lock = threading.Lock()
+
+
+def resolve_textfile_path(path=None):
+    """Return the textfile path from the CLI flag or environment, or ``None``."""
+    return path or os.environ.get(TEXTFILE_ENV_VAR) or None
+
+
+def run_status(exit_code):
+    """Map an artctl exit code to the ``status`` label of ``artctl_runs_total``."""
+    return {0: "success", 2: "invalid", 4: "output_error"}.get(exit_code, "error")
+
+
+def record_run(program, status, duration=None, output_bytes=None, metrics=REGISTRY):
+    metrics.inc("artctl_runs_total", program=program, status=status)
+    if duration is not None:
+        metrics.observe("artctl_run_duration_seconds", duration, program=program)
+    if output_bytes:
+        metrics.inc("artctl_output_bytes_total", output_bytes, program=program)
+
+
+def record_sweep(program, duration, invocations, metrics=REGISTRY):
+    metrics.observe("artctl_sweep_duration_seconds", duration, program=program)
+    metrics.inc("artctl_generator_invocations_total", invocations, program=program)
+
+
+def record_registry_load(duration, metrics=REGISTRY):
+    metrics.observe("artctl_registry_load_seconds", duration)
+
+
+def record_cache_lookup(hit, metrics=REGISTRY):
+    metrics.inc("artctl_registry_cache_requests_total", result="hit" if hit else "miss")
+
+
+def render(samples):
+    """Render samples in the Prometheus text exposition format."""
+    lines = []
+    for name, (kind, help_text, _) in FAMILIES.items():
+        names = _sample_names(name, kind)
+        family = [
+            (sample, key, value) for (sample, key), value in samples.items() if sample in names
+        ]
+        if not family:
+            continue
+        family.sort(key=lambda item: _sort_key(names, *item))
+        lines.append("# HELP {0} {1}".format(name, help_text))
+        lines.append("# TYPE {0} {1}".format(name, kind))
+        for sample, key, value in family:
+            lines.append("{0}{1} {2}".format(sample, _format_labels(key), _format_value(value)))
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def parse(text):
+    """Parse samples of known families from text written by :func:`render`.
+
+    Lines that are comments, malformed, or belong to other metrics are skipped.
+    """
+    known = set()
+    for name, (kind, _, _) in FAMILIES.items():
+        known.update(_sample_names(name, kind))
+    samples = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        match = _SAMPLE_PATTERN.match(line)
+        if not match or match.group(1) not in known:
+            continue
+        try:
+            value = float(match.group(3))
+        except ValueError:
+            continue
+        labels = {
+            label: _unescape(raw) for label, raw in _LABEL_PATTERN.findall(match.group(2) or "")
+        }
+        le = labels.pop("le", None)
+        key = _label_key(labels) + ((("le", le),) if le is not None else ())
+        samples[match.group(1), key] = samples.get((match.group(1), key), 0) + value
+    return samples
+
+
+def flush_textfile(path, metrics=REGISTRY):
+    """Add samples recorded since the last flush to the textfile at ``path``.
+
+    The file is read, merged and replaced atomically under an exclusive lock, so
+    concurrent artctl processes never lose each other's counts and node-exporter never
+    reads a partial file. Returns ``False`` when there was nothing to write.
+    """
+    pending = metrics.take_pending()
+    if not pending:
+        return False
+    directory = os.path.dirname(os.path.abspath(path))
+    temporary = "{0}.{1}.{2}.tmp".format(path, os.getpid(), threading.get_ident())
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with _flush_lock, open(path + ".lock", "a") as lock:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            try:
+                with open(path, "r", encoding="utf-8") as handle:
+                    merged = parse(handle.read())
+            except FileNotFoundError:
+                merged = {}
+            for sample_key, amount in pending.items():
+                merged[sample_key] = merged.get(sample_key, 0) + amount
+            with open(temporary, "w", encoding="utf-8") as handle:
+                handle.write(render(merged))
+            os.chmod(temporary, 0o644)
+            os.replace(temporary, path)
+    except OSError as exc:
+        metrics.restore_pending(pending)
+        if os.path.exists(temporary):
+            os.unlink(temporary)
+        raise MetricsError("Failed to write metrics textfile {0}: {1}".format(path, exc))
+    return True
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != METRICS_PATH:
+            self.send_error(404)
+            return
+        body = render(self.server.metrics.samples()).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(port, host="127.0.0.1", metrics=REGISTRY):
+    """Serve ``/metrics`` from a background thread; returns the running server.
+
+    Call ``shutdown()`` and ``server_close()`` on the result to stop it.
+    """
+    try:
+        http_server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as exc:
+        raise MetricsError("Cannot serve metrics on {0}:{1}: {2}".format(host, port, exc))
+    http_server.daemon_threads = True
+    http_server.metrics = metrics
+    thread = threading.Thread(target=http_server.serve_forever, name="artctl-metrics")
+    thread.daemon = True
+    thread.start()
+    return http_server
+
+
+def _sample_names(name, kind):
+    if kind == "histogram":
+        return [name + suffix for suffix in _HISTOGRAM_SUFFIXES]
+    return [name]
+
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _sort_key(names, sample, key, value):
+    labels = tuple(item for item in key if item[0] != "le")
+    le = dict(key).get("le")
+    bound = math.inf if le in (None, "+Inf") else float(le)
+    return labels, names.index(sample), bound
+
+
+def _format_bound(bound):
+    return repr(float(bound))
+
+
+def _format_value(value):
+    if isinstance(value, float) and value.is_integer() and abs(value) < 2**53:
+        return str(int(value))
+    return repr(value)
+
+
+def _format_labels(key):
+    if not key:
+        return ""
+    return "{" + ",".join('{0}="{1}"'.format(name, _escape(value)) for name, value in key) + "}"
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _unescape(value):
+    return re.sub(r"\\(.)", lambda match: "\n" if match.group(1) == "n" else match.group(1), value)
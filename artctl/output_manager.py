@@ -1,8 +1,17 @@
 """Utilities for determining output directories and file paths."""
 
+import errno
+import hashlib
 import os
+import re
+import shutil
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 
+from . import verify
+
 
 class OutputError(Exception):
     """Raised when an output path cannot be determined."""
@@ -11,9 +20,29 @@ class OutputError(Exception):
 DEFAULT_BASE_DIR = "outputs"
 DEFAULT_EXTENSION = "png"
 
+OUTPUT_MODES = ("file", "stream", "shm")
+DEFAULT_OUTPUT_MODE = "file"
+STREAM_TARGET = "/dev/stdout"
+STREAM_BUFFER_SIZE = 1024 * 1024
+STREAM_HASH_ALGORITHM = "sha256"
+
+CLAIM_SUFFIX = ".claim"
+
+SCRATCH_ENV_VAR = "ARTCTL_SCRATCH_DIR"
+PUBLISH_WORKERS = 2
+
+_PARAM_PLACEHOLDER = re.compile(r"\{params\.([^}]*)\}")
 
-def build_output_path(entry, base_dir=None, now=None, params_values=None):
-    """Create an output path for a registry entry and ensure directories exist."""
+_publish_lock = threading.Lock()
+_publish_executor = None
+_pending_publishes = set()
+
+
+def build_output_path(entry, base_dir=None, now=None, params_values=None, create_dirs=True):
+    """Create an output path for a registry entry and ensure directories exist.
+
+    With ``create_dirs=False`` the path is only computed; nothing is created.
+    """
     if base_dir is None:
         base_dir = DEFAULT_BASE_DIR
     if not base_dir:
@@ -38,7 +67,7 @@ def build_output_path(entry, base_dir=None, now=None, params_values=None):
         now.strftime("%d"),
     ]
     dated_dir = os.path.join(base_dir, *dated_segments)
-    if not os.path.isdir(dated_dir):
+    if create_dirs and not os.path.isdir(dated_dir):
         os.makedirs(dated_dir, exist_ok=True)
 
     if output_config.get("path_template"):
@@ -57,12 +86,66 @@ def build_output_path(entry, base_dir=None, now=None, params_values=None):
         final_path = os.path.join(dated_dir, filename)
 
     final_dir = os.path.dirname(final_path)
-    if final_dir and not os.path.isdir(final_dir):
+    if create_dirs and final_dir and not os.path.isdir(final_dir):
         os.makedirs(final_dir, exist_ok=True)
 
     return final_path
 
 
+def indexed_output_path(path, index):
+    """Return ``path`` with a zero-padded sweep index before the extension."""
+    stem, extension = os.path.splitext(path)
+    return "{0}-{1:05d}{2}".format(stem, index, extension)
+
+
+def claim_output_path(path, index=None):
+    """Reserve a free output path against runs and sweeps started at the same time.
+
+    Default names only resolve to the second, so invocations started in the same second
+    compute the same paths. The candidates are ``path`` (with ``index``,
+    ``indexed_output_path(path, index)``) and then the following indexes; the first that
+    neither exists nor is claimed is claimed by creating a hidden ``.<name>.claim`` file
+    next to it with ``O_EXCL``. Returns ``(claimed_path, index)``, ``index`` being
+    ``None`` when ``path`` itself was free. Call :func:`release_output_path` once the
+    output has been written or abandoned.
+    """
+    candidate = path if index is None else indexed_output_path(path, index)
+    while not _claim(candidate):
+        index = 1 if index is None else index + 1
+        candidate = indexed_output_path(path, index)
+    return candidate, index
+
+
+def release_output_path(path):
+    """Remove the claim :func:`claim_output_path` placed on ``path``, if any."""
+    try:
+        os.unlink(_claim_path(path))
+    except FileNotFoundError:
+        pass
+
+
+def _claim_path(path):
+    directory, name = os.path.split(path)
+    return os.path.join(directory, "." + name + CLAIM_SUFFIX)
+
+
+def _claim(path):
+    claim = _claim_path(path)
+    try:
+        os.close(os.open(claim, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644))
+    except FileExistsError:
+        return False
+    except FileNotFoundError:
+        # No directory yet, so no output or claim to collide with; the run creates it.
+        return True
+    # The output is written before its claim is released, so a claim taken after the
+    # release still sees the finished file here.
+    if os.path.lexists(path):
+        os.unlink(claim)
+        return False
+    return True
+
+
 def _render_output_template(template, entry, params_values, now):
     output = template
     replacements = {
@@ -85,24 +168,18 @@ def _render_output_template(template, entry, params_values, now):
                 )
             output = output.replace(placeholder, str(value))
 
-    while True:
-        start = output.find("{params.")
-        if start == -1:
-            break
-        end = output.find("}", start)
-        if end == -1:
-            break
-        token = output[start : end + 1]
-        param_name = token[len("{params.") : -1]
+    # One pass over the template, so the cost stays linear in its placeholders.
+    def substitute(match):
+        param_name = match.group(1)
         if param_name not in params_values:
             raise OutputError(
                 "Parameter '{0}' not provided for output template in '{1}'.".format(
                     param_name, entry.get("name")
                 )
             )
-        output = output.replace(token, str(params_values[param_name]))
+        return str(params_values[param_name])
 
-    return output
+    return _PARAM_PLACEHOLDER.sub(substitute, output)
 
 
 def output_is_required(entry):
@@ -110,7 +187,168 @@ def output_is_required(entry):
     return bool(output_config.get("required"))
 
 
-def verify_output(entry, path):
+def check_output(entry, path):
+    """Return ``None`` if the output at ``path`` satisfies the entry, else a reason."""
     if not output_is_required(entry):
-        return True
-    return os.path.exists(path)
+        return None
+    output_config = entry.get("output") or {}
+    return verify.check_file(
+        path,
+        mode=output_config.get("verify", verify.DEFAULT_MODE),
+        min_size=output_config.get("min_size"),
+        extension=output_config.get("extension"),
+    )
+
+
+def verify_output(entry, path):
+    return check_output(entry, path) is None
+
+
+def output_mode(entry):
+    output_config = entry.get("output") or {}
+    return output_config.get("mode", DEFAULT_OUTPUT_MODE)
+
+
+def command_output(entry, path):
+    """Return what ``{output}`` renders to: ``path``, or stdout for streamed output."""
+    if output_mode(entry) == "stream":
+        return STREAM_TARGET
+    return path
+
+
+def shared_segment_name():
+    """Return a fresh shared-memory segment name for ``mode: shm`` output."""
+    # Kept under 31 characters, the POSIX shm name limit on macOS.
+    return "artctl-{0}".format(uuid.uuid4().hex[:16])
+
+
+def capture_stream(source_fd, path, algorithm=STREAM_HASH_ALGORITHM):
+    """Copy ``source_fd`` to ``path`` until EOF, hashing the bytes in the same pass.
+
+    Returns ``{"digest": hexdigest, "size": bytes}``. Data moves through one reusable
+    buffer so nothing is read back from disk afterwards; when ``source_fd`` is a pipe
+    its capacity is raised to the buffer size to cut down on wakeups.
+    """
+    _grow_pipe(source_fd)
+    digest = hashlib.new(algorithm)
+    buffer = memoryview(bytearray(STREAM_BUFFER_SIZE))
+    size = 0
+    try:
+        with open(path, "wb", buffering=0) as handle:
+            target_fd = handle.fileno()
+            while True:
+                count = os.readv(source_fd, [buffer])
+                if not count:
+                    break
+                chunk = buffer[:count]
+                digest.update(chunk)
+                while chunk:
+                    chunk = chunk[os.write(target_fd, chunk) :]
+                size += count
+    except OSError as exc:
+        raise OutputError("Failed to capture output to {0}: {1}".format(path, exc))
+    return {"digest": digest.hexdigest(), "size": size}
+
+
+def _grow_pipe(fd):
+    try:
+        import fcntl
+
+        fcntl.fcntl(fd, fcntl.F_SETPIPE_SZ, STREAM_BUFFER_SIZE)
+    except (ImportError, AttributeError, OSError):
+        pass
+
+
+def resolve_scratch_dir(path=None):
+    """Return the scratch directory from the CLI flag or environment, or ``None``."""
+    return path or os.environ.get(SCRATCH_ENV_VAR) or None
+
+
+def staging_path(final_path, scratch_dir):
+    """Return a unique path in ``scratch_dir`` for a generator to write ``final_path`` to.
+
+    The extension is preserved so generators that infer the format from the path keep
+    working. The file itself is not created.
+    """
+    if not scratch_dir:
+        raise OutputError("Scratch directory must be provided for staged output.")
+    os.makedirs(scratch_dir, exist_ok=True)
+    stem, extension = os.path.splitext(os.path.basename(final_path))
+    return os.path.join(scratch_dir, "{0}.{1}{2}".format(stem, uuid.uuid4().hex[:12], extension))
+
+
+def publish_output(staged_path, final_path, background=False):
+    """Move a staged output into place atomically and return a ``Future``.
+
+    Within one filesystem this is a single ``rename``. Across filesystems the file is
+    copied to a hidden temporary name next to ``final_path`` and renamed into place, so
+    readers never observe a partial file; with ``background=True`` the copy runs on a
+    worker thread and the returned future completes once the file is published.
+    """
+    future = Future()
+    try:
+        os.replace(staged_path, final_path)
+    except OSError as exc:
+        if exc.errno != errno.EXDEV:
+            raise OutputError(
+                "Failed to publish {0} to {1}: {2}".format(staged_path, final_path, exc)
+            )
+    else:
+        future.set_result(final_path)
+        return future
+
+    if not background:
+        _copy_into_place(staged_path, final_path)
+        future.set_result(final_path)
+        return future
+
+    global _publish_executor
+    with _publish_lock:
+        if _publish_executor is None:
+            _publish_executor = ThreadPoolExecutor(
+                max_workers=PUBLISH_WORKERS, thread_name_prefix="artctl-publish"
+            )
+        future = _publish_executor.submit(_copy_into_place, staged_path, final_path)
+        _pending_publishes.add(future)
+    future.add_done_callback(_forget_publish)
+    return future
+
+
+def wait_for_publishes(timeout=None):
+    """Block until background publishes finish; return error messages for failed ones."""
+    with _publish_lock:
+        pending = list(_pending_publishes)
+    failed = []
+    for future in pending:
+        try:
+            future.result(timeout=timeout)
+        except OutputError as exc:
+            failed.append(str(exc))
+    return failed
+
+
+def discard_staged(staged_path):
+    try:
+        os.unlink(staged_path)
+    except FileNotFoundError:
+        pass
+
+
+def _forget_publish(future):
+    with _publish_lock:
+        _pending_publishes.discard(future)
+
+
+def _copy_into_place(staged_path, final_path):
+    directory, name = os.path.split(final_path)
+    partial_path = os.path.join(directory, ".{0}.{1}.partial".format(name, uuid.uuid4().hex[:8]))
+    try:
+        shutil.copyfile(staged_path, partial_path)
+        os.replace(partial_path, final_path)
+    except OSError as exc:
+        discard_staged(partial_path)
+        raise OutputError(
+            "Failed to publish {0} to {1}: {2}".format(staged_path, final_path, exc)
+        )
+    discard_staged(staged_path)
+    return final_path
@@ -0,0 +1,263 @@
+"""CPU affinity and scheduling priority placement for generator processes."""
+
+import os
+import shutil
+
+
+class PlacementError(Exception):
+    """Raised when a placement specification is invalid or unsupported."""
+
+
+SPREAD_MODES = {"none", "core", "numa"}
+
+IONICE_CLASSES = {"none": 0, "realtime": 1, "best-effort": 2, "idle": 3}
+
+NUMA_SYSFS_ROOT = "/sys/devices/system/node"
+
+
+def parse_cpu_list(value):
+    """Parse a CPU list such as ``"0-3,6"`` or ``[0, 1]`` into sorted CPU ids."""
+    if isinstance(value, int) and not isinstance(value, bool):
+        value = [value]
+    if isinstance(value, (list, tuple)):
+        cpus = set()
+        for item in value:
+            if not isinstance(item, int) or isinstance(item, bool) or item < 0:
+                raise PlacementError(
+                    "CPU ids must be non-negative integers; got {0!r}.".format(item)
+                )
+            cpus.add(item)
+        if not cpus:
+            raise PlacementError("CPU list must not be empty.")
+        return sorted(cpus)
+    if not isinstance(value, str) or not value.strip():
+        raise PlacementError(
+            "CPU list must be a non-empty string or list; got {0!r}.".format(value)
+        )
+
+    cpus = set()
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, sep, end = part.partition("-")
+        try:
+            low = int(start, 10)
+            high = int(end, 10) if sep else low
+        except ValueError:
+            raise PlacementError("Invalid CPU range '{0}' in '{1}'.".format(part, value))
+        if low < 0 or high < low:
+            raise PlacementError("Invalid CPU range '{0}' in '{1}'.".format(part, value))
+        cpus.update(range(low, high + 1))
+    if not cpus:
+        raise PlacementError("CPU list must not be empty.")
+    return sorted(cpus)
+
+
+def format_cpu_list(cpus):
+    """Render CPU ids in the compact ``0-3,6`` form used by sysfs and taskset."""
+    ranges = []
+    for cpu in sorted(cpus):
+        if ranges and cpu == ranges[-1][1] + 1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+    return ",".join(
+        str(low) if low == high else "{0}-{1}".format(low, high) for low, high in ranges
+    )
+
+
+def parse_ionice(value):
+    """Parse ``CLASS[:LEVEL]`` into an ``(class_name, level)`` tuple."""
+    if not isinstance(value, str) or not value:
+        raise PlacementError("I/O priority must be a non-empty string; got {0!r}.".format(value))
+    name, sep, level_text = value.partition(":")
+    name = name.strip()
+    if name not in IONICE_CLASSES:
+        raise PlacementError(
+            "Unknown I/O priority class '{0}'; expected one of {1}.".format(
+                name, sorted(IONICE_CLASSES)
+            )
+        )
+    level = 0
+    if sep:
+        if name not in {"realtime", "best-effort"}:
+            raise PlacementError("I/O priority class '{0}' does not take a level.".format(name))
+        try:
+            level = int(level_text, 10)
+        except ValueError:
+            raise PlacementError(
+                "I/O priority level must be an integer; got '{0}'.".format(level_text)
+            )
+        if not 0 <= level <= 7:
+            raise PlacementError(
+                "I/O priority level must be between 0 and 7; got {0}.".format(level)
+            )
+    elif name == "best-effort":
+        level = 4
+    return name, level
+
+
+def validate_nice(value):
+    if not isinstance(value, int) or isinstance(value, bool) or not -20 <= value <= 19:
+        raise PlacementError(
+            "Nice value must be an integer between -20 and 19; got {0!r}.".format(value)
+        )
+    return value
+
+
+def validate_spread(value):
+    if value not in SPREAD_MODES:
+        raise PlacementError(
+            "Unknown spread mode '{0}'; expected one of {1}.".format(value, sorted(SPREAD_MODES))
+        )
+    return value
+
+
+def available_cpus():
+    """Return the CPUs the current process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def numa_nodes(sysfs_root=None):
+    """Return a list of CPU lists, one per NUMA node, falling back to a single node."""
+    root = sysfs_root or NUMA_SYSFS_ROOT
+    nodes = []
+    try:
+        names = sorted(
+            (name for name in os.listdir(root) if name.startswith("node") and name[4:].isdigit()),
+            key=lambda name: int(name[4:]),
+        )
+    except OSError:
+        names = []
+    for name in names:
+        try:
+            with open(os.path.join(root, name, "cpulist"), "r", encoding="utf-8") as handle:
+                text = handle.read().strip()
+        except OSError:
+            continue
+        if text:
+            nodes.append(parse_cpu_list(text))
+    if not nodes:
+        nodes = [available_cpus()]
+    return nodes
+
+
+def merge_config(entry_config, overrides):
+    """Combine a registry ``placement`` block with CLI overrides (overrides win)."""
+    merged = dict(entry_config or {})
+    for key, value in (overrides or {}).items():
+        if value is not None:
+            merged[key] = value
+    return merged
+
+
+def resolve_placement(config, worker_index=0, sysfs_root=None):
+    """Compute the concrete placement for one worker, or ``None`` if nothing is requested.
+
+    Workers are distributed round-robin: with ``spread: core`` worker *i* is pinned to
+    the *i*-th CPU of the pool, with ``spread: numa`` to all pool CPUs of the *i*-th
+    NUMA node. Without a spread mode every worker shares the whole pool.
+    """
+    if not config:
+        return None
+    if worker_index < 0:
+        raise PlacementError("Worker index must be non-negative; got {0}.".format(worker_index))
+
+    spread = validate_spread(config.get("spread") or "none")
+    nice = config.get("nice")
+    if nice is not None:
+        validate_nice(nice)
+    ionice = config.get("ionice")
+    if ionice is not None:
+        ionice_class, ionice_level = parse_ionice(ionice)
+        if ionice_class in {"realtime", "best-effort"}:
+            ionice = "{0}:{1}".format(ionice_class, ionice_level)
+        else:
+            ionice = ionice_class
+
+    pool = None
+    if config.get("cpus") is not None:
+        pool = parse_cpu_list(config["cpus"])
+    elif spread != "none":
+        pool = available_cpus()
+
+    cpus = pool
+    numa_node = None
+    if spread == "core":
+        cpus = [pool[worker_index % len(pool)]]
+    elif spread == "numa":
+        members = set(pool)
+        candidates = []
+        for index, node_cpus in enumerate(numa_nodes(sysfs_root)):
+            local = [cpu for cpu in node_cpus if cpu in members]
+            if local:
+                candidates.append((index, local))
+        if not candidates:
+            candidates = [(0, pool)]
+        numa_node, cpus = candidates[worker_index % len(candidates)]
+
+    if cpus is None and nice is None and ionice is None:
+        return None
+    return {
+        "worker": worker_index,
+        "spread": spread,
+        "cpus": cpus,
+        "numa_node": numa_node,
+        "nice": nice,
+        "ionice": ionice,
+    }
+
+
+def describe(placement):
+    """Return a one-line summary of a resolved placement."""
+    if not placement:
+        return "default"
+    parts = ["worker={0}".format(placement["worker"])]
+    if placement.get("cpus") is not None:
+        parts.append("cpus={0}".format(format_cpu_list(placement["cpus"])))
+    if placement.get("numa_node") is not None:
+        parts.append("numa_node={0}".format(placement["numa_node"]))
+    if placement.get("nice") is not None:
+        parts.append("nice={0}".format(placement["nice"]))
+    if placement.get("ionice") is not None:
+        parts.append("ionice={0}".format(placement["ionice"]))
+    return " ".join(parts)
+
+
+def wrap_command(placement, command):
+    """Return ``command`` prefixed with ``taskset``, ``nice`` and ``ionice`` as needed.
+
+    Each tool applies its part of the placement to itself and execs the next, so the
+    generator starts with it in place and keeps its pid. Wrapping rather than
+    applying the placement between fork and exec keeps process creation safe from
+    threaded callers. Missing tools are reported here as :class:`PlacementError`
+    instead of an opaque child start-up error.
+    """
+    if not placement:
+        return list(command)
+
+    prefix = []
+    if placement.get("cpus") is not None:
+        prefix += [_tool("taskset", "CPU affinity"), "-c", format_cpu_list(placement["cpus"])]
+    if placement.get("nice") is not None:
+        # nice(1) takes an adjustment, while the placement holds the absolute value.
+        adjustment = placement["nice"] - os.getpriority(os.PRIO_PROCESS, 0)
+        prefix += [_tool("nice", "Niceness"), "-n", str(adjustment)]
+    if placement.get("ionice") is not None:
+        ionice_class, ionice_level = parse_ionice(placement["ionice"])
+        prefix += [_tool("ionice", "I/O priority"), "-c", str(IONICE_CLASSES[ionice_class])]
+        if ionice_class in {"realtime", "best-effort"}:
+            prefix += ["-n", str(ionice_level)]
+    return prefix + list(command)
+
+
+def _tool(name, feature):
+    path = shutil.which(name)
+    if path is None:
+        raise PlacementError(
+            "{0} needs the '{1}' command, which was not found on PATH.".format(feature, name)
+        )
+    return path
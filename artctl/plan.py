@@ -0,0 +1,153 @@
+"""Export rendered generator commands for external runners.
+
+:func:`jobs` turns parameter points into fully rendered jobs (``argv``, ``cwd``,
+``env``, ``output``) without creating directories, writing manifests or starting
+processes, so a sweep of millions of points can be streamed straight into GNU
+parallel, ``xargs -P`` or a cluster scheduler. Points are consumed lazily and each
+grid value is coerced once, not once per point.
+
+Jobs are written as JSON lines or, for shell runners, as NUL-terminated command
+lines (``cd CWD && env VAR=... ARGV... [> OUTPUT]``). Batch plans group items into
+batch-command invocations and carry each manifest inline, since writing it is left to
+the consumer.
+"""
+
+import itertools
+import json
+import os
+import shlex
+from datetime import datetime
+
+from . import batch
+from . import output_manager
+from . import params
+from . import runner
+from . import templater
+
+PLAN_FORMATS = ("jsonl", "nul")
+
+
+class PlanError(Exception):
+    """Raised when a plan cannot be rendered in the requested form."""
+
+
+def grid_points(axes, overrides, declared_params):
+    """Lazily yield the coerced parameter mapping of every grid point.
+
+    ``axes`` comes from :func:`artctl.batch.parse_grid`; ``overrides`` are ``--set``
+    arguments applied to every point.
+    """
+    base_values = params.parse_overrides(overrides, declared_params)
+    names = [name for name, _ in axes]
+    coerced = []
+    for name, values in axes:
+        coerced.append(
+            [
+                params.parse_overrides(
+                    list(overrides) + ["{0}={1}".format(name, value)], declared_params
+                )[name]
+                for value in values
+            ]
+        )
+    for combo in itertools.product(*coerced):
+        point = dict(base_values)
+        point.update(zip(names, combo))
+        yield point
+
+
+def jobs(entry, points, now=None, working_dir=None, indexed=True):
+    """Yield one rendered job per parameter mapping in ``points``.
+
+    Output paths are computed as :func:`artctl.output_manager.build_output_path`
+    would for a run (with a sweep index when ``indexed``) but nothing is created.
+    Streamed outputs add a ``stdout`` key naming the file to redirect into.
+    """
+    working_dir = working_dir or os.getcwd()
+    now = now or datetime.now()
+    env = runner.extra_environment(entry.get("runtime"))
+    streamed = output_manager.output_mode(entry) == "stream"
+    # Without a path_template the path depends only on ``now``, so compute it once.
+    fixed_output = None
+    if not (entry.get("output") or {}).get("path_template"):
+        fixed_output = output_manager.build_output_path(entry, now=now, create_dirs=False)
+    for index, values in enumerate(points):
+        output = fixed_output or output_manager.build_output_path(
+            entry, now=now, params_values=values, create_dirs=False
+        )
+        if indexed:
+            output = output_manager.indexed_output_path(output, index)
+        rendered = dict(values, output=output_manager.STREAM_TARGET if streamed else output)
+        job = {
+            "program": entry["name"],
+            "index": index,
+            "argv": templater.render_command(entry, rendered, working_dir),
+            "cwd": working_dir,
+            "env": env,
+            "output": output,
+            "params": values,
+        }
+        if streamed:
+            job["stdout"] = output
+        yield job
+
+
+def batch_jobs(entry, item_jobs, size, manifest_dir):
+    """Group item jobs into batch-command invocations with inline manifests.
+
+    Each invocation reads ``manifest_dir/batch-NNNNN.jsonl`` (whose lines are given
+    under ``manifest``) and reports to ``manifest_dir/batch-NNNNN.results.jsonl``.
+    """
+    if not batch.supports_batch(entry):
+        raise PlanError("Program '{0}' does not declare a batch command.".format(entry["name"]))
+    batch_entry = dict(entry, command=entry["batch"]["command"], params=[])
+    item_jobs = iter(item_jobs)
+    for number in itertools.count():
+        chunk = list(itertools.islice(item_jobs, size))
+        if not chunk:
+            return
+        manifest = os.path.join(manifest_dir, "batch-{0:05d}.jsonl".format(number))
+        results = os.path.join(manifest_dir, "batch-{0:05d}.results.jsonl".format(number))
+        first = chunk[0]
+        yield {
+            "program": entry["name"],
+            "index": number,
+            "argv": templater.render_command(
+                batch_entry, {"batch_manifest": manifest, "batch_results": results}, first["cwd"]
+            ),
+            "cwd": first["cwd"],
+            "env": first["env"],
+            "manifest_path": manifest,
+            "results_path": results,
+            "manifest": [
+                {"index": position, "params": job["params"], "output": job["output"]}
+                for position, job in enumerate(chunk)
+            ],
+        }
+
+
+def format_job(job, plan_format="jsonl"):
+    """Serialise one job as a JSON line or a NUL-terminated shell command line."""
+    if plan_format == "jsonl":
+        return json.dumps(job, sort_keys=True, default=str) + "\n"
+    if plan_format != "nul":
+        raise PlanError(
+            "Plan format must be one of {0}; got '{1}'.".format(
+                ", ".join(PLAN_FORMATS), plan_format
+            )
+        )
+    if "manifest" in job:
+        raise PlanError("Batch plans carry manifests and can only be written as jsonl.")
+    variables = ["{0}={1}".format(name, value) for name, value in sorted(job["env"].items())]
+    line = "cd {0} && {1}".format(
+        shlex.quote(job["cwd"]), shlex.join(["env"] + variables + job["argv"])
+    )
+    if "stdout" in job:
+        line += " > {0}".format(shlex.quote(job["stdout"]))
+    return line + "\0"
+
+
+def missing_dirs(directories):
+    """Return the sorted ``directories`` that do not exist yet."""
+    return sorted(
+        directory for directory in directories if directory and not os.path.isdir(directory)
+    )
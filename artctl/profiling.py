@@ -0,0 +1,154 @@
+"""Run Python generators under cProfile (and optionally tracemalloc).
+
+:func:`rewrite_command` turns a rendered ``python script.py ...`` or ``python -m
+module ...`` command into ``python -m artctl.profiling --stats PATH -- script.py ...``.
+This module's ``__main__`` then runs the generator in-process under the profiler and
+writes the ``.pstats`` file (and a peak-memory summary) even if the generator exits
+with an error.
+"""
+
+import argparse
+import cProfile
+import os
+import pstats
+import runpy
+import sys
+
+STATS_SUFFIX = ".pstats"
+MEMORY_SUFFIX = ".memory.txt"
+MEMORY_TOP_LINES = 15
+
+_INTERPRETER_FLAGS_WITH_VALUE = {"-W", "-X"}
+
+
+class ProfilingError(Exception):
+    """Raised when a command cannot be run under the profiler."""
+
+
+def profile_paths(output_path):
+    """Return ``(stats_path, memory_path)`` saved next to ``output_path``."""
+    return output_path + STATS_SUFFIX, output_path + MEMORY_SUFFIX
+
+
+def rewrite_command(command, stats_path, memory_path=None):
+    """Wrap a rendered Python command so the generator runs under cProfile."""
+    if not command:
+        raise ProfilingError("Cannot profile an empty command.")
+    interpreter = command[0]
+    index = 1
+    flags = []
+    while index < len(command) and command[index].startswith("-"):
+        flag = command[index]
+        if flag in ("-m", "-c"):
+            break
+        flags.append(flag)
+        if flag in _INTERPRETER_FLAGS_WITH_VALUE and index + 1 < len(command):
+            flags.append(command[index + 1])
+            index += 1
+        index += 1
+    target = command[index:]
+    if not target or target[0] == "-c":
+        raise ProfilingError(
+            "Only 'python script.py' and 'python -m module' commands can be profiled."
+        )
+    wrapped = [interpreter] + flags + ["-m", "artctl.profiling", "--stats", stats_path]
+    if memory_path:
+        wrapped += ["--memory", memory_path]
+    return wrapped + ["--"] + target
+
+
+def top_functions(stats_path, limit=10):
+    """Return the ``limit`` functions (all for ``None``) with the most self time in ``stats_path``.
+
+    Each row is ``(self_seconds, cumulative_seconds, calls, "file:line(function)")``.
+    """
+    stats = pstats.Stats(stats_path)
+    rows = []
+    for (filename, line, function), (_, calls, self_time, cumulative, _) in stats.stats.items():
+        location = "{0}:{1}({2})".format(_short_path(filename), line, function)
+        rows.append((self_time, cumulative, calls, location))
+    rows.sort(reverse=True)
+    return rows[:limit]
+
+
+def _short_path(filename):
+    if filename.startswith("~") or not os.path.isabs(filename):
+        return filename
+    try:
+        relative = os.path.relpath(filename)
+    except ValueError:
+        return filename
+    return filename if relative.startswith("..") else relative
+
+
+def _write_memory_summary(path, tracemalloc):
+    current, peak = tracemalloc.get_traced_memory()
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    lines = [
+        "peak_bytes {0}".format(peak),
+        "current_bytes {0}".format(current),
+        "",
+        "Top allocation sites still alive at exit:",
+    ]
+    for stat in snapshot.statistics("lineno")[:MEMORY_TOP_LINES]:
+        lines.append(str(stat))
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write("\n".join(lines) + "\n")
+
+
+def read_peak_memory(memory_path):
+    """Return the peak traced bytes recorded in a memory summary, or ``None``."""
+    try:
+        with open(memory_path, "r", encoding="utf-8") as handle:
+            for line in handle:
+                name, _, value = line.partition(" ")
+                if name == "peak_bytes":
+                    return int(value)
+    except (OSError, ValueError):
+        return None
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m artctl.profiling")
+    parser.add_argument("--stats", required=True)
+    parser.add_argument("--memory", default=None)
+    parser.add_argument("target", nargs=argparse.REMAINDER)
+    args = parser.parse_args(argv)
+    target = args.target[1:] if args.target[:1] == ["--"] else args.target
+    module = None
+    if target[:1] == ["-m"] and len(target) > 1:
+        module, target = target[1], target[2:]
+        sys.argv = [module] + target
+    elif target:
+        sys.argv = list(target)
+        sys.path[0] = os.path.dirname(os.path.abspath(target[0]))
+    else:
+        parser.error("a script or -m module to profile is required")
+
+    tracemalloc = None
+    if args.memory:
+        import tracemalloc
+
+        tracemalloc.start()
+    profiler = cProfile.Profile()
+    exit_code = 0
+    profiler.enable()
+    try:
+        if module:
+            runpy.run_module(module, run_name="__main__", alter_sys=True)
+        else:
+            runpy.run_path(sys.argv[0], run_name="__main__")
+    except SystemExit as exc:
+        exit_code = exc.code
+    finally:
+        profiler.disable()
+        profiler.dump_stats(args.stats)
+        if tracemalloc is not None:
+            _write_memory_summary(args.memory, tracemalloc)
+    return exit_code
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
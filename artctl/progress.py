@@ -0,0 +1,338 @@
+"""Live progress from running generators.
+
+Each watched child gets its own pipe. The write end is inherited as
+``$ARTCTL_PROGRESS_FD`` (see :func:`artctl.sdk.progress`), and the child writes one
+record per line: either compact JSON (``{"done": 3, "total": 10, "msg": "..."}``) or
+plain ``DONE[/TOTAL] [message]`` text. One background thread multiplexes the read ends
+of every child with :mod:`selectors`, so a sweep with many concurrent invocations costs
+one thread and one ``select`` call per wakeup. The combined state is written, at most
+once per interval, as a single rewritten status line or as JSON lines.
+"""
+
+import json
+import os
+import selectors
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+PROGRESS_MODES = ("auto", "line", "json", "none")
+DEFAULT_INTERVAL = 0.2
+# How long stop() keeps reading from children that have not closed their pipe yet.
+STOP_GRACE = 1.0
+READ_SIZE = 64 * 1024
+MAX_LINE = 4096
+
+
+class ProgressError(Exception):
+    """Raised when the progress monitor cannot be set up."""
+
+
+def resolve_mode(mode, stream):
+    """Return the effective mode; ``auto`` draws a status line only on terminals."""
+    if mode not in PROGRESS_MODES:
+        raise ProgressError(
+            "Progress mode must be one of {0}; got '{1}'.".format(", ".join(PROGRESS_MODES), mode)
+        )
+    if mode == "auto":
+        isatty = getattr(stream, "isatty", None)
+        return "line" if isatty is not None and isatty() else "none"
+    return mode
+
+
+def current_stream(stream):
+    """Return the object that this thread's writes to ``stream`` end up in.
+
+    The daemon swaps ``sys.stdout``/``sys.stderr`` for streams that route each
+    request's output to its own buffer (see :mod:`artctl.server`); writers on other
+    threads and child processes must target the buffer resolved here instead.
+    """
+    current = getattr(stream, "current", None)
+    return current() if current is not None else stream
+
+
+def parse_record(line):
+    """Parse one progress line into ``{"done", "total", "msg"}``, or ``None``."""
+    line = line.strip()
+    if not line:
+        return None
+    if line.startswith("{"):
+        try:
+            data = json.loads(line)
+            record = {
+                "done": float(data["done"]),
+                "total": float(data["total"]) if data.get("total") is not None else None,
+                "msg": data.get("msg"),
+            }
+        except (ValueError, KeyError, TypeError):
+            return None
+        return record
+    counts, _, message = line.partition(" ")
+    done, _, total = counts.partition("/")
+    try:
+        return {
+            "done": float(done),
+            "total": float(total) if total else None,
+            "msg": message.strip() or None,
+        }
+    except ValueError:
+        return None
+
+
+class _Channel:
+    def __init__(self, label):
+        self.label = label
+        self.done = 0.0
+        self.total = None
+        self.message = None
+        self.open = True
+        self._partial = b""
+
+    def feed(self, chunk):
+        lines = (self._partial + chunk).split(b"\n")
+        self._partial = lines.pop()
+        if len(self._partial) > MAX_LINE:
+            self._partial = b""
+        updated = False
+        for raw in lines:
+            record = parse_record(raw.decode("utf-8", "replace"))
+            if record is None:
+                continue
+            self.done = record["done"]
+            if record["total"] is not None:
+                self.total = record["total"]
+            if record["msg"]:
+                self.message = record["msg"]
+            updated = True
+        return updated
+
+
+class ProgressMonitor:
+    """Aggregate progress records from every watched child into one display.
+
+    Use :meth:`channel` around each child to get the fd it should inherit, and run
+    the monitor itself as a context manager (or :meth:`start`/:meth:`stop`). With
+    ``expected``, the number of children that will run, the overall fraction averages
+    every child's own fraction, counting children not yet started as zero.
+    """
+
+    def __init__(
+        self, mode="line", stream=None, interval=DEFAULT_INTERVAL, label=None, expected=None
+    ):
+        self.stream = stream if stream is not None else current_stream(sys.stderr)
+        self.mode = resolve_mode(mode, self.stream)
+        self.interval = interval
+        self.label = label
+        self.expected = expected
+        self.started = time.monotonic()
+        self._channels = []
+        self._pending = []
+        self._lock = threading.Lock()
+        self._selector = None
+        self._wake_r = self._wake_w = None
+        self._thread = None
+        self._stopping = False
+        self._stop_deadline = None
+        self._dirty = False
+        self._last_emit = 0.0
+        self._line_width = 0
+        self._latest = None
+
+    @property
+    def enabled(self):
+        return self.mode != "none"
+
+    def start(self):
+        if not self.enabled or self._thread is not None:
+            return self
+        self._selector = selectors.DefaultSelector()
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        os.set_blocking(self._wake_w, False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+        self._thread = threading.Thread(target=self._loop, name="artctl-progress", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Drain every channel, write the final state and stop the thread."""
+        if self._thread is None:
+            return
+        self._stop_deadline = time.monotonic() + STOP_GRACE
+        self._stopping = True
+        self._wake()
+        self._thread.join()
+        self._thread = None
+        self._selector.close()
+        os.close(self._wake_r)
+        os.close(self._wake_w)
+        if self._last_emit or (self._dirty and self._worth_showing()):
+            self._emit(final=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.stop()
+
+    @contextmanager
+    def channel(self, label):
+        """Yield the write fd a child should inherit, or ``None`` when disabled.
+
+        The parent's copy is closed when the block exits, so the reader sees EOF once
+        the child (and anything it spawned) has exited.
+        """
+        if self._thread is None:
+            yield None
+            return
+        read_fd, write_fd = os.pipe()
+        os.set_blocking(read_fd, False)
+        channel = _Channel(label)
+        with self._lock:
+            self._pending.append((read_fd, channel))
+        self._wake()
+        try:
+            yield write_fd
+        finally:
+            os.close(write_fd)
+
+    def snapshot(self):
+        """Return the combined state as a JSON-serialisable mapping."""
+        with self._lock:
+            channels = list(self._channels)
+        totals = [channel for channel in channels if channel.total]
+        done = sum(min(channel.done, channel.total) for channel in totals)
+        total = sum(channel.total for channel in totals)
+        if self.expected:
+            fraction = sum(_fraction(channel) for channel in channels) / self.expected
+        else:
+            fraction = done / total if total else None
+        latest = self._latest
+        return {
+            "label": self.label,
+            "elapsed": round(time.monotonic() - self.started, 3),
+            "running": sum(1 for channel in channels if channel.open),
+            "finished": sum(1 for channel in channels if not channel.open),
+            "done": done,
+            "total": total or None,
+            "expected": self.expected,
+            "fraction": round(min(fraction, 1.0), 4) if fraction is not None else None,
+            "current": latest.label if latest else None,
+            "message": latest.message if latest else None,
+        }
+
+    def _wake(self):
+        try:
+            os.write(self._wake_w, b"\0")
+        except BlockingIOError:
+            pass
+
+    def _loop(self):
+        while True:
+            for key, _ in self._selector.select(self.interval):
+                if key.data is None:
+                    self._drain_wakeups()
+                else:
+                    self._read(key.fd, key.data)
+            now = time.monotonic()
+            if self._dirty and now - self._last_emit >= self.interval and self._worth_showing():
+                self._emit()
+            if self._stopping and (not self._reading() or now >= self._stop_deadline):
+                break
+        for key in list(self._selector.get_map().values()):
+            if key.data is not None:
+                self._selector.unregister(key.fd)
+                os.close(key.fd)
+                key.data.open = False
+
+    def _drain_wakeups(self):
+        try:
+            while os.read(self._wake_r, READ_SIZE):
+                pass
+        except BlockingIOError:
+            pass
+        with self._lock:
+            pending, self._pending = self._pending, []
+            self._channels.extend(channel for _, channel in pending)
+        for read_fd, channel in pending:
+            self._selector.register(read_fd, selectors.EVENT_READ, channel)
+        if pending:
+            self._dirty = True
+
+    def _read(self, fd, channel):
+        try:
+            chunk = os.read(fd, READ_SIZE)
+        except BlockingIOError:
+            return
+        except OSError:
+            chunk = b""
+        if chunk:
+            if channel.feed(chunk):
+                self._latest = channel
+                self._dirty = True
+            return
+        self._selector.unregister(fd)
+        os.close(fd)
+        channel.open = False
+        self._dirty = True
+
+    def _worth_showing(self):
+        # A lone child that never reports progress gets no status line.
+        return self._latest is not None or len(self._channels) > 1
+
+    def _reading(self):
+        with self._lock:
+            if self._pending:
+                return True
+        return len(self._selector.get_map()) > 1
+
+    def _emit(self, final=False):
+        self._dirty = False
+        self._last_emit = time.monotonic()
+        state = self.snapshot()
+        try:
+            if self.mode == "json":
+                state["final"] = final
+                self.stream.write(json.dumps(state, sort_keys=True) + "\n")
+            else:
+                text = format_status(state)
+                padding = " " * max(0, self._line_width - len(text))
+                self._line_width = len(text)
+                self.stream.write("\r" + text + padding + ("\n" if final else ""))
+            self.stream.flush()
+        except (OSError, ValueError):
+            self.mode = "none"
+
+
+def _fraction(channel):
+    if not channel.open:
+        return 1.0
+    if channel.total:
+        return min(channel.done / channel.total, 1.0)
+    return 0.0
+
+
+def format_status(state):
+    """Render a snapshot as a one-line status."""
+    parts = []
+    if state["label"]:
+        parts.append(state["label"])
+    if state["fraction"] is not None:
+        text = "{0:5.1f}%".format(state["fraction"] * 100)
+        if state["total"] and not state["expected"]:
+            text += " ({0:g}/{1:g})".format(state["done"], state["total"])
+        parts.append(text)
+    if state["expected"]:
+        parts.append(
+            "{0}/{1} processes finished, {2} running".format(
+                state["finished"], state["expected"], state["running"]
+            )
+        )
+    elif state["running"] + state["finished"] > 1:
+        parts.append("{0} running, {1} finished".format(state["running"], state["finished"]))
+    parts.append("{0:.1f}s".format(state["elapsed"]))
+    if state["message"]:
+        current = state["current"]
+        parts.append("{0}: {1}".format(current, state["message"]) if current else state["message"])
+    return " | ".join(parts)
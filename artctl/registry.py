@@ -2,9 +2,18 @@
 
 import glob
 import os
+import threading
+import time
 
 import yaml
 
+from . import metrics
+from . import output_manager
+from . import placement as placement_module
+from . import runtimes
+from . import sampling
+from . import verify
+
 
 class RegistryError(Exception):
     """Raised when registry files are missing or invalid."""
@@ -19,16 +28,20 @@ REQUIRED_TOP_LEVEL_FIELDS = {
 }
 
 ALLOWED_TOP_LEVEL_FIELDS = REQUIRED_TOP_LEVEL_FIELDS.union(
-    {"params", "output", "tags"}
+    {"params", "output", "tags", "placement", "batch", "constraints", "interpreter"}
 )
 
 ALLOWED_RUNTIMES = {"python", "node", "binary", "custom"}
 
-ALLOWED_PARAM_KEYS = {"name", "type", "default", "choices", "help", "required"}
+ALLOWED_PARAM_KEYS = {"name", "type", "default", "choices", "help", "required", "min", "max"}
 REQUIRED_PARAM_KEYS = {"name", "type"}
 ALLOWED_PARAM_TYPES = {"string", "int", "float", "bool", "enum", "file", "dir"}
 
-ALLOWED_OUTPUT_KEYS = {"required", "path_template", "extension"}
+ALLOWED_OUTPUT_KEYS = {"required", "path_template", "extension", "verify", "min_size", "mode"}
+
+ALLOWED_PLACEMENT_KEYS = {"cpus", "spread", "nice", "ionice"}
+
+ALLOWED_BATCH_KEYS = {"command", "max_items"}
 
 
 def load_registry(path):
@@ -37,6 +50,7 @@ def load_registry(path):
     if not os.path.isdir(registry_path):
         raise RegistryError("Registry directory not found: {0}".format(registry_path))
 
+    started = time.perf_counter()
     entries = {}
     source_map = {}
     for file_path in _discover_registry_files(registry_path):
@@ -52,9 +66,50 @@ def load_registry(path):
         entries[name] = data
         source_map[name] = file_path
 
+    metrics.record_registry_load(time.perf_counter() - started)
     return entries
 
 
+def registry_fingerprint(path):
+    """Return a cheap fingerprint of the registry files (paths, mtimes and sizes)."""
+    registry_path = os.path.abspath(path or "registry")
+    if not os.path.isdir(registry_path):
+        raise RegistryError("Registry directory not found: {0}".format(registry_path))
+    fingerprint = []
+    for file_path in _discover_registry_files(registry_path):
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            continue
+        fingerprint.append((file_path, stat.st_mtime_ns, stat.st_size))
+    return tuple(fingerprint)
+
+
+class RegistryCache:
+    """Keep loaded registries in memory, reloading only when their files change.
+
+    Returned entries are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self):
+        self._loaded = {}
+        self._lock = threading.Lock()
+
+    def load(self, path):
+        registry_path = os.path.abspath(path or "registry")
+        fingerprint = registry_fingerprint(registry_path)
+        with self._lock:
+            cached = self._loaded.get(registry_path)
+            if cached is not None and cached[0] == fingerprint:
+                metrics.record_cache_lookup(True)
+                return cached[1]
+        metrics.record_cache_lookup(False)
+        entries = load_registry(registry_path)
+        with self._lock:
+            self._loaded[registry_path] = (fingerprint, entries)
+        return entries
+
+
 def _discover_registry_files(registry_path):
     pattern_yaml = os.path.join(registry_path, "**", "*.yaml")
     pattern_yml = os.path.join(registry_path, "**", "*.yml")
@@ -88,12 +143,21 @@ def _load_registry_file(file_path):
     params = _validate_params(file_path, data.get("params", []))
     output = _validate_output(file_path, data.get("output"))
     tags = _validate_tags(file_path, data.get("tags"))
+    placement = _validate_placement(file_path, data.get("placement"))
+    batch = _validate_batch(file_path, data.get("batch"))
+    constraints = _validate_constraints(file_path, data.get("constraints"), params)
 
     data["params"] = params
     if output is not None:
         data["output"] = output
     if tags is not None:
         data["tags"] = tags
+    if placement is not None:
+        data["placement"] = placement
+    if batch is not None:
+        data["batch"] = batch
+    if constraints is not None:
+        data["constraints"] = constraints
     return data
 
 
@@ -127,6 +191,19 @@ def _validate_top_level(file_path, data):
     if not isinstance(entrypoint, str) or not entrypoint:
         raise RegistryError("Entrypoint must be a non-empty string in {0}".format(file_path))
 
+    interpreter = data.get("interpreter")
+    if interpreter is not None:
+        if not isinstance(interpreter, str) or not interpreter:
+            raise RegistryError(
+                "Interpreter must be a non-empty string in {0}".format(file_path)
+            )
+        if interpreter == runtimes.CURRENT_INTERPRETER and runtime != "python":
+            raise RegistryError(
+                "interpreter: {0} requires runtime: python in {1}".format(
+                    runtimes.CURRENT_INTERPRETER, file_path
+                )
+            )
+
 
 def _validate_command(file_path, command):
     if not isinstance(command, list) or not command:
@@ -138,6 +215,34 @@ def _validate_command(file_path, command):
             )
 
 
+def _validate_batch(file_path, batch):
+    if batch is None:
+        return None
+    if not isinstance(batch, dict):
+        raise RegistryError("Batch block must be a mapping in {0}".format(file_path))
+    unknown = set(batch).difference(ALLOWED_BATCH_KEYS)
+    if unknown:
+        raise RegistryError(
+            "Batch block has unknown fields {0} in {1}".format(sorted(unknown), file_path)
+        )
+    if "command" not in batch:
+        raise RegistryError("Batch block requires a command in {0}".format(file_path))
+    _validate_command(file_path, batch["command"])
+    if not any("{batch_manifest}" in token for token in batch["command"]):
+        raise RegistryError(
+            "Batch command must reference {{batch_manifest}} in {0}".format(file_path)
+        )
+    result = {"command": list(batch["command"])}
+    if "max_items" in batch:
+        max_items = batch["max_items"]
+        if not isinstance(max_items, int) or isinstance(max_items, bool) or max_items <= 0:
+            raise RegistryError(
+                "Batch max_items must be a positive integer in {0}".format(file_path)
+            )
+        result["max_items"] = max_items
+    return result
+
+
 def _validate_params(file_path, params):
     if params is None:
         return []
@@ -189,6 +294,7 @@ def _validate_params(file_path, params):
                         name, file_path
                     )
                 )
+        _validate_range(file_path, name, param)
         cleaned.append(
             {
                 "name": name,
@@ -197,11 +303,44 @@ def _validate_params(file_path, params):
                 "choices": param.get("choices"),
                 "help": param.get("help"),
                 "required": bool(param.get("required", False)),
+                "min": param.get("min"),
+                "max": param.get("max"),
             }
         )
     return cleaned
 
 
+def _validate_range(file_path, name, param):
+    bounds = [param[key] for key in ("min", "max") if key in param]
+    if not bounds:
+        return
+    if param["type"] not in ("int", "float"):
+        raise RegistryError(
+            "Param '{0}' may only declare min/max for int or float types in {1}".format(
+                name, file_path
+            )
+        )
+    for bound in bounds:
+        if not isinstance(bound, (int, float)) or isinstance(bound, bool):
+            raise RegistryError(
+                "Param '{0}' min/max must be numbers in {1}".format(name, file_path)
+            )
+    if "min" in param and "max" in param and param["min"] > param["max"]:
+        raise RegistryError("Param '{0}' has min greater than max in {1}".format(name, file_path))
+
+
+def _validate_constraints(file_path, constraints, params):
+    if constraints is None:
+        return None
+    if not isinstance(constraints, list):
+        raise RegistryError("Constraints must be a list of expressions in {0}".format(file_path))
+    try:
+        sampling.compile_constraints(constraints, [param["name"] for param in params])
+    except sampling.SamplingError as exc:
+        raise RegistryError("{0} in {1}".format(exc, file_path))
+    return list(constraints)
+
+
 def _validate_output(file_path, output):
     if output is None:
         return None
@@ -229,6 +368,31 @@ def _validate_output(file_path, output):
                 "Output extension must be a non-empty string in {0}".format(file_path)
             )
         result["extension"] = extension
+    if "verify" in output:
+        mode = output["verify"]
+        if mode not in verify.VERIFY_MODES:
+            raise RegistryError(
+                "Output verify must be one of {0} in {1}".format(
+                    list(verify.VERIFY_MODES), file_path
+                )
+            )
+        result["verify"] = mode
+    if "min_size" in output:
+        min_size = output["min_size"]
+        if not isinstance(min_size, int) or isinstance(min_size, bool) or min_size < 0:
+            raise RegistryError(
+                "Output min_size must be a non-negative integer in {0}".format(file_path)
+            )
+        result["min_size"] = min_size
+    if "mode" in output:
+        mode = output["mode"]
+        if mode not in output_manager.OUTPUT_MODES:
+            raise RegistryError(
+                "Output mode must be one of {0} in {1}".format(
+                    list(output_manager.OUTPUT_MODES), file_path
+                )
+            )
+        result["mode"] = mode
     return result
 
 
@@ -243,3 +407,30 @@ def _validate_tags(file_path, tags):
             raise RegistryError("Tags must be non-empty strings in {0}".format(file_path))
         cleaned.append(tag)
     return cleaned
+
+
+def _validate_placement(file_path, placement):
+    if placement is None:
+        return None
+    if not isinstance(placement, dict):
+        raise RegistryError("Placement block must be a mapping in {0}".format(file_path))
+    unknown = set(placement).difference(ALLOWED_PLACEMENT_KEYS)
+    if unknown:
+        raise RegistryError(
+            "Placement block has unknown fields {0} in {1}".format(sorted(unknown), file_path)
+        )
+    result = {}
+    try:
+        if "cpus" in placement:
+            placement_module.parse_cpu_list(placement["cpus"])
+            result["cpus"] = placement["cpus"]
+        if "spread" in placement:
+            result["spread"] = placement_module.validate_spread(placement["spread"])
+        if "nice" in placement:
+            result["nice"] = placement_module.validate_nice(placement["nice"])
+        if "ionice" in placement:
+            placement_module.parse_ionice(placement["ionice"])
+            result["ionice"] = placement["ionice"]
+    except placement_module.PlacementError as exc:
+        raise RegistryError("Invalid placement in {0}: {1}".format(file_path, exc))
+    return result
@@ -0,0 +1,472 @@
+"""Disk usage reporting and retention pruning for the dated outputs tree.
+
+Outputs live under ``<base>/YYYY/MM/DD/`` (see
+:func:`artctl.output_manager.build_output_path`), so day directories can be selected by
+name alone. Per-day totals are cached in ``<base>/.artctl-du.json`` and reused while
+the newest mtime of the day directory and every directory below it (``path_template``
+outputs may nest) is unchanged. That catches files being added, removed or renamed
+anywhere in the day, but not a file growing in place, so the current day, whose
+outputs may still be written, is always scanned; earlier days hold the write-once
+files generators produce.
+
+Days packed by :mod:`artctl.archive` (``<base>/YYYY/MM/DD.zip``) are reported from the
+pack's member list, counting each member's compressed size, and are removed whole
+(pack and index) by age; packed days neither count toward nor are trimmed by size
+budgets. Sidecars
+written next to outputs (profiles, archive indexes) are not attributed to any program.
+"""
+
+import json
+import os
+import shutil
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from . import profiling
+
+CACHE_FILENAME = ".artctl-du.json"
+CACHE_VERSION = 3
+
+PACK_EXTENSION = ".zip"
+PACK_INDEX_SUFFIX = ".idx.json"
+SIDECAR_SUFFIXES = (profiling.STATS_SUFFIX, profiling.MEMORY_SUFFIX, PACK_INDEX_SUFFIX)
+
+_SIZE_UNITS = {"": 1, "B": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+
+
+class RetentionError(Exception):
+    """Raised when usage cannot be computed or pruning fails."""
+
+
+def parse_size(text):
+    """Parse sizes such as ``500M``, ``2G`` or ``1024`` into bytes."""
+    value = str(text).strip().upper()
+    if value.endswith("IB"):
+        value = value[:-2]
+    elif value.endswith("B") and len(value) > 1 and value[-2] in "KMGT":
+        value = value[:-1]
+    unit = value[-1:] if value[-1:] in _SIZE_UNITS else ""
+    number = value[: len(value) - len(unit)].strip()
+    try:
+        amount = float(number)
+    except ValueError:
+        raise RetentionError("Invalid size '{0}'; use a number with K, M, G or T.".format(text))
+    if amount < 0:
+        raise RetentionError("Size must be non-negative; got '{0}'.".format(text))
+    return int(amount * _SIZE_UNITS[unit])
+
+
+def format_size(size):
+    """Render a byte count with a binary unit suffix."""
+    for unit in ("B", "K", "M", "G", "T"):
+        if abs(size) < 1024 or unit == "T":
+            break
+        size /= 1024.0
+    if unit == "B":
+        return "{0}B".format(int(size))
+    return "{0:.1f}{1}".format(size, unit)
+
+
+def program_from_filename(filename):
+    """Return the program name encoded in a default ``<name>-HHMMSS.<ext>`` filename.
+
+    Sweep outputs carry an extra index (``<name>-HHMMSS-NNNNN.<ext>``).
+    """
+    stem = os.path.splitext(filename)[0]
+    for _ in range(2):
+        name, sep, suffix = stem.rpartition("-")
+        if not (sep and name and suffix.isdigit()):
+            break
+        stem = name
+    return stem
+
+
+def iter_day_dirs(base_dir):
+    """Yield ``(date, path)`` for every ``YYYY/MM/DD`` directory, oldest first, by name only."""
+    for year_name, year_path in _numeric_subdirs(base_dir, 4):
+        for month_name, month_path in _numeric_subdirs(year_path, 2):
+            for day_name, day_path in _numeric_subdirs(month_path, 2):
+                try:
+                    day = date(int(year_name), int(month_name), int(day_name))
+                except ValueError:
+                    continue
+                yield day, day_path
+
+
+def iter_day_packs(base_dir):
+    """Yield ``(date, path)`` for every ``YYYY/MM/DD.zip`` day pack, oldest first."""
+    for year_name, year_path in _numeric_subdirs(base_dir, 4):
+        for month_name, month_path in _numeric_subdirs(year_path, 2):
+            try:
+                with os.scandir(month_path) as iterator:
+                    names = sorted(
+                        item.name
+                        for item in iterator
+                        if item.name.endswith(PACK_EXTENSION)
+                        and item.is_file(follow_symlinks=False)
+                    )
+            except FileNotFoundError:
+                continue
+            except OSError as exc:
+                raise RetentionError("Failed to scan {0}: {1}".format(month_path, exc))
+            for name in names:
+                day_name = name[: -len(PACK_EXTENSION)]
+                if len(day_name) != 2 or not day_name.isdigit():
+                    continue
+                try:
+                    day = date(int(year_name), int(month_name), int(day_name))
+                except ValueError:
+                    continue
+                yield day, os.path.join(month_path, name)
+
+
+def is_pack(path):
+    """Return whether ``path`` is a day pack rather than a day directory."""
+    return path.endswith(PACK_EXTENSION)
+
+
+def is_sidecar(filename):
+    """Return whether ``filename`` is a sidecar rather than a program's output."""
+    return filename.endswith(SIDECAR_SUFFIXES)
+
+
+def _numeric_subdirs(path, width):
+    try:
+        with os.scandir(path) as iterator:
+            found = [
+                (item.name, item.path)
+                for item in iterator
+                if len(item.name) == width
+                and item.name.isdigit()
+                and item.is_dir(follow_symlinks=False)
+            ]
+    except FileNotFoundError:
+        return []
+    except OSError as exc:
+        raise RetentionError("Failed to scan {0}: {1}".format(path, exc))
+    found.sort()
+    return found
+
+
+def scan_day(day_path):
+    """Return ``{program: {"files": n, "bytes": b}}`` for one day directory."""
+    return _tally((os.path.basename(path), size) for path, size in iter_files(day_path))
+
+
+def scan_pack(pack_path):
+    """Return ``{program: {"files": n, "bytes": b}}`` for one day pack.
+
+    Members are counted at their compressed size, which is what they occupy on disk.
+    """
+    try:
+        with zipfile.ZipFile(pack_path) as pack:
+            members = [
+                (info.filename.rsplit("/", 1)[-1], info.compress_size)
+                for info in pack.infolist()
+                if not info.is_dir()
+            ]
+    except FileNotFoundError:
+        return {}
+    except (OSError, zipfile.BadZipFile) as exc:
+        raise RetentionError("Failed to read {0}: {1}".format(pack_path, exc))
+    return _tally(members)
+
+
+def _tally(files):
+    programs = {}
+    for name, size in files:
+        if is_sidecar(name):
+            continue
+        totals = programs.setdefault(program_from_filename(name), {"files": 0, "bytes": 0})
+        totals["files"] += 1
+        totals["bytes"] += size
+    return programs
+
+
+def iter_files(directory):
+    """Yield ``(path, size)`` for regular files under ``directory``, skipping hidden ones."""
+    stack = [directory]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as iterator:
+                for item in iterator:
+                    if item.name.startswith("."):
+                        continue
+                    if item.is_dir(follow_symlinks=False):
+                        stack.append(item.path)
+                    elif item.is_file(follow_symlinks=False):
+                        yield item.path, item.stat(follow_symlinks=False).st_size
+        except FileNotFoundError:
+            continue
+
+
+def tree_mtime(directory):
+    """Return the newest ``st_mtime_ns`` of ``directory`` and the directories below it."""
+    newest = os.stat(directory).st_mtime_ns
+    stack = [directory]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as iterator:
+                for item in iterator:
+                    if not item.name.startswith(".") and item.is_dir(follow_symlinks=False):
+                        newest = max(newest, item.stat(follow_symlinks=False).st_mtime_ns)
+                        stack.append(item.path)
+        except FileNotFoundError:
+            continue
+    return newest
+
+
+class UsageCache:
+    """Per-day totals persisted next to the outputs tree."""
+
+    def __init__(self, base_dir, enabled=True):
+        self.path = os.path.join(base_dir, CACHE_FILENAME)
+        self.enabled = enabled
+        self.days = {}
+        self.dirty = False
+        self._lock = threading.Lock()
+        if enabled:
+            self._read()
+
+    def _read(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as handle:
+                data = json.load(handle)
+        except (OSError, ValueError):
+            return
+        if isinstance(data, dict) and data.get("version") == CACHE_VERSION:
+            self.days = data.get("days") or {}
+
+    def lookup(self, key, mtime_ns):
+        with self._lock:
+            cached = self.days.get(key)
+        if cached and cached.get("mtime_ns") == mtime_ns:
+            return cached["programs"]
+        return None
+
+    def store(self, key, mtime_ns, programs):
+        with self._lock:
+            self.days[key] = {"mtime_ns": mtime_ns, "programs": programs}
+            self.dirty = True
+
+    def forget(self, key):
+        with self._lock:
+            if self.days.pop(key, None) is not None:
+                self.dirty = True
+
+    def save(self):
+        if not self.enabled or not self.dirty:
+            return
+        directory = os.path.dirname(self.path)
+        temporary = "{0}.{1}.tmp".format(self.path, os.getpid())
+        try:
+            os.makedirs(directory, exist_ok=True)
+            with open(temporary, "w", encoding="utf-8") as handle:
+                json.dump({"version": CACHE_VERSION, "days": self.days}, handle)
+            os.replace(temporary, self.path)
+        except OSError as exc:
+            raise RetentionError("Failed to write usage cache {0}: {1}".format(self.path, exc))
+        self.dirty = False
+
+
+def disk_usage(base_dir, jobs=None, use_cache=True):
+    """Return ``[(date, path, programs)]`` for every day directory and pack, oldest first.
+
+    ``path`` is a day directory or, for archived days, its pack (see :func:`is_pack`).
+    Days are scanned in parallel; unchanged days before today are answered from the
+    cache with a ``stat`` per directory.
+    """
+    cache = UsageCache(base_dir, enabled=use_cache)
+    days = sorted(list(iter_day_dirs(base_dir)) + list(iter_day_packs(base_dir)))
+    today = date.today()
+
+    def _usage(item):
+        day, path = item
+        key = os.path.relpath(path, base_dir)
+        scan = scan_pack if is_pack(path) else scan_day
+        if day >= today and not is_pack(path):
+            cache.forget(key)
+            return day, path, scan(path)
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns if is_pack(path) else tree_mtime(path)
+        except FileNotFoundError:
+            return day, path, {}
+        programs = cache.lookup(key, mtime_ns) if use_cache else None
+        if programs is None:
+            programs = scan(path)
+            cache.store(key, mtime_ns, programs)
+        return day, path, programs
+
+    with ThreadPoolExecutor(max_workers=jobs or min(32, (os.cpu_count() or 1) * 4)) as executor:
+        usage = list(executor.map(_usage, days))
+
+    known = {os.path.relpath(path, base_dir) for _, path in days}
+    for key in list(cache.days):
+        if key not in known:
+            cache.forget(key)
+    cache.save()
+    return usage
+
+
+def summarize(usage):
+    """Collapse per-day usage into ``{program: {"files": n, "bytes": b}}``."""
+    totals = {}
+    for _, _, programs in usage:
+        for program, counts in programs.items():
+            summary = totals.setdefault(program, {"files": 0, "bytes": 0})
+            summary["files"] += counts["files"]
+            summary["bytes"] += counts["bytes"]
+    return totals
+
+
+def plan_prune(base_dir, before=None, budgets=None, default_budget=None, jobs=None):
+    """Work out what to delete without touching the filesystem.
+
+    Returns ``{"days": [(date, path, bytes)], "files": [(path, bytes)]}``: whole day
+    directories and packs older than ``before`` and, for programs over their byte budget, their
+    oldest files until the newest ones fit.
+    """
+    budgets = dict(budgets or {})
+    usage = disk_usage(base_dir, jobs=jobs)
+    day_removals = []
+    kept = []
+    for day, path, programs in usage:
+        if before is not None and day < before:
+            if is_pack(path):
+                size = _pack_size(path)
+            else:
+                size = sum(item["bytes"] for item in programs.values())
+            day_removals.append((day, path, size))
+        else:
+            kept.append((day, path, programs))
+
+    file_removals = []
+    if budgets or default_budget is not None:
+        used = {}
+        for day, path, programs in reversed(kept):
+            if is_pack(path):
+                continue
+            over = []
+            for program, counts in programs.items():
+                budget = budgets.get(program, default_budget)
+                if budget is None:
+                    continue
+                if used.get(program, 0) + counts["bytes"] > budget:
+                    over.append(program)
+                else:
+                    used[program] = used.get(program, 0) + counts["bytes"]
+            if over:
+                file_removals.extend(
+                    _select_over_budget(path, set(over), budgets, default_budget, used)
+                )
+    return {"days": day_removals, "files": file_removals}
+
+
+def _select_over_budget(day_path, programs, budgets, default_budget, used):
+    files = []
+    for path, size in iter_files(day_path):
+        if is_sidecar(path):
+            continue
+        program = program_from_filename(os.path.basename(path))
+        if program in programs:
+            files.append((os.stat(path).st_mtime_ns, path, size, program))
+    removals = []
+    for _, path, size, program in sorted(files, reverse=True):
+        budget = budgets.get(program, default_budget)
+        if used.get(program, 0) + size <= budget:
+            used[program] = used.get(program, 0) + size
+        else:
+            removals.append((path, size))
+    return removals
+
+
+def apply_prune(base_dir, plan):
+    """Delete what :func:`plan_prune` selected and return the number of bytes freed.
+
+    Deduplicated outputs share an inode, so a file's size only counts as freed once its
+    last link is removed.
+    """
+    cache = UsageCache(base_dir)
+    removed = {}
+    for _, path, _ in plan["days"]:
+        stats = list(_removal_stats(path))
+        try:
+            if is_pack(path):
+                _remove_pack(path)
+            else:
+                shutil.rmtree(path)
+        except FileNotFoundError:
+            continue
+        except OSError as exc:
+            raise RetentionError("Failed to remove {0}: {1}".format(path, exc))
+        cache.forget(os.path.relpath(path, base_dir))
+        _count_links(removed, stats)
+        _remove_empty_parents(os.path.dirname(path), base_dir)
+    for path, _ in plan["files"]:
+        try:
+            stat = os.lstat(path)
+            os.unlink(path)
+        except FileNotFoundError:
+            continue
+        except OSError as exc:
+            raise RetentionError("Failed to remove {0}: {1}".format(path, exc))
+        _count_links(removed, [stat])
+    cache.save()
+    return sum(size for links, size, count in removed.values() if count >= links)
+
+
+def _removal_stats(path):
+    if is_pack(path):
+        paths = [path, path + PACK_INDEX_SUFFIX]
+    else:
+        paths = [
+            os.path.join(root, filename)
+            for root, _, filenames in os.walk(path)
+            for filename in filenames
+        ]
+    for file_path in paths:
+        try:
+            yield os.lstat(file_path)
+        except FileNotFoundError:
+            continue
+
+
+def _count_links(removed, stats):
+    # Keyed by inode; the link count is the one seen before its first link went away.
+    for stat in stats:
+        entry = removed.setdefault((stat.st_dev, stat.st_ino), [stat.st_nlink, stat.st_size, 0])
+        entry[2] += 1
+
+
+def _pack_size(pack_path):
+    size = 0
+    for path in (pack_path, pack_path + PACK_INDEX_SUFFIX):
+        try:
+            size += os.path.getsize(path)
+        except FileNotFoundError:
+            pass
+    return size
+
+
+def _remove_pack(pack_path):
+    # The index goes first: an index without its pack is never left behind.
+    try:
+        os.unlink(pack_path + PACK_INDEX_SUFFIX)
+    except FileNotFoundError:
+        pass
+    os.unlink(pack_path)
+
+
+def _remove_empty_parents(directory, base_dir):
+    base_dir = os.path.abspath(base_dir)
+    directory = os.path.abspath(directory)
+    while directory != base_dir and directory.startswith(base_dir + os.sep):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            return
+        directory = os.path.dirname(directory)
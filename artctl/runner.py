@@ -1,19 +1,84 @@
 """Subprocess execution for artctl."""
 
+import codecs
+import os
+import shutil
 import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+
+from . import output_manager
+from . import placement as placement_module
+from . import progress
+from . import runtimes
+from . import sdk
+
+
+# Modules a generator may import as ``artctl.<name>`` without artctl being installed
+# for its interpreter; they depend on the standard library only.
+SDK_MODULES = ("__init__.py", "sdk.py", "profiling.py")
+SDK_DIR_ENV = "XDG_CACHE_HOME"
+
+_sdk_lock = threading.Lock()
+_sdk_path = None
 
 
 class RunnerError(Exception):
     """Raised when execution of a generator fails."""
 
+    def __init__(self, message, returncode=None):
+        super().__init__(message)
+        self.returncode = returncode
+
+
+def run_process(
+    command, working_dir=None, placement=None, stdout_path=None, progress_fd=None, runtime=None
+):
+    """Execute the command list and return its exit status, timing and resource usage.
+
+    Unlike :func:`execute`, a non-zero exit status is reported rather than raised. The
+    result is a mapping with ``returncode``, ``wall_time`` (seconds), ``user_time``,
+    ``system_time`` (CPU seconds) and ``max_rss_kb``. ``placement`` is a resolved
+    placement from :func:`artctl.placement.resolve_placement`, applied by wrapping
+    the command (see :func:`artctl.placement.wrap_command`). With ``stdout_path`` the
+    child's stdout is captured to that file and the result also carries
+    ``output_digest`` and ``output_size``. Otherwise
+    the child writes to ``sys.stdout``/``sys.stderr``: their file descriptors when they
+    have one, or through a pipe relayed into them when they are in-memory streams (as
+    in the daemon, where they hold the request's captured output).
+    ``progress_fd`` is inherited by the child and advertised in ``$ARTCTL_PROGRESS_FD``
+    (see :class:`artctl.progress.ProgressMonitor`). The executable is resolved with
+    :func:`artctl.runtimes.resolve_command`. ``runtime`` is the entry's runtime and
+    selects the variables from :func:`extra_environment`.
+    """
+    try:
+        command = runtimes.resolve_command(command, working_dir)
+    except runtimes.RuntimeResolutionError as exc:
+        raise RunnerError(str(exc))
 
-def execute(command, working_dir=None):
-    """Execute the given command list and stream output."""
     try:
-        result = subprocess.run(
+        command = placement_module.wrap_command(placement, command)
+    except placement_module.PlacementError as exc:
+        raise RunnerError("Invalid placement: {0}".format(exc))
+
+    if stdout_path:
+        stdout, stdout_relay = subprocess.PIPE, None
+    else:
+        stdout, stdout_relay = _child_stream(sys.stdout)
+    stderr, stderr_relay = _child_stream(sys.stderr)
+
+    started = time.perf_counter()
+    try:
+        process = subprocess.Popen(
             command,
             cwd=working_dir,
-            check=False,
+            stdout=stdout,
+            stderr=stderr,
+            env=_child_environment(progress_fd, runtime),
+            pass_fds=() if progress_fd is None else (progress_fd,),
         )
     except FileNotFoundError:
         executable = command[0] if command else ""
@@ -23,7 +88,154 @@ def execute(command, working_dir=None):
     except OSError as exc:
         raise RunnerError("Failed to execute command: {0}".format(exc))
 
-    if result.returncode != 0:
-        raise RunnerError("Command exited with status {0}".format(result.returncode))
+    relays = []
+    if stdout_relay is not None:
+        relays.append(_start_relay(process.stdout, stdout_relay))
+    if stderr_relay is not None:
+        relays.append(_start_relay(process.stderr, stderr_relay))
+    captured = None
+    try:
+        if stdout_path:
+            with process.stdout:
+                captured = output_manager.capture_stream(process.stdout.fileno(), stdout_path)
+        _, status, usage = os.wait4(process.pid, 0)
+    except output_manager.OutputError as exc:
+        process.kill()
+        process.wait()
+        raise RunnerError(str(exc))
+    except BaseException:
+        process.kill()
+        process.wait()
+        raise
+    finally:
+        for relay in relays:
+            relay.join()
+    process.returncode = os.waitstatus_to_exitcode(status)
+    result = {
+        "returncode": process.returncode,
+        "wall_time": time.perf_counter() - started,
+        "user_time": usage.ru_utime,
+        "system_time": usage.ru_stime,
+        "max_rss_kb": usage.ru_maxrss,
+    }
+    if captured is not None:
+        result["output_digest"] = captured["digest"]
+        result["output_size"] = captured["size"]
+    return result
+
+
+def _child_stream(stream):
+    # Returns the ``Popen`` argument for one of the child's output streams and, when
+    # ``stream`` has no file descriptor to inherit, the stream to relay a pipe into.
+    stream = progress.current_stream(stream)
+    if stream is None:
+        return None, None
+    try:
+        stream.flush()
+        return stream.fileno(), None
+    except (AttributeError, OSError, ValueError):
+        return subprocess.PIPE, stream
+
+
+def _start_relay(pipe, stream):
+    thread = threading.Thread(
+        target=_relay, args=(pipe, stream), name="artctl-relay", daemon=True
+    )
+    thread.start()
+    return thread
+
+
+def _relay(pipe, stream):
+    decoder = codecs.getincrementaldecoder("utf-8")("replace")
+    with pipe:
+        for chunk in iter(lambda: os.read(pipe.fileno(), 64 * 1024), b""):
+            stream.write(decoder.decode(chunk))
+    stream.write(decoder.decode(b"", final=True))
+    stream.flush()
+
+
+def extra_environment(runtime=None):
+    """Return the variables artctl adds to a generator's environment.
+
+    For ``runtime: python`` generators ``PYTHONPATH`` gains :func:`sdk_path`, so they can
+    import :mod:`artctl.sdk` without installing artctl. Nothing else of artctl's
+    environment (its site-packages and compiled dependencies) is exposed, and other
+    runtimes get no additions.
+    """
+    if runtime != "python":
+        return {}
+    existing = os.environ.get("PYTHONPATH")
+    return {"PYTHONPATH": sdk_path() + (os.pathsep + existing if existing else "")}
+
+
+def sdk_path():
+    """Return a directory holding only the ``artctl`` SDK modules.
+
+    The copy lives in ``$XDG_CACHE_HOME/artctl/sdk-<crc>`` (``~/.cache`` by default),
+    named after the modules' content so upgrades get a fresh directory; if the cache is
+    not writable a private temporary directory is used.
+    """
+    global _sdk_path
+    with _sdk_lock:
+        if _sdk_path is None or not os.path.isdir(_sdk_path):
+            _sdk_path = _write_sdk()
+        return _sdk_path
+
+
+def _write_sdk():
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    sources = {}
+    for name in SDK_MODULES:
+        with open(os.path.join(package_dir, name), "rb") as handle:
+            sources[name] = handle.read()
+    checksum = 0
+    for name in SDK_MODULES:
+        checksum = zlib.crc32(name.encode("utf-8") + sources[name], checksum)
+    cache_root = os.environ.get(SDK_DIR_ENV) or os.path.join(os.path.expanduser("~"), ".cache")
+    target = os.path.join(cache_root, "artctl", "sdk-{0:08x}".format(checksum))
+    if os.path.isdir(os.path.join(target, "artctl")):
+        return target
+    try:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=".sdk-", dir=os.path.dirname(target))
+    except OSError:
+        target = staging = tempfile.mkdtemp(prefix="artctl-sdk-")
+    os.makedirs(os.path.join(staging, "artctl"))
+    for name, content in sources.items():
+        with open(os.path.join(staging, "artctl", name), "wb") as handle:
+            handle.write(content)
+    if staging != target:
+        try:
+            os.rename(staging, target)
+        except OSError:
+            # Another process published the same content first.
+            shutil.rmtree(staging, ignore_errors=True)
+    return target
+
+
+def _child_environment(progress_fd=None, runtime=None):
+    env = dict(os.environ)
+    env.update(extra_environment(runtime))
+    if progress_fd is None:
+        env.pop(sdk.PROGRESS_FD_ENV, None)
+    else:
+        env[sdk.PROGRESS_FD_ENV] = str(progress_fd)
+    return env
+
+
+def execute(command, working_dir=None, placement=None, progress_fd=None, runtime=None):
+    """Execute the given command list and stream output."""
+    result = run_process(
+        command,
+        working_dir=working_dir,
+        placement=placement,
+        progress_fd=progress_fd,
+        runtime=runtime,
+    )
+    if result["returncode"] != 0:
+        raise RunnerError(
+            "Command exited with status {0}".format(result["returncode"]),
+            returncode=result["returncode"],
+        )
 
-    return result.returncode
+    return result["returncode"]
@@ -0,0 +1,158 @@
+"""Resolve generator executables and check them before work is launched.
+
+The first token of a rendered command (``python3``, ``node``, a binary) is looked up
+on ``PATH`` once and the absolute path is cached together with a fingerprint of
+``PATH``: its value and the mtime of each directory, which changes whenever an
+executable is installed or removed. A sweep that launches thousands of processes
+therefore does one lookup, and a missing runtime is reported by :func:`preflight`
+before the first job starts instead of as a ``FileNotFoundError`` per job.
+
+Entries may set ``interpreter: current`` to run their command with the interpreter
+running artctl (``sys.executable``), which skips the lookup and avoids picking up a
+different ``python3`` than the active virtualenv's; any other ``interpreter`` value
+is an executable name or path that replaces the command's first token.
+"""
+
+import os
+import shutil
+import sys
+import threading
+
+CURRENT_INTERPRETER = "current"
+
+_PLACEHOLDERS = ("{entrypoint}", "{project_root}", "{name}")
+
+_resolved = {}
+_lock = threading.Lock()
+
+
+class RuntimeResolutionError(Exception):
+    """Raised when a generator's executable cannot be found or run."""
+
+
+def interpreter(entry):
+    """Return the executable configured by the entry's ``interpreter``, or ``None``."""
+    value = entry.get("interpreter")
+    if value == CURRENT_INTERPRETER:
+        return sys.executable
+    return value
+
+
+def apply_interpreter(entry, command):
+    """Return ``command`` with its first token replaced by the entry's interpreter."""
+    executable = interpreter(entry)
+    if executable is None or not command:
+        return command
+    return [executable] + list(command[1:])
+
+
+def path_fingerprint(search_path=None):
+    """Return ``PATH`` and the mtime of each of its directories."""
+    if search_path is None:
+        search_path = os.environ.get("PATH", os.defpath)
+    states = []
+    for directory in search_path.split(os.pathsep):
+        try:
+            states.append((directory, os.stat(directory or os.curdir).st_mtime_ns))
+        except OSError:
+            states.append((directory, None))
+    return tuple(states)
+
+
+def resolve_executable(name, working_dir=None):
+    """Return the absolute path of ``name``, looking it up on ``PATH`` when needed.
+
+    Names containing a path separator are taken relative to ``working_dir`` (as the
+    child process would see them) and are not cached.
+    """
+    if not name:
+        raise RuntimeResolutionError("Command has no executable.")
+    if os.sep in name or (os.altsep and os.altsep in name):
+        path = os.path.abspath(os.path.join(working_dir or os.getcwd(), name))
+        if not os.path.isfile(path):
+            raise RuntimeResolutionError("Executable not found: {0}.".format(path))
+        if not os.access(path, os.X_OK):
+            raise RuntimeResolutionError("Executable is not executable: {0}.".format(path))
+        return path
+
+    fingerprint = path_fingerprint()
+    with _lock:
+        cached = _resolved.get(name)
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1]
+    found = shutil.which(name)
+    if found is None:
+        raise RuntimeResolutionError(
+            "Executable '{0}' not found on PATH. Install the required runtime.".format(name)
+        )
+    found = os.path.abspath(found)
+    with _lock:
+        _resolved[name] = (fingerprint, found)
+    return found
+
+
+def resolve_command(command, working_dir=None):
+    """Return ``command`` with its executable replaced by an absolute path."""
+    if not command:
+        raise RuntimeResolutionError("Command is empty.")
+    return [resolve_executable(command[0], working_dir)] + list(command[1:])
+
+
+def clear_cache():
+    with _lock:
+        _resolved.clear()
+
+
+def preflight(entries, working_dir=None):
+    """Check that every entry's executables and entrypoint exist.
+
+    Checks the regular command and, when declared, the batch command. Returns a list
+    of problems (empty when everything resolves); each executable is resolved once.
+    """
+    root = working_dir or os.getcwd()
+    problems = []
+    checked = {}
+    for entry in entries:
+        commands = [entry.get("command") or []]
+        if entry.get("batch"):
+            commands.append(entry["batch"]["command"])
+        uses_entrypoint = False
+        for command in commands:
+            command = apply_interpreter(entry, command)
+            if not command:
+                continue
+            uses_entrypoint = uses_entrypoint or any(
+                "{entrypoint}" in token or token == entry.get("entrypoint") for token in command
+            )
+            executable = _expand(command[0], entry, root)
+            if "{" in executable:
+                continue
+            if executable not in checked:
+                try:
+                    resolve_executable(executable, root)
+                    checked[executable] = None
+                except RuntimeResolutionError as exc:
+                    checked[executable] = str(exc)
+            problem = checked[executable] and "{0}: {1}".format(entry["name"], checked[executable])
+            if problem and problem not in problems:
+                problems.append(problem)
+        entrypoint = entry.get("entrypoint")
+        if uses_entrypoint and entrypoint:
+            if not os.path.exists(os.path.join(root, entrypoint)):
+                problems.append(
+                    "{0}: entrypoint not found: {1}.".format(entry["name"], entrypoint)
+                )
+    return problems
+
+
+def _expand(token, entry, root):
+    values = {
+        "{entrypoint}": entry.get("entrypoint") or "",
+        "{project_root}": root,
+        "{name}": entry.get("name") or "",
+    }
+    for placeholder in _PLACEHOLDERS:
+        token = token.replace(placeholder, values[placeholder])
+    if token[:1] == token[-1:] and token[:1] in ("'", '"') and len(token) > 1:
+        token = token[1:-1]
+    return token
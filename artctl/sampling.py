@@ -0,0 +1,342 @@
+"""Sample a program's parameter space instead of rendering a full grid.
+
+The space is built from the declared ``params``: ``int`` and ``float`` params with a
+``min``/``max`` range (declared in the registry or passed as ``--range``), ``enum``
+choices and ``bool`` flags are sampled; everything else keeps its default or ``--set``
+value. Points are drawn lazily in the unit hypercube by one of :data:`SAMPLING_METHODS`
+and mapped onto each dimension:
+
+* ``random``: independent uniform draws.
+* ``lhs``: Latin hypercube blocks of the requested size, so every dimension's range is
+  split into that many strata and each stratum is hit exactly once per block.
+* ``halton``: the Halton low-discrepancy sequence (one prime base per dimension),
+  randomly shifted when a seed is given.
+
+Points that violate the entry's ``constraints`` (boolean expressions over param
+names, e.g. ``radius >= turns * 10``) or that repeat a combination already drawn or
+already rendered successfully according to the run catalog are skipped.
+"""
+
+import ast
+import math
+import operator
+import random
+
+from . import catalog
+from . import coalesce
+
+SAMPLING_METHODS = ("random", "lhs", "halton")
+SAMPLED_TYPES = {"int", "float", "enum", "bool"}
+FLOAT_DIGITS = 6
+# Give up after this many rejected draws per requested point.
+DRAWS_PER_POINT = 50
+
+_BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    # Floating point, so a huge power overflows at once instead of building an
+    # arbitrarily large integer.
+    ast.Pow: math.pow,
+}
+_UNARY_OPERATORS = {ast.Not: operator.not_, ast.USub: operator.neg, ast.UAdd: operator.pos}
+_COMPARE_OPERATORS = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.In: lambda left, right: left in right,
+    ast.NotIn: lambda left, right: left not in right,
+}
+_FUNCTIONS = {"abs": abs, "min": min, "max": max, "round": round}
+
+
+class SamplingError(Exception):
+    """Raised when a parameter space, range or constraint is invalid."""
+
+
+def parse_ranges(specs):
+    """Parse ``NAME=MIN:MAX`` specs into ``{name: (min, max)}``."""
+    ranges = {}
+    for spec in specs or []:
+        name, sep, raw = spec.partition("=")
+        low, colon, high = raw.partition(":")
+        try:
+            if not sep or not colon or not name.strip():
+                raise ValueError(spec)
+            bounds = (float(low), float(high))
+        except ValueError:
+            raise SamplingError("Ranges must use NAME=MIN:MAX format; got '{0}'.".format(spec))
+        if bounds[0] > bounds[1]:
+            raise SamplingError("Range minimum exceeds maximum in '{0}'.".format(spec))
+        ranges[name.strip()] = bounds
+    return ranges
+
+
+def build_space(declared_params, fixed=(), ranges=None):
+    """Return the sampled dimensions as ``{"name", "type", "low", "high", "choices"}``.
+
+    Params named in ``fixed``, non-numeric/enum/bool params and numeric params without
+    a range are left out. ``ranges`` overrides declared ``min``/``max`` values.
+    """
+    ranges = ranges or {}
+    declared = {param["name"]: param for param in declared_params or []}
+    unknown = sorted(set(ranges).difference(declared))
+    if unknown:
+        raise SamplingError("Ranges given for unknown parameters {0}.".format(unknown))
+    dimensions = []
+    for name, param in declared.items():
+        kind = param["type"]
+        if name in ranges and kind not in ("int", "float"):
+            raise SamplingError(
+                "Only int and float parameters take a range; got '{0}'.".format(name)
+            )
+        if name in fixed or kind not in SAMPLED_TYPES:
+            continue
+        dimension = {"name": name, "type": kind, "low": None, "high": None, "choices": None}
+        if kind in ("int", "float"):
+            low, high = ranges.get(name, (param.get("min"), param.get("max")))
+            if low is None or high is None:
+                continue
+            if kind == "int":
+                low, high = math.ceil(low), math.floor(high)
+                if low > high:
+                    raise SamplingError("Range for '{0}' contains no integers.".format(name))
+            dimension["low"], dimension["high"] = low, high
+        elif kind == "enum":
+            dimension["choices"] = list(param["choices"])
+        else:
+            dimension["choices"] = [False, True]
+        dimensions.append(dimension)
+    return dimensions
+
+
+def compile_constraint(expression, names):
+    """Compile a constraint over ``names`` into a ``predicate(values) -> bool``.
+
+    Only literals, param names, arithmetic, comparisons, ``and``/``or``/``not``,
+    conditional expressions and ``abs``/``min``/``max``/``round`` are allowed. A
+    constraint that fails to evaluate, e.g. a ``**`` that overflows, rejects the point.
+    """
+    if not isinstance(expression, str) or not expression.strip():
+        raise SamplingError("Constraints must be non-empty strings.")
+    try:
+        tree = ast.parse(expression.strip(), mode="eval")
+    except SyntaxError as exc:
+        raise SamplingError("Invalid constraint '{0}': {1}".format(expression, exc.msg))
+    _check_node(tree.body, expression, set(names))
+
+    def predicate(values):
+        try:
+            return bool(_evaluate(tree.body, values))
+        except (ArithmeticError, TypeError, ValueError):
+            return False
+
+    predicate.expression = expression
+    return predicate
+
+
+def _check_node(node, expression, names):
+    if isinstance(node, ast.Constant):
+        if not isinstance(node.value, (int, float, str, bool, type(None))):
+            raise SamplingError("Unsupported literal in constraint '{0}'.".format(expression))
+        return
+    if isinstance(node, ast.Name):
+        if node.id not in names:
+            raise SamplingError(
+                "Constraint '{0}' references unknown parameter '{1}'.".format(expression, node.id)
+            )
+        return
+    if isinstance(node, ast.Call):
+        if (
+            not isinstance(node.func, ast.Name)
+            or node.func.id not in _FUNCTIONS
+            or node.keywords
+        ):
+            raise SamplingError(
+                "Constraint '{0}' may only call {1}.".format(expression, sorted(_FUNCTIONS))
+            )
+        children = node.args
+    elif isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPERATORS:
+        children = [node.left, node.right]
+    elif isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPERATORS:
+        children = [node.operand]
+    elif isinstance(node, ast.BoolOp):
+        children = node.values
+    elif isinstance(node, ast.Compare) and all(
+        type(op) in _COMPARE_OPERATORS for op in node.ops
+    ):
+        children = [node.left] + node.comparators
+    elif isinstance(node, ast.IfExp):
+        children = [node.test, node.body, node.orelse]
+    elif isinstance(node, (ast.Tuple, ast.List)):
+        children = node.elts
+    else:
+        raise SamplingError(
+            "Unsupported syntax '{0}' in constraint '{1}'.".format(type(node).__name__, expression)
+        )
+    for child in children:
+        _check_node(child, expression, names)
+
+
+def _evaluate(node, values):
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, ast.Name):
+        return values[node.id]
+    if isinstance(node, ast.Call):
+        return _FUNCTIONS[node.func.id](*[_evaluate(arg, values) for arg in node.args])
+    if isinstance(node, ast.BinOp):
+        left = _evaluate(node.left, values)
+        return _BINARY_OPERATORS[type(node.op)](left, _evaluate(node.right, values))
+    if isinstance(node, ast.UnaryOp):
+        return _UNARY_OPERATORS[type(node.op)](_evaluate(node.operand, values))
+    if isinstance(node, ast.BoolOp):
+        if isinstance(node.op, ast.And):
+            return all(_evaluate(value, values) for value in node.values)
+        return any(_evaluate(value, values) for value in node.values)
+    if isinstance(node, ast.Compare):
+        left = _evaluate(node.left, values)
+        for op, comparator in zip(node.ops, node.comparators):
+            right = _evaluate(comparator, values)
+            if not _COMPARE_OPERATORS[type(op)](left, right):
+                return False
+            left = right
+        return True
+    if isinstance(node, ast.IfExp):
+        branch = node.body if _evaluate(node.test, values) else node.orelse
+        return _evaluate(branch, values)
+    return tuple(_evaluate(element, values) for element in node.elts)
+
+
+def compile_constraints(expressions, names):
+    return [compile_constraint(expression, names) for expression in expressions or []]
+
+
+def rendered_keys(catalog_path, program):
+    """Return canonical keys of ``program``'s successful runs recorded in the catalog."""
+    keys = set()
+    if not catalog_path:
+        return keys
+    for record in catalog.read_records(catalog_path):
+        if record.get("program") == program and record.get("exit_status") == 0:
+            keys.add(coalesce.canonical_key(program, record.get("params")))
+    return keys
+
+
+def sample(
+    program,
+    dimensions,
+    base_values,
+    count,
+    method="random",
+    seed=None,
+    constraints=(),
+    exclude=(),
+):
+    """Lazily yield up to ``count`` distinct parameter mappings.
+
+    Each mapping is ``base_values`` with the sampled ``dimensions`` replaced. Fewer
+    than ``count`` are produced when the space (after constraints and ``exclude``,
+    a set of :func:`artctl.coalesce.canonical_key` keys) runs out: sampling stops after
+    :data:`DRAWS_PER_POINT` rejected draws per requested point.
+    """
+    if method not in SAMPLING_METHODS:
+        raise SamplingError(
+            "Sampling method must be one of {0}; got '{1}'.".format(
+                ", ".join(SAMPLING_METHODS), method
+            )
+        )
+    if count <= 0:
+        return
+    rng = random.Random(seed)
+    if method == "random":
+        points = _random_points(len(dimensions), rng)
+    elif method == "lhs":
+        points = _latin_hypercube_points(len(dimensions), count, rng)
+    else:
+        points = _halton_points(len(dimensions), rng if seed is not None else None)
+
+    seen = set(exclude)
+    produced = 0
+    rejected = 0
+    budget = count * DRAWS_PER_POINT
+    for point in points:
+        values = dict(base_values)
+        for dimension, unit in zip(dimensions, point):
+            values[dimension["name"]] = _scale(dimension, unit)
+        key = coalesce.canonical_key(program, values)
+        if key in seen or not all(check(values) for check in constraints):
+            rejected += 1
+            if rejected >= budget:
+                return
+            continue
+        seen.add(key)
+        yield values
+        produced += 1
+        if produced >= count:
+            return
+
+
+def _scale(dimension, unit):
+    kind = dimension["type"]
+    if kind == "float":
+        value = dimension["low"] + unit * (dimension["high"] - dimension["low"])
+        return float("{0:.{1}g}".format(value, FLOAT_DIGITS))
+    if kind == "int":
+        span = dimension["high"] - dimension["low"] + 1
+        return dimension["low"] + min(int(unit * span), span - 1)
+    choices = dimension["choices"]
+    return choices[min(int(unit * len(choices)), len(choices) - 1)]
+
+
+def _random_points(dimensions, rng):
+    while True:
+        yield [rng.random() for _ in range(dimensions)]
+
+
+def _latin_hypercube_points(dimensions, block, rng):
+    while True:
+        strata = []
+        for _ in range(dimensions):
+            order = list(range(block))
+            rng.shuffle(order)
+            strata.append(order)
+        for index in range(block):
+            yield [(column[index] + rng.random()) / block for column in strata]
+
+
+def _halton_points(dimensions, rng=None):
+    bases = _primes(dimensions)
+    shift = [rng.random() for _ in bases] if rng is not None else [0.0] * dimensions
+    index = 1
+    while True:
+        yield [
+            (_radical_inverse(index, base) + offset) % 1.0 for base, offset in zip(bases, shift)
+        ]
+        index += 1
+
+
+def _radical_inverse(index, base):
+    result = 0.0
+    fraction = 1.0 / base
+    while index:
+        index, digit = divmod(index, base)
+        result += digit * fraction
+        fraction /= base
+    return result
+
+
+def _primes(count):
+    primes = []
+    candidate = 2
+    while len(primes) < count:
+        if all(candidate % prime for prime in primes):
+            primes.append(candidate)
+        candidate += 1
+    return primes
@@ -0,0 +1,470 @@
+"""Helpers for generator scripts launched by artctl.
+
+The runner puts this package on ``PYTHONPATH`` for child processes, so Python
+generators can ``from artctl import sdk`` without installing artctl into their own
+environment.
+
+PNG output
+----------
+:class:`PNGWriter` encodes rows as they are produced, through one incremental
+``zlib.compressobj`` and fixed-size IDAT chunks, so memory stays bounded by a couple
+of rows however large the image is. Rows may be ``bytes``, ``memoryview`` or NumPy
+arrays; with the default ``none`` filter they reach zlib without being copied.
+
+Batches
+-------
+Entries with a registry ``batch`` block get many items per invocation. A generator
+walks the manifest with :func:`iter_batch` and reports each item through
+:class:`BatchResults`; items it never reports are treated as failed.
+
+Progress
+--------
+When artctl watches a run it passes an inherited pipe in ``$ARTCTL_PROGRESS_FD``.
+:func:`progress` writes one compact JSON line per call to it, skips calls that
+arrive faster than :data:`PROGRESS_INTERVAL`, and never blocks: if artctl falls
+behind, records are dropped because only the latest one matters. Without the
+variable it does nothing. Generators in other languages can write
+``DONE[/TOTAL] [message]`` lines to the same fd.
+
+Shared-memory frames
+--------------------
+When an entry runs with ``mode: shm`` output, ``{output}`` renders as
+``shm:<segment>``. The generator creates that segment with :func:`shared_frame` and
+fills the raw 8-bit pixels in place. The host attaches with :class:`SharedFrame`,
+reads them without copying, and unlinks the segment once it is done with the frame.
+"""
+
+import json
+import os
+import struct
+import time
+import zlib
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+
+SHM_PREFIX = "shm:"
+FRAME_MAGIC = b"ARTF"
+FRAME_VERSION = 1
+FRAME_HEADER = struct.Struct("<4sIIII")
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_FILTERS = {"none": 0, "sub": 1, "up": 2, "average": 3, "paeth": 4}
+PNG_COLOR_TYPES = {1: 0, 2: 4, 3: 2, 4: 6}
+DEFAULT_IDAT_SIZE = 256 * 1024
+
+PROGRESS_FD_ENV = "ARTCTL_PROGRESS_FD"
+PROGRESS_INTERVAL = 0.1
+
+
+class SDKError(Exception):
+    """Raised when a shared frame or PNG cannot be written or read."""
+
+
+def is_shared_target(output):
+    return str(output).startswith(SHM_PREFIX)
+
+
+def segment_name(output):
+    """Return the segment name from an ``shm:<segment>`` output target."""
+    if not is_shared_target(output):
+        raise SDKError("Output '{0}' is not a shared-memory target.".format(output))
+    name = output[len(SHM_PREFIX) :]
+    if not name:
+        raise SDKError("Shared-memory target is missing a segment name.")
+    return name
+
+
+def _open_segment(name, create=False, size=0):
+    # The segment outlives the process that opens it; the host unlinks it explicitly.
+    try:
+        return shared_memory.SharedMemory(name=name, create=create, size=size, track=False)
+    except TypeError:
+        segment = shared_memory.SharedMemory(name=name, create=create, size=size)
+        resource_tracker.unregister(segment._name, "shared_memory")
+        return segment
+
+
+@contextmanager
+def shared_frame(output, width, height, channels=1):
+    """Create the frame named by ``output`` and yield a writable view of its pixels.
+
+    The view covers ``width * height * channels`` bytes in row-major order. The
+    segment is closed, but left in place for the host, when the block exits.
+    """
+    if width <= 0 or height <= 0 or channels not in (1, 2, 3, 4):
+        raise SDKError(
+            "Invalid frame shape {0}x{1}x{2}.".format(width, height, channels)
+        )
+    size = width * height * channels
+    try:
+        segment = _open_segment(segment_name(output), create=True, size=FRAME_HEADER.size + size)
+    except OSError as exc:
+        raise SDKError("Failed to create shared frame {0}: {1}".format(output, exc))
+    FRAME_HEADER.pack_into(segment.buf, 0, FRAME_MAGIC, FRAME_VERSION, width, height, channels)
+    pixels = segment.buf[FRAME_HEADER.size : FRAME_HEADER.size + size]
+    try:
+        yield pixels
+    finally:
+        pixels.release()
+        segment.close()
+
+
+class SharedFrame:
+    """A frame left in shared memory by a generator.
+
+    ``pixels`` is a read-only view straight into the segment; :meth:`close` releases
+    it and unlinks the segment.
+    """
+
+    def __init__(self, name):
+        try:
+            self._segment = _open_segment(name)
+        except (FileNotFoundError, ValueError):
+            raise SDKError("Shared frame '{0}' was not produced.".format(name))
+        buffer = self._segment.buf
+        if len(buffer) < FRAME_HEADER.size:
+            self.close()
+            raise SDKError("Shared frame '{0}' is truncated.".format(name))
+        magic, version, width, height, channels = FRAME_HEADER.unpack_from(buffer, 0)
+        size = width * height * channels
+        if magic != FRAME_MAGIC or version != FRAME_VERSION:
+            self.close()
+            raise SDKError("Shared frame '{0}' has an unknown header.".format(name))
+        if FRAME_HEADER.size + size > len(buffer):
+            self.close()
+            raise SDKError("Shared frame '{0}' is truncated.".format(name))
+        self.name = name
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self.pixels = buffer[FRAME_HEADER.size : FRAME_HEADER.size + size].toreadonly()
+
+    def as_array(self):
+        """Return the pixels as a ``(height, width, channels)`` NumPy view (no copy)."""
+        import numpy
+
+        return numpy.frombuffer(self.pixels, dtype=numpy.uint8).reshape(
+            self.height, self.width, self.channels
+        )
+
+    def close(self):
+        segment, self._segment = self._segment, None
+        if segment is None:
+            return
+        pixels = getattr(self, "pixels", None)
+        if pixels is not None:
+            pixels.release()
+        segment.close()
+        try:
+            segment.unlink()
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+
+def iter_batch(manifest_path):
+    """Yield ``(index, params, output)`` for every item in a batch manifest."""
+    with open(manifest_path, "r", encoding="utf-8") as handle:
+        for line in handle:
+            if line.strip():
+                item = json.loads(line)
+                yield item["index"], item["params"], item["output"]
+
+
+class BatchResults:
+    """Report per-item outcomes of a batch back to artctl.
+
+    Each result is flushed as soon as it is recorded, so items finished before a
+    crash still count.
+    """
+
+    def __init__(self, path):
+        self._handle = open(path, "a", encoding="utf-8")
+
+    def ok(self, index):
+        self._write({"index": index, "ok": True})
+
+    def failed(self, index, error):
+        self._write({"index": index, "ok": False, "error": str(error)})
+
+    def _write(self, record):
+        self._handle.write(json.dumps(record) + "\n")
+        self._handle.flush()
+
+    def close(self):
+        self._handle.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+
+_progress = {"fd": None, "last": 0.0}
+
+
+def progress(done, total=None, message=None):
+    """Report that ``done`` of ``total`` units of work are finished.
+
+    Calls within :data:`PROGRESS_INTERVAL` of the previous report are skipped unless
+    they complete the work. Returns whether a record was sent.
+    """
+    if _progress["fd"] is None:
+        _progress["fd"] = _progress_fd()
+    fd = _progress["fd"]
+    if fd < 0:
+        return False
+    now = time.monotonic()
+    if now - _progress["last"] < PROGRESS_INTERVAL and (total is None or done < total):
+        return False
+    record = {"done": done}
+    if total is not None:
+        record["total"] = total
+    if message:
+        record["msg"] = str(message)[:200]
+    try:
+        os.write(fd, (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8"))
+    except BlockingIOError:
+        return False
+    except OSError:
+        _progress["fd"] = -1
+        return False
+    _progress["last"] = now
+    return True
+
+
+def _progress_fd():
+    try:
+        fd = int(os.environ.get(PROGRESS_FD_ENV, ""))
+        os.set_blocking(fd, False)
+    except (ValueError, OSError):
+        return -1
+    return fd
+
+
+class PNGWriter:
+    """Encode a PNG to ``path`` one row at a time.
+
+    ``channels`` selects grayscale, grayscale+alpha, RGB or RGBA; ``bit_depth`` is 8 or
+    16 (16-bit rows are big-endian, or NumPy ``uint16`` arrays). ``filter`` is one of
+    :data:`PNG_FILTERS` and applies to every row; ``level`` and ``strategy`` are
+    passed to ``zlib.compressobj``. Compressed data is written as IDAT chunks of ``idat_size``
+    bytes (the last one may be shorter).
+    """
+
+    def __init__(
+        self,
+        path,
+        width,
+        height,
+        channels=1,
+        bit_depth=8,
+        level=6,
+        filter="none",
+        strategy=zlib.Z_DEFAULT_STRATEGY,
+        idat_size=DEFAULT_IDAT_SIZE,
+    ):
+        if width <= 0 or height <= 0:
+            raise SDKError("Invalid PNG size {0}x{1}.".format(width, height))
+        if channels not in PNG_COLOR_TYPES:
+            raise SDKError("PNG channels must be 1, 2, 3 or 4; got {0}.".format(channels))
+        if bit_depth not in (8, 16):
+            raise SDKError("PNG bit depth must be 8 or 16; got {0}.".format(bit_depth))
+        if filter not in PNG_FILTERS:
+            raise SDKError(
+                "Unknown PNG filter '{0}'; expected one of {1}.".format(filter, list(PNG_FILTERS))
+            )
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self.bit_depth = bit_depth
+        self.filter = filter
+        self.row_bytes = width * channels * bit_depth // 8
+        self.rows_written = 0
+        self._bpp = channels * bit_depth // 8
+        self._filter_byte = bytes([PNG_FILTERS[filter]])
+        self._prior = None
+        self._idat_size = idat_size
+        self._pending = []
+        self._pending_size = 0
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS, 9, strategy)
+        try:
+            self._handle = open(path, "wb")
+        except OSError as exc:
+            raise SDKError("Failed to open {0}: {1}".format(path, exc))
+        header = struct.pack(
+            ">IIBBBBB", width, height, bit_depth, PNG_COLOR_TYPES[channels], 0, 0, 0
+        )
+        self._handle.write(PNG_SIGNATURE)
+        self._write_chunk(b"IHDR", header)
+
+    def write_row(self, row):
+        """Append one row of ``width * channels`` samples."""
+        if self.rows_written >= self.height:
+            raise SDKError("PNG already has all {0} rows.".format(self.height))
+        data = _row_buffer(row, self.bit_depth)
+        if data.nbytes != self.row_bytes:
+            raise SDKError(
+                "PNG row {0} is {1} bytes, expected {2}.".format(
+                    self.rows_written, data.nbytes, self.row_bytes
+                )
+            )
+        if self.filter != "none":
+            filtered = _filter_row(self.filter, data, self._prior, self._bpp)
+            self._prior = bytes(data)
+            data = filtered
+        self._compress(self._filter_byte)
+        self._compress(data)
+        self.rows_written += 1
+
+    def write_rows(self, rows):
+        """Append every row of an iterable, or of a 2-D/3-D NumPy array (as views)."""
+        for row in rows:
+            self.write_row(row)
+
+    def close(self):
+        """Finish the image; raises if fewer than ``height`` rows were written."""
+        if self._handle is None:
+            return
+        try:
+            if self.rows_written != self.height:
+                raise SDKError(
+                    "PNG has {0} of {1} rows.".format(self.rows_written, self.height)
+                )
+            self._queue(self._compressor.flush())
+            self._flush_idat()
+            self._write_chunk(b"IEND", b"")
+        finally:
+            handle, self._handle = self._handle, None
+            handle.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        elif self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+    def _compress(self, data):
+        self._queue(self._compressor.compress(data))
+
+    def _queue(self, compressed):
+        if compressed:
+            self._pending.append(compressed)
+            self._pending_size += len(compressed)
+        while self._pending_size >= self._idat_size:
+            data = b"".join(self._pending)
+            self._write_chunk(b"IDAT", data[: self._idat_size])
+            rest = data[self._idat_size :]
+            self._pending = [rest] if rest else []
+            self._pending_size = len(rest)
+
+    def _flush_idat(self):
+        if self._pending:
+            self._write_chunk(b"IDAT", b"".join(self._pending))
+            self._pending = []
+            self._pending_size = 0
+
+    def _write_chunk(self, kind, data):
+        crc = zlib.crc32(data, zlib.crc32(kind))
+        self._handle.write(struct.pack(">I", len(data)))
+        self._handle.write(kind)
+        self._handle.write(data)
+        self._handle.write(struct.pack(">I", crc))
+
+
+def write_png(path, pixels, width, height, channels=1, **options):
+    """Encode a whole image, given as a flat buffer or a NumPy array, to ``path``.
+
+    Rows are handed to :class:`PNGWriter` as views into ``pixels``; remaining keyword
+    arguments are passed to it.
+    """
+    with PNGWriter(path, width, height, channels=channels, **options) as writer:
+        if getattr(pixels, "ndim", 1) > 1:
+            writer.write_rows(pixels)
+        else:
+            view = memoryview(pixels).cast("B")
+            for row in range(height):
+                writer.write_row(view[row * writer.row_bytes : (row + 1) * writer.row_bytes])
+
+
+def _row_buffer(row, bit_depth):
+    if hasattr(row, "dtype"):
+        import numpy
+
+        row = numpy.ascontiguousarray(row)
+        if bit_depth == 16 and row.dtype.itemsize == 2 and row.dtype.byteorder != ">":
+            row = row.astype(">u2")
+        return memoryview(row.reshape(-1).view(numpy.uint8))
+    return memoryview(row).cast("B")
+
+
+def _filter_row(kind, data, prior, bpp):
+    try:
+        import numpy
+    except ImportError:
+        return _filter_row_python(kind, bytes(data), prior, bpp)
+    current = numpy.frombuffer(data, dtype=numpy.uint8).astype(numpy.int16)
+    above = (
+        numpy.frombuffer(prior, dtype=numpy.uint8).astype(numpy.int16)
+        if prior is not None
+        else numpy.zeros_like(current)
+    )
+    left = numpy.zeros_like(current)
+    left[bpp:] = current[:-bpp]
+    if kind == "sub":
+        predictor = left
+    elif kind == "up":
+        predictor = above
+    elif kind == "average":
+        predictor = (left + above) // 2
+    else:
+        upper_left = numpy.zeros_like(current)
+        upper_left[bpp:] = above[:-bpp]
+        estimate = left + above - upper_left
+        distance_left = numpy.abs(estimate - left)
+        distance_above = numpy.abs(estimate - above)
+        distance_upper_left = numpy.abs(estimate - upper_left)
+        predictor = numpy.where(
+            (distance_left <= distance_above) & (distance_left <= distance_upper_left),
+            left,
+            numpy.where(distance_above <= distance_upper_left, above, upper_left),
+        )
+    return ((current - predictor) & 0xFF).astype(numpy.uint8).tobytes()
+
+
+def _filter_row_python(kind, current, prior, bpp):
+    above = prior or bytes(len(current))
+    out = bytearray(len(current))
+    for index, value in enumerate(current):
+        left = current[index - bpp] if index >= bpp else 0
+        up = above[index]
+        if kind == "sub":
+            predictor = left
+        elif kind == "up":
+            predictor = up
+        elif kind == "average":
+            predictor = (left + up) // 2
+        else:
+            upper_left = above[index - bpp] if index >= bpp else 0
+            estimate = left + up - upper_left
+            distance_left = abs(estimate - left)
+            distance_above = abs(estimate - up)
+            distance_upper_left = abs(estimate - upper_left)
+            if distance_left <= distance_above and distance_left <= distance_upper_left:
+                predictor = left
+            elif distance_above <= distance_upper_left:
+                predictor = up
+            else:
+                predictor = upper_left
+        out[index] = (value - predictor) & 0xFF
+    return bytes(out)
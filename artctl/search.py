@@ -0,0 +1,102 @@
+"""Filter and search registry programs through an inverted index.
+
+The index maps lowercase words from each program's name, tags and description to the
+programs containing them, plus exact tag and runtime postings, with a small summary
+(description, runtime, tags, source path) per program. It is saved next to the shell
+completion index (see :mod:`artctl.complete`) and rebuilt only when a registry file
+changes, so a query reads one cached file instead of parsing and validating every
+YAML file.
+
+``--search`` words match as prefixes (``spi`` finds ``spiral``); every word, tag and
+runtime given must match.
+"""
+
+import bisect
+import re
+
+from . import complete
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def words(text):
+    """Split ``text`` into lowercase alphanumeric words."""
+    return _WORD_PATTERN.findall((text or "").lower())
+
+
+def build_index(entries):
+    """Build the search index for loaded registry ``entries``."""
+    programs = {}
+    postings = {}
+    tags = {}
+    runtimes = {}
+    for name in sorted(entries):
+        entry = entries[name]
+        entry_tags = list(entry.get("tags") or [])
+        programs[name] = {
+            "name": name,
+            "description": (entry.get("description") or "").strip(),
+            "runtime": entry.get("runtime"),
+            "tags": entry_tags,
+            "source_path": entry.get("source_path"),
+        }
+        terms = set(words(name)) | set(words(entry.get("description")))
+        terms.add(name.lower())
+        for tag in entry_tags:
+            terms.update(words(tag))
+            tags.setdefault(tag, []).append(name)
+        for term in terms:
+            postings.setdefault(term, []).append(name)
+        runtimes.setdefault(entry.get("runtime"), []).append(name)
+    return {
+        "programs": programs,
+        "names": sorted(programs),
+        "terms": sorted(postings),
+        "postings": postings,
+        "tags": tags,
+        "runtimes": runtimes,
+    }
+
+
+def load_index(registry_path, load_entries, cache_dir=None):
+    """Return the cached index for ``registry_path``.
+
+    ``load_entries()`` returns the loaded registry and is only called when the cached
+    index is missing or stale.
+    """
+    path = complete.index_path(registry_path, cache_dir, kind="search")
+    current = complete.fingerprint(registry_path)
+    index = complete.read_cached(path, current)
+    if index is None:
+        index = build_index(load_entries())
+        complete.write_cached(path, index, current)
+    return index
+
+
+def query(index, tags=(), runtime=None, text=None):
+    """Yield the summaries of matching programs in name order."""
+    candidates = None
+    for tag in tags or ():
+        candidates = _narrow(candidates, index["tags"].get(tag, ()))
+    if runtime is not None:
+        candidates = _narrow(candidates, index["runtimes"].get(runtime, ()))
+    for word in words(text):
+        candidates = _narrow(candidates, _prefix_matches(index, word))
+    names = index["names"] if candidates is None else sorted(candidates)
+    for name in names:
+        yield index["programs"][name]
+
+
+def _narrow(candidates, names):
+    names = set(names)
+    return names if candidates is None else candidates & names
+
+
+def _prefix_matches(index, word):
+    terms = index["terms"]
+    matches = set()
+    position = bisect.bisect_left(terms, word)
+    while position < len(terms) and terms[position].startswith(word):
+        matches.update(index["postings"][terms[position]])
+        position += 1
+    return matches
@@ -0,0 +1,254 @@
+"""Resident daemon serving artctl commands over a Unix domain socket.
+
+The protocol is newline-delimited JSON. A request carries the CLI arguments and the
+client's working directory and environment; the response carries the exit code and
+captured output::
+
+    -> {"argv": ["run", "spiral", "--set", "turns=40"], "cwd": "/srv/art", "env": {...}}
+    <- {"exit_code": 0, "stdout": "...", "stderr": ""}
+
+Commands run with the daemon's own working directory and environment. A request is
+rejected, and the client runs locally instead, when its ``cwd`` differs from the
+daemon's or any variable that affects execution does (see
+:data:`EXECUTION_VARIABLES`). Generator output and progress lines written while a
+request is handled go to that request's captured ``stdout``/``stderr``, not the
+daemon's terminal.
+
+A ``{"ping": true}`` request returns the daemon's pid, version and working directory.
+"""
+
+import io
+import json
+import os
+import socket
+import socketserver
+import stat
+import sys
+import threading
+from contextlib import contextmanager
+
+from . import __version__
+from . import coalesce
+from . import registry
+
+SOCKET_ENV_VAR = "ARTCTL_SOCKET"
+
+CONNECT_TIMEOUT = 0.5
+
+# Variables that change how a command runs: executable and module lookup, artctl's own
+# settings, cache and config locations, and the locale. Everything else (terminal and
+# session variables such as TERM_SESSION_ID, SSH_* or DISPLAY) may differ between the
+# client and the daemon.
+EXECUTION_VARIABLES = frozenset(("PATH", "PYTHONPATH", "NODE_PATH", "LANG", "LANGUAGE"))
+EXECUTION_PREFIXES = ("ARTCTL_", "XDG_", "LC_")
+# Only selects the daemon to forward to; the daemon itself may have been given --socket.
+_FORWARDING_VARIABLES = frozenset((SOCKET_ENV_VAR,))
+
+
+class ServerError(Exception):
+    """Raised when the daemon cannot start or a request cannot be forwarded."""
+
+
+def resolve_socket_path(path=None):
+    """Return the socket path from the CLI flag or environment, or ``None``."""
+    return path or os.environ.get(SOCKET_ENV_VAR) or None
+
+
+class _ThreadLocalStream:
+    """Route writes to a per-thread buffer while a request is being handled."""
+
+    def __init__(self, fallback):
+        self.fallback = fallback
+        self._local = threading.local()
+
+    def current(self):
+        """Return the stream this thread writes to: its request buffer or the fallback."""
+        return getattr(self._local, "buffer", None) or self.fallback
+
+    def write(self, text):
+        return self.current().write(text)
+
+    def flush(self):
+        self.current().flush()
+
+    def isatty(self):
+        return False
+
+    @contextmanager
+    def capture(self):
+        buffer = io.StringIO()
+        self._local.buffer = buffer
+        try:
+            yield buffer
+        finally:
+            self._local.buffer = None
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as exc:
+                response = {"error": "invalid_request", "message": str(exc)}
+            else:
+                response = self.server.dispatch(request)
+            payload = json.dumps(response, separators=(",", ":")) + "\n"
+            self.wfile.write(payload.encode("utf-8"))
+            self.wfile.flush()
+
+
+class ArtctlServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Threaded Unix socket server that runs CLI commands in-process."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, socket_path, registry_cache=None):
+        self.socket_path = socket_path
+        self.cwd = os.getcwd()
+        self.registry_cache = registry_cache or registry.RegistryCache()
+        self.coalescer = coalesce.ThreadSingleFlight()
+        self.stdout = _ThreadLocalStream(sys.stdout)
+        self.stderr = _ThreadLocalStream(sys.stderr)
+        self._streams_lock = threading.Lock()
+        _remove_stale_socket(socket_path)
+        super().__init__(socket_path, _RequestHandler)
+        os.chmod(socket_path, 0o600)
+
+    def dispatch(self, request):
+        if not isinstance(request, dict):
+            return {"error": "invalid_request", "message": "Request must be a JSON object."}
+        if request.get("ping"):
+            return {"pid": os.getpid(), "version": __version__, "cwd": self.cwd}
+
+        argv = request.get("argv")
+        if not isinstance(argv, list) or not all(isinstance(item, str) for item in argv):
+            return {"error": "invalid_request", "message": "argv must be a list of strings."}
+        cwd = request.get("cwd")
+        if cwd is not None and os.path.realpath(cwd) != os.path.realpath(self.cwd):
+            return {"error": "cwd_mismatch", "cwd": self.cwd}
+        env = request.get("env")
+        if not isinstance(env, dict):
+            return {"error": "invalid_request", "message": "env must be an object."}
+        mismatched = _mismatched_variables(env, os.environ)
+        if mismatched:
+            return {"error": "env_mismatch", "variables": mismatched}
+
+        from . import cli
+
+        self._install_streams()
+        with self.stdout.capture() as out, self.stderr.capture() as err:
+            try:
+                exit_code = cli.main(
+                    argv,
+                    allow_forward=False,
+                    registry_cache=self.registry_cache,
+                    coalescer=self.coalescer,
+                )
+            except SystemExit as exc:
+                exit_code = exc.code if isinstance(exc.code, int) else cli.EXIT_VALIDATION_ERROR
+            except Exception as exc:  # noqa: BLE001
+                print("Unexpected error: {0}".format(exc), file=sys.stderr)
+                exit_code = cli.EXIT_INTERNAL_ERROR
+        return {"exit_code": exit_code, "stdout": out.getvalue(), "stderr": err.getvalue()}
+
+    def _install_streams(self):
+        # Route sys.stdout/sys.stderr through the per-thread capture streams; re-checked
+        # per request in case something else replaced the process-wide streams.
+        with self._streams_lock:
+            if sys.stdout is not self.stdout:
+                self.stdout.fallback = sys.stdout
+                sys.stdout = self.stdout
+            if sys.stderr is not self.stderr:
+                self.stderr.fallback = sys.stderr
+                sys.stderr = self.stderr
+
+    def _restore_streams(self):
+        with self._streams_lock:
+            if sys.stdout is self.stdout:
+                sys.stdout = self.stdout.fallback
+            if sys.stderr is self.stderr:
+                sys.stderr = self.stderr.fallback
+
+    def serve(self):
+        """Serve requests until interrupted, then remove the socket file."""
+        try:
+            self.serve_forever()
+        finally:
+            self._restore_streams()
+            self.server_close()
+            _remove_stale_socket(self.socket_path)
+
+
+def _mismatched_variables(client, daemon):
+    names = [
+        name
+        for name in set(client) | set(daemon)
+        if (name in EXECUTION_VARIABLES or name.startswith(EXECUTION_PREFIXES))
+        and name not in _FORWARDING_VARIABLES
+    ]
+    return sorted(name for name in names if client.get(name) != daemon.get(name))
+
+
+def _remove_stale_socket(socket_path):
+    try:
+        mode = os.stat(socket_path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise ServerError("Refusing to replace non-socket file at {0}.".format(socket_path))
+    if _ping(socket_path) is not None:
+        raise ServerError("Another artctl daemon is already serving {0}.".format(socket_path))
+    os.unlink(socket_path)
+
+
+def _send(socket_path, request, timeout=None):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.settimeout(CONNECT_TIMEOUT)
+        conn.connect(socket_path)
+        conn.settimeout(timeout)
+        conn.sendall((json.dumps(request) + "\n").encode("utf-8"))
+        with conn.makefile("rb") as reader:
+            line = reader.readline()
+    if not line:
+        raise ServerError("Daemon closed the connection without responding.")
+    return json.loads(line)
+
+
+def _ping(socket_path):
+    try:
+        return _send(socket_path, {"ping": True}, timeout=CONNECT_TIMEOUT)
+    except (OSError, ValueError, ServerError):
+        return None
+
+
+def forward(socket_path, argv, cwd=None, env=None):
+    """Run ``argv`` on the daemon listening at ``socket_path``.
+
+    ``cwd`` and ``env`` default to the current process's. Returns the daemon's
+    response, or ``None`` when no daemon is reachable or it serves a different working
+    directory or environment, in which case the caller should run locally.
+    """
+    if not socket_path or not os.path.exists(socket_path):
+        return None
+    request = {
+        "argv": list(argv),
+        "cwd": cwd or os.getcwd(),
+        "env": dict(os.environ if env is None else env),
+    }
+    try:
+        response = _send(socket_path, request)
+    except (ConnectionRefusedError, FileNotFoundError, socket.timeout):
+        return None
+    except (OSError, ValueError) as exc:
+        raise ServerError("Failed to forward request to {0}: {1}".format(socket_path, exc))
+    if response.get("error") in ("cwd_mismatch", "env_mismatch"):
+        return None
+    if response.get("error"):
+        raise ServerError(
+            "Daemon rejected request: {0}".format(response.get("message", response["error"]))
+        )
+    return response
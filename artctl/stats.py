@@ -0,0 +1,371 @@
+"""Per-program latency analytics and regression detection over the run catalog.
+
+Runs record ``wall_time`` and ``cpu_time`` (user plus system seconds), ``max_rss_kb``
+and ``version``, a short digest of the generator's entrypoint (see
+:func:`source_version`). :func:`update` folds catalog records into a summary saved
+beside the catalog (``<catalog>.stats.json``) holding, per program and version, run
+and failure counts and, for each metric, a log-scale histogram plus the count, sum
+and sum of squares of the metric's logarithm. The summary remembers the byte offset
+it has read up to, so an update parses only the records appended since; the catalog
+is re-read from the start only when it has been rewritten (``artctl archive``
+relocations replace the file) or truncated.
+
+Histogram buckets grow by ``2 ** (1 / 16)``, so reported percentiles are within about
+2.2% of the exact value however many runs are recorded. Versions of a program are
+compared in the order they first appear: a version is flagged as a regression when
+Welch's t-test on log values rejects "no slower than the previous version" at
+``alpha`` and its geometric mean is at least ``min_change`` higher. Only successful
+runs contribute samples.
+"""
+
+import json
+import math
+import os
+import threading
+
+from . import dedupe
+
+SUMMARY_SUFFIX = ".stats.json"
+SUMMARY_VERSION = 1
+METRICS = ("wall_time", "cpu_time", "max_rss_kb")
+DEFAULT_METRIC = "wall_time"
+PERCENTILES = (0.5, 0.95, 0.99)
+BUCKETS_PER_DOUBLING = 16
+VERSION_LENGTH = 12
+UNKNOWN_VERSION = "unknown"
+DEFAULT_ALPHA = 0.01
+DEFAULT_MIN_CHANGE = 0.05
+
+# Smaller values (including zero CPU time) are counted as this one.
+_FLOOR = 1e-6
+
+_versions = {}
+_versions_lock = threading.Lock()
+
+
+class StatsError(Exception):
+    """Raised when run statistics cannot be read or written."""
+
+
+def source_version(entry, working_dir=None):
+    """Return a short digest of the entry's entrypoint, or ``None`` if it has none.
+
+    Digests are cached by the file's size, mtime and inode, so a sweep hashes the
+    entrypoint once.
+    """
+    entrypoint = entry.get("entrypoint")
+    if not entrypoint:
+        return None
+    path = os.path.abspath(os.path.join(working_dir or os.getcwd(), entrypoint))
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    signature = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+    with _versions_lock:
+        cached = _versions.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    try:
+        version = dedupe.hash_file(path)[:VERSION_LENGTH]
+    except OSError:
+        return None
+    with _versions_lock:
+        _versions[path] = (signature, version)
+    return version
+
+
+def summary_path(catalog_path):
+    return catalog_path + SUMMARY_SUFFIX
+
+
+def update(catalog_path, rebuild=False):
+    """Fold records appended to the catalog into its saved summary and return it.
+
+    With ``rebuild`` the summary is recomputed from the whole catalog. A trailing
+    record without its newline (still being written) is left for the next update.
+    """
+    path = summary_path(catalog_path)
+    summary = None if rebuild else _read_summary(path)
+    try:
+        stat = os.stat(catalog_path)
+    except FileNotFoundError:
+        return _empty_summary(None)
+    except OSError as exc:
+        raise StatsError("Failed to read run catalog {0}: {1}".format(catalog_path, exc))
+    if summary is None or summary["inode"] != stat.st_ino or summary["offset"] > stat.st_size:
+        summary = _empty_summary(stat.st_ino)
+    if summary["offset"] == stat.st_size:
+        return summary
+
+    offset = summary["offset"]
+    try:
+        with open(catalog_path, "rb") as handle:
+            handle.seek(offset)
+            for line in handle:
+                if not line.endswith(b"\n"):
+                    break
+                if line.strip():
+                    try:
+                        record = json.loads(line)
+                    except ValueError as exc:
+                        raise StatsError(
+                            "Invalid catalog record at {0} byte {1}: {2}".format(
+                                catalog_path, offset, exc
+                            )
+                        )
+                    _add_record(summary, record)
+                offset += len(line)
+    except OSError as exc:
+        raise StatsError("Failed to read run catalog {0}: {1}".format(catalog_path, exc))
+    summary["offset"] = offset
+    _write_summary(path, summary)
+    return summary
+
+
+def report(summary, metric=DEFAULT_METRIC, programs=None, by_version=False):
+    """Return one row per program (or per program and version) with percentiles.
+
+    Rows carry ``program``, ``version`` (``None`` when versions are combined),
+    ``runs``, ``failures``, ``samples`` and ``p50``/``p95``/``p99`` of ``metric``
+    (``None`` without samples). Versions are listed in the order they first appeared.
+    """
+    rows = []
+    for program in _selected(summary, programs):
+        versions = _ordered_versions(summary["programs"][program])
+        groups = [(version, [stats]) for version, stats in versions]
+        if not by_version:
+            groups = [(None, [stats for _, stats in versions])]
+        for version, group in groups:
+            accumulator = _merge([stats["metrics"].get(metric) for stats in group])
+            row = {
+                "program": program,
+                "version": version,
+                "runs": sum(stats["runs"] for stats in group),
+                "failures": sum(stats["failures"] for stats in group),
+                "samples": accumulator["n"],
+            }
+            for quantile, value in zip(PERCENTILES, percentiles(accumulator)):
+                row["p{0:g}".format(quantile * 100)] = value
+            rows.append(row)
+    return rows
+
+
+def regressions(
+    summary,
+    metric=DEFAULT_METRIC,
+    programs=None,
+    alpha=DEFAULT_ALPHA,
+    min_change=DEFAULT_MIN_CHANGE,
+):
+    """Return the significant slowdowns of ``metric`` between consecutive versions.
+
+    Each regression names ``program``, ``before`` and ``after`` versions, their
+    ``before_p50``/``after_p50``, ``change`` (relative change of the geometric mean)
+    and the one-sided ``p_value``. Runs without a recorded version are not compared.
+    """
+    found = []
+    for program in _selected(summary, programs):
+        previous = None
+        for version, stats in _ordered_versions(summary["programs"][program]):
+            accumulator = stats["metrics"].get(metric)
+            if version == UNKNOWN_VERSION or not accumulator or accumulator["n"] < 2:
+                continue
+            if previous is not None:
+                change, p_value = compare(previous[1], accumulator)
+                if p_value < alpha and change >= min_change:
+                    found.append(
+                        {
+                            "program": program,
+                            "metric": metric,
+                            "before": previous[0],
+                            "after": version,
+                            "before_p50": percentiles(previous[1], (0.5,))[0],
+                            "after_p50": percentiles(accumulator, (0.5,))[0],
+                            "change": change,
+                            "p_value": p_value,
+                        }
+                    )
+            previous = (version, accumulator)
+    return found
+
+
+def compare(before, after):
+    """Compare two metric accumulators with Welch's t-test on log values.
+
+    Returns ``(change, p_value)``: the relative change of the geometric mean and the
+    one-sided p-value of ``after`` being no slower than ``before``.
+    """
+    mean_before, variance_before = _moments(before)
+    mean_after, variance_after = _moments(after)
+    change = math.exp(mean_after - mean_before) - 1.0
+    error_before = variance_before / before["n"]
+    error_after = variance_after / after["n"]
+    error = error_before + error_after
+    difference = mean_after - mean_before
+    if error <= 0:
+        return change, 0.0 if difference > 0 else 1.0
+    t = difference / math.sqrt(error)
+    freedom = error * error / (
+        error_before * error_before / (before["n"] - 1)
+        + error_after * error_after / (after["n"] - 1)
+    )
+    return change, student_t_sf(t, freedom)
+
+
+def student_t_sf(t, freedom):
+    """Return P(T > t) for Student's t distribution with ``freedom`` degrees of freedom."""
+    tail = 0.5 * _incomplete_beta(freedom / 2.0, 0.5, freedom / (freedom + t * t))
+    return tail if t > 0 else 1.0 - tail
+
+
+def percentiles(accumulator, quantiles=PERCENTILES):
+    """Return the values at ``quantiles`` (ascending) from an accumulator's histogram."""
+    total = accumulator["n"] if accumulator else 0
+    if not total:
+        return [None] * len(quantiles)
+    buckets = sorted((int(key), count) for key, count in accumulator["buckets"].items())
+    values = []
+    seen = 0
+    position = 0
+    for quantile in quantiles:
+        rank = max(1, math.ceil(quantile * total))
+        while seen + buckets[position][1] < rank:
+            seen += buckets[position][1]
+            position += 1
+        values.append(2.0 ** ((buckets[position][0] + 0.5) / BUCKETS_PER_DOUBLING))
+    return values
+
+
+def _empty_summary(inode):
+    return {"version": SUMMARY_VERSION, "inode": inode, "offset": 0, "records": 0, "programs": {}}
+
+
+def _read_summary(path):
+    try:
+        with open(path, "r", encoding="utf-8") as handle:
+            summary = json.load(handle)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as exc:
+        raise StatsError("Failed to read run statistics {0}: {1}".format(path, exc))
+    if summary.get("version") != SUMMARY_VERSION:
+        return None
+    return summary
+
+
+def _write_summary(path, summary):
+    temporary = "{0}.{1}.tmp".format(path, os.getpid())
+    try:
+        with open(temporary, "w", encoding="utf-8") as handle:
+            json.dump(summary, handle, separators=(",", ":"))
+        os.replace(temporary, path)
+    except OSError as exc:
+        raise StatsError("Failed to write run statistics {0}: {1}".format(path, exc))
+
+
+def _add_record(summary, record):
+    program = record.get("program")
+    if not program:
+        return
+    version = record.get("version") or UNKNOWN_VERSION
+    versions = summary["programs"].setdefault(program, {})
+    stats = versions.get(version)
+    if stats is None:
+        stats = versions[version] = {
+            "first_seen": summary["records"],
+            "runs": 0,
+            "failures": 0,
+            "metrics": {},
+        }
+    summary["records"] += 1
+    stats["runs"] += 1
+    if record.get("exit_status") != 0:
+        stats["failures"] += 1
+        return
+    for metric in METRICS:
+        value = record.get(metric)
+        if value is None:
+            continue
+        logged = math.log(max(value, _FLOOR))
+        accumulator = stats["metrics"].get(metric)
+        if accumulator is None:
+            accumulator = stats["metrics"][metric] = _empty_accumulator()
+        accumulator["n"] += 1
+        accumulator["sum"] += logged
+        accumulator["sumsq"] += logged * logged
+        key = str(math.floor(logged / math.log(2) * BUCKETS_PER_DOUBLING))
+        accumulator["buckets"][key] = accumulator["buckets"].get(key, 0) + 1
+
+
+def _empty_accumulator():
+    return {"n": 0, "sum": 0.0, "sumsq": 0.0, "buckets": {}}
+
+
+def _merge(accumulators):
+    merged = _empty_accumulator()
+    for accumulator in accumulators:
+        if not accumulator:
+            continue
+        merged["n"] += accumulator["n"]
+        merged["sum"] += accumulator["sum"]
+        merged["sumsq"] += accumulator["sumsq"]
+        for key, count in accumulator["buckets"].items():
+            merged["buckets"][key] = merged["buckets"].get(key, 0) + count
+    return merged
+
+
+def _moments(accumulator):
+    count = accumulator["n"]
+    mean = accumulator["sum"] / count
+    variance = max(0.0, (accumulator["sumsq"] - count * mean * mean) / (count - 1))
+    return mean, variance
+
+
+def _selected(summary, programs):
+    names = sorted(summary["programs"])
+    if programs:
+        wanted = set(programs)
+        names = [name for name in names if name in wanted]
+    return names
+
+
+def _ordered_versions(versions):
+    return sorted(versions.items(), key=lambda item: item[1]["first_seen"])
+
+
+def _incomplete_beta(a, b, x):
+    # Regularised incomplete beta function I_x(a, b) by Lentz's continued fraction.
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+    front = math.exp(
+        math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b)
+        + a * math.log(x) + b * math.log1p(-x)
+    )
+    if x < (a + 1.0) / (a + b + 2.0):
+        return front * _beta_fraction(a, b, x) / a
+    return 1.0 - front * _beta_fraction(b, a, 1.0 - x) / b
+
+
+def _beta_fraction(a, b, x):
+    tiny = 1e-300
+    c = 1.0
+    d = 1.0 - (a + b) * x / (a + 1.0)
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    result = d
+    for m in range(1, 500):
+        for numerator in (
+            m * (b - m) * x / ((a + 2 * m - 1.0) * (a + 2 * m)),
+            -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1.0)),
+        ):
+            d = 1.0 + numerator * d
+            d = 1.0 / (d if abs(d) > tiny else tiny)
+            c = 1.0 + numerator / c
+            c = c if abs(c) > tiny else tiny
+            delta = c * d
+            result *= delta
+        if abs(delta - 1.0) < 1e-14:
+            break
+    return result
@@ -2,6 +2,8 @@
 
 import os
 
+from . import runtimes
+
 
 class TemplateError(Exception):
     """Raised when command templating fails."""
@@ -23,6 +25,14 @@ def render_command(registry_entry, params_values, project_root=None):
     resolved = []
     params_inserted = False
     consumed_params = set()
+    replacements = {
+        "{project_root}": project_root,
+        "{entrypoint}": registry_entry.get("entrypoint"),
+        "{name}": registry_entry.get("name"),
+        "{output}": params_values.get("output"),
+        "{batch_manifest}": params_values.get("batch_manifest"),
+        "{batch_results}": params_values.get("batch_results"),
+    }
     for token in command_template:
         if token == "{params}":
             resolved.extend(
@@ -33,7 +43,7 @@ def render_command(registry_entry, params_values, project_root=None):
 
         resolved.append(
             _expand_token(
-                token, registry_entry, params_values, project_root, consumed_params
+                token, registry_entry, params_values, replacements, consumed_params
             )
         )
 
@@ -41,16 +51,12 @@ def render_command(registry_entry, params_values, project_root=None):
         resolved.extend(
             _render_params_flags(registry_entry, params_values, consumed_params)
         )
-    return resolved
+    return runtimes.apply_interpreter(registry_entry, resolved)
 
 
-def _expand_token(token, registry_entry, params_values, project_root, consumed):
-    replacements = {
-        "{project_root}": project_root,
-        "{entrypoint}": registry_entry.get("entrypoint"),
-        "{name}": registry_entry.get("name"),
-        "{output}": params_values.get("output"),
-    }
+def _expand_token(token, registry_entry, params_values, replacements, consumed):
+    if "{" not in token and token[:1] not in ("'", '"'):
+        return token
 
     for placeholder, value in replacements.items():
         if placeholder in token:
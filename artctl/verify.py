@@ -0,0 +1,163 @@
+"""Structural verification of generator output files."""
+
+import mmap
+import os
+import struct
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+VERIFY_MODES = ("exists", "magic", "structure")
+DEFAULT_MODE = "exists"
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+MAGIC_NUMBERS = {
+    "png": [PNG_SIGNATURE],
+    "jpg": [b"\xff\xd8\xff"],
+    "jpeg": [b"\xff\xd8\xff"],
+    "gif": [b"GIF87a", b"GIF89a"],
+    "bmp": [b"BM"],
+    "tif": [b"II*\x00", b"MM\x00*"],
+    "tiff": [b"II*\x00", b"MM\x00*"],
+    "webp": [b"RIFF"],
+    "pdf": [b"%PDF-"],
+}
+
+_MAGIC_READ_SIZE = 16
+_CHUNK_HEADER = struct.Struct(">I4s")
+
+
+def check_file(path, mode=DEFAULT_MODE, min_size=None, extension=None):
+    """Return ``None`` if ``path`` passes verification, otherwise a reason string.
+
+    ``exists`` only requires the file to exist; ``magic`` also rejects empty files and
+    files whose leading bytes do not match the format implied by ``extension`` (or the
+    file name); ``structure`` additionally walks PNG chunks and checks every CRC.
+    Formats without a known signature pass the magic and structure checks.
+    """
+    if mode not in VERIFY_MODES:
+        return "unknown verification mode '{0}'".format(mode)
+    try:
+        size = os.stat(path).st_size
+    except FileNotFoundError:
+        return "file does not exist"
+    except OSError as exc:
+        return "cannot stat file: {0}".format(exc)
+
+    if min_size is not None and size < min_size:
+        return "file is {0} bytes, expected at least {1}".format(size, min_size)
+    if mode == "exists":
+        return None
+    if size == 0:
+        return "file is empty"
+
+    if extension is None:
+        extension = os.path.splitext(path)[1]
+    extension = extension.lstrip(".").lower()
+    signatures = MAGIC_NUMBERS.get(extension)
+    if not signatures:
+        return None
+
+    try:
+        with open(path, "rb") as handle:
+            if mode == "structure" and extension == "png":
+                return _check_png_structure(handle, size)
+            header = handle.read(_MAGIC_READ_SIZE)
+    except OSError as exc:
+        return "cannot read file: {0}".format(exc)
+    if not any(header.startswith(signature) for signature in signatures):
+        return "missing {0} signature".format(extension.upper())
+    if extension == "webp" and header[8:12] != b"WEBP":
+        return "missing WEBP signature"
+    return None
+
+
+def _check_png_structure(handle, size):
+    with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        view = memoryview(mapped)
+        try:
+            return _walk_png_chunks(view, size)
+        finally:
+            view.release()
+
+
+def _walk_png_chunks(view, size):
+    if view[: len(PNG_SIGNATURE)] != PNG_SIGNATURE:
+        return "missing PNG signature"
+    offset = len(PNG_SIGNATURE)
+    first = True
+    while True:
+        if offset + _CHUNK_HEADER.size > size:
+            return "truncated before IEND chunk"
+        length, chunk_type = _CHUNK_HEADER.unpack_from(view, offset)
+        data_end = offset + _CHUNK_HEADER.size + length
+        if data_end + 4 > size:
+            return "truncated {0} chunk at offset {1}".format(_chunk_name(chunk_type), offset)
+        if first and chunk_type != b"IHDR":
+            return "first chunk is {0}, expected IHDR".format(_chunk_name(chunk_type))
+        first = False
+        expected_crc = struct.unpack_from(">I", view, data_end)[0]
+        if zlib.crc32(view[offset + 4 : data_end]) != expected_crc:
+            return "CRC mismatch in {0} chunk at offset {1}".format(
+                _chunk_name(chunk_type), offset
+            )
+        offset = data_end + 4
+        if chunk_type == b"IEND":
+            if offset != size:
+                return "{0} trailing bytes after IEND".format(size - offset)
+            return None
+
+
+def _chunk_name(chunk_type):
+    return chunk_type.decode("ascii", "replace")
+
+
+def iter_output_files(root, extensions=None):
+    """Yield regular files under ``root``, skipping hidden files and directories."""
+    if extensions is not None:
+        extensions = {extension.lstrip(".").lower() for extension in extensions}
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as iterator:
+                entries = sorted(iterator, key=lambda item: item.name)
+        except OSError:
+            continue
+        subdirectories = []
+        for item in entries:
+            if item.name.startswith("."):
+                continue
+            if item.is_dir(follow_symlinks=False):
+                subdirectories.append(item.path)
+            elif item.is_file(follow_symlinks=False):
+                extension = os.path.splitext(item.name)[1].lstrip(".").lower()
+                if extensions is None and extension not in MAGIC_NUMBERS:
+                    continue
+                if extensions is not None and extension not in extensions:
+                    continue
+                yield item.path
+        stack.extend(reversed(subdirectories))
+
+
+def verify_tree(root, mode="structure", min_size=None, extensions=None, jobs=None):
+    """Verify output files under ``root`` in parallel.
+
+    Yields ``(path, reason)`` pairs in walk order; ``reason`` is ``None`` for files that
+    pass. Only files with a known image extension are checked unless ``extensions``
+    lists the ones to include.
+    """
+    jobs = jobs or min(32, (os.cpu_count() or 1) * 2)
+    window = jobs * 4
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        # Bound the number of queued checks so huge trees are not materialised up front.
+        for path in iter_output_files(root, extensions):
+            pending.append((path, executor.submit(check_file, path, mode, min_size)))
+            if len(pending) >= window:
+                done_path, future = pending.popleft()
+                yield done_path, future.result()
+        while pending:
+            done_path, future = pending.popleft()
+            yield done_path, future.result()
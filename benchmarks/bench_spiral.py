@@ -0,0 +1,100 @@
+"""Compare the vectorised and per-point spiral renderers in generators/spiral.py.
+
+Usage::
+
+    uv run --with numpy python benchmarks/bench_spiral.py --turns 20 200 2000
+
+Each renderer is timed as the best of ``--repeat`` runs; the vectorised column is
+skipped when NumPy is not installed. Both renderers must produce the same image (up
+to one grey level of floating-point rounding), which is checked on every size.
+"""
+
+import argparse
+import importlib.util
+import os
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_spiral():
+    path = os.path.join(ROOT, "generators", "spiral.py")
+    spec = importlib.util.spec_from_file_location("spiral", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def best_of(repeat, func, *args):
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def max_difference(naive, vectorized):
+    flat = vectorized.reshape(-1)
+    return max(abs(a - int(b)) for a, b in zip(naive, flat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, nargs="+", default=[20, 200, 2000])
+    parser.add_argument("--size", type=int, default=1024)
+    parser.add_argument("--radius", type=int, default=400)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--skip-naive-above",
+        type=int,
+        default=None,
+        metavar="TURNS",
+        help="Only time the vectorised renderer above this turn count.",
+    )
+    args = parser.parse_args()
+
+    spiral = load_spiral()
+    if spiral.numpy is None:
+        print("NumPy is not installed; timing the per-point renderer only.")
+    print(
+        "{0:>8} {1:>10} {2:>12} {3:>12} {4:>8}".format(
+            "turns", "samples", "naive s", "numpy s", "speedup"
+        )
+    )
+    for turns in args.turns:
+        samples = spiral.sample_count(turns, args.radius)
+        naive_time = vector_time = None
+        naive = vectorized = None
+        if args.skip_naive_above is None or turns <= args.skip_naive_above:
+            naive_time, naive = best_of(
+                args.repeat, spiral.render_naive, args.size, turns, args.radius
+            )
+        if spiral.numpy is not None:
+            vector_time, vectorized = best_of(
+                args.repeat, spiral.render_vectorized, args.size, turns, args.radius
+            )
+        if naive is not None and vectorized is not None:
+            difference = max_difference(naive, vectorized)
+            if difference > 1:
+                raise SystemExit(
+                    "Renderers disagree by {0} grey levels at {1} turns.".format(
+                        difference, turns
+                    )
+                )
+        speedup = naive_time / vector_time if naive_time and vector_time else None
+        print(
+            "{0:>8} {1:>10} {2:>12} {3:>12} {4:>8}".format(
+                turns,
+                samples,
+                "-" if naive_time is None else "{0:.3f}".format(naive_time),
+                "-" if vector_time is None else "{0:.3f}".format(vector_time),
+                "-" if speedup is None else "{0:.1f}x".format(speedup),
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Write a synthetic registry for scalability tests and local profiling.
+
+Usage::
+
+    uv run python benchmarks/make_registry.py /tmp/big-registry --count 100000 --load
+
+Entries are spread over nested directories (``--depth`` levels, ``--fanout`` per
+level), mix ``.yaml`` and ``.yml`` files, python and node runtimes, tags, path
+templates and every param type with ranges, choices and required flags. The content
+is derived from ``--seed`` only, so the same arguments always produce the same tree.
+``--duplicates N`` adds N more files that reuse names already defined elsewhere,
+which the registry loader must reject.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PARAM_TYPES = ("int", "float", "enum", "bool", "string")
+WORDS = (
+    "spiral", "noise", "field", "grid", "flow", "wave", "orbit", "bloom", "crystal",
+    "tile", "maze", "drift", "ember", "lattice", "ripple", "shard", "pulse", "moire",
+)
+TAGS = ("example", "python", "node", "print", "animation", "texture", "mono", "color")
+
+
+def program_name(index):
+    return "prog_{0:06d}".format(index)
+
+
+def entry_path(root, index, depth=2, fanout=16):
+    parts = []
+    value = index
+    for _ in range(depth):
+        parts.append("group_{0:02d}".format(value % fanout))
+        value //= fanout
+    extension = ".yml" if index % 5 == 0 else ".yaml"
+    return os.path.join(root, *parts, program_name(index) + extension)
+
+
+def entry_yaml(name, rng, max_params=12):
+    """Return the YAML text of one synthetic registry entry."""
+    runtime = "node" if rng.random() < 0.25 else "python"
+    words = rng.sample(WORDS, 3)
+    lines = [
+        "name: {0}".format(name),
+        "description: Synthetic {0} {1} generator with {2} output.".format(*words),
+        "runtime: {0}".format(runtime),
+        "entrypoint: generators/{0}.{1}".format(name, "js" if runtime == "node" else "py"),
+        "command:",
+        "  - {0}".format("node" if runtime == "node" else "python3"),
+        '  - "{entrypoint}"',
+        "  - --output",
+        '  - "{output}"',
+        '  - "{params}"',
+        "params:",
+    ]
+    count = rng.randint(0, max_params)
+    for number in range(count):
+        kind = PARAM_TYPES[rng.randrange(len(PARAM_TYPES))]
+        lines.append("  - name: p{0}_{1}".format(number, rng.choice(WORDS)))
+        lines.append("    type: {0}".format(kind))
+        lines.append("    help: Synthetic {0} parameter.".format(kind))
+        if kind == "int":
+            low = rng.randint(0, 50)
+            lines.append("    default: {0}".format(low + 1))
+            lines.append("    min: {0}".format(low))
+            lines.append("    max: {0}".format(low + rng.randint(1, 1000)))
+        elif kind == "float":
+            lines.append("    default: {0:.3f}".format(rng.random()))
+            lines.append("    min: 0.0")
+            lines.append("    max: 1.0")
+        elif kind == "enum":
+            choices = rng.sample(WORDS, rng.randint(2, 6))
+            lines.append("    default: {0}".format(choices[0]))
+            lines.append("    choices: [{0}]".format(", ".join(choices)))
+        elif kind == "bool":
+            lines.append("    default: {0}".format(rng.choice(("true", "false"))))
+        elif rng.random() < 0.2:
+            lines.append("    required: true")
+        else:
+            lines.append("    default: {0}".format(rng.choice(WORDS)))
+    if not count:
+        lines[-1] = "params: []"
+    lines.append("output:")
+    lines.append("  required: true")
+    lines.append("  extension: png")
+    if rng.random() < 0.3:
+        lines.append('  path_template: "{date_path}/{name}-{timestamp}.png"')
+    lines.append("tags:")
+    for tag in rng.sample(TAGS, rng.randint(1, 3)):
+        lines.append("  - {0}".format(tag))
+    return "\n".join(lines) + "\n"
+
+
+def write_registry(root, count, seed=0, duplicates=0, depth=2, fanout=16, max_params=12):
+    """Write ``count`` entries (plus ``duplicates`` clashing ones) under ``root``.
+
+    Returns the list of program names written, in index order.
+    """
+    rng = random.Random(seed)
+    names = []
+    created = set()
+    for index in range(count):
+        name = program_name(index)
+        path = entry_path(root, index, depth, fanout)
+        _write(path, entry_yaml(name, rng, max_params), created)
+        names.append(name)
+    for number in range(duplicates):
+        name = names[rng.randrange(len(names))]
+        path = os.path.join(root, "duplicates", "dup_{0:06d}.yaml".format(number))
+        _write(path, entry_yaml(name, rng, max_params), created)
+    return names
+
+
+def _write(path, content, created):
+    directory = os.path.dirname(path)
+    if directory not in created:
+        os.makedirs(directory, exist_ok=True)
+        created.add(directory)
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write(content)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("root", help="Directory to write the registry into.")
+    parser.add_argument("--count", type=int, default=1000, help="Number of entries.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--duplicates", type=int, default=0, help="Clashing entries to add.")
+    parser.add_argument("--depth", type=int, default=2, help="Directory nesting levels.")
+    parser.add_argument("--fanout", type=int, default=16, help="Directories per level.")
+    parser.add_argument("--max-params", type=int, default=12, help="Params per entry, at most.")
+    parser.add_argument(
+        "--load", action="store_true", help="Time artctl's load_registry on the result."
+    )
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    write_registry(
+        args.root, args.count, args.seed, args.duplicates, args.depth, args.fanout,
+        args.max_params,
+    )
+    print("Wrote {0} entries in {1:.2f}s.".format(args.count, time.perf_counter() - started))
+    if args.load:
+        sys.path.insert(0, ROOT)
+        from artctl import registry
+
+        started = time.perf_counter()
+        entries = registry.load_registry(args.root)
+        elapsed = time.perf_counter() - started
+        print(
+            "Loaded {0} entries in {1:.2f}s ({2:.1f} us per entry).".format(
+                len(entries), elapsed, elapsed / max(len(entries), 1) * 1e6
+            )
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,26 +1,194 @@
-"""Sample spiral generator writing a placeholder PNG image."""
+"""Sample spiral generator rasterising an anti-aliased Archimedean spiral.
+
+The spiral is sampled densely enough that neighbouring points are under a pixel apart,
+and every sample is splatted bilinearly onto the four pixels around it. With NumPy
+installed all samples are computed and splatted at once; otherwise a per-point loop
+produces the same image more slowly. The result is written as an 8-bit grayscale PNG
+with :func:`artctl.sdk.write_png`, or into a shared-memory frame for an
+``shm:<segment>`` output (``mode: shm``).
+
+``--batch MANIFEST --batch-results RESULTS`` renders every item of an artctl batch
+in one process; items of the same size are rasterised together in one vectorised
+pass when NumPy is available. Progress is reported through :func:`artctl.sdk.progress`
+when artctl is watching.
+"""
 
 import argparse
-import base64
+import math
+import os
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
-PLACEHOLDER_PNG = base64.b64decode(
-    "iVBORw0KGgoAAAANSUhEUgAAAEAAAABACAYAAACqaXHeAAAAOklEQVR4nO3BAQEAAACCIP+vbkcKBQAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA"
-    "AADwGgAB9gABNDBthQAAAABJRU5ErkJggg=="
-)
+SAMPLES_PER_PIXEL = 2.0
+# Upper bound on canvas pixels rendered together in one vectorised batch pass.
+BATCH_PIXELS = 16 * 1024 * 1024
 
 
 def parse_args():
-    parser = argparse.ArgumentParser(description="Generate a sample spiral PNG.")
-    parser.add_argument("--output", required=True, help="Output file path.")
+    parser = argparse.ArgumentParser(description="Generate a spiral PNG.")
+    parser.add_argument("--output", help="Output file path.")
     parser.add_argument("--turns", type=int, default=20, help="Number of turns.")
     parser.add_argument("--radius", type=int, default=400, help="Radius value.")
-    return parser.parse_args()
+    parser.add_argument("--size", type=int, default=1024, help="Image width and height.")
+    parser.add_argument("--batch", metavar="MANIFEST", help="Render an artctl batch manifest.")
+    parser.add_argument("--batch-results", metavar="PATH", help="Where to report batch results.")
+    args = parser.parse_args()
+    if args.batch and not args.batch_results:
+        parser.error("--batch requires --batch-results")
+    if not args.batch and not args.output:
+        parser.error("--output is required")
+    return args
+
+
+def sample_count(turns, radius):
+    """Return how many samples keep consecutive points under half a pixel apart."""
+    # The arc length of r = radius * t over `turns` revolutions is about pi * turns * radius.
+    return max(2, int(math.pi * max(turns, 1) * max(radius, 1) * SAMPLES_PER_PIXEL) + 1)
+
+
+def render_naive(size, turns, radius):
+    """Rasterise the spiral one sample at a time; returns a row-major bytearray."""
+    count = sample_count(turns, radius)
+    center = (size - 1) / 2.0
+    canvas = [0.0] * (size * size)
+    for index in range(count):
+        t = index / (count - 1)
+        angle = 2.0 * math.pi * turns * t
+        x = center + radius * t * math.cos(angle)
+        y = center + radius * t * math.sin(angle)
+        x0 = math.floor(x)
+        y0 = math.floor(y)
+        fx = x - x0
+        fy = y - y0
+        for dx, dy, weight in (
+            (0, 0, (1.0 - fx) * (1.0 - fy)),
+            (1, 0, fx * (1.0 - fy)),
+            (0, 1, (1.0 - fx) * fy),
+            (1, 1, fx * fy),
+        ):
+            px = x0 + dx
+            py = y0 + dy
+            if 0 <= px < size and 0 <= py < size:
+                canvas[py * size + px] += weight
+    scale = 255.0 / SAMPLES_PER_PIXEL
+    return bytearray(min(255, int(value * scale)) for value in canvas)
+
+
+def render_vectorized(size, turns, radius):
+    """Rasterise the spiral with NumPy; returns a ``(size, size)`` uint8 array."""
+    return render_many_vectorized(size, [(turns, radius)])[0]
+
+
+def render_many_vectorized(size, specs):
+    """Rasterise several ``(turns, radius)`` spirals of one size in a single pass.
+
+    Samples of all spirals are concatenated and splatted into one stacked canvas;
+    returns a ``(len(specs), size, size)`` uint8 array.
+    """
+    counts = numpy.array([sample_count(turns, radius) for turns, radius in specs])
+    item = numpy.repeat(numpy.arange(len(specs)), counts)
+    starts = numpy.repeat(numpy.cumsum(counts) - counts, counts)
+    t = (numpy.arange(counts.sum()) - starts) / numpy.repeat(counts - 1, counts)
+    turns = numpy.repeat(numpy.array([spec[0] for spec in specs], dtype=numpy.float64), counts)
+    radius = numpy.repeat(numpy.array([spec[1] for spec in specs], dtype=numpy.float64), counts)
+    center = (size - 1) / 2.0
+    angle = (2.0 * math.pi) * turns * t
+    x = center + radius * t * numpy.cos(angle)
+    y = center + radius * t * numpy.sin(angle)
+    x0 = numpy.floor(x)
+    y0 = numpy.floor(y)
+    fx = x - x0
+    fy = y - y0
+    x0 = x0.astype(numpy.int64)
+    y0 = y0.astype(numpy.int64)
+    offset = item * (size * size)
+
+    total = len(specs) * size * size
+    canvas = numpy.zeros(total, dtype=numpy.float64)
+    for dx, dy, weight in (
+        (0, 0, (1.0 - fx) * (1.0 - fy)),
+        (1, 0, fx * (1.0 - fy)),
+        (0, 1, (1.0 - fx) * fy),
+        (1, 1, fx * fy),
+    ):
+        px = x0 + dx
+        py = y0 + dy
+        inside = (px >= 0) & (px < size) & (py >= 0) & (py < size)
+        canvas += numpy.bincount(
+            offset[inside] + py[inside] * size + px[inside],
+            weights=weight[inside],
+            minlength=total,
+        )
+    scale = 255.0 / SAMPLES_PER_PIXEL
+    image = numpy.minimum(canvas * scale, 255.0).astype(numpy.uint8)
+    return image.reshape(len(specs), size, size)
+
+
+def render(size, turns, radius):
+    if numpy is not None:
+        return render_vectorized(size, turns, radius)
+    return render_naive(size, turns, radius)
+
+
+def render_batch(manifest, results_path):
+    """Render every manifest item, grouping same-size items for vectorised passes."""
+    from artctl import sdk
+
+    groups = {}
+    with sdk.BatchResults(results_path) as results:
+        for index, params, output in sdk.iter_batch(manifest):
+            try:
+                size = int(params.get("size", 1024))
+                spec = (int(params.get("turns", 20)), int(params.get("radius", 400)))
+                if size <= 0:
+                    raise ValueError("size must be positive")
+            except (TypeError, ValueError) as exc:
+                results.failed(index, exc)
+                continue
+            groups.setdefault(size, []).append((index, spec, output))
+
+        total = sum(len(members) for members in groups.values())
+        finished = 0
+        for size, members in groups.items():
+            step = max(1, BATCH_PIXELS // (size * size)) if numpy is not None else 1
+            for start in range(0, len(members), step):
+                chunk = members[start : start + step]
+                if numpy is not None:
+                    images = render_many_vectorized(size, [spec for _, spec, _ in chunk])
+                else:
+                    images = [render_naive(size, *chunk[0][1])]
+                for (index, _, output), pixels in zip(chunk, images):
+                    try:
+                        sdk.write_png(output, pixels, size, size)
+                    except (OSError, sdk.SDKError) as exc:
+                        results.failed(index, exc)
+                    else:
+                        results.ok(index)
+                    finished += 1
+                    sdk.progress(finished, total, "wrote {0}".format(os.path.basename(output)))
 
 
 def main():
     args = parse_args()
-    with open(args.output, "wb") as handle:
-        handle.write(PLACEHOLDER_PNG)
+    if args.batch:
+        render_batch(args.batch, args.batch_results)
+        return 0
+    if args.size <= 0:
+        raise SystemExit("--size must be positive")
+    from artctl import sdk
+
+    sdk.progress(0, 2, "rendering {0} turns".format(args.turns))
+    pixels = render(args.size, args.turns, args.radius)
+    sdk.progress(1, 2, "writing output")
+    if sdk.is_shared_target(args.output):
+        with sdk.shared_frame(args.output, args.size, args.size) as frame:
+            frame[:] = memoryview(pixels).cast("B")
+    else:
+        sdk.write_png(args.output, pixels, args.size, args.size)
+    sdk.progress(2, 2, "done")
     return 0
 
 
@@ -0,0 +1,173 @@
+import asyncio
+import hashlib
+import os
+import sys
+import textwrap
+
+import pytest
+
+import artctl.api as api
+import artctl.coalesce as coalesce
+import artctl.params as params
+import artctl.runner as runner
+import artctl.sdk as sdk
+
+GENERATOR = textwrap.dedent(
+    """
+    import sys
+
+    output, turns = sys.argv[1], int(sys.argv[2])
+    if turns < 0:
+        sys.exit(3)
+    with open(output, "wb") as handle:
+        handle.write(b"x" * turns)
+    """
+)
+
+
+def build_entry(tmp_path):
+    script = tmp_path / "gen.py"
+    script.write_text(GENERATOR, encoding="utf-8")
+    return {
+        "name": "blob",
+        "entrypoint": str(script),
+        "command": [sys.executable, "{entrypoint}", "{output}", "{params.turns}"],
+        "params": [{"name": "turns", "type": "int", "default": 4}],
+        "output": {"required": True, "path_template": "{name}-{params.turns}.bin"},
+    }
+
+
+def test_resolve_accepts_mapping_and_strings(tmp_path):
+    entry = build_entry(tmp_path)
+    assert api.resolve(entry, {"turns": 7}) == {"turns": 7}
+    assert api.resolve(entry, ["turns=8"]) == {"turns": 8}
+    assert api.resolve(entry) == {"turns": 4}
+    with pytest.raises(params.ParameterError):
+        api.resolve(entry, {"radius": 1})
+
+
+def test_plan_renders_command(tmp_path):
+    entry = build_entry(tmp_path)
+    run_plan = api.plan(entry, {"turns": 5}, base_dir=str(tmp_path / "out"))
+    assert run_plan.output_path == str(tmp_path / "out" / "blob-5.bin")
+    assert run_plan.command[-2:] == [run_plan.output_path, "5"]
+    assert run_plan.params == {"turns": 5}
+
+
+def test_run_returns_structured_result(tmp_path):
+    entry = build_entry(tmp_path)
+    result = asyncio.run(api.run(entry, {"turns": 6}, base_dir=str(tmp_path / "out")))
+    assert result.ok
+    assert result.exit_status == 0
+    assert result.wall_time > 0
+    assert result.max_rss_kb > 0
+    with open(result.output_path, "rb") as handle:
+        assert handle.read() == b"xxxxxx"
+
+
+def test_run_many_reports_failures_in_order(tmp_path):
+    entry = build_entry(tmp_path)
+    requests = [(entry, {"turns": 1}), (entry, {"turns": -1}), (entry, {"turns": 2})]
+    results = asyncio.run(
+        api.run_many(requests, concurrency=2, base_dir=str(tmp_path / "out"))
+    )
+    assert [result.exit_status for result in results] == [0, 3, 0]
+    assert [result.ok for result in results] == [True, False, True]
+
+
+def test_run_many_coalesces_identical_requests(tmp_path):
+    entry = build_entry(tmp_path)
+    flight = coalesce.SingleFlight()
+    requests = [(entry, {"turns": 3})] * 3 + [(entry, {"turns": 4})]
+    results = asyncio.run(
+        api.run_many(requests, base_dir=str(tmp_path / "out"), coalescer=flight)
+    )
+    assert results[0] is results[1] is results[2]
+    assert results[3].output_path != results[0].output_path
+    assert all(result.ok for result in results)
+
+
+def test_run_does_not_coalesce_different_options(tmp_path):
+    entry = build_entry(tmp_path)
+    flight = coalesce.SingleFlight()
+
+    async def both():
+        return await asyncio.gather(
+            api.run(entry, {"turns": 3}, base_dir=str(tmp_path / "a"), coalescer=flight),
+            api.run(entry, {"turns": 3}, base_dir=str(tmp_path / "b"), coalescer=flight),
+        )
+
+    first, second = asyncio.run(both())
+    assert first is not second
+    assert first.output_path == str(tmp_path / "a" / "blob-3.bin")
+    assert second.output_path == str(tmp_path / "b" / "blob-3.bin")
+
+
+def test_run_publishes_staged_output(tmp_path):
+    entry = build_entry(tmp_path)
+    scratch = tmp_path / "scratch"
+    result = asyncio.run(
+        api.run(entry, {"turns": 2}, base_dir=str(tmp_path / "out"), scratch_dir=str(scratch))
+    )
+    assert result.ok
+    with open(result.output_path, "rb") as handle:
+        assert handle.read() == b"xx"
+    assert os.listdir(scratch) == []
+
+
+def test_failed_runs_leave_no_staged_output_or_frame(tmp_path, monkeypatch):
+    outputs = []
+
+    def interrupted(command, **kwargs):
+        output = command[2]
+        outputs.append(output)
+        if output.startswith(sdk.SHM_PREFIX):
+            with sdk.shared_frame(output, 2, 2):
+                pass
+        else:
+            with open(output, "wb") as handle:
+                handle.write(b"partial")
+        raise runner.RunnerError("Generator timed out.")
+
+    monkeypatch.setattr(runner, "run_process", interrupted)
+    entry = build_entry(tmp_path)
+    scratch = tmp_path / "scratch"
+    with pytest.raises(runner.RunnerError):
+        asyncio.run(
+            api.run(entry, {"turns": 2}, base_dir=str(tmp_path / "out"), scratch_dir=str(scratch))
+        )
+    assert os.listdir(scratch) == []
+    assert not os.path.exists(tmp_path / "out" / "blob-2.bin")
+
+    with pytest.raises(runner.RunnerError):
+        asyncio.run(api.run(entry, {"turns": 2}, output_mode="shm"))
+    with pytest.raises(sdk.SDKError):
+        sdk.SharedFrame(outputs[-1][len(sdk.SHM_PREFIX) :])
+
+
+def test_run_captures_streamed_output_with_digest(tmp_path):
+    entry = build_entry(tmp_path)
+    entry["output"]["mode"] = "stream"
+    catalog_path = tmp_path / "catalog.jsonl"
+    result = asyncio.run(
+        api.run(entry, {"turns": 3}, base_dir=str(tmp_path / "out"), catalog_path=str(catalog_path))
+    )
+    assert result.ok
+    assert result.command[2] == "/dev/stdout"
+    with open(result.output_path, "rb") as handle:
+        assert handle.read() == b"xxx"
+    assert result.output_size == 3
+    assert result.output_digest == hashlib.sha256(b"xxx").hexdigest()
+    assert result.output_digest in catalog_path.read_text()
+
+
+def test_run_shared_memory_frame_from_spiral():
+    entry = api.load("registry")["spiral"]
+    result = asyncio.run(api.run(entry, {"turns": 2, "radius": 10, "size": 21}, output_mode="shm"))
+    try:
+        assert result.ok
+        assert result.output_path is None
+        assert (result.frame.width, result.frame.height, result.frame.channels) == (21, 21, 1)
+        assert 255 in bytes(result.frame.pixels)
+    finally:
+        result.frame.close()
@@ -0,0 +1,87 @@
+import json
+import os
+
+import pytest
+
+import artctl.archive as archive
+
+
+def make_day(base, files):
+    day = base / "2025" / "01" / "02"
+    day.mkdir(parents=True)
+    for name, content in files.items():
+        path = day / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+    return day
+
+
+@pytest.mark.parametrize("compression", ["stored", "deflate"])
+def test_archive_day_writes_pack_and_index(tmp_path, compression):
+    day = make_day(
+        tmp_path,
+        {"spiral-000001.png": b"a" * 300, "sub/night_sky-000002.png": b"bc" * 50},
+    )
+
+    pack_path, members = archive.archive_day(str(day), compression=compression)
+
+    assert pack_path == str(tmp_path / "2025" / "01" / "02.zip")
+    assert sorted(members) == ["spiral-000001.png", "sub/night_sky-000002.png"]
+    assert not day.exists()
+    index = archive.load_index(pack_path)
+    assert index["members"]["spiral-000001.png"]["size"] == 300
+
+    destination = tmp_path / "restored" / "spiral.png"
+    size = archive.extract_member(pack_path, "spiral-000001.png", str(destination))
+    assert size == 300
+    assert destination.read_bytes() == b"a" * 300
+
+
+def test_extract_rejects_unknown_member_and_corrupt_pack(tmp_path):
+    day = make_day(tmp_path, {"spiral-000001.png": b"a" * 64})
+    pack_path, _ = archive.archive_day(str(day))
+
+    with pytest.raises(archive.ArchiveError, match="not found"):
+        archive.extract_member(pack_path, "missing.png", str(tmp_path / "out.png"))
+
+    index = archive.load_index(pack_path)
+    index["members"]["spiral-000001.png"]["crc"] ^= 1
+    with open(archive.index_path_for(pack_path), "w", encoding="utf-8") as handle:
+        json.dump(index, handle)
+    with pytest.raises(archive.ArchiveError, match="Checksum mismatch"):
+        archive.extract_member(pack_path, "spiral-000001.png", str(tmp_path / "out.png"))
+    assert not (tmp_path / "out.png").exists()
+
+
+def test_archive_day_refuses_to_overwrite_existing_pack(tmp_path):
+    day = make_day(tmp_path, {"spiral-000001.png": b"a"})
+    (tmp_path / "2025" / "01" / "02.zip").write_bytes(b"")
+
+    with pytest.raises(archive.ArchiveError, match="already exists"):
+        archive.archive_day(str(day))
+    assert day.exists()
+
+
+def test_split_location_and_relocate_records(tmp_path):
+    assert archive.split_location("outputs/2025/01/02.zip#a.png") == (
+        "outputs/2025/01/02.zip",
+        "a.png",
+    )
+    with pytest.raises(archive.ArchiveError):
+        archive.split_location("outputs/2025/01/02.zip")
+
+    original = str(tmp_path / "a.png")
+    records = [{"output": original}, {"output": "elsewhere.png"}, {"output": None}]
+    updated = archive.relocate_records(records, {os.path.abspath(original): "pack.zip#a.png"})
+    assert updated == 1
+    assert records[0]["output"] == "pack.zip#a.png"
+    assert records[1]["output"] == "elsewhere.png"
+
+
+def test_archive_day_refuses_files_it_would_not_pack(tmp_path):
+    day = make_day(tmp_path, {"spiral-000001.png": b"a", ".spiral-000002.png.partial": b"b"})
+
+    with pytest.raises(archive.ArchiveError, match="spiral-000002.png.partial"):
+        archive.archive_day(str(day))
+    assert (day / "spiral-000001.png").exists()
+    assert not (tmp_path / "2025" / "01" / "02.zip").exists()
@@ -0,0 +1,167 @@
+import os
+import sys
+import textwrap
+import threading
+
+import pytest
+
+import artctl.batch as batch
+
+BATCH_GENERATOR = textwrap.dedent(
+    """
+    import sys
+
+    from artctl import sdk
+
+    manifest, results_path = sys.argv[1], sys.argv[2]
+    with sdk.BatchResults(results_path) as results:
+        for index, params, output in sdk.iter_batch(manifest):
+            if params["turns"] < 0:
+                results.failed(index, "negative turns")
+                continue
+            if params["turns"] == 99:
+                sys.exit(5)
+            with open(output, "wb") as handle:
+                handle.write(b"x" * params["turns"])
+            results.ok(index)
+    """
+)
+
+
+def build_entry(tmp_path, batch_block=True):
+    script = tmp_path / "gen.py"
+    script.write_text(BATCH_GENERATOR, encoding="utf-8")
+    entry = {
+        "name": "blob",
+        "runtime": "python",
+        "entrypoint": str(script),
+        "command": [sys.executable, "-c", "raise SystemExit(1)", "{output}"],
+        "params": [{"name": "turns", "type": "int", "default": 4}],
+        "output": {"required": True, "min_size": 1},
+    }
+    if batch_block:
+        entry["batch"] = {
+            "command": [sys.executable, "{entrypoint}", "{batch_manifest}", "{batch_results}"],
+            "max_items": 2,
+        }
+    return entry
+
+
+def test_parse_and_expand_grid():
+    axes = batch.parse_grid(["turns=1:5:2", "radius=10,20", "scale=0.5:1.0:0.25"])
+    assert axes == [
+        ("turns", ["1", "3", "5"]),
+        ("radius", ["10", "20"]),
+        ("scale", ["0.5", "0.75", "1.0"]),
+    ]
+    points = batch.expand_grid(axes[:2])
+    assert len(points) == 6
+    assert points[0] == {"turns": "1", "radius": "10"}
+    assert points[-1] == {"turns": "5", "radius": "20"}
+    with pytest.raises(batch.BatchError):
+        batch.parse_grid(["turns"])
+    with pytest.raises(batch.BatchError):
+        batch.parse_grid(["turns=1:5:0"])
+    with pytest.raises(batch.BatchError):
+        batch.parse_grid(["turns=1,2", "turns=3"])
+
+
+def test_batch_size_respects_registry_limit(tmp_path):
+    entry = build_entry(tmp_path)
+    assert batch.batch_size(entry) == 2
+    assert batch.batch_size(entry, 10) == 2
+    assert batch.batch_size(entry, 1) == 1
+    assert batch.batch_size({"name": "x"}) == batch.DEFAULT_BATCH_SIZE
+
+
+def test_run_batch_maps_results_to_items(tmp_path):
+    entry = build_entry(tmp_path)
+    items = [
+        {"params": {"turns": 3}, "output": str(tmp_path / "a.bin")},
+        {"params": {"turns": -1}, "output": str(tmp_path / "b.bin")},
+        {"params": {"turns": 0}, "output": str(tmp_path / "c.bin")},
+    ]
+    usage, outcomes = batch.run_batch(entry, items)
+    assert usage["returncode"] == 0
+    assert outcomes[0] == {"exit_status": 0, "reason": None}
+    assert outcomes[1] == {"exit_status": 1, "reason": "negative turns"}
+    assert outcomes[2]["exit_status"] == 0
+    assert "expected at least 1" in outcomes[2]["reason"]
+
+
+def test_run_batch_reports_items_lost_to_a_crash(tmp_path):
+    entry = build_entry(tmp_path)
+    items = [
+        {"params": {"turns": 2}, "output": str(tmp_path / "a.bin")},
+        {"params": {"turns": 99}, "output": str(tmp_path / "b.bin")},
+    ]
+    _, outcomes = batch.run_batch(entry, items)
+    assert outcomes[0]["reason"] is None
+    assert outcomes[1] == {"exit_status": 5, "reason": "generator exited with status 5"}
+
+
+def test_run_sweep_chunks_items_into_batches(tmp_path):
+    entry = build_entry(tmp_path)
+    items = [
+        {"params": {"turns": turns}, "output": str(tmp_path / "{0}.bin".format(turns))}
+        for turns in range(1, 6)
+    ]
+    seen = []
+    outcomes, invocations = batch.run_sweep(
+        entry, items, jobs=2, on_result=lambda index, item, outcome: seen.append(index)
+    )
+    assert invocations == 3
+    assert sorted(seen) == [0, 1, 2, 3, 4]
+    assert all(outcome["reason"] is None for outcome in outcomes)
+
+
+def test_run_sweep_hands_out_worker_slots(tmp_path):
+    entry = build_entry(tmp_path, batch_block=False)
+    items = [{"params": {}, "output": str(tmp_path / "{0}.bin".format(n))} for n in range(6)]
+    outcomes, _ = batch.run_sweep(
+        entry, items, jobs=2, placement_for=lambda worker_index: {"worker": worker_index}
+    )
+    assert {outcome["placement"]["worker"] for outcome in outcomes} <= {0, 1}
+
+
+def test_run_sweep_spreads_batches_over_every_job(tmp_path):
+    entry = build_entry(tmp_path)
+    entry["batch"]["max_items"] = 100
+    items = [
+        {"params": {"turns": turns}, "output": str(tmp_path / "{0}.bin".format(turns))}
+        for turns in range(1, 8)
+    ]
+    assert batch.batch_size(entry, count=len(items), jobs=3) == 3
+
+    barrier = threading.Barrier(2, timeout=10)
+
+    def placement_for(worker_index):
+        # Both slots must be handed out at once for the barrier to release.
+        barrier.wait()
+        return {"worker": worker_index}
+
+    outcomes, invocations = batch.run_sweep(entry, items[:4], jobs=2, placement_for=placement_for)
+    assert invocations == 2
+    assert {outcome["placement"]["worker"] for outcome in outcomes} == {0, 1}
+    assert all(outcome["reason"] is None for outcome in outcomes)
+
+
+def test_run_sweep_without_batch_uses_regular_command(tmp_path):
+    entry = build_entry(tmp_path, batch_block=False)
+    items = [{"params": {"turns": 1}, "output": str(tmp_path / "a.bin")}]
+    outcomes, invocations = batch.run_sweep(entry, items)
+    assert invocations == 1
+    assert outcomes[0]["exit_status"] == 1
+
+
+def test_run_sweep_does_not_rewrite_deduped_copies(tmp_path):
+    entry = build_entry(tmp_path)
+    output = tmp_path / "a.bin"
+    output.write_bytes(b"old")
+    copy = tmp_path / "copy.bin"
+    os.link(output, copy)
+
+    outcomes, _ = batch.run_sweep(entry, [{"params": {"turns": 5}, "output": str(output)}])
+    assert outcomes[0]["reason"] is None
+    assert output.read_bytes() == b"x" * 5
+    assert copy.read_bytes() == b"old"
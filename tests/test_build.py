@@ -0,0 +1,182 @@
+import os
+import sys
+import textwrap
+
+import pytest
+
+import artctl.build as build
+import artctl.registry as registry
+
+GENERATOR = """
+import argparse
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--output", required=True)
+parser.add_argument("--text", default="")
+parser.add_argument("--source", default="")
+parser.add_argument("--note", default="")
+parser.add_argument("--fail", default="false")
+args = parser.parse_args()
+if args.fail.lower() == "true":
+    raise SystemExit(3)
+data = args.text
+if args.source:
+    with open(args.source, "r", encoding="utf-8") as handle:
+        data = handle.read() + "+" + data
+with open(args.output, "w", encoding="utf-8") as handle:
+    handle.write(data)
+"""
+
+
+def write_setup(tmp_path, targets):
+    script = tmp_path / "writer.py"
+    script.write_text(GENERATOR, encoding="utf-8")
+    registry_dir = tmp_path / "registry"
+    registry_dir.mkdir(exist_ok=True)
+    (registry_dir / "writer.yaml").write_text(
+        textwrap.dedent(
+            """
+            name: writer
+            description: Writes text, optionally after an upstream file.
+            runtime: python
+            entrypoint: {script}
+            command:
+              - {python}
+              - "{{entrypoint}}"
+              - --output
+              - "{{output}}"
+              - --text
+              - "{{params.text}}"
+              - --source
+              - "{{params.source}}"
+              - --note
+              - "{{params.note}}"
+              - --fail
+              - "{{params.fail}}"
+            params:
+              - name: text
+                type: string
+                default: ""
+              - name: source
+                type: file
+                default: ""
+              - name: note
+                type: string
+                default: ""
+              - name: fail
+                type: bool
+                default: false
+            output:
+              extension: txt
+            """
+        ).format(script=script, python=sys.executable),
+        encoding="utf-8",
+    )
+    project = tmp_path / "build.yaml"
+    project.write_text(textwrap.dedent(targets).strip() + "\n", encoding="utf-8")
+    entries = registry.load_registry(str(registry_dir))
+    return build.load_project(str(project), entries), entries
+
+
+CHAIN = """
+outputs: out
+targets:
+  base:
+    program: writer
+    params: {text: hello, note: first}
+  derived:
+    program: writer
+    params:
+      text: world
+      source: "{targets.base}"
+  other:
+    program: writer
+    params: {text: alone}
+"""
+
+
+def statuses(results):
+    return {result["name"]: result["status"] for result in results}
+
+
+def test_load_project_resolves_references(tmp_path):
+    project, entries = write_setup(tmp_path, CHAIN)
+    targets = project["targets"]
+    assert targets["derived"]["deps"] == ["base"]
+    assert targets["base"]["output"] == str(tmp_path / "out" / "base.txt")
+    values = build.resolve_values(targets["derived"], entries["writer"], targets)
+    assert values["source"] == targets["base"]["output"]
+    assert build.order(targets, ["derived"]) == ["base", "derived"]
+
+
+@pytest.mark.parametrize(
+    "targets, message",
+    [
+        ("targets: {a: {program: missing}}", "not in the registry"),
+        ("targets: {a: {program: writer, deps: [b]}}", "unknown targets"),
+        (
+            "targets: {a: {program: writer, deps: [b]}, b: {program: writer, deps: [a]}}",
+            "Dependency cycle",
+        ),
+        ("targets: {a: {program: writer, params: {fail: maybe}}}", "expects a boolean"),
+        ("targets: {a: {program: writer, colour: red}}", "unknown fields"),
+    ],
+)
+def test_load_project_rejects_invalid_graphs(tmp_path, targets, message):
+    with pytest.raises(build.BuildError, match=message):
+        write_setup(tmp_path, targets)
+
+
+def test_incremental_rebuilds(tmp_path):
+    project, entries = write_setup(tmp_path, CHAIN)
+    results = build.build(project, entries, jobs=2)
+    assert statuses(results) == {"base": "built", "derived": "built", "other": "built"}
+    derived = project["targets"]["derived"]["output"]
+    with open(derived, "r", encoding="utf-8") as handle:
+        assert handle.read() == "hello+world"
+
+    assert set(statuses(build.build(project, entries)).values()) == {"up-to-date"}
+
+    # A param that does not change base's output rebuilds base but not derived.
+    project["targets"]["base"]["params"]["note"] = "second"
+    assert statuses(build.build(project, entries, jobs=2)) == {
+        "base": "built",
+        "derived": "up-to-date",
+        "other": "up-to-date",
+    }
+
+    project["targets"]["base"]["params"]["text"] = "howdy"
+    assert statuses(build.build(project, entries, dry_run=True, selected=["derived"])) == {
+        "base": "would-build",
+        "derived": "would-build",
+    }
+    assert statuses(build.build(project, entries)) == {
+        "base": "built",
+        "derived": "built",
+        "other": "up-to-date",
+    }
+
+    os.remove(project["targets"]["other"]["output"])
+    results = {result["name"]: result for result in build.build(project, entries)}
+    assert results["other"]["status"] == "built"
+    assert results["other"]["reason"] == "output missing"
+
+
+def test_generator_source_change_rebuilds(tmp_path):
+    project, entries = write_setup(tmp_path, CHAIN)
+    build.build(project, entries)
+    script = tmp_path / "writer.py"
+    script.write_text(GENERATOR + "\n# changed\n", encoding="utf-8")
+    results = build.build(project, entries, selected=["other"])
+    assert results[0]["status"] == "built"
+    assert results[0]["reason"] == "inputs changed"
+
+
+def test_failures_block_dependents(tmp_path):
+    project, entries = write_setup(tmp_path, CHAIN)
+    project["targets"]["base"]["params"]["fail"] = True
+    results = statuses(build.build(project, entries))
+    assert results == {"base": "failed", "derived": "blocked", "other": "skipped"}
+    results = statuses(build.build(project, entries, keep_going=True))
+    assert results == {"base": "failed", "derived": "blocked", "other": "built"}
+    assert not os.path.exists(build.stamp_path(project["outputs"], "base"))
@@ -1,4 +1,9 @@
+import json
+import os
 import textwrap
+from datetime import datetime
+
+import pytest
 
 import artctl.cli as cli
 
@@ -8,7 +13,7 @@ class StubOutputPath:
         self.path = path
         self.calls = []
 
-    def __call__(self, entry, base_dir=None, now=None, params_values=None):
+    def __call__(self, entry, base_dir=None, now=None, params_values=None, create_dirs=True):
         self.calls.append({
             "entry": entry,
             "base_dir": base_dir,
@@ -28,6 +33,16 @@ class StubVerifyOutput:
         return self.should_exist
 
 
+def stub_run_process(command, working_dir=None, placement=None, stdout_path=None, **options):
+    return {
+        "returncode": 0,
+        "wall_time": 1.5,
+        "user_time": 1.25,
+        "system_time": 0.125,
+        "max_rss_kb": 2048,
+    }
+
+
 def write_registry(tmp_path):
     content = textwrap.dedent(
         """
@@ -72,6 +87,27 @@ def test_list_subcommand(tmp_path, capsys):
     assert "- spiral: Generates a spiral PNG using matplotlib." in captured.out
 
 
+def test_list_filters_and_streams_json(tmp_path, capsys, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    registry_dir = tmp_path / "registry"
+    registry_dir.mkdir()
+    write_registry(registry_dir)
+    base = ["--registry-path", str(registry_dir), "list"]
+
+    assert cli.main(base + ["--tag", "python", "--search", "spi", "--jsonl"]) == cli.EXIT_SUCCESS
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [record["name"] for record in records] == ["spiral"]
+    assert records[0]["runtime"] == "python"
+
+    assert cli.main(base + ["--runtime", "node", "--json"]) == cli.EXIT_SUCCESS
+    assert json.loads(capsys.readouterr().out) == []
+
+    assert cli.main(base + ["--search", "matplotlib"]) == cli.EXIT_SUCCESS
+    assert "- spiral:" in capsys.readouterr().out
+    assert cli.main(base + ["--search", "circles"]) == cli.EXIT_SUCCESS
+    assert "No registry entries match" in capsys.readouterr().out
+
+
 def test_help_subcommand(tmp_path, capsys):
     write_registry(tmp_path)
     exit_code = cli.main(["--registry-path", str(tmp_path), "help", "spiral"])
@@ -83,7 +119,7 @@ def test_help_subcommand(tmp_path, capsys):
     assert "turns: 20" not in captured.out
 
 
-def test_run_subcommand_reports_placeholder(tmp_path, capsys):
+def test_run_subcommand_dry_run_previews_command(tmp_path, capsys):
     write_registry(tmp_path)
     stub_output = StubOutputPath("/tmp/fixed/path.png")
     original = cli.output_manager.build_output_path
@@ -104,7 +140,6 @@ def test_run_subcommand_reports_placeholder(tmp_path, capsys):
         cli.output_manager.build_output_path = original
     captured = capsys.readouterr()
     assert exit_code == cli.EXIT_SUCCESS
-    assert "Execution pipeline for 'spiral' is not implemented yet." in captured.out
     assert "Resolved parameters:" in captured.out
     assert "Dry run requested" in captured.out
     assert "turns: 10" in captured.out
@@ -160,11 +195,11 @@ def test_run_reports_missing_output(tmp_path, capsys):
     stub_verify = StubVerifyOutput(should_exist=False)
     original_output = cli.output_manager.build_output_path
     original_verify = cli.output_manager.verify_output
-    original_execute = cli.runner.execute
+    original_run_process = cli.runner.run_process
     try:
         cli.output_manager.build_output_path = stub_output
         cli.output_manager.verify_output = stub_verify
-        cli.runner.execute = lambda command, working_dir=None: 0
+        cli.runner.run_process = stub_run_process
         exit_code = cli.main([
             "--registry-path",
             str(tmp_path),
@@ -174,7 +209,423 @@ def test_run_reports_missing_output(tmp_path, capsys):
     finally:
         cli.output_manager.build_output_path = original_output
         cli.output_manager.verify_output = original_verify
-        cli.runner.execute = original_execute
+        cli.runner.run_process = original_run_process
     captured = capsys.readouterr()
     assert exit_code == 4
     assert "Expected output was not produced" in captured.err
+
+
+def test_run_records_placement_in_catalog(tmp_path, capsys):
+    write_registry(tmp_path)
+    catalog_path = tmp_path / "runs.jsonl"
+    stub_output = StubOutputPath("/tmp/fixed/path.png")
+    stub_verify = StubVerifyOutput(should_exist=True)
+    calls = []
+
+    def stub_execute(command, working_dir=None, placement=None, **options):
+        calls.append(placement)
+        return stub_run_process(command)
+
+    original_output = cli.output_manager.build_output_path
+    original_verify = cli.output_manager.verify_output
+    original_run_process = cli.runner.run_process
+    try:
+        cli.output_manager.build_output_path = stub_output
+        cli.output_manager.verify_output = stub_verify
+        cli.runner.run_process = stub_execute
+        exit_code = cli.main([
+            "--registry-path",
+            str(tmp_path),
+            "--catalog",
+            str(catalog_path),
+            "run",
+            "spiral",
+            "--cpus",
+            "0",
+            "--nice",
+            "5",
+        ])
+    finally:
+        cli.output_manager.build_output_path = original_output
+        cli.output_manager.verify_output = original_verify
+        cli.runner.run_process = original_run_process
+    captured = capsys.readouterr()
+    assert exit_code == cli.EXIT_SUCCESS
+    assert "Placement: worker=0 cpus=0 nice=5" in captured.out
+    assert calls[0]["cpus"] == [0]
+    records = list(cli.catalog.read_records(str(catalog_path)))
+    assert records[0]["program"] == "spiral"
+    assert records[0]["exit_status"] == 0
+    assert records[0]["placement"]["nice"] == 5
+    assert records[0]["wall_time"] == 1.5
+    assert records[0]["cpu_time"] == 1.375
+    assert records[0]["max_rss_kb"] == 2048
+
+
+def test_run_reports_joined_in_flight_run(tmp_path, capsys):
+    write_registry(tmp_path)
+
+    class FollowerFlight:
+        def __init__(self):
+            self.keys = []
+
+        def do(self, key, func):
+            self.keys.append(key)
+            return (cli.EXIT_SUCCESS, "/tmp/shared/path.png"), False
+
+    flight = FollowerFlight()
+    base = ["--registry-path", str(tmp_path), "run", "spiral", "--set", "turns=10"]
+    exit_code = cli.main(base, coalescer=flight)
+    captured = capsys.readouterr()
+    assert exit_code == cli.EXIT_SUCCESS
+    assert "Joined in-flight run of 'spiral'" in captured.out
+    assert "/tmp/shared/path.png" in captured.out
+
+    program, values, options = json.loads(flight.keys[0])
+    assert (program, values) == ("spiral", {"turns": 10})
+    assert options["registry_path"] == str(tmp_path)
+    assert options["entry"]["source_path"] == str(tmp_path / "spiral.yaml")
+    cli.main(base + ["--set", "turns=10"], coalescer=flight)
+    cli.main(base + ["--nice", "5"], coalescer=flight)
+    cli.main(base + ["--scratch-dir", str(tmp_path / "scratch")], coalescer=flight)
+    capsys.readouterr()
+    assert flight.keys[1] == flight.keys[0]
+    assert len(set(flight.keys)) == 3
+
+
+def test_verify_subcommand_reports_failures(tmp_path, capsys):
+    (tmp_path / "empty.png").write_bytes(b"")
+    exit_code = cli.main(["verify", str(tmp_path)])
+    captured = capsys.readouterr()
+    assert exit_code == cli.EXIT_OUTPUT_ERROR
+    assert "FAIL" in captured.out
+    assert "Verified 1 files: 1 failed." in captured.out
+
+
+def test_du_and_prune_subcommands(tmp_path, capsys):
+    day_dir = tmp_path / "2020" / "01" / "01"
+    day_dir.mkdir(parents=True)
+    (day_dir / "spiral-000001.png").write_bytes(b"x" * 100)
+
+    exit_code = cli.main(["du", "--outputs-dir", str(tmp_path)])
+    captured = capsys.readouterr()
+    assert exit_code == cli.EXIT_SUCCESS
+    assert "spiral" in captured.out
+    assert "in 1 days" in captured.out
+
+    exit_code = cli.main(["prune", "--outputs-dir", str(tmp_path), "--older-than", "30"])
+    captured = capsys.readouterr()
+    assert exit_code == cli.EXIT_SUCCESS
+    assert "Freed 100B." in captured.out
+    assert not day_dir.exists()
+
+
+def test_archive_and_extract_subcommands(tmp_path, capsys):
+    day_dir = tmp_path / "outputs" / "2020" / "01" / "01"
+    day_dir.mkdir(parents=True)
+    output = day_dir / "spiral-000001.png"
+    output.write_bytes(b"x" * 100)
+    catalog_path = tmp_path / "catalog.jsonl"
+    catalog_path.write_text(json.dumps({"program": "spiral", "output": str(output)}) + "\n")
+
+    exit_code = cli.main(
+        [
+            "--catalog",
+            str(catalog_path),
+            "archive",
+            "--outputs-dir",
+            str(tmp_path / "outputs"),
+            "--before",
+            "2020-01-02",
+        ]
+    )
+    captured = capsys.readouterr()
+    assert exit_code == cli.EXIT_SUCCESS
+    assert "1 files" in captured.out
+    assert "Updated 1 catalog records." in captured.out
+    assert not day_dir.exists()
+
+    location = json.loads(catalog_path.read_text())["output"]
+    assert location == str(tmp_path / "outputs" / "2020" / "01" / "01.zip") + "#spiral-000001.png"
+
+    destination = tmp_path / "restored.png"
+    exit_code = cli.main(["extract", location, "--dest", str(destination)])
+    assert exit_code == cli.EXIT_SUCCESS
+    assert destination.read_bytes() == b"x" * 100
+
+
+def test_archive_failure_still_relocates_archived_days(tmp_path, capsys):
+    outputs = tmp_path / "outputs"
+    first = outputs / "2020" / "01" / "01" / "spiral-000001.png"
+    second = outputs / "2020" / "01" / "02" / "spiral-000002.png"
+    for path in (first, second):
+        path.parent.mkdir(parents=True)
+        path.write_bytes(b"x")
+    (second.parent / ".in-progress").write_bytes(b"y")
+    catalog_path = tmp_path / "catalog.jsonl"
+    catalog_path.write_text(
+        "".join(
+            json.dumps({"program": "spiral", "output": str(path)}) + "\n"
+            for path in (first, second)
+        )
+    )
+
+    exit_code = cli.main(
+        [
+            "--catalog",
+            str(catalog_path),
+            "archive",
+            "--outputs-dir",
+            str(outputs),
+            "--before",
+            "2020-01-03",
+        ]
+    )
+    captured = capsys.readouterr()
+    assert exit_code == cli.EXIT_INTERNAL_ERROR
+    assert ".in-progress" in captured.err
+    assert "Updated 1 catalog records." in captured.out
+    locations = [json.loads(line)["output"] for line in catalog_path.read_text().splitlines()]
+    packed = str(outputs / "2020" / "01" / "01.zip") + "#spiral-000001.png"
+    assert locations == [packed, str(second)]
+    assert second.exists()
+
+
+def test_run_rejects_shared_memory_output(tmp_path, capsys):
+    registry_dir = tmp_path / "registry"
+    registry_dir.mkdir()
+    (registry_dir / "preview.yaml").write_text(
+        textwrap.dedent(
+            """
+            name: preview
+            description: Preview generator
+            runtime: python
+            entrypoint: generators/spiral.py
+            command:
+              - python3
+              - generators/spiral.py
+              - --output
+              - "{output}"
+            output:
+              mode: shm
+            """
+        ).strip()
+        + "\n",
+        encoding="utf-8",
+    )
+    exit_code = cli.main(["--registry-path", str(registry_dir), "run", "preview"])
+    assert exit_code == cli.EXIT_VALIDATION_ERROR
+    assert "only available through artctl.api" in capsys.readouterr().err
+
+
+def test_profile_generator_requires_python_runtime(capsys):
+    exit_code = cli.main(["run", "night_sky", "--dry-run", "--profile-generator"])
+    assert exit_code == cli.EXIT_VALIDATION_ERROR
+    assert "only supported for runtime: python" in capsys.readouterr().err
+
+
+def test_run_accumulates_metrics_textfile(tmp_path, capsys):
+    write_registry(tmp_path)
+    textfile = tmp_path / "metrics" / "artctl.prom"
+    stub_output = StubOutputPath("/tmp/fixed/path.png")
+    original_output = cli.output_manager.build_output_path
+    original_verify = cli.output_manager.verify_output
+    original_run_process = cli.runner.run_process
+    cli.metrics.REGISTRY.take_pending()
+    try:
+        cli.output_manager.build_output_path = stub_output
+        cli.runner.run_process = stub_run_process
+        for should_exist in (True, False, True):
+            cli.output_manager.verify_output = StubVerifyOutput(should_exist=should_exist)
+            cli.main([
+                "--registry-path",
+                str(tmp_path),
+                "--metrics-textfile",
+                str(textfile),
+                "run",
+                "spiral",
+            ])
+    finally:
+        cli.output_manager.build_output_path = original_output
+        cli.output_manager.verify_output = original_verify
+        cli.runner.run_process = original_run_process
+    capsys.readouterr()
+    samples = cli.metrics.parse(textfile.read_text(encoding="utf-8"))
+    runs = {
+        dict(key)["status"]: value
+        for (name, key), value in samples.items()
+        if name == "artctl_runs_total"
+    }
+    assert runs == {"success": 2, "output_error": 1}
+    assert samples["artctl_run_duration_seconds_count", (("program", "spiral"),)] == 3
+    assert samples["artctl_registry_load_seconds_count", ()] == 3
+
+
+def test_sweep_preflight_rejects_missing_runtime(tmp_path, capsys):
+    registry_file = write_registry(tmp_path)
+    registry_file.write_text(
+        registry_file.read_text().replace("python3", "artctl-no-such-runtime"), encoding="utf-8"
+    )
+    stub_output = StubOutputPath("/tmp/fixed/path.png")
+    original_output = cli.output_manager.build_output_path
+    original_sweep = cli.batch.run_sweep
+    try:
+        cli.output_manager.build_output_path = stub_output
+        cli.batch.run_sweep = lambda *args, **kwargs: pytest.fail("sweep should not start")
+        exit_code = cli.main([
+            "--registry-path",
+            str(tmp_path),
+            "sweep",
+            "spiral",
+            "--grid",
+            "turns=1,2",
+        ])
+    finally:
+        cli.output_manager.build_output_path = original_output
+        cli.batch.run_sweep = original_sweep
+    assert exit_code == cli.EXIT_VALIDATION_ERROR
+    assert (
+        "Preflight error: spiral: Executable 'artctl-no-such-runtime' not found on PATH."
+        in capsys.readouterr().err
+    )
+
+
+def test_sweep_samples_parameter_space(tmp_path, capsys):
+    write_registry(tmp_path)
+    catalog_path = tmp_path / "runs.jsonl"
+    cli.catalog.append_record(
+        str(catalog_path), cli.catalog.make_record("spiral", {"turns": 3}, "a.png", 0)
+    )
+    stub_output = StubOutputPath("/tmp/fixed/path.png")
+    original_output = cli.output_manager.build_output_path
+    try:
+        cli.output_manager.build_output_path = stub_output
+        exit_code = cli.main([
+            "--registry-path",
+            str(tmp_path),
+            "--catalog",
+            str(catalog_path),
+            "sweep",
+            "spiral",
+            "--sample",
+            "10",
+            "--range",
+            "turns=1:5",
+            "--method",
+            "random",
+            "--seed",
+            "4",
+            "--dry-run",
+        ])
+    finally:
+        cli.output_manager.build_output_path = original_output
+    captured = capsys.readouterr()
+    assert exit_code == cli.EXIT_SUCCESS
+    assert "Sampled 4 of 10 points over turns with random (seed 4)." in captured.out
+    sampled = sorted(
+        int(line.rsplit("turns=", 1)[1]) for line in captured.out.splitlines() if "turns=" in line
+    )
+    assert sampled == [1, 2, 4, 5]
+
+    exit_code = cli.main([
+        "--registry-path",
+        str(tmp_path),
+        "sweep",
+        "spiral",
+        "--sample",
+        "3",
+        "--grid",
+        "turns=1,2",
+    ])
+    assert exit_code == cli.EXIT_VALIDATION_ERROR
+    assert "cannot be combined" in capsys.readouterr().err
+
+    with open(catalog_path, "a", encoding="utf-8") as handle:
+        handle.write("{not json\n")
+    for command in ("sweep", "plan"):
+        exit_code = cli.main([
+            "--registry-path",
+            str(tmp_path),
+            "--catalog",
+            str(catalog_path),
+            command,
+            "spiral",
+            "--sample",
+            "3",
+            "--range",
+            "turns=1:5",
+        ])
+        assert exit_code == cli.EXIT_INTERNAL_ERROR
+        assert "Catalog error:" in capsys.readouterr().err
+
+
+def test_stats_reports_percentiles_and_regressions(tmp_path, capsys, monkeypatch):
+    monkeypatch.delenv(cli.catalog.CATALOG_ENV_VAR, raising=False)
+    assert cli.main(["stats"]) == cli.EXIT_VALIDATION_ERROR
+    assert "no run catalog" in capsys.readouterr().err
+
+    catalog_path = tmp_path / "runs.jsonl"
+    for version, wall_time in (("old", 1.0), ("new", 2.0)):
+        for index in range(10):
+            record = cli.catalog.make_record("spiral", {}, "a.png", 0, version=version)
+            usage = dict(stub_run_process(None), wall_time=wall_time + index / 100.0)
+            cli.catalog.append_record(str(catalog_path), cli.catalog.record_usage(record, usage))
+
+    base = ["--catalog", str(catalog_path), "stats"]
+    assert cli.main(base + ["--by-version"]) == cli.EXIT_SUCCESS
+    out = capsys.readouterr().out
+    assert "spiral                   old" in out
+    assert "Regression in spiral: old -> new, wall_time p50" in out
+
+    assert cli.main(base + ["--metric", "max_rss_kb", "--json"]) == cli.EXIT_SUCCESS
+    report = json.loads(capsys.readouterr().out)
+    assert report["programs"][0]["runs"] == 20
+    assert report["regressions"] == []
+
+
+def test_back_to_back_sweeps_do_not_overwrite_each_other(tmp_path, capsys):
+    script = tmp_path / "echo.py"
+    script.write_text(
+        "import sys\nopen(sys.argv[1], 'w').write(' '.join(sys.argv[2:]))\n", encoding="utf-8"
+    )
+    (tmp_path / "echo.yaml").write_text(
+        textwrap.dedent(
+            """
+            name: echo
+            description: Writes its params to the output.
+            runtime: python
+            entrypoint: {0}
+            interpreter: current
+            command: [python3, "{{entrypoint}}", "{{output}}", "{{params.tag}}", "{{params.n}}"]
+            params:
+              - {{name: tag, type: string, default: none}}
+              - {{name: n, type: int, default: 0}}
+            """
+        ).format(script),
+        encoding="utf-8",
+    )
+    catalog_path = tmp_path / "runs.jsonl"
+    now = datetime(2025, 1, 2, 3, 4, 5)
+    original_output = cli.output_manager.build_output_path
+
+    def fixed_second(entry, **options):
+        return original_output(entry, base_dir=str(tmp_path / "outputs"), now=now, **options)
+
+    base = ["--registry-path", str(tmp_path), "--catalog", str(catalog_path)]
+    try:
+        cli.output_manager.build_output_path = fixed_second
+        for tag in ("first", "second"):
+            command = ["sweep", "echo", "--grid", "n=1,2,3", "--set", "tag=" + tag]
+            assert cli.main(base + command) == cli.EXIT_SUCCESS
+        assert cli.main(base + ["run", "echo", "--set", "tag=run"]) == cli.EXIT_SUCCESS
+    finally:
+        cli.output_manager.build_output_path = original_output
+    capsys.readouterr()
+
+    records = list(cli.catalog.read_records(str(catalog_path)))
+    assert len({record["output"] for record in records}) == 7
+    for record in records:
+        with open(record["output"], encoding="utf-8") as handle:
+            assert handle.read() == "{tag} {n}".format(**record["params"])
+    day_dir = tmp_path / "outputs" / "2025" / "01" / "02"
+    assert not [name for name in os.listdir(day_dir) if name.startswith(".")]
@@ -0,0 +1,66 @@
+import asyncio
+import threading
+import time
+
+import artctl.coalesce as coalesce
+
+
+def test_canonical_key_ignores_order_and_output():
+    first = coalesce.canonical_key("spiral", {"turns": 2, "radius": 5, "output": "a.png"})
+    second = coalesce.canonical_key("spiral", {"radius": 5, "turns": 2})
+    assert first == second
+    assert first != coalesce.canonical_key("spiral", {"radius": 5, "turns": 3})
+
+
+def test_single_flight_shares_one_call():
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "out.png"
+
+    async def scenario():
+        flight = coalesce.SingleFlight()
+        results = await asyncio.gather(*(flight.do("k", work) for _ in range(3)))
+        return flight, results
+
+    flight, results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert [result for result, _ in results] == ["out.png"] * 3
+    assert [leader for _, leader in results] == [True, False, False]
+    assert flight.in_flight() == 0
+
+
+def test_thread_single_flight_propagates_errors():
+    flight = coalesce.ThreadSingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+    errors = []
+
+    def work():
+        calls.append(1)
+        started.set()
+        release.wait(timeout=5)
+        raise RuntimeError("boom")
+
+    def call():
+        try:
+            flight.do("k", work)
+        except RuntimeError as exc:
+            errors.append(str(exc))
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    threads[0].start()
+    started.wait(timeout=5)
+    for thread in threads[1:]:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert len(calls) == 1
+    assert errors == ["boom", "boom", "boom"]
+    assert flight.in_flight() == 0
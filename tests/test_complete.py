@@ -0,0 +1,156 @@
+import io
+import os
+import subprocess
+import sys
+import time
+
+import artctl.cli as cli
+import artctl.complete as complete
+
+ENTRY = """\
+name: {name}
+description: Test program {name}.
+runtime: python
+entrypoint: generators/{name}.py
+command: [python3, "{{entrypoint}}", "{{output}}"]
+params:
+  - name: turns
+    type: int
+    default: 20
+  - name: scale
+    type: float
+    default: 1.0
+  - name: palette
+    type: enum
+    default: mono
+    choices: [mono, fire]
+  - name: invert
+    type: bool
+    default: false
+  - name: title
+    type: string
+    default: x
+"""
+
+
+def write_registry(directory, names):
+    directory.mkdir(exist_ok=True)
+    for name in names:
+        (directory / "{0}.yaml".format(name)).write_text(ENTRY.format(name=name))
+
+
+def complete_words(registry, cache, *words):
+    stream = io.StringIO()
+    complete.main(["--registry-path", str(registry)] + list(words), stream, str(cache))
+    return stream.getvalue().split()
+
+
+def test_completes_commands_programs_and_options(tmp_path):
+    registry = tmp_path / "registry"
+    write_registry(registry, ["spiral", "spokes", "night_sky"])
+    cache = tmp_path / "cache"
+    assert "run" in complete_words(registry, cache, "")
+    assert complete_words(registry, cache, "sw") == ["sweep"]
+    assert complete_words(registry, cache, "run", "sp") == ["spiral", "spokes"]
+    assert complete_words(registry, cache, "help", "") == ["night_sky", "spiral", "spokes"]
+    assert complete_words(registry, cache, "run", "spiral", "x") == []
+    assert complete_words(registry, cache, "run", "spiral", "--pro") == [
+        "--profile-generator",
+        "--profile-memory",
+        "--progress",
+    ]
+    assert complete_words(registry, cache, "run", "spiral", "--progress", "j") == ["json"]
+    assert complete_words(registry, cache, "run", "--cpus", "0-3", "spi") == ["spiral"]
+
+
+def test_completes_param_names_and_values(tmp_path):
+    registry = tmp_path / "registry"
+    write_registry(registry, ["spiral"])
+    cache = tmp_path / "cache"
+    names = complete_words(registry, cache, "run", "spiral", "--set", "")
+    assert names == ["invert=", "palette=", "scale=", "title=", "turns="]
+    assert complete_words(registry, cache, "run", "spiral", "--set", "t") == ["title=", "turns="]
+    assert complete_words(registry, cache, "run", "spiral", "--set", "palette=f") == [
+        "palette=fire"
+    ]
+    assert complete_words(registry, cache, "run", "spiral", "--set", "invert=") == [
+        "invert=true",
+        "invert=false",
+    ]
+    assert complete_words(registry, cache, "sweep", "spiral", "--range", "") == [
+        "scale=",
+        "turns=",
+    ]
+    assert complete_words(registry, cache, "run", "missing", "--set", "") == []
+
+
+def test_index_is_refreshed_when_registry_changes(tmp_path):
+    registry = tmp_path / "registry"
+    write_registry(registry, ["spiral"])
+    cache = tmp_path / "cache"
+    assert complete_words(registry, cache, "run", "") == ["spiral"]
+    assert os.path.exists(complete.index_path(str(registry), str(cache)))
+
+    write_registry(registry, ["waves"])
+    assert complete_words(registry, cache, "run", "") == ["spiral", "waves"]
+    (registry / "spiral.yaml").unlink()
+    assert complete_words(registry, cache, "run", "") == ["waves"]
+
+
+def test_only_the_newest_indexes_are_kept(tmp_path):
+    cache = tmp_path / "cache"
+    paths = []
+    for number in range(complete.MAX_CACHED_INDEXES + 4):
+        path = complete.index_path(str(tmp_path / "registry{0}".format(number)), str(cache))
+        complete.write_cached(path, {}, [])
+        os.utime(path, ns=(number * 10**9, number * 10**9))
+        paths.append(path)
+    other = complete.index_path(str(tmp_path / "registry0"), str(cache), kind="search")
+    complete.write_cached(other, {}, [])
+
+    kept = sorted(str(path) for path in cache.iterdir())
+    assert kept == sorted(paths[4:] + [other])
+
+
+def test_index_matches_parser_commands(tmp_path):
+    registry = tmp_path / "registry"
+    write_registry(registry, ["spiral"])
+    index = complete.build_index(str(registry))
+    parser_commands = cli.build_parser()._subparsers._group_actions[0].choices
+    assert set(index["commands"]) == set(parser_commands)
+    assert index["commands"]["run"]["positionals"] == ["program"]
+
+
+def test_completion_latency_on_large_registry(tmp_path):
+    registry = tmp_path / "registry"
+    write_registry(registry, ["program_{0:04d}".format(number) for number in range(500)])
+    cache = tmp_path / "cache"
+    complete_words(registry, cache, "run", "")
+    timings = []
+    for _ in range(20):
+        started = time.perf_counter()
+        complete_words(registry, cache, "run", "program_01", "--set", "pa")
+        timings.append(time.perf_counter() - started)
+    assert sorted(timings)[len(timings) // 2] < 0.010
+
+
+def test_complete_entry_point_skips_yaml_and_argparse(tmp_path):
+    registry = tmp_path / "registry"
+    write_registry(registry, ["spiral"])
+    env = dict(os.environ, XDG_CACHE_HOME=str(tmp_path / "cache"))
+    script = (
+        "import sys\n"
+        "from artctl import __main__\n"
+        "__main__.main(['__complete', '--registry-path', sys.argv[1], 'run', 'sp'])\n"
+        "print(sorted({'yaml', 'argparse'}.intersection(sys.modules)))\n"
+    )
+    command = [sys.executable, "-c", script, str(registry)]
+    subprocess.run(command, env=env, check=True, capture_output=True)
+    completed = subprocess.run(command, env=env, check=True, capture_output=True, text=True)
+    assert completed.stdout.splitlines() == ["spiral", "[]"]
+
+
+def test_completion_command_prints_scripts(capsys):
+    for shell in complete.SHELLS:
+        assert cli.main(["completion", shell]) == cli.EXIT_SUCCESS
+        assert "artctl __complete" in capsys.readouterr().out
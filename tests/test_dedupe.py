@@ -0,0 +1,78 @@
+import os
+
+import artctl.dedupe as dedupe
+
+
+def write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return path
+
+
+def test_dedupe_tree_hardlinks_identical_files(tmp_path):
+    first = write(tmp_path / "2025" / "01" / "01" / "spiral-000001.png", b"same-bytes")
+    second = write(tmp_path / "2025" / "01" / "02" / "spiral-000002.png", b"same-bytes")
+    unique = write(tmp_path / "2025" / "01" / "02" / "spiral-000003.png", b"other-byte")
+    lonely = write(tmp_path / "2025" / "01" / "02" / "night_sky-000004.png", b"x")
+
+    summary = dedupe.dedupe_tree(str(tmp_path))
+    assert summary["linked"] == 1
+    assert summary["reclaimed"] == len(b"same-bytes")
+    assert summary["candidates"] == 3
+    assert os.stat(first).st_ino == os.stat(second).st_ino
+    assert os.stat(unique).st_ino != os.stat(first).st_ino
+    assert os.stat(lonely).st_nlink == 1
+    assert (tmp_path / dedupe.INDEX_FILENAME).exists()
+
+    again = dedupe.dedupe_tree(str(tmp_path))
+    assert again["linked"] == 0
+
+
+def test_dedupe_file_uses_persistent_index(tmp_path):
+    existing = write(tmp_path / "2025" / "01" / "01" / "spiral-000001.png", b"payload")
+    dedupe.dedupe_tree(str(tmp_path))
+
+    fresh = write(tmp_path / "2025" / "01" / "03" / "spiral-000009.png", b"payload")
+    index = dedupe.DedupeIndex(str(tmp_path))
+    status, reclaimed = dedupe.dedupe_file(str(fresh), index)
+    assert status == "linked"
+    assert reclaimed == len(b"payload")
+    assert os.stat(fresh).st_ino == os.stat(existing).st_ino
+
+
+def test_dedupe_tree_dry_run_changes_nothing(tmp_path):
+    first = write(tmp_path / "a" / "one.png", b"dup")
+    second = write(tmp_path / "b" / "two.png", b"dup")
+    summary = dedupe.dedupe_tree(str(tmp_path), dry_run=True)
+    assert summary["linked"] == 1
+    assert os.stat(first).st_ino != os.stat(second).st_ino
+    assert not (tmp_path / dedupe.INDEX_FILENAME).exists()
+
+
+def test_rewritten_canonical_file_is_not_linked_to(tmp_path):
+    first = write(tmp_path / "a" / "one.png", b"old-bytes")
+    write(tmp_path / "b" / "two.png", b"unrelated")
+    dedupe.dedupe_tree(str(tmp_path))
+
+    # Rewrite the indexed canonical file in place: same inode, new content.
+    with open(first, "r+b") as handle:
+        handle.write(b"new-bytes, longer")
+    fresh = write(tmp_path / "c" / "three.png", b"old-bytes")
+    index = dedupe.DedupeIndex(str(tmp_path))
+    status, _ = dedupe.dedupe_file(str(fresh), index)
+
+    assert status == "unique"
+    assert fresh.read_bytes() == b"old-bytes"
+    assert first.read_bytes() == b"new-bytes, longer"
+
+
+def test_break_link_gives_a_private_copy(tmp_path):
+    first = write(tmp_path / "a" / "one.png", b"shared")
+    second = tmp_path / "a" / "two.png"
+    os.link(first, second)
+
+    assert dedupe.break_link(str(second)) is True
+    second.write_bytes(b"rewritten")
+    assert first.read_bytes() == b"shared"
+    assert dedupe.break_link(str(second)) is False
+    assert dedupe.break_link(str(tmp_path / "missing.png")) is False
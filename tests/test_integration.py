@@ -1,14 +1,18 @@
+import importlib.util
+import os
 import shutil
 
 import pytest
 
 import artctl.cli as cli
+import artctl.sdk as sdk
+import artctl.verify as verify
 
 
 def test_run_spiral_generator(tmp_path):
     output_path = tmp_path / "spiral.png"
 
-    def stub_output(entry, base_dir=None, now=None, params_values=None):
+    def stub_output(entry, base_dir=None, now=None, params_values=None, create_dirs=True):
         output_path.parent.mkdir(parents=True, exist_ok=True)
         return str(output_path)
 
@@ -34,7 +38,7 @@ def test_run_spiral_generator(tmp_path):
 def test_run_night_sky_generator(tmp_path):
     output_path = tmp_path / "night_sky.png"
 
-    def stub_output(entry, base_dir=None, now=None, params_values=None):
+    def stub_output(entry, base_dir=None, now=None, params_values=None, create_dirs=True):
         output_path.parent.mkdir(parents=True, exist_ok=True)
         return str(output_path)
 
@@ -54,3 +58,159 @@ def test_run_night_sky_generator(tmp_path):
     with open(output_path, "rb") as handle:
         data = handle.read(8)
     assert data == b"\x89PNG\r\n\x1a\n"
+
+
+def test_run_spiral_generator_with_scratch_dir(tmp_path):
+    output_path = tmp_path / "outputs" / "spiral.png"
+    scratch_dir = tmp_path / "scratch"
+
+    def stub_output(entry, base_dir=None, now=None, params_values=None, create_dirs=True):
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        return str(output_path)
+
+    original_output = cli.output_manager.build_output_path
+    try:
+        cli.output_manager.build_output_path = stub_output
+        exit_code = cli.main(["run", "spiral", "--scratch-dir", str(scratch_dir)])
+    finally:
+        cli.output_manager.build_output_path = original_output
+
+    assert exit_code == cli.EXIT_SUCCESS
+    assert output_path.exists()
+    assert list(scratch_dir.iterdir()) == []
+
+
+def load_spiral_generator():
+    spec = importlib.util.spec_from_file_location("spiral", os.path.join("generators", "spiral.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_spiral_renderers_agree():
+    pytest.importorskip("numpy")
+    spiral = load_spiral_generator()
+    naive = spiral.render_naive(64, 3, 28)
+    vectorized = spiral.render_vectorized(64, 3, 28)
+    assert vectorized.shape == (64, 64)
+    assert max(abs(a - int(b)) for a, b in zip(naive, vectorized.reshape(-1))) <= 1
+    assert max(naive) > 0
+
+
+def test_spiral_png_passes_structure_check(tmp_path):
+    spiral = load_spiral_generator()
+    pixels = spiral.render_naive(32, 2, 12)
+    path = tmp_path / "spiral.png"
+    sdk.write_png(str(path), pixels, 32, 32)
+    assert verify.check_file(str(path), mode="structure") is None
+
+
+def test_spiral_batch_matches_single_renders():
+    pytest.importorskip("numpy")
+    spiral = load_spiral_generator()
+    images = spiral.render_many_vectorized(48, [(2, 20), (5, 23)])
+    assert images.shape == (2, 48, 48)
+    assert (images[0] == spiral.render_vectorized(48, 2, 20)).all()
+    assert (images[1] == spiral.render_vectorized(48, 5, 23)).all()
+
+
+def test_sweep_spiral_in_batches(tmp_path, capsys):
+    output_dir = tmp_path / "outputs"
+
+    def stub_output(entry, base_dir=None, now=None, params_values=None, create_dirs=True):
+        output_dir.mkdir(parents=True, exist_ok=True)
+        return str(output_dir / "spiral.png")
+
+    original_output = cli.output_manager.build_output_path
+    try:
+        cli.output_manager.build_output_path = stub_output
+        exit_code = cli.main(
+            [
+                "sweep",
+                "spiral",
+                "--grid",
+                "turns=1:3",
+                "--set",
+                "size=24",
+                "--set",
+                "radius=10",
+                "--batch-size",
+                "2",
+            ]
+        )
+    finally:
+        cli.output_manager.build_output_path = original_output
+
+    captured = capsys.readouterr()
+    assert exit_code == cli.EXIT_SUCCESS
+    assert "Rendered 3 of 3 items in 2 generator invocations" in captured.out
+    outputs = sorted(path.name for path in output_dir.iterdir())
+    assert outputs == ["spiral-00000.png", "spiral-00001.png", "spiral-00002.png"]
+    for name in outputs:
+        assert verify.check_file(str(output_dir / name), mode="structure") is None
+
+
+def test_run_spiral_under_profiler(tmp_path, capsys):
+    output_path = tmp_path / "spiral.png"
+
+    def stub_output(entry, base_dir=None, now=None, params_values=None, create_dirs=True):
+        return str(output_path)
+
+    original_output = cli.output_manager.build_output_path
+    try:
+        cli.output_manager.build_output_path = stub_output
+        exit_code = cli.main(
+            [
+                "run",
+                "spiral",
+                "--set",
+                "size=32",
+                "--set",
+                "radius=12",
+                "--profile-generator",
+                "--profile-memory",
+            ]
+        )
+    finally:
+        cli.output_manager.build_output_path = original_output
+
+    assert exit_code == cli.EXIT_SUCCESS
+    assert output_path.exists()
+    assert os.path.exists(str(output_path) + ".pstats")
+    assert os.path.exists(str(output_path) + ".memory.txt")
+    captured = capsys.readouterr().out
+    assert "Profile saved to" in captured
+    assert "Top functions by self time:" in captured
+    assert "Peak traced memory:" in captured
+
+
+def test_failed_run_still_reports_profile(tmp_path, capsys):
+    script = tmp_path / "broken.py"
+    script.write_text("raise SystemExit(3)\n", encoding="utf-8")
+    (tmp_path / "broken.yaml").write_text(
+        "name: broken\n"
+        "description: Always fails.\n"
+        "runtime: python\n"
+        "entrypoint: {0}\n"
+        "interpreter: current\n"
+        'command: [python3, "{{entrypoint}}", --output, "{{output}}"]\n'.format(script),
+        encoding="utf-8",
+    )
+    output_path = tmp_path / "broken.png"
+
+    def stub_output(entry, base_dir=None, now=None, params_values=None, create_dirs=True):
+        return str(output_path)
+
+    original_output = cli.output_manager.build_output_path
+    try:
+        cli.output_manager.build_output_path = stub_output
+        exit_code = cli.main(
+            ["--registry-path", str(tmp_path), "run", "broken", "--profile-generator"]
+        )
+    finally:
+        cli.output_manager.build_output_path = original_output
+
+    assert exit_code == cli.EXIT_INTERNAL_ERROR
+    captured = capsys.readouterr()
+    assert "Command exited with status 3" in captured.err
+    assert "Profile saved to" in captured.out
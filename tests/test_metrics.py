@@ -0,0 +1,95 @@
+import urllib.error
+import urllib.request
+
+import pytest
+
+import artctl.metrics as metrics
+
+
+def test_observe_fills_every_bucket():
+    store = metrics.Metrics()
+    store.observe("artctl_run_duration_seconds", 3.0, program="spiral")
+    samples = store.samples()
+    key = (("program", "spiral"),)
+    assert samples["artctl_run_duration_seconds_bucket", key + (("le", "2.5"),)] == 0
+    assert samples["artctl_run_duration_seconds_bucket", key + (("le", "5.0"),)] == 1
+    assert samples["artctl_run_duration_seconds_bucket", key + (("le", "+Inf"),)] == 1
+    assert samples["artctl_run_duration_seconds_sum", key] == 3.0
+    assert samples["artctl_run_duration_seconds_count", key] == 1
+
+
+def test_render_and_parse_round_trip():
+    store = metrics.Metrics()
+    metrics.record_run("spiral", "success", duration=0.2, output_bytes=512, metrics=store)
+    metrics.record_run('we"ird\\name', "error", metrics=store)
+    metrics.record_registry_load(0.004, metrics=store)
+    text = metrics.render(store.samples())
+
+    assert "# TYPE artctl_runs_total counter" in text
+    assert "# TYPE artctl_run_duration_seconds histogram" in text
+    assert 'artctl_runs_total{program="we\\"ird\\\\name",status="error"} 1' in text
+    assert "artctl_output_bytes_total{program=\"spiral\"} 512" in text
+    lines = [line for line in text.splitlines() if line.startswith("artctl_registry_load")]
+    assert lines[0] == 'artctl_registry_load_seconds_bucket{le="0.001"} 0'
+    assert lines[-3] == 'artctl_registry_load_seconds_bucket{le="+Inf"} 1'
+    assert metrics.parse(text) == store.samples()
+
+
+def test_parse_skips_unknown_and_malformed_lines():
+    text = "other_metric 4\nartctl_runs_total{program=\"a\",status=\"success\"} x\n# comment\n"
+    assert metrics.parse(text) == {}
+
+
+def test_flush_textfile_accumulates(tmp_path):
+    path = tmp_path / "artctl.prom"
+    first = metrics.Metrics()
+    metrics.record_run("spiral", "success", duration=1.0, metrics=first)
+    assert metrics.flush_textfile(str(path), metrics=first) is True
+    assert metrics.flush_textfile(str(path), metrics=first) is False
+
+    second = metrics.Metrics()
+    metrics.record_run("spiral", "success", duration=2.0, metrics=second)
+    metrics.record_run("spiral", "error", metrics=second)
+    metrics.flush_textfile(str(path), metrics=second)
+
+    samples = metrics.parse(path.read_text(encoding="utf-8"))
+    assert samples["artctl_runs_total", (("program", "spiral"), ("status", "success"))] == 2
+    assert samples["artctl_runs_total", (("program", "spiral"), ("status", "error"))] == 1
+    assert samples["artctl_run_duration_seconds_sum", (("program", "spiral"),)] == 3.0
+    assert [p.name for p in tmp_path.iterdir() if p.name.endswith(".tmp")] == []
+
+
+def test_flush_failure_keeps_pending_samples(tmp_path):
+    blocker = tmp_path / "file"
+    blocker.write_text("", encoding="utf-8")
+    store = metrics.Metrics()
+    metrics.record_run("spiral", "success", metrics=store)
+    with pytest.raises(metrics.MetricsError):
+        metrics.flush_textfile(str(blocker / "artctl.prom"), metrics=store)
+    assert store.take_pending()
+
+
+def test_run_status_labels():
+    assert metrics.run_status(0) == "success"
+    assert metrics.run_status(2) == "invalid"
+    assert metrics.run_status(4) == "output_error"
+    assert metrics.run_status(1) == "error"
+
+
+def test_http_endpoint_serves_metrics():
+    store = metrics.Metrics()
+    metrics.record_cache_lookup(True, metrics=store)
+    http_server = metrics.start_http_server(0, metrics=store)
+    try:
+        host, port = http_server.server_address[:2]
+        base = "http://{0}:{1}".format(host, port)
+        with urllib.request.urlopen(base + "/metrics", timeout=5) as response:
+            body = response.read().decode("utf-8")
+            content_type = response.headers["Content-Type"]
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(base + "/other", timeout=5)
+    finally:
+        http_server.shutdown()
+        http_server.server_close()
+    assert content_type == metrics.CONTENT_TYPE
+    assert 'artctl_registry_cache_requests_total{result="hit"} 1' in body
@@ -1,3 +1,7 @@
+import errno
+import hashlib
+import os
+import threading
 from datetime import datetime
 
 import pytest
@@ -43,3 +47,72 @@ def test_build_output_path_missing_param_raises():
     }
     with pytest.raises(output_manager.OutputError):
         output_manager.build_output_path(entry, params_values={})
+
+
+def test_staging_path_preserves_extension(tmp_path):
+    final_path = str(tmp_path / "outputs" / "spiral-030405.png")
+    staged = output_manager.staging_path(final_path, str(tmp_path / "scratch"))
+    assert os.path.dirname(staged) == str(tmp_path / "scratch")
+    assert os.path.basename(staged).startswith("spiral-030405.")
+    assert staged.endswith(".png")
+    assert not os.path.exists(staged)
+
+
+def test_publish_output_renames_on_same_filesystem(tmp_path):
+    staged = tmp_path / "scratch.png"
+    staged.write_bytes(b"data")
+    final_path = tmp_path / "final.png"
+    future = output_manager.publish_output(str(staged), str(final_path))
+    assert future.result() == str(final_path)
+    assert final_path.read_bytes() == b"data"
+    assert not staged.exists()
+
+
+def test_publish_output_copies_across_filesystems_in_background(tmp_path, monkeypatch):
+    staged = tmp_path / "scratch.png"
+    staged.write_bytes(b"data")
+    final_path = tmp_path / "out" / "final.png"
+    final_path.parent.mkdir()
+    real_replace = os.replace
+
+    def cross_device_replace(src, dst):
+        if src == str(staged):
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+        return real_replace(src, dst)
+
+    monkeypatch.setattr(output_manager.os, "replace", cross_device_replace)
+    future = output_manager.publish_output(str(staged), str(final_path), background=True)
+    assert future.result(timeout=5) == str(final_path)
+    assert output_manager.wait_for_publishes() == []
+    assert final_path.read_bytes() == b"data"
+    assert os.listdir(final_path.parent) == ["final.png"]
+    assert not staged.exists()
+
+
+def test_verify_output_applies_registry_mode(tmp_path):
+    path = tmp_path / "out.png"
+    path.write_bytes(b"")
+    entry = {"name": "spiral", "output": {"required": True, "verify": "magic"}}
+    assert output_manager.check_output(entry, str(path)) == "file is empty"
+    assert not output_manager.verify_output(entry, str(path))
+    assert output_manager.verify_output({"name": "spiral", "output": {}}, str(path))
+
+
+def test_capture_stream_hashes_while_copying(tmp_path):
+    payload = os.urandom(output_manager.STREAM_BUFFER_SIZE + 12345)
+    read_fd, write_fd = os.pipe()
+    writer = threading.Thread(target=lambda: (os.write(write_fd, payload), os.close(write_fd)))
+    writer.start()
+    try:
+        captured = output_manager.capture_stream(read_fd, str(tmp_path / "out.png"))
+    finally:
+        writer.join()
+        os.close(read_fd)
+    assert captured == {"digest": hashlib.sha256(payload).hexdigest(), "size": len(payload)}
+    assert (tmp_path / "out.png").read_bytes() == payload
+
+
+def test_command_output_targets_stdout_for_streamed_entries():
+    entry = {"name": "spiral", "output": {"mode": "stream"}}
+    assert output_manager.command_output(entry, "out.png") == output_manager.STREAM_TARGET
+    assert output_manager.command_output({"name": "spiral"}, "out.png") == "out.png"
@@ -0,0 +1,81 @@
+import pytest
+
+import artctl.placement as placement
+
+
+def write_node(root, index, cpulist):
+    node_dir = root / "node{0}".format(index)
+    node_dir.mkdir()
+    (node_dir / "cpulist").write_text(cpulist + "\n", encoding="utf-8")
+
+
+def test_parse_cpu_list_ranges_and_lists():
+    assert placement.parse_cpu_list("0-3,6, 8-9") == [0, 1, 2, 3, 6, 8, 9]
+    assert placement.parse_cpu_list([3, 1, 1]) == [1, 3]
+    assert placement.format_cpu_list([0, 1, 2, 3, 6, 8, 9]) == "0-3,6,8-9"
+
+
+def test_parse_cpu_list_invalid_raises():
+    with pytest.raises(placement.PlacementError):
+        placement.parse_cpu_list("3-1")
+    with pytest.raises(placement.PlacementError):
+        placement.parse_cpu_list("a,b")
+
+
+def test_parse_ionice():
+    assert placement.parse_ionice("idle") == ("idle", 0)
+    assert placement.parse_ionice("best-effort") == ("best-effort", 4)
+    assert placement.parse_ionice("realtime:2") == ("realtime", 2)
+    with pytest.raises(placement.PlacementError):
+        placement.parse_ionice("idle:3")
+    with pytest.raises(placement.PlacementError):
+        placement.parse_ionice("fast")
+
+
+def test_resolve_placement_core_round_robin():
+    config = {"cpus": "2-4", "spread": "core", "nice": 5}
+    cpus = [
+        placement.resolve_placement(config, worker_index=index)["cpus"] for index in range(4)
+    ]
+    assert cpus == [[2], [3], [4], [2]]
+
+
+def test_resolve_placement_numa_round_robin(tmp_path):
+    write_node(tmp_path, 0, "0-3")
+    write_node(tmp_path, 1, "4-7")
+    config = {"cpus": "0-5", "spread": "numa"}
+    first = placement.resolve_placement(config, worker_index=0, sysfs_root=str(tmp_path))
+    second = placement.resolve_placement(config, worker_index=1, sysfs_root=str(tmp_path))
+    assert first["cpus"] == [0, 1, 2, 3]
+    assert first["numa_node"] == 0
+    assert second["cpus"] == [4, 5]
+    assert second["numa_node"] == 1
+
+
+def test_resolve_placement_empty_config_returns_none():
+    assert placement.resolve_placement({}) is None
+    assert placement.resolve_placement({"spread": "none"}) is None
+
+
+def test_merge_config_prefers_overrides():
+    merged = placement.merge_config({"nice": 10, "cpus": "0-1"}, {"nice": 3, "cpus": None})
+    assert merged == {"nice": 3, "cpus": "0-1"}
+
+
+def test_wrap_command_prefixes_placement_tools(monkeypatch):
+    monkeypatch.setattr(placement.shutil, "which", lambda name: "/bin/" + name)
+    monkeypatch.setattr(placement.os, "getpriority", lambda which, who: 2)
+    resolved = {"cpus": [0, 1, 2, 6], "nice": 10, "ionice": "best-effort:3"}
+
+    assert placement.wrap_command(resolved, ["python3", "gen.py"]) == [
+        "/bin/taskset", "-c", "0-2,6",
+        "/bin/nice", "-n", "8",
+        "/bin/ionice", "-c", "2", "-n", "3",
+        "python3", "gen.py",
+    ]
+    assert placement.wrap_command({"ionice": "idle"}, ["gen"]) == ["/bin/ionice", "-c", "3", "gen"]
+    assert placement.wrap_command(None, ["gen"]) == ["gen"]
+
+    monkeypatch.setattr(placement.shutil, "which", lambda name: None)
+    with pytest.raises(placement.PlacementError, match="'taskset'"):
+        placement.wrap_command({"cpus": [0]}, ["gen"])
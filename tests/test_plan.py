@@ -0,0 +1,105 @@
+import json
+import os
+from datetime import datetime
+
+import pytest
+
+import artctl.cli as cli
+import artctl.plan as plan
+
+NOW = datetime(2025, 1, 2, 3, 4, 5)
+ENTRY = {
+    "name": "demo",
+    "runtime": "python",
+    "entrypoint": "generators/demo.py",
+    "command": ["python3", "{entrypoint}", "--output", "{output}", "--turns", "{params.turns}"],
+    "params": [
+        {"name": "turns", "type": "int", "default": 10},
+        {"name": "label", "type": "string", "default": "a b"},
+    ],
+    "output": {"required": True, "extension": "png"},
+    "batch": {"command": ["python3", "{entrypoint}", "--batch", "{batch_manifest}"]},
+}
+
+
+def test_grid_points_are_coerced_lazily():
+    points = plan.grid_points([("turns", ["1", "2", "3"])], ["label=x"], ENTRY["params"])
+    assert next(points) == {"turns": 1, "label": "x"}
+    assert [point["turns"] for point in points] == [2, 3]
+
+
+def test_jobs_render_commands_without_creating_directories(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    points = [{"turns": 1, "label": "a b"}, {"turns": 2, "label": "a b"}]
+    jobs = list(plan.jobs(ENTRY, points, now=NOW, working_dir="/work"))
+    assert not os.listdir(tmp_path)
+    first = jobs[0]
+    assert first["output"] == os.path.join("outputs", "2025", "01", "02", "demo-030405-00000.png")
+    assert first["argv"][1:] == [
+        "generators/demo.py", "--output", first["output"], "--turns", "1", "--label", "a b"
+    ]
+    assert first["cwd"] == "/work"
+    assert "PYTHONPATH" in first["env"]
+    assert jobs[1]["output"].endswith("-00001.png")
+
+    line = plan.format_job(first, "nul")
+    assert line.startswith("cd /work && env PYTHONPATH=")
+    assert line.endswith("--turns 1 --label 'a b'\0")
+    assert json.loads(plan.format_job(first, "jsonl"))["params"] == {"turns": 1, "label": "a b"}
+
+
+def test_streamed_output_is_redirected():
+    entry = dict(ENTRY, output={"extension": "png", "mode": "stream"})
+    job = next(plan.jobs(entry, [{"turns": 1, "label": "x"}], now=NOW, indexed=False))
+    assert "/dev/stdout" in job["argv"]
+    assert job["stdout"] == job["output"]
+    assert plan.format_job(job, "nul").endswith("> {0}\0".format(job["output"]))
+
+
+def test_batch_jobs_carry_manifests_inline():
+    points = [{"turns": turns, "label": "x"} for turns in range(5)]
+    jobs = plan.jobs(ENTRY, points, now=NOW, working_dir="/work")
+    batches = list(plan.batch_jobs(ENTRY, jobs, 2, "/manifests"))
+    assert len(batches) == 3
+    assert batches[0]["argv"][-1] == "/manifests/batch-00000.jsonl"
+    assert [item["params"]["turns"] for item in batches[2]["manifest"]] == [4]
+    with pytest.raises(plan.PlanError):
+        plan.format_job(batches[0], "nul")
+    with pytest.raises(plan.PlanError):
+        next(plan.batch_jobs(dict(ENTRY, batch=None), iter([]), 2, "/manifests"))
+
+
+def test_plan_command_streams_jobs(tmp_path, capsys, monkeypatch):
+    registry_dir = tmp_path / "registry"
+    registry_dir.mkdir()
+    (registry_dir / "demo.yaml").write_text(
+        "name: demo\n"
+        "description: Demo.\n"
+        "runtime: python\n"
+        "entrypoint: generators/demo.py\n"
+        "command: [python3, '{entrypoint}', --output, '{output}']\n"
+        "params:\n"
+        "  - name: turns\n"
+        "    type: int\n"
+        "    default: 10\n"
+        "constraints:\n"
+        "  - turns != 2\n"
+    )
+    monkeypatch.chdir(tmp_path)
+    exit_code = cli.main(
+        ["--registry-path", str(registry_dir), "plan", "demo", "--grid", "turns=1:3"]
+    )
+    captured = capsys.readouterr()
+    assert exit_code == cli.EXIT_SUCCESS
+    jobs = [json.loads(line) for line in captured.out.splitlines()]
+    assert [job["params"]["turns"] for job in jobs] == [1, 3]
+    assert jobs[0]["argv"][-2:] == ["--turns", "1"]
+    assert "Skipped 1 grid points" in captured.err
+    assert "Planned 2 jobs" in captured.err
+    assert "Create these output directories" in captured.err
+    assert not os.path.exists(tmp_path / "outputs")
+
+    exit_code = cli.main(
+        ["--registry-path", str(registry_dir), "plan", "demo", "--batch", "--format", "nul"]
+    )
+    assert exit_code == cli.EXIT_VALIDATION_ERROR
@@ -0,0 +1,90 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import artctl.profiling as profiling
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(profiling.__file__)))
+
+
+def test_rewrite_script_command():
+    command = ["python3", "generators/spiral.py", "--output", "out.png"]
+    wrapped = profiling.rewrite_command(command, "out.png.pstats")
+    assert wrapped == [
+        "python3",
+        "-m",
+        "artctl.profiling",
+        "--stats",
+        "out.png.pstats",
+        "--",
+        "generators/spiral.py",
+        "--output",
+        "out.png",
+    ]
+
+
+def test_rewrite_keeps_interpreter_flags_and_modules():
+    command = ["python", "-X", "dev", "-O", "-m", "pkg.gen", "--size", "4"]
+    wrapped = profiling.rewrite_command(command, "a.pstats", "a.memory.txt")
+    assert wrapped == [
+        "python",
+        "-X",
+        "dev",
+        "-O",
+        "-m",
+        "artctl.profiling",
+        "--stats",
+        "a.pstats",
+        "--memory",
+        "a.memory.txt",
+        "--",
+        "-m",
+        "pkg.gen",
+        "--size",
+        "4",
+    ]
+
+
+def test_rewrite_rejects_inline_code():
+    with pytest.raises(profiling.ProfilingError):
+        profiling.rewrite_command(["python", "-c", "print(1)"], "a.pstats")
+    with pytest.raises(profiling.ProfilingError):
+        profiling.rewrite_command([], "a.pstats")
+
+
+def test_profile_paths_sit_next_to_output():
+    stats_path, memory_path = profiling.profile_paths("/tmp/out/spiral.png")
+    assert stats_path == "/tmp/out/spiral.png.pstats"
+    assert memory_path == "/tmp/out/spiral.png.memory.txt"
+
+
+def test_bootstrap_profiles_script(tmp_path):
+    script = tmp_path / "gen.py"
+    script.write_text(
+        "import sys\n"
+        "def busy(n):\n"
+        "    return sum(i * i for i in range(n))\n"
+        "data = [bytearray(1024) for _ in range(64)]\n"
+        "busy(20000)\n"
+        "sys.exit(3)\n",
+        encoding="utf-8",
+    )
+    stats_path = tmp_path / "gen.pstats"
+    memory_path = tmp_path / "gen.memory.txt"
+    command = profiling.rewrite_command(
+        [sys.executable, str(script)], str(stats_path), str(memory_path)
+    )
+    env = dict(os.environ, PYTHONPATH=PACKAGE_ROOT)
+    completed = subprocess.run(command, env=env, check=False)
+
+    assert completed.returncode == 3
+    rows = profiling.top_functions(str(stats_path), limit=None)
+    assert any("busy" in location for _, _, _, location in rows)
+    assert [row[0] for row in rows] == sorted((row[0] for row in rows), reverse=True)
+    assert profiling.read_peak_memory(str(memory_path)) >= 64 * 1024
+
+
+def test_read_peak_memory_missing_file(tmp_path):
+    assert profiling.read_peak_memory(str(tmp_path / "missing.txt")) is None
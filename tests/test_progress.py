@@ -0,0 +1,114 @@
+import io
+import json
+import subprocess
+import sys
+
+import pytest
+
+import artctl.progress as progress
+import artctl.runner as runner
+
+REPORTER = (
+    "import os, sys\n"
+    "fd = int(os.environ['ARTCTL_PROGRESS_FD'])\n"
+    "for line in sys.argv[1:]:\n"
+    "    os.write(fd, (line + '\\n').encode())\n"
+)
+
+
+class TTYStream(io.StringIO):
+    def isatty(self):
+        return True
+
+
+def test_parse_record_formats():
+    assert progress.parse_record('{"done": 3, "total": 10, "msg": "rows"}') == {
+        "done": 3.0,
+        "total": 10.0,
+        "msg": "rows",
+    }
+    assert progress.parse_record("4/8 writing png") == {
+        "done": 4.0,
+        "total": 8.0,
+        "msg": "writing png",
+    }
+    assert progress.parse_record("7") == {"done": 7.0, "total": None, "msg": None}
+    assert progress.parse_record("garbage here") is None
+    assert progress.parse_record('{"total": 3}') is None
+    assert progress.parse_record("") is None
+
+
+def test_resolve_mode():
+    assert progress.resolve_mode("auto", io.StringIO()) == "none"
+    assert progress.resolve_mode("auto", TTYStream()) == "line"
+    assert progress.resolve_mode("json", io.StringIO()) == "json"
+    with pytest.raises(progress.ProgressError):
+        progress.resolve_mode("fancy", io.StringIO())
+
+
+def test_disabled_monitor_hands_out_no_channel():
+    monitor = progress.ProgressMonitor("none")
+    with monitor, monitor.channel("spiral") as fd:
+        assert fd is None
+    assert monitor.snapshot()["running"] == 0
+
+
+def test_monitor_aggregates_concurrent_children():
+    stream = io.StringIO()
+    monitor = progress.ProgressMonitor("json", stream=stream, label="sweep", expected=3)
+    with monitor:
+        with monitor.channel("a") as first, monitor.channel("b") as second:
+            children = [
+                subprocess.Popen(
+                    [sys.executable, "-c", REPORTER, "1/4", '{"done": 4, "total": 4}'],
+                    env=runner._child_environment(first),
+                    pass_fds=(first,),
+                ),
+                subprocess.Popen(
+                    [sys.executable, "-c", REPORTER, "2/2 finished b"],
+                    env=runner._child_environment(second),
+                    pass_fds=(second,),
+                ),
+            ]
+            for child in children:
+                assert child.wait() == 0
+    states = [json.loads(line) for line in stream.getvalue().splitlines()]
+    final = states[-1]
+    assert final["final"] is True
+    assert final["running"] == 0
+    assert final["finished"] == 2
+    assert final["done"] == 6
+    assert final["total"] == 6
+    assert final["fraction"] == pytest.approx(2 / 3, abs=1e-4)
+    assert all(not state["final"] for state in states[:-1])
+
+
+def test_run_process_passes_progress_fd(tmp_path):
+    stream = TTYStream()
+    monitor = progress.ProgressMonitor("auto", stream=stream, label="spiral")
+    with monitor, monitor.channel("spiral") as fd:
+        result = runner.run_process(
+            [sys.executable, "-c", REPORTER, "5/10 halfway"], progress_fd=fd
+        )
+    assert result["returncode"] == 0
+    lines = stream.getvalue().split("\r")
+    assert lines[-1].startswith("spiral |  50.0% (5/10)")
+    assert lines[-1].endswith("spiral: halfway\n")
+
+
+def test_format_status_for_sweeps():
+    state = {
+        "label": "sweep spiral",
+        "elapsed": 1.25,
+        "running": 2,
+        "finished": 1,
+        "expected": 4,
+        "done": 3.0,
+        "total": 8.0,
+        "fraction": 0.4,
+        "current": "item 2",
+        "message": "rows",
+    }
+    assert progress.format_status(state) == (
+        "sweep spiral |  40.0% | 1/4 processes finished, 2 running | 1.2s | item 2: rows"
+    )
@@ -121,3 +121,223 @@ def test_invalid_param_definition_raises(tmp_path):
     with pytest.raises(registry.RegistryError) as excinfo:
         registry.load_registry(tmp_path)
     assert "missing fields" in str(excinfo.value)
+
+
+def test_placement_block_validated(tmp_path):
+    write_file(
+        tmp_path,
+        "placed.yaml",
+        """
+        name: spiral
+        description: Spiral generator
+        runtime: python
+        entrypoint: generators/spiral.py
+        command:
+          - python3
+          - generators/spiral.py
+        placement:
+          cpus: 0-3
+          spread: core
+          nice: 10
+          ionice: idle
+        """,
+    )
+    entries = registry.load_registry(tmp_path)
+    assert entries["spiral"]["placement"] == {
+        "cpus": "0-3",
+        "spread": "core",
+        "nice": 10,
+        "ionice": "idle",
+    }
+
+
+def test_invalid_placement_raises(tmp_path):
+    write_file(
+        tmp_path,
+        "placed.yaml",
+        """
+        name: spiral
+        description: Spiral generator
+        runtime: python
+        entrypoint: generators/spiral.py
+        command:
+          - python3
+          - generators/spiral.py
+        placement:
+          nice: 40
+        """,
+    )
+    with pytest.raises(registry.RegistryError) as excinfo:
+        registry.load_registry(tmp_path)
+    assert "Invalid placement" in str(excinfo.value)
+
+
+def test_output_mode_validated(tmp_path):
+    write_file(
+        tmp_path,
+        "spiral.yaml",
+        """
+        name: spiral
+        description: Spiral generator
+        runtime: python
+        entrypoint: generators/spiral.py
+        command:
+          - python3
+          - generators/spiral.py
+        output:
+          mode: pipe
+        """,
+    )
+    with pytest.raises(registry.RegistryError, match="Output mode"):
+        registry.load_registry(tmp_path)
+
+
+def test_batch_block_validated(tmp_path):
+    write_file(
+        tmp_path,
+        "spiral.yaml",
+        """
+        name: spiral
+        description: Spiral generator
+        runtime: python
+        entrypoint: generators/spiral.py
+        command:
+          - python3
+          - generators/spiral.py
+        batch:
+          command:
+            - python3
+            - generators/spiral.py
+            - --batch
+            - "{batch_manifest}"
+          max_items: 64
+        """,
+    )
+    entry = registry.load_registry(tmp_path)["spiral"]
+    assert entry["batch"]["max_items"] == 64
+
+    write_file(
+        tmp_path,
+        "spiral.yaml",
+        """
+        name: spiral
+        description: Spiral generator
+        runtime: python
+        entrypoint: generators/spiral.py
+        command:
+          - python3
+          - generators/spiral.py
+        batch:
+          command:
+            - python3
+            - generators/spiral.py
+        """,
+    )
+    with pytest.raises(registry.RegistryError, match="batch_manifest"):
+        registry.load_registry(tmp_path)
+
+
+def test_interpreter_validated(tmp_path):
+    write_file(
+        tmp_path,
+        "spiral.yaml",
+        """
+        name: spiral
+        description: Spiral generator
+        runtime: python
+        entrypoint: generators/spiral.py
+        interpreter: current
+        command:
+          - python3
+          - generators/spiral.py
+        """,
+    )
+    assert registry.load_registry(tmp_path)["spiral"]["interpreter"] == "current"
+
+    write_file(
+        tmp_path,
+        "spiral.yaml",
+        """
+        name: spiral
+        description: Spiral generator
+        runtime: node
+        entrypoint: generators/spiral.js
+        interpreter: current
+        command:
+          - node
+          - generators/spiral.js
+        """,
+    )
+    with pytest.raises(registry.RegistryError, match="requires runtime: python"):
+        registry.load_registry(tmp_path)
+
+
+def test_param_ranges_and_constraints_validated(tmp_path):
+    write_file(
+        tmp_path,
+        "spiral.yaml",
+        """
+        name: spiral
+        description: Spiral generator
+        runtime: python
+        entrypoint: generators/spiral.py
+        command:
+          - python3
+          - generators/spiral.py
+        params:
+          - name: turns
+            type: int
+            min: 1
+            max: 50
+          - name: radius
+            type: float
+        constraints:
+          - radius >= turns * 2
+        """,
+    )
+    entry = registry.load_registry(tmp_path)["spiral"]
+    assert (entry["params"][0]["min"], entry["params"][0]["max"]) == (1, 50)
+    assert entry["params"][1]["min"] is None
+    assert entry["constraints"] == ["radius >= turns * 2"]
+
+    write_file(
+        tmp_path,
+        "spiral.yaml",
+        """
+        name: spiral
+        description: Spiral generator
+        runtime: python
+        entrypoint: generators/spiral.py
+        command:
+          - python3
+          - generators/spiral.py
+        params:
+          - name: turns
+            type: int
+        constraints:
+          - size > turns
+        """,
+    )
+    with pytest.raises(registry.RegistryError, match="unknown parameter 'size'"):
+        registry.load_registry(tmp_path)
+
+    write_file(
+        tmp_path,
+        "spiral.yaml",
+        """
+        name: spiral
+        description: Spiral generator
+        runtime: python
+        entrypoint: generators/spiral.py
+        command:
+          - python3
+          - generators/spiral.py
+        params:
+          - name: turns
+            type: int
+            min: 10
+            max: 1
+        """,
+    )
+    with pytest.raises(registry.RegistryError, match="min greater than max"):
+        registry.load_registry(tmp_path)
@@ -0,0 +1,138 @@
+import os
+from datetime import date
+
+import pytest
+
+import artctl.archive as archive
+import artctl.retention as retention
+
+
+def write_output(base, day, name, size):
+    directory = base / day.strftime("%Y") / day.strftime("%m") / day.strftime("%d")
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / name
+    path.write_bytes(b"x" * size)
+    return path
+
+
+def test_parse_and_format_size():
+    assert retention.parse_size("1024") == 1024
+    assert retention.parse_size("2K") == 2048
+    assert retention.parse_size("1.5MB") == int(1.5 * 1024 * 1024)
+    assert retention.parse_size("1GiB") == 1024**3
+    assert retention.format_size(512) == "512B"
+    assert retention.format_size(2048) == "2.0K"
+    with pytest.raises(retention.RetentionError):
+        retention.parse_size("lots")
+
+
+def test_program_from_filename():
+    assert retention.program_from_filename("night_sky-030405.png") == "night_sky"
+    assert retention.program_from_filename("custom-name.png") == "custom-name"
+    assert retention.program_from_filename("spiral-030405-00012.png") == "spiral"
+
+
+def test_disk_usage_groups_by_program_and_caches(tmp_path):
+    write_output(tmp_path, date(2025, 1, 1), "spiral-000001.png", 10)
+    write_output(tmp_path, date(2025, 1, 1), "night_sky-000002.png", 5)
+    write_output(tmp_path, date(2025, 1, 2), "spiral-000003.png", 7)
+    (tmp_path / "not-a-year").mkdir()
+
+    usage = retention.disk_usage(str(tmp_path), jobs=2)
+    assert [day for day, _, _ in usage] == [date(2025, 1, 1), date(2025, 1, 2)]
+    assert retention.summarize(usage) == {
+        "spiral": {"files": 2, "bytes": 17},
+        "night_sky": {"files": 1, "bytes": 5},
+    }
+    assert (tmp_path / retention.CACHE_FILENAME).exists()
+
+    calls = []
+    original = retention.scan_day
+    retention.scan_day = lambda path: calls.append(path) or original(path)
+    try:
+        cached = retention.disk_usage(str(tmp_path))
+    finally:
+        retention.scan_day = original
+    assert calls == []
+    assert retention.summarize(cached) == retention.summarize(usage)
+
+
+def test_disk_usage_cache_sees_nested_changes_and_rescans_today(tmp_path):
+    old = date(2025, 1, 1)
+    write_output(tmp_path, old, "spiral-000001.png", 10)
+    nested = tmp_path / "2025" / "01" / "01" / "spiral" / "large"
+    nested.mkdir(parents=True)
+    (nested / "spiral-000002.png").write_bytes(b"x" * 5)
+    today = write_output(tmp_path, date.today(), "spiral-000003.png", 1)
+    retention.disk_usage(str(tmp_path))
+
+    # A file added two levels down changes neither the day directory's mtime nor its
+    # subdirectory's, only the nested one's.
+    (nested / "spiral-000004.png").write_bytes(b"x" * 7)
+    stat = os.stat(nested)
+    os.utime(nested, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    today.write_bytes(b"x" * 3)
+
+    usage = {day: programs for day, _, programs in retention.disk_usage(str(tmp_path))}
+    assert usage[old]["spiral"] == {"files": 3, "bytes": 22}
+    assert usage[date.today()]["spiral"] == {"files": 1, "bytes": 3}
+
+
+def test_disk_usage_and_prune_cover_packs_but_not_sidecars(tmp_path):
+    packed = write_output(tmp_path, date(2024, 12, 30), "spiral-000001.png", 10)
+    write_output(tmp_path, date(2024, 12, 30), "spiral-000001.png.pstats", 5)
+    pack_path, _ = archive.archive_day(str(packed.parent))
+    write_output(tmp_path, date(2025, 1, 1), "spiral-000002.png", 7)
+    write_output(tmp_path, date(2025, 1, 1), "spiral-000002.png.memory.txt", 4)
+
+    usage = retention.disk_usage(str(tmp_path))
+    assert [(day, path) for day, path, _ in usage][0] == (date(2024, 12, 30), pack_path)
+    assert retention.summarize(usage) == {"spiral": {"files": 2, "bytes": 17}}
+    assert retention.summarize(retention.disk_usage(str(tmp_path))) == retention.summarize(usage)
+
+    plan = retention.plan_prune(str(tmp_path), before=date(2025, 1, 1))
+    assert [path for _, path, _ in plan["days"]] == [pack_path]
+    retention.apply_prune(str(tmp_path), plan)
+    assert not (tmp_path / "2024").exists()
+    assert retention.summarize(retention.disk_usage(str(tmp_path))) == {
+        "spiral": {"files": 1, "bytes": 7}
+    }
+
+
+def test_prune_by_age_removes_whole_days(tmp_path):
+    old = write_output(tmp_path, date(2024, 12, 31), "spiral-000001.png", 10)
+    new = write_output(tmp_path, date(2025, 1, 2), "spiral-000002.png", 10)
+    plan = retention.plan_prune(str(tmp_path), before=date(2025, 1, 1))
+    assert [day for day, _, _ in plan["days"]] == [date(2024, 12, 31)]
+    assert retention.apply_prune(str(tmp_path), plan) == 10
+    assert not old.exists()
+    assert not (tmp_path / "2024").exists()
+    assert new.exists()
+
+
+def test_prune_counts_hardlinked_files_once_their_last_link_goes(tmp_path):
+    kept = write_output(tmp_path, date(2025, 1, 2), "spiral-000001.png", 10)
+    shared = write_output(tmp_path, date(2024, 12, 30), "spiral-000001.png", 20)
+    write_output(tmp_path, date(2024, 12, 30), "spiral-000002.png", 3)
+    os.unlink(shared)
+    os.link(kept, shared)
+    twin = tmp_path / "2024" / "12" / "31" / "spiral-000001.png"
+    twin.parent.mkdir()
+    os.link(write_output(tmp_path, date(2024, 12, 29), "spiral-000001.png", 7), twin)
+
+    plan = retention.plan_prune(str(tmp_path), before=date(2025, 1, 1))
+    assert retention.apply_prune(str(tmp_path), plan) == 3 + 7
+    assert kept.exists() and kept.stat().st_size == 10
+
+
+def test_prune_by_budget_keeps_newest_files(tmp_path):
+    oldest = write_output(tmp_path, date(2025, 1, 1), "spiral-000001.png", 10)
+    middle = write_output(tmp_path, date(2025, 1, 2), "spiral-000001.png", 10)
+    newest = write_output(tmp_path, date(2025, 1, 3), "spiral-000001.png", 10)
+    other = write_output(tmp_path, date(2025, 1, 1), "night_sky-000001.png", 50)
+    plan = retention.plan_prune(str(tmp_path), budgets={"spiral": 25})
+    assert [path for path, _ in plan["files"]] == [str(oldest)]
+    retention.apply_prune(str(tmp_path), plan)
+    assert not oldest.exists()
+    assert middle.exists() and newest.exists() and other.exists()
+    assert os.path.isdir(tmp_path / "2025" / "01" / "01")
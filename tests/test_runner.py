@@ -0,0 +1,35 @@
+import os
+import subprocess
+import sys
+
+import artctl.runner as runner
+
+
+def test_extra_environment_exposes_only_the_sdk_to_python(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    monkeypatch.setenv("PYTHONPATH", "/existing")
+    monkeypatch.setattr(runner, "_sdk_path", None)
+
+    assert runner.extra_environment("node") == {}
+    assert runner.extra_environment(None) == {}
+    env = runner.extra_environment("python")
+    sdk_dir, existing = env["PYTHONPATH"].split(os.pathsep)
+    assert existing == "/existing"
+    assert sdk_dir.startswith(str(tmp_path / "cache" / "artctl" / "sdk-"))
+    assert sorted(os.listdir(os.path.join(sdk_dir, "artctl"))) == sorted(runner.SDK_MODULES)
+    assert runner.sdk_path() == sdk_dir
+
+    probe = (
+        "import importlib.util\n"
+        "from artctl import profiling, sdk\n"
+        "print(importlib.util.find_spec('artctl.cli') is None)\n"
+    )
+    completed = subprocess.run(
+        [sys.executable, "-c", probe],
+        cwd=str(tmp_path),
+        env=dict(os.environ, PYTHONPATH=sdk_dir),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert completed.stdout.strip() == "True"
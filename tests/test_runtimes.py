@@ -0,0 +1,87 @@
+import os
+import sys
+
+import pytest
+
+import artctl.runtimes as runtimes
+import artctl.templater as templater
+
+
+def write_executable(directory, name):
+    path = directory / name
+    path.write_text("#!/bin/sh\nexit 0\n")
+    path.chmod(0o755)
+    return path
+
+
+def entry(command, **extra):
+    data = {
+        "name": "demo",
+        "runtime": "python",
+        "entrypoint": "generators/demo.py",
+        "command": command,
+    }
+    data.update(extra)
+    return data
+
+
+def test_resolves_names_on_path_and_caches_them(tmp_path, monkeypatch):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    script = write_executable(bin_dir, "artctl-demo-gen")
+    monkeypatch.setenv("PATH", str(bin_dir))
+    runtimes.clear_cache()
+    calls = []
+    original_which = runtimes.shutil.which
+    monkeypatch.setattr(
+        runtimes.shutil, "which", lambda name: calls.append(name) or original_which(name)
+    )
+
+    assert runtimes.resolve_executable("artctl-demo-gen") == str(script)
+    assert runtimes.resolve_executable("artctl-demo-gen") == str(script)
+    assert calls == ["artctl-demo-gen"]
+
+    script.unlink()
+    os.utime(bin_dir, ns=(0, 0))
+    with pytest.raises(runtimes.RuntimeResolutionError, match="not found on PATH"):
+        runtimes.resolve_executable("artctl-demo-gen")
+    assert len(calls) == 2
+
+
+def test_resolves_relative_paths_against_working_dir(tmp_path):
+    write_executable(tmp_path, "render")
+    command = runtimes.resolve_command(["./render", "--out", "x"], working_dir=str(tmp_path))
+    assert command == [str(tmp_path / "render"), "--out", "x"]
+    (tmp_path / "plain").write_text("")
+    with pytest.raises(runtimes.RuntimeResolutionError, match="not executable"):
+        runtimes.resolve_executable("./plain", working_dir=str(tmp_path))
+
+
+def test_current_interpreter_replaces_command_executable():
+    rendered = templater.render_command(
+        entry(["python3", "{entrypoint}"], interpreter="current"), {}
+    )
+    assert rendered == [sys.executable, "generators/demo.py"]
+    assert templater.render_command(entry(["python3", "{entrypoint}"]), {})[0] == "python3"
+
+
+def test_preflight_reports_missing_runtimes_and_entrypoints(tmp_path):
+    (tmp_path / "generators").mkdir()
+    (tmp_path / "generators" / "demo.py").write_text("")
+    good = entry(["python3", "{entrypoint}"], interpreter="current")
+    assert runtimes.preflight([good], working_dir=str(tmp_path)) == []
+
+    missing_runtime = entry(["artctl-no-such-runtime", "{entrypoint}"], name="ghost")
+    missing_entrypoint = entry(
+        [sys.executable, "generators/other.py"],
+        name="lost",
+        entrypoint="generators/other.py",
+    )
+    problems = runtimes.preflight(
+        [missing_runtime, missing_entrypoint, missing_runtime], working_dir=str(tmp_path)
+    )
+    assert problems == [
+        "ghost: Executable 'artctl-no-such-runtime' not found on PATH. "
+        "Install the required runtime.",
+        "lost: entrypoint not found: generators/other.py.",
+    ]
@@ -0,0 +1,114 @@
+import pytest
+
+import artctl.catalog as catalog
+import artctl.coalesce as coalesce
+import artctl.sampling as sampling
+
+PARAMS = [
+    {"name": "turns", "type": "int", "default": 20, "min": 1, "max": 10},
+    {"name": "scale", "type": "float", "default": 1.0, "min": 0.5, "max": 2.0},
+    {"name": "palette", "type": "enum", "default": "mono", "choices": ["mono", "fire"]},
+    {"name": "invert", "type": "bool", "default": False},
+    {"name": "size", "type": "int", "default": 64},
+    {"name": "title", "type": "string", "default": "x"},
+]
+BASE = {"turns": 20, "scale": 1.0, "palette": "mono", "invert": False, "size": 64, "title": "x"}
+
+
+def test_build_space_uses_declared_ranges_and_types():
+    dimensions = sampling.build_space(PARAMS, fixed={"invert"}, ranges={"size": (16, 32.5)})
+    by_name = {dimension["name"]: dimension for dimension in dimensions}
+    assert sorted(by_name) == ["palette", "scale", "size", "turns"]
+    assert (by_name["turns"]["low"], by_name["turns"]["high"]) == (1, 10)
+    assert (by_name["size"]["low"], by_name["size"]["high"]) == (16, 32)
+    assert by_name["palette"]["choices"] == ["mono", "fire"]
+
+
+def test_build_space_rejects_bad_ranges():
+    with pytest.raises(sampling.SamplingError):
+        sampling.build_space(PARAMS, ranges={"missing": (0, 1)})
+    with pytest.raises(sampling.SamplingError):
+        sampling.build_space(PARAMS, ranges={"palette": (0, 1)})
+    with pytest.raises(sampling.SamplingError):
+        sampling.parse_ranges(["turns=5"])
+    with pytest.raises(sampling.SamplingError):
+        sampling.parse_ranges(["turns=5:1"])
+    assert sampling.parse_ranges(["turns=1:5"]) == {"turns": (1.0, 5.0)}
+
+
+@pytest.mark.parametrize("method", sampling.SAMPLING_METHODS)
+def test_samples_stay_in_range_and_are_distinct(method):
+    dimensions = sampling.build_space(PARAMS)
+    points = list(sampling.sample("demo", dimensions, BASE, 40, method=method, seed=7))
+    assert len(points) == 40
+    keys = {coalesce.canonical_key("demo", point) for point in points}
+    assert len(keys) == 40
+    for point in points:
+        assert 1 <= point["turns"] <= 10 and isinstance(point["turns"], int)
+        assert 0.5 <= point["scale"] <= 2.0
+        assert point["palette"] in ("mono", "fire")
+        assert point["size"] == 64 and point["title"] == "x"
+
+
+def test_latin_hypercube_covers_every_stratum():
+    dimensions = [{"name": "turns", "type": "int", "low": 0, "high": 9, "choices": None}]
+    points = list(sampling.sample("demo", dimensions, {}, 10, method="lhs", seed=3))
+    assert sorted(point["turns"] for point in points) == list(range(10))
+
+
+def test_seeded_sampling_is_reproducible():
+    dimensions = sampling.build_space(PARAMS)
+    first = list(sampling.sample("demo", dimensions, BASE, 5, method="random", seed=11))
+    second = list(sampling.sample("demo", dimensions, BASE, 5, method="random", seed=11))
+    assert first == second
+
+
+def test_small_spaces_run_out_instead_of_looping():
+    dimensions = sampling.build_space([{"name": "flag", "type": "bool", "default": False}])
+    points = list(sampling.sample("demo", dimensions, {}, 5, method="random", seed=1))
+    assert sorted(point["flag"] for point in points) == [False, True]
+
+
+def test_constraints_and_exclusions_filter_points():
+    dimensions = sampling.build_space(PARAMS[:1])
+    constraints = sampling.compile_constraints(["turns % 2 == 0"], ["turns"])
+    exclude = {coalesce.canonical_key("demo", {"turns": 4})}
+    points = list(
+        sampling.sample(
+            "demo", dimensions, {}, 10, method="halton", constraints=constraints, exclude=exclude
+        )
+    )
+    assert sorted(point["turns"] for point in points) == [2, 6, 8, 10]
+
+
+def test_constraint_compiler_allows_only_safe_expressions():
+    check = sampling.compile_constraint(
+        "max(turns, 2) * 10 <= radius and palette in ('mono', 'fire')",
+        ["turns", "radius", "palette"],
+    )
+    assert check({"turns": 3, "radius": 30, "palette": "mono"}) is True
+    assert check({"turns": 3, "radius": 29, "palette": "mono"}) is False
+    assert sampling.compile_constraint("1 / turns > 0", ["turns"])({"turns": 0}) is False
+    assert sampling.compile_constraint("turns ** 2 == 9", ["turns"])({"turns": 3}) is True
+    assert sampling.compile_constraint("turns ** 10 ** 9 > 1", ["turns"])({"turns": 3}) is False
+    for expression in (
+        "__import__('os')",
+        "turns.__class__",
+        "[x for x in turns]",
+        "unknown > 1",
+        "turns >",
+        "",
+    ):
+        with pytest.raises(sampling.SamplingError):
+            sampling.compile_constraint(expression, ["turns"])
+
+
+def test_rendered_keys_reads_successful_runs(tmp_path):
+    path = str(tmp_path / "runs.jsonl")
+    catalog.append_record(path, catalog.make_record("demo", {"turns": 1}, "a.png", 0))
+    catalog.append_record(path, catalog.make_record("demo", {"turns": 2}, "b.png", 1))
+    catalog.append_record(path, catalog.make_record("other", {"turns": 3}, "c.png", 0))
+    assert sampling.rendered_keys(path, "demo") == {
+        coalesce.canonical_key("demo", {"turns": 1})
+    }
+    assert sampling.rendered_keys(None, "demo") == set()
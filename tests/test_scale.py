@@ -0,0 +1,165 @@
+import importlib.util
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from artctl import output_manager, params, registry, templater
+
+pytestmark = [
+    pytest.mark.scale,
+    pytest.mark.skipif(
+        not os.environ.get("ARTCTL_SCALE_TESTS"),
+        reason="set ARTCTL_SCALE_TESTS=1 to run scalability tests",
+    ),
+]
+
+ROOT = Path(__file__).resolve().parents[1]
+SIZES = sorted(
+    int(size) for size in os.environ.get("ARTCTL_SCALE_SIZES", "1000,4000").split(",")
+)
+# Time per item may grow by at most this factor from the smallest to the largest size;
+# anything quadratic grows by the size ratio instead.
+GROWTH_LIMIT = 2.5
+NOW = datetime(2024, 1, 2, 3, 4, 5)
+
+
+def load_generator():
+    spec = importlib.util.spec_from_file_location(
+        "make_registry", ROOT / "benchmarks" / "make_registry.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def per_item(func, count, repeat=3):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best / count
+
+
+def assert_flat(timings, label):
+    smallest, largest = timings[SIZES[0]], timings[SIZES[-1]]
+    assert largest <= smallest * GROWTH_LIMIT, (
+        "{0}: {1:.2f}us per item at {2} vs {3:.2f}us at {4}".format(
+            label, largest * 1e6, SIZES[-1], smallest * 1e6, SIZES[0]
+        )
+    )
+
+
+def wide_entry(count):
+    declared = []
+    for number in range(count):
+        kind = ("int", "float", "enum", "bool", "string")[number % 5]
+        param = {"name": "p{0}".format(number), "type": kind, "default": None}
+        if kind == "enum":
+            param["choices"] = ["a", "b", "c"]
+        declared.append(param)
+    return {
+        "name": "wide",
+        "runtime": "python",
+        "entrypoint": "generators/wide.py",
+        "command": ["python3", "{entrypoint}", "--output", "{output}", "{params}"],
+        "params": declared,
+        "output": {
+            "extension": "png",
+            "path_template": "{date_path}/"
+            + "-".join("{{params.p{0}}}".format(number) for number in range(0, count, 10))
+            + ".png",
+        },
+    }
+
+
+def wide_overrides(count):
+    values = {"int": "7", "float": "0.5", "enum": "b", "bool": "true", "string": "text"}
+    kinds = ("int", "float", "enum", "bool", "string")
+    return ["p{0}={1}".format(number, values[kinds[number % 5]]) for number in range(count)]
+
+
+def test_load_registry_time_per_entry_is_flat(tmp_path):
+    generator = load_generator()
+    timings = {}
+    for size in SIZES:
+        root = tmp_path / str(size)
+        names = generator.write_registry(str(root), size, seed=size)
+        started = time.perf_counter()
+        entries = registry.load_registry(str(root))
+        timings[size] = (time.perf_counter() - started) / size
+        assert sorted(entries) == names
+    assert_flat(timings, "load_registry")
+
+
+def test_duplicate_names_are_rejected_at_scale(tmp_path):
+    generator = load_generator()
+    generator.write_registry(str(tmp_path), SIZES[-1], seed=1, duplicates=1)
+
+    with pytest.raises(registry.RegistryError, match="Duplicate registry name"):
+        registry.load_registry(str(tmp_path))
+
+
+def test_parse_overrides_time_per_param_is_flat():
+    timings = {}
+    for size in SIZES:
+        declared = wide_entry(size)["params"]
+        overrides = wide_overrides(size)
+        values = params.parse_overrides(overrides, declared)
+        assert len(values) == size
+        timings[size] = per_item(lambda: params.parse_overrides(overrides, declared), size)
+    assert_flat(timings, "parse_overrides")
+
+
+def test_render_command_time_per_param_is_flat():
+    timings = {}
+    for size in SIZES:
+        entry = wide_entry(size)
+        values = params.parse_overrides(wide_overrides(size), entry["params"])
+        values["output"] = "out.png"
+        command = templater.render_command(entry, values, "/project")
+        assert command[:4] == ["python3", "generators/wide.py", "--output", "out.png"]
+        timings[size] = per_item(
+            lambda: templater.render_command(entry, values, "/project"), size
+        )
+    assert_flat(timings, "render_command")
+
+
+def test_build_output_path_time_per_call_is_flat(tmp_path):
+    generator = load_generator()
+    root = tmp_path / "registry"
+    generator.write_registry(str(root), SIZES[0], seed=2)
+    entries = list(registry.load_registry(str(root)).values())
+    base_dir = str(tmp_path / "outputs")
+
+    def build(count):
+        for number in range(count):
+            output_manager.build_output_path(
+                entries[number % len(entries)], base_dir=base_dir, now=NOW, create_dirs=False
+            )
+
+    timings = {size: per_item(lambda: build(size), size) for size in SIZES}
+    assert_flat(timings, "build_output_path")
+
+
+def test_output_template_time_per_placeholder_is_flat(tmp_path):
+    timings = {}
+    for size in SIZES:
+        entry = wide_entry(size)
+        values = params.parse_overrides(wide_overrides(size), entry["params"])
+        path = output_manager.build_output_path(
+            entry, base_dir=str(tmp_path), now=NOW, params_values=values, create_dirs=False
+        )
+        assert path.startswith(os.path.join(str(tmp_path), "2024", "01", "02", "7-"))
+        placeholders = len(range(0, size, 10))
+        timings[size] = per_item(
+            lambda: output_manager.build_output_path(
+                entry, base_dir=str(tmp_path), now=NOW, params_values=values, create_dirs=False
+            ),
+            placeholders,
+        )
+    assert_flat(timings, "build_output_path placeholders")
@@ -0,0 +1,128 @@
+import os
+import zlib
+
+import pytest
+
+import artctl.sdk as sdk
+import artctl.verify as verify
+
+
+def segment(name):
+    return "artctl-test-{0}-{1}".format(name, os.getpid())
+
+
+def test_shared_frame_round_trip():
+    name = segment("roundtrip")
+    with sdk.shared_frame(sdk.SHM_PREFIX + name, 4, 3, channels=1) as pixels:
+        pixels[:] = bytes(range(12))
+
+    with sdk.SharedFrame(name) as frame:
+        assert (frame.width, frame.height, frame.channels) == (4, 3, 1)
+        assert bytes(frame.pixels) == bytes(range(12))
+        assert frame.pixels.readonly
+
+    with pytest.raises(sdk.SDKError, match="was not produced"):
+        sdk.SharedFrame(name)
+
+
+def test_shared_frame_rejects_bad_targets_and_shapes():
+    with pytest.raises(sdk.SDKError, match="not a shared-memory target"):
+        sdk.segment_name("out.png")
+    with pytest.raises(sdk.SDKError, match="Invalid frame shape"):
+        with sdk.shared_frame(sdk.SHM_PREFIX + segment("shape"), 0, 3):
+            pass
+
+
+def read_chunks(path):
+    data = path.read_bytes()
+    assert data.startswith(sdk.PNG_SIGNATURE)
+    offset = len(sdk.PNG_SIGNATURE)
+    chunks = []
+    while offset < len(data):
+        length = int.from_bytes(data[offset : offset + 4], "big")
+        chunks.append((data[offset + 4 : offset + 8], data[offset + 8 : offset + 8 + length]))
+        offset += 12 + length
+    return chunks
+
+
+def test_write_png_streams_rows_into_bounded_idat_chunks(tmp_path):
+    path = tmp_path / "image.png"
+    pixels = bytes(range(256)) * 12
+    sdk.write_png(str(path), pixels, 64, 16, channels=3, level=0, idat_size=256)
+
+    chunks = read_chunks(path)
+    kinds = [kind for kind, _ in chunks]
+    assert kinds[0] == b"IHDR" and kinds[-1] == b"IEND"
+    assert kinds.count(b"IDAT") > 1
+    raw = zlib.decompress(b"".join(data for kind, data in chunks if kind == b"IDAT"))
+    rows = [raw[index * 193 : (index + 1) * 193] for index in range(16)]
+    assert all(row[0] == 0 for row in rows)
+    assert b"".join(row[1:] for row in rows) == pixels
+    assert verify.check_file(str(path), mode="structure") is None
+
+
+@pytest.mark.parametrize("png_filter", sorted(sdk.PNG_FILTERS))
+def test_png_writer_filters_produce_valid_images(tmp_path, png_filter):
+    path = tmp_path / "image.png"
+    with sdk.PNGWriter(str(path), 5, 3, channels=2, filter=png_filter) as writer:
+        for row in range(3):
+            values = bytes((row * 31 + column * 7) % 256 for column in range(10))
+            writer.write_row(memoryview(values))
+    chunks = read_chunks(path)
+    raw = zlib.decompress(b"".join(data for kind, data in chunks if kind == b"IDAT"))
+    assert raw[0] == sdk.PNG_FILTERS[png_filter]
+    assert verify.check_file(str(path), mode="structure") is None
+
+
+def test_png_writer_rejects_wrong_row_sizes_and_counts(tmp_path):
+    writer = sdk.PNGWriter(str(tmp_path / "image.png"), 4, 2)
+    with pytest.raises(sdk.SDKError, match="expected 4"):
+        writer.write_row(b"abc")
+    writer.write_row(b"abcd")
+    with pytest.raises(sdk.SDKError, match="1 of 2 rows"):
+        writer.close()
+
+
+def test_write_png_accepts_numpy_arrays(tmp_path):
+    numpy = pytest.importorskip("numpy")
+    image = numpy.arange(4 * 6 * 3, dtype=numpy.uint8).reshape(4, 6, 3)
+    path = tmp_path / "image.png"
+    sdk.write_png(str(path), image[:, ::-1], 6, 4, channels=3, filter="paeth")
+    assert verify.check_file(str(path), mode="structure") is None
+
+
+def test_progress_writes_throttled_records_to_inherited_fd():
+    read_fd, write_fd = os.pipe()
+    original_env = os.environ.get(sdk.PROGRESS_FD_ENV)
+    original_state = dict(sdk._progress)
+    os.environ[sdk.PROGRESS_FD_ENV] = str(write_fd)
+    sdk._progress.update(fd=None, last=0.0)
+    try:
+        assert sdk.progress(1, 10, "first") is True
+        assert sdk.progress(2, 10) is False
+        assert sdk.progress(10, 10, "done") is True
+    finally:
+        sdk._progress.update(original_state)
+        if original_env is None:
+            del os.environ[sdk.PROGRESS_FD_ENV]
+        else:
+            os.environ[sdk.PROGRESS_FD_ENV] = original_env
+        os.close(write_fd)
+    with os.fdopen(read_fd, "rb") as handle:
+        lines = handle.read().decode("utf-8").splitlines()
+    assert lines == [
+        '{"done":1,"total":10,"msg":"first"}',
+        '{"done":10,"total":10,"msg":"done"}',
+    ]
+
+
+def test_progress_is_a_no_op_without_artctl():
+    original_env = os.environ.pop(sdk.PROGRESS_FD_ENV, None)
+    original_state = dict(sdk._progress)
+    sdk._progress.update(fd=None, last=0.0)
+    try:
+        assert sdk.progress(1, 2) is False
+    finally:
+        sdk._progress.update(original_state)
+        if original_env is not None:
+            os.environ[sdk.PROGRESS_FD_ENV] = original_env
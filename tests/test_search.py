@@ -0,0 +1,85 @@
+import time
+
+import artctl.search as search
+
+ENTRIES = {
+    "spiral": {
+        "name": "spiral",
+        "description": "Rasterises an anti-aliased spiral.",
+        "runtime": "python",
+        "tags": ["example", "python"],
+        "source_path": "registry/spiral.yaml",
+    },
+    "night_sky": {
+        "name": "night_sky",
+        "description": "Renders a night sky with Node.",
+        "runtime": "node",
+        "tags": ["example", "node"],
+        "source_path": "registry/night_sky.yaml",
+    },
+    "spokes": {
+        "name": "spokes",
+        "description": "Radial spokes.",
+        "runtime": "python",
+        "source_path": "registry/spokes.yaml",
+    },
+}
+
+
+def names(results):
+    return [program["name"] for program in results]
+
+
+def test_query_filters_by_tag_runtime_and_text():
+    index = search.build_index(ENTRIES)
+    assert names(search.query(index)) == ["night_sky", "spiral", "spokes"]
+    assert names(search.query(index, tags=["example"])) == ["night_sky", "spiral"]
+    assert names(search.query(index, tags=["example", "node"])) == ["night_sky"]
+    assert names(search.query(index, runtime="python")) == ["spiral", "spokes"]
+    assert names(search.query(index, text="sp")) == ["spiral", "spokes"]
+    assert names(search.query(index, text="SKY night")) == ["night_sky"]
+    assert names(search.query(index, text="anti aliased", runtime="python")) == ["spiral"]
+    assert names(search.query(index, text="radial", tags=["example"])) == []
+    assert next(search.query(index, text="spokes"))["tags"] == []
+
+
+def test_index_is_cached_until_registry_changes(tmp_path):
+    registry = tmp_path / "registry"
+    registry.mkdir()
+    (registry / "spiral.yaml").write_text("name: spiral\n")
+    cache = tmp_path / "cache"
+    loads = []
+
+    def load_entries():
+        loads.append(1)
+        return dict(ENTRIES)
+
+    first = search.load_index(str(registry), load_entries, str(cache))
+    second = search.load_index(str(registry), load_entries, str(cache))
+    assert len(loads) == 1
+    assert second["names"] == first["names"]
+
+    (registry / "spokes.yaml").write_text("name: spokes\n")
+    search.load_index(str(registry), load_entries, str(cache))
+    assert len(loads) == 2
+
+
+def test_query_on_large_index_is_fast():
+    entries = {}
+    for number in range(20000):
+        name = "program_{0:05d}".format(number)
+        entries[name] = {
+            "name": name,
+            "description": "Generator number {0} drawing {1}.".format(
+                number, ("waves", "circles", "noise")[number % 3]
+            ),
+            "runtime": ("python", "node")[number % 2],
+            "tags": ["batch{0}".format(number % 10)],
+        }
+    index = search.build_index(entries)
+    started = time.perf_counter()
+    matches = names(search.query(index, tags=["batch3"], runtime="node", text="circ"))
+    elapsed = time.perf_counter() - started
+    assert matches[:2] == ["program_00013", "program_00043"]
+    assert len(matches) == 667
+    assert elapsed < 0.05
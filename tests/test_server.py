@@ -0,0 +1,118 @@
+import os
+import tempfile
+import textwrap
+import threading
+
+import pytest
+
+import artctl.registry as registry
+import artctl.server as server
+
+
+def write_registry(directory, description="Spiral generator"):
+    content = textwrap.dedent(
+        """
+        name: spiral
+        description: {0}
+        runtime: python
+        entrypoint: generators/spiral.py
+        command:
+          - python3
+          - generators/spiral.py
+        """
+    ).format(description)
+    path = directory / "spiral.yaml"
+    path.write_text(content.strip() + "\n", encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def daemon(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    socket_dir = tempfile.mkdtemp(prefix="artctl-")
+    socket_path = os.path.join(socket_dir, "artctl.sock")
+    instance = server.ArtctlServer(socket_path)
+    thread = threading.Thread(target=instance.serve, daemon=True)
+    thread.start()
+    try:
+        yield instance
+    finally:
+        instance.shutdown()
+        thread.join(timeout=5)
+        os.rmdir(socket_dir)
+
+
+def test_forward_runs_command_on_daemon(daemon, tmp_path):
+    write_registry(tmp_path)
+    response = server.forward(daemon.socket_path, ["--registry-path", str(tmp_path), "list"])
+    assert response["exit_code"] == 0
+    assert "- spiral: Spiral generator" in response["stdout"]
+    assert response["stderr"] == ""
+
+
+def test_forward_returns_none_for_other_working_directory(daemon, tmp_path):
+    elsewhere = tmp_path / "elsewhere"
+    elsewhere.mkdir()
+    response = server.forward(daemon.socket_path, ["list"], cwd=str(elsewhere))
+    assert response is None
+
+
+def test_forward_returns_none_for_other_environment(daemon, tmp_path):
+    write_registry(tmp_path)
+    env = dict(os.environ, ARTCTL_CATALOG=str(tmp_path / "other.jsonl"))
+    argv = ["--registry-path", str(tmp_path), "list"]
+    assert server.forward(daemon.socket_path, argv, env=env) is None
+
+    env = dict(os.environ, PATH=str(tmp_path) + os.pathsep + os.environ.get("PATH", ""))
+    assert server.forward(daemon.socket_path, argv, env=env) is None
+
+    env = dict(os.environ, SHLVL="9", TERM_SESSION_ID="other", SSH_TTY="/dev/pts/9")
+    env[server.SOCKET_ENV_VAR] = daemon.socket_path
+    env.pop("DISPLAY", None)
+    assert server.forward(daemon.socket_path, argv, env=env)["exit_code"] == 0
+
+
+def test_generator_output_is_returned_to_the_client(daemon, tmp_path, capfd):
+    script = tmp_path / "chatty.py"
+    script.write_text(
+        "import sys\nprint('to stdout')\nprint('to stderr', file=sys.stderr)\n",
+        encoding="utf-8",
+    )
+    content = textwrap.dedent(
+        """
+        name: chatty
+        description: Talkative generator
+        runtime: python
+        entrypoint: {0}
+        command: [python3, "{{entrypoint}}"]
+        output:
+          required: false
+        """
+    ).format(script)
+    (tmp_path / "chatty.yaml").write_text(content.strip() + "\n", encoding="utf-8")
+
+    argv = ["--registry-path", str(tmp_path), "run", "chatty", "--progress", "json"]
+    response = server.forward(daemon.socket_path, argv)
+    assert response["exit_code"] == 0, response
+    assert "to stdout" in response["stdout"]
+    assert "to stderr" in response["stderr"]
+    assert "to stdout" not in capfd.readouterr().out
+    assert (tmp_path / "outputs").is_dir()
+
+
+def test_forward_without_daemon_returns_none(tmp_path):
+    assert server.forward(str(tmp_path / "missing.sock"), ["list"]) is None
+
+
+def test_registry_cache_reloads_changed_files(tmp_path):
+    path = write_registry(tmp_path)
+    cache = registry.RegistryCache()
+    first = cache.load(str(tmp_path))
+    assert cache.load(str(tmp_path)) is first
+
+    write_registry(tmp_path, description="Updated spiral with a longer description")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    second = cache.load(str(tmp_path))
+    assert second is not first
+    assert second["spiral"]["description"].startswith("Updated")
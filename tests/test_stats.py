@@ -0,0 +1,137 @@
+import random
+
+import pytest
+
+from artctl import catalog, stats
+
+
+def usage(wall_time, cpu_time=None, rss=1024):
+    return {
+        "returncode": 0,
+        "wall_time": wall_time,
+        "user_time": wall_time if cpu_time is None else cpu_time,
+        "system_time": 0.0,
+        "max_rss_kb": rss,
+    }
+
+
+def append_runs(path, program, version, times, exit_status=0):
+    for wall_time in times:
+        record = catalog.make_record(program, {}, "out.png", exit_status, version=version)
+        catalog.append_record(str(path), catalog.record_usage(record, usage(wall_time)))
+
+
+def noisy(rng, center, count):
+    return [center * rng.lognormvariate(0, 0.05) for _ in range(count)]
+
+
+def test_source_version_tracks_entrypoint_content(tmp_path):
+    script = tmp_path / "gen.py"
+    script.write_text("print('one')\n", encoding="utf-8")
+    entry = {"name": "gen", "entrypoint": "gen.py"}
+
+    first = stats.source_version(entry, str(tmp_path))
+    assert len(first) == stats.VERSION_LENGTH
+    assert stats.source_version(entry, str(tmp_path)) == first
+
+    script.write_text("print('two, longer')\n", encoding="utf-8")
+    assert stats.source_version(entry, str(tmp_path)) != first
+    assert stats.source_version({"name": "gen"}, str(tmp_path)) is None
+    assert stats.source_version({"name": "gen", "entrypoint": "missing.py"}) is None
+
+
+def test_update_reads_only_appended_records(tmp_path):
+    path = tmp_path / "runs.jsonl"
+    append_runs(path, "spiral", "a", [1.0, 2.0])
+    summary = stats.update(str(path))
+    assert summary["offset"] == path.stat().st_size
+    assert summary["programs"]["spiral"]["a"]["runs"] == 2
+
+    # Blank out the records already summarised without replacing the file: a later
+    # update must not read them again.
+    path.write_bytes(b" " * (path.stat().st_size - 1) + b"\n")
+    append_runs(path, "spiral", "a", [3.0])
+    summary = stats.update(str(path))
+    assert summary["programs"]["spiral"]["a"]["runs"] == 3
+    assert summary["programs"]["spiral"]["a"]["metrics"]["wall_time"]["n"] == 3
+
+    assert stats.update(str(path), rebuild=True)["programs"]["spiral"]["a"]["runs"] == 1
+
+
+def test_update_waits_for_a_partial_record(tmp_path):
+    path = tmp_path / "runs.jsonl"
+    append_runs(path, "spiral", "a", [1.0])
+    line = path.read_text(encoding="utf-8")
+    with open(path, "a", encoding="utf-8") as handle:
+        handle.write(line[:-10])
+
+    assert stats.update(str(path))["programs"]["spiral"]["a"]["runs"] == 1
+    with open(path, "a", encoding="utf-8") as handle:
+        handle.write(line[-10:])
+    assert stats.update(str(path))["programs"]["spiral"]["a"]["runs"] == 2
+
+
+def test_update_rereads_a_rewritten_catalog(tmp_path):
+    path = tmp_path / "runs.jsonl"
+    append_runs(path, "spiral", "a", [1.0, 2.0, 3.0])
+    stats.update(str(path))
+
+    catalog.rewrite_records(str(path), lambda records: records.pop())
+    assert stats.update(str(path))["programs"]["spiral"]["a"]["runs"] == 2
+
+
+def test_update_rejects_invalid_records(tmp_path):
+    path = tmp_path / "runs.jsonl"
+    path.write_text("{not json\n", encoding="utf-8")
+
+    with pytest.raises(stats.StatsError, match="byte 0"):
+        stats.update(str(path))
+
+
+def test_report_percentiles_and_failures(tmp_path):
+    path = tmp_path / "runs.jsonl"
+    append_runs(path, "spiral", "a", [value / 1000.0 for value in range(1, 1001)])
+    append_runs(path, "spiral", "b", [0.5] * 10)
+    append_runs(path, "spiral", "b", [100.0], exit_status=1)
+    summary = stats.update(str(path))
+
+    (combined,) = stats.report(summary)
+    assert combined["version"] is None
+    assert (combined["runs"], combined["failures"], combined["samples"]) == (1011, 1, 1010)
+
+    first, second = stats.report(summary, by_version=True, programs=["spiral"])
+    assert first["version"] == "a"
+    assert first["p50"] == pytest.approx(0.5, rel=0.025)
+    assert first["p95"] == pytest.approx(0.95, rel=0.025)
+    assert first["p99"] == pytest.approx(0.99, rel=0.025)
+    assert second["p99"] == pytest.approx(0.5, rel=0.025)
+    assert stats.report(summary, programs=["other"]) == []
+    assert stats.report(summary, metric="max_rss_kb")[0]["p50"] == pytest.approx(1024, rel=0.025)
+
+
+def test_regressions_between_versions(tmp_path):
+    path = tmp_path / "runs.jsonl"
+    rng = random.Random(3)
+    append_runs(path, "spiral", "a", noisy(rng, 1.0, 40))
+    append_runs(path, "spiral", "b", noisy(rng, 1.3, 40))
+    append_runs(path, "spiral", "c", noisy(rng, 1.3, 40))
+    append_runs(path, "spiral", "d", noisy(rng, 1.01, 3))
+    append_runs(path, "night_sky", None, noisy(rng, 1.0, 5) + noisy(rng, 3.0, 5))
+    summary = stats.update(str(path))
+
+    (regression,) = stats.regressions(summary)
+    assert (regression["program"], regression["before"], regression["after"]) == (
+        "spiral",
+        "a",
+        "b",
+    )
+    assert regression["change"] == pytest.approx(0.3, abs=0.05)
+    assert regression["p_value"] < 1e-6
+    assert regression["after_p50"] == pytest.approx(1.3, rel=0.05)
+    assert stats.regressions(summary, min_change=0.5) == []
+
+
+def test_student_t_tail():
+    assert stats.student_t_sf(2.0, 10) == pytest.approx(0.036694, rel=1e-4)
+    assert stats.student_t_sf(-1.0, 5) == pytest.approx(0.818391, rel=1e-4)
+    assert stats.student_t_sf(0.0, 7) == pytest.approx(0.5)
@@ -0,0 +1,67 @@
+import struct
+import zlib
+
+import artctl.verify as verify
+
+
+def png_chunk(chunk_type, data):
+    crc = zlib.crc32(chunk_type + data)
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", crc)
+
+
+def build_png(width=2, height=2):
+    header = struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0)
+    raw = b"".join(b"\x00" + b"\x80" * width for _ in range(height))
+    return (
+        verify.PNG_SIGNATURE
+        + png_chunk(b"IHDR", header)
+        + png_chunk(b"IDAT", zlib.compress(raw))
+        + png_chunk(b"IEND", b"")
+    )
+
+
+def test_valid_png_passes_structure(tmp_path):
+    path = tmp_path / "ok.png"
+    path.write_bytes(build_png())
+    assert verify.check_file(str(path), "structure") is None
+
+
+def test_truncated_png_fails_structure_but_passes_magic(tmp_path):
+    path = tmp_path / "truncated.png"
+    path.write_bytes(build_png()[:-6])
+    assert verify.check_file(str(path), "magic") is None
+    assert "truncated" in verify.check_file(str(path), "structure")
+
+
+def test_corrupt_crc_detected(tmp_path):
+    data = bytearray(build_png())
+    data[40] ^= 0xFF
+    path = tmp_path / "corrupt.png"
+    path.write_bytes(bytes(data))
+    assert "CRC mismatch" in verify.check_file(str(path), "structure")
+
+
+def test_empty_and_small_files(tmp_path):
+    path = tmp_path / "empty.png"
+    path.write_bytes(b"")
+    assert verify.check_file(str(path), "exists") is None
+    assert verify.check_file(str(path), "magic") == "file is empty"
+    assert "expected at least 10" in verify.check_file(str(path), "exists", min_size=10)
+    assert verify.check_file(str(tmp_path / "missing.png")) == "file does not exist"
+
+
+def test_wrong_magic_detected(tmp_path):
+    path = tmp_path / "fake.png"
+    path.write_bytes(b"GIF89a-not-a-png")
+    assert verify.check_file(str(path), "magic") == "missing PNG signature"
+
+
+def test_verify_tree_reports_failures(tmp_path):
+    day = tmp_path / "2025" / "01" / "02"
+    day.mkdir(parents=True)
+    (day / "good.png").write_bytes(build_png())
+    (day / "bad.png").write_bytes(b"")
+    (day / ".partial.png").write_bytes(b"")
+    (day / "notes.txt").write_text("skip me", encoding="utf-8")
+    results = dict(verify.verify_tree(str(tmp_path), mode="structure", jobs=2))
+    assert results == {str(day / "bad.png"): "file is empty", str(day / "good.png"): None}